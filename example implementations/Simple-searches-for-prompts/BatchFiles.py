@@ -0,0 +1,188 @@
+"""
+BatchFiles: Compact, deduplicated batch request files
+
+A round's batch requests repeat every system prompt once per example and every
+example input once per prompt. The compact format stores each distinct message
+string once in a side table on the first line, and every request line refers to
+strings by index. Full OpenAI batch JSONL is rebuilt in memory only when the
+file is uploaded.
+
+Compact file layout (JSON lines, optionally gzip-compressed):
+    {"format": "compact-batch-v1", "strings": ["<system prompt>", "<input>", ...]}
+    {"custom_id": "r0_p0_e0", "body": {..., "messages": [{"role": "system", "ref": 0}, ...]}}
+
+Lines are serialized with orjson when it is installed, and with the standard
+json module otherwise.
+
+Rows of batch output and error files are classified with `classify_result`, so
+callers can resubmit only the requests that failed for retryable reasons.
+
+Typical usage:
+    from BatchFiles import write_batch_requests, read_batch_requests, upload_payload
+
+    path = write_batch_requests("results/batch_round_0.compact.jsonl.gz", requests, compress=True)
+    for custom_id, body in read_batch_requests(path):
+        ...
+    client.files.create(file=upload_payload(path), purpose="batch")
+"""
+
+import gzip
+import json
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FORMAT = "compact-batch-v1"
+
+
+def dumps(obj) -> bytes:
+    """Serialize to compact JSON bytes with the fastest available encoder."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON bytes or text with the fastest available decoder."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _open(path: str, mode: str):
+    if str(path).endswith('.gz'):
+        return gzip.open(path, mode, compresslevel=6)
+    return open(path, mode)
+
+
+def write_batch_requests(path: str, requests: Dict[str, Dict], compress: bool = False) -> str:
+    """
+    Write requests in the compact format.
+
+    Args:
+        path: Output path; '.gz' is appended when `compress` is set
+        requests: Chat completion request bodies keyed by custom ID
+        compress: Gzip the file (default: False)
+
+    Returns:
+        The path written
+    """
+    path = str(path)
+    if compress and not path.endswith('.gz'):
+        path += '.gz'
+
+    strings: Dict[str, int] = {}
+    lines = []
+    for custom_id, body in requests.items():
+        messages = []
+        for message in body['messages']:
+            ref = strings.setdefault(message['content'], len(strings))
+            messages.append({'role': message['role'], 'ref': ref})
+        lines.append(dumps({'custom_id': custom_id, 'body': dict(body, messages=messages)}))
+
+    with _open(path, 'wb') as f:
+        f.write(dumps({'format': FORMAT, 'strings': list(strings)}))
+        f.write(b'\n')
+        for line in lines:
+            f.write(line)
+            f.write(b'\n')
+    return path
+
+
+def read_batch_requests(path: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Read (custom_id, body) pairs from a compact or a legacy full JSONL file.
+
+    Args:
+        path: Batch request file
+
+    Yields:
+        Custom ID and the full request body with message text restored
+    """
+    with _open(path, 'rb') as f:
+        strings = None
+        for raw in f:
+            if not raw.strip():
+                continue
+            record = loads(raw)
+            if strings is None and record.get('format') == FORMAT:
+                strings = record['strings']
+                continue
+            body = record['body']
+            if strings is not None:
+                body['messages'] = [{'role': m['role'], 'content': strings[m['ref']]} for m in body['messages']]
+            yield record['custom_id'], body
+
+
+def upload_payload(path: str, url: str = "/v1/chat/completions") -> Tuple[str, bytes]:
+    """
+    Rebuild the full OpenAI batch JSONL for a request file in memory.
+
+    Args:
+        path: Compact or legacy batch request file
+        url: Endpoint each request targets (default: "/v1/chat/completions")
+
+    Returns:
+        (filename, content) tuple accepted by `client.files.create(file=...)`
+    """
+    lines = [
+        dumps({'custom_id': custom_id, 'method': 'POST', 'url': url, 'body': body})
+        for custom_id, body in read_batch_requests(path)
+    ]
+    filename = str(path).rsplit('/', 1)[-1].replace('.gz', '').replace('.compact', '')
+    return filename, b'\n'.join(lines) + b'\n'
+
+
+# Error classes worth resubmitting; the others would fail again unchanged
+RETRYABLE_ERRORS = {'rate_limit', 'server_error', 'timeout', 'expired', 'cancelled', 'missing'}
+
+
+def classify_status(status_code: Optional[int], code: str = '') -> str:
+    """
+    Map an HTTP status code and API error code to an error class.
+
+    Returns:
+        One of 'rate_limit', 'expired', 'cancelled', 'timeout', 'server_error',
+        'auth', 'invalid_request' or 'unknown'
+    """
+    code = code or ''
+    if status_code == 429 or 'rate_limit' in code:
+        return 'rate_limit'
+    if code == 'batch_expired':
+        return 'expired'
+    if code == 'batch_cancelled':
+        return 'cancelled'
+    if status_code == 408 or 'timeout' in code:
+        return 'timeout'
+    if status_code is not None and status_code >= 500:
+        return 'server_error'
+    if status_code in (401, 403):
+        return 'auth'
+    if status_code == 400 or 'invalid' in code:
+        return 'invalid_request'
+    return 'unknown'
+
+
+def classify_result(row: Dict) -> Optional[str]:
+    """
+    Classify one row of a batch output or error file.
+
+    Args:
+        row: Parsed result line with 'custom_id', 'response' and 'error'
+
+    Returns:
+        None for a usable completion, otherwise an error class (see classify_status,
+        plus 'empty' for a successful response without content)
+    """
+    error = row.get('error') or {}
+    response = row.get('response') or {}
+    body = response.get('body') or {}
+    status_code = response.get('status_code')
+    if not error and status_code == 200 and body.get('choices'):
+        content = (body['choices'][0].get('message') or {}).get('content')
+        return None if content is not None else 'empty'
+    code = error.get('code') or (body.get('error') or {}).get('code') or ''
+    return classify_status(status_code, code)
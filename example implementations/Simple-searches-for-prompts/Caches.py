@@ -0,0 +1,163 @@
+"""
+Caches: Shared completion and embedding caches
+
+Both caches are thread-safe, so several PromptGenerator runs in one process can
+share them (see Orchestrator). The completion cache can be persisted to a
+SQLite file so it also survives across processes and runs.
+
+- CompletionCache: evaluator completions keyed by a hash of the request body
+- EmbeddingCache: sentence embeddings keyed by text, wrapping any encode function
+
+Typical usage:
+    from Caches import CompletionCache, EmbeddingCache
+
+    completion_cache = CompletionCache("results/completions.sqlite")
+    embedding_cache = EmbeddingCache(lambda texts: model.encode(texts, convert_to_tensor=True))
+
+    exp_emb, pred_emb = embedding_cache.embed([expected, predicted])
+"""
+
+import json
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+
+def request_key(body: Dict) -> str:
+    """
+    Hash a chat completion request body into a stable cache key.
+
+    Args:
+        body: Request body with 'model', 'messages' and sampling parameters
+
+    Returns:
+        Hex SHA-256 digest of the canonical JSON encoding
+    """
+    canonical = json.dumps(body, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class CompletionCache:
+    """
+    Cache of evaluator completions keyed by request body.
+
+    Evaluation requests use a low fixed temperature, so a repeated
+    (model, system prompt, input, parameters) request is served from the cache
+    instead of being paid for again.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Optional SQLite file for persistence (in-memory only if None)
+        """
+        self._lock = threading.Lock()
+        self._memory: Dict[str, str] = {}
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, content TEXT)")
+            self._db.commit()
+
+    def get(self, body: Dict) -> Optional[str]:
+        """Return the cached completion for a request body, or None."""
+        key = request_key(body)
+        with self._lock:
+            content = self._memory.get(key)
+            if content is None and self._db is not None:
+                row = self._db.execute("SELECT content FROM completions WHERE key = ?", (key,)).fetchone()
+                if row:
+                    content = row[0]
+                    self._memory[key] = content
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return content
+
+    def put(self, body: Dict, content: str):
+        """Store the completion for a request body."""
+        key = request_key(body)
+        with self._lock:
+            self._memory[key] = content
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO completions VALUES (?, ?)", (key, content))
+                self._db.commit()
+
+    def stats(self) -> Dict:
+        """Return hit/miss counts."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._memory)
+            }
+
+
+class EmbeddingCache:
+    """
+    Cache of text embeddings around an arbitrary encode function.
+
+    Expected answers are embedded once per run instead of once per
+    (prompt, example) evaluation, and identical predictions are embedded once.
+    """
+
+    def __init__(self, encode: Callable[[List[str]], Sequence], max_entries: int = 100000):
+        """
+        Args:
+            encode: Function mapping a list of texts to a sequence of vectors
+            max_entries: Entries kept before the oldest are evicted (default: 100000)
+        """
+        self._encode = encode
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._vectors: Dict[str, object] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, texts: List[str]) -> List:
+        """
+        Embed texts, encoding only the ones not already cached.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            One vector per input text, in order
+        """
+        with self._lock:
+            found = {t: self._vectors[t] for t in texts if t in self._vectors}
+            missing = [t for t in dict.fromkeys(texts) if t not in found]
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            vectors = self._encode(missing)
+            found.update(zip(missing, vectors))
+            with self._lock:
+                for text in missing:
+                    self._vectors[text] = found[text]
+                # Evict oldest entries (dicts keep insertion order)
+                while len(self._vectors) > self._max_entries:
+                    self._vectors.pop(next(iter(self._vectors)))
+
+        return [found[t] for t in texts]
+
+    def stats(self) -> Dict:
+        """Return hit/miss counts."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'entries': len(self._vectors)
+            }
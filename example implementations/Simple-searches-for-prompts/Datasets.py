@@ -0,0 +1,204 @@
+"""
+Datasets: Evaluation set loaders that avoid reading whole files into memory
+
+Evaluation sets are CSV files (like eval.csv, with 'question' and 'answer'
+columns) or JSON-lines files. Two loaders turn them into the
+[{'input': ..., 'expected': ...}] lists used by PromptGenerator:
+
+- stream: reads records one at a time and stops at `limit`; a random `sample`
+  is drawn with reservoir sampling in one pass
+- mmap: memory-maps the file and indexes record offsets, so a random sample or
+  a slice parses only the records it returns
+
+Neither loader needs pandas.
+
+Typical usage:
+    from Datasets import load_examples
+
+    examples = load_examples("eval.csv", limit=25)                      # first 25 rows
+    examples = load_examples("eval.csv", loader="mmap", sample=100)     # 100 random rows
+"""
+
+import csv
+import io
+import json
+import mmap
+import random
+import sys
+from typing import Dict, Iterator, List, Optional
+
+# eval.csv has multi-kilobyte code snippets in single fields
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
+def _is_jsonl(path: str) -> bool:
+    return str(path).endswith(('.jsonl', '.ndjson'))
+
+
+def _example(record: Dict, input_column: str, expected_column: str) -> Dict:
+    return {'input': record[input_column], 'expected': record[expected_column]}
+
+
+def stream_examples(path: str, input_column: str = "question", expected_column: str = "answer") -> Iterator[Dict]:
+    """
+    Yield examples one record at a time.
+
+    Args:
+        path: CSV or JSON-lines file
+        input_column: Column/key holding the model input (default: 'question')
+        expected_column: Column/key holding the expected output (default: 'answer')
+
+    Yields:
+        Dicts with 'input' and 'expected'
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        if _is_jsonl(path):
+            for line in f:
+                if line.strip():
+                    yield _example(json.loads(line), input_column, expected_column)
+        else:
+            for record in csv.DictReader(f):
+                yield _example(record, input_column, expected_column)
+
+
+class MmapDataset:
+    """
+    Random access to the records of a memory-mapped CSV or JSON-lines file.
+
+    Opening the dataset scans the file once for record boundaries (respecting
+    quoted newlines in CSV); records are parsed only when accessed.
+    """
+
+    def __init__(self, path: str, input_column: str = "question", expected_column: str = "answer"):
+        """
+        Args:
+            path: CSV or JSON-lines file
+            input_column: Column/key holding the model input (default: 'question')
+            expected_column: Column/key holding the expected output (default: 'answer')
+        """
+        self.path = str(path)
+        self._input_column = input_column
+        self._expected_column = expected_column
+        self._jsonl = _is_jsonl(path)
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._ends = self._index()
+        self._start = 0
+        self._header: Optional[List[str]] = None
+        if not self._jsonl:
+            self._start = self._ends.pop(0)
+            self._header = next(csv.reader(io.StringIO(self._map[:self._start].decode('utf-8'))))
+
+    def _index(self) -> List[int]:
+        """Return the end offset of every record."""
+        data = self._map
+        ends = []
+        if self._jsonl:
+            position = data.find(b'\n')
+            while position != -1:
+                ends.append(position + 1)
+                position = data.find(b'\n', position + 1)
+        else:
+            # A newline ends a record unless it is inside a quoted field. Quotes
+            # are escaped by doubling, which toggles twice and so cancels out.
+            in_quotes = False
+            position = 0
+            size = len(data)
+            while position < size:
+                next_quote = data.find(b'"', position)
+                next_newline = data.find(b'\n', position)
+                if next_newline == -1:
+                    break
+                if next_quote != -1 and next_quote < next_newline:
+                    in_quotes = not in_quotes
+                    position = next_quote + 1
+                    continue
+                if not in_quotes:
+                    ends.append(next_newline + 1)
+                position = next_newline + 1
+        # Last record without a trailing newline
+        last = ends[-1] if ends else 0
+        if data[last:].strip():
+            ends.append(len(data))
+        if self._jsonl:
+            # Skip blank lines
+            ends = [end for i, end in enumerate(ends) if data[(ends[i - 1] if i else 0):end].strip()]
+        return ends
+
+    def __len__(self) -> int:
+        return len(self._ends)
+
+    def __getitem__(self, index: int) -> Dict:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        start = self._ends[index - 1] if index > 0 else self._start
+        raw = self._map[start:self._ends[index]].decode('utf-8')
+        if self._jsonl:
+            record = json.loads(raw)
+        else:
+            record = dict(zip(self._header, next(csv.reader(io.StringIO(raw)))))
+        return _example(record, self._input_column, self._expected_column)
+
+    def close(self):
+        """Unmap and close the file."""
+        self._map.close()
+        self._file.close()
+
+
+def load_examples(
+    path: str,
+    loader: str = "stream",
+    limit: Optional[int] = None,
+    sample: Optional[int] = None,
+    seed: int = 0,
+    input_column: str = "question",
+    expected_column: str = "answer"
+) -> List[Dict]:
+    """
+    Load an evaluation set.
+
+    Args:
+        path: CSV or JSON-lines file
+        loader: 'stream' or 'mmap' (default: 'stream')
+        limit: Keep only the first `limit` records
+        sample: Draw `sample` random records instead (reproducible with `seed`)
+        seed: Random seed for `sample` (default: 0)
+        input_column: Column/key holding the model input (default: 'question')
+        expected_column: Column/key holding the expected output (default: 'answer')
+
+    Returns:
+        List of dicts with 'input' and 'expected'
+    """
+    rng = random.Random(seed)
+
+    if loader == "mmap":
+        dataset = MmapDataset(path, input_column, expected_column)
+        try:
+            if sample is not None:
+                indices = sorted(rng.sample(range(len(dataset)), min(sample, len(dataset))))
+            else:
+                indices = range(min(limit, len(dataset)) if limit is not None else len(dataset))
+            return [dataset[i] for i in indices]
+        finally:
+            dataset.close()
+
+    if loader != "stream":
+        raise ValueError(f"Unknown loader '{loader}'. Choose 'stream' or 'mmap'")
+
+    examples: List[Dict] = []
+    for i, example in enumerate(stream_examples(path, input_column, expected_column)):
+        if sample is not None:
+            # Reservoir sampling keeps a uniform sample in one pass
+            if len(examples) < sample:
+                examples.append(example)
+            else:
+                j = rng.randint(0, i)
+                if j < sample:
+                    examples[j] = example
+        else:
+            if limit is not None and i >= limit:
+                break
+            examples.append(example)
+    return examples
@@ -0,0 +1,270 @@
+"""
+Diversity: Embedding-space selection of a diverse next population
+
+Generated children are often near-paraphrases of each other or of prompts
+already evaluated, and each one costs a full evaluation while adding little
+information. With a DiversitySelector attached, PromptGenerator asks the search
+strategy for `oversample` times more candidates than the breadth, embeds them
+and keeps a diverse subset of size `breadth`:
+
+- mmr: maximal marginal relevance, trading each candidate's expected quality
+  (its parent's fitness) against its similarity to prompts already chosen
+- k_center: greedy k-center, repeatedly taking the candidate furthest from
+  everything chosen so far
+
+Both are vectorized with numpy: each pick costs one matrix-vector product over
+the remaining candidates. Prompts evaluated in the previous round count as
+already chosen, so near-copies of them are avoided too.
+
+Embeddings default to hashed character n-grams, which need no model and catch
+lexical paraphrases; pass `embed=sentence_transformer_embedding()` (or any
+function mapping texts to vectors) for semantic similarity.
+
+Typical usage:
+    from Diversity import DiversitySelector
+
+    generator = PromptGenerator(
+        base_prompt="You are a helpful assistant.",
+        metric=similarity_metric,
+        diversity=DiversitySelector(method="mmr", oversample=2.0, diversity=0.5)
+    )
+"""
+
+import zlib
+import logging
+from typing import Callable, Dict, List, Optional, Sequence
+
+from Caches import EmbeddingCache
+
+_logger = logging.getLogger("prompt_generator")
+
+
+def hashed_ngram_embedding(texts: List[str], dim: int = 2048, n: int = 3):
+    """
+    Embed texts as L2-normalised hashed character n-gram counts.
+
+    Args:
+        texts: Texts to embed
+        dim: Number of hash buckets (default: 2048)
+        n: Character n-gram length (default: 3)
+
+    Returns:
+        numpy array of shape (len(texts), dim)
+    """
+    import numpy as np
+
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        text = f" {' '.join(text.lower().split())} "
+        buckets = [zlib.crc32(text[i:i + n].encode('utf-8')) % dim for i in range(max(1, len(text) - n + 1))]
+        np.add.at(vectors[row], buckets, 1.0)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def sentence_transformer_embedding(model_name: str = "all-MiniLM-L6-v2") -> Callable[[List[str]], Sequence]:
+    """
+    Return an embed function backed by a sentence-transformers model, loaded on first use.
+
+    Args:
+        model_name: sentence-transformers model (default: all-MiniLM-L6-v2)
+    """
+    model = None
+
+    def embed(texts: List[str]):
+        nonlocal model
+        if model is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(model_name)
+        return model.encode(texts, normalize_embeddings=True)
+
+    return embed
+
+
+def _normalise(vectors):
+    import numpy as np
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+
+
+def k_center_greedy(vectors, k: int, reference=None, first: int = 0) -> List[int]:
+    """
+    Greedy k-center selection under cosine distance.
+
+    Args:
+        vectors: (n, d) candidate embeddings
+        k: Number of candidates to select
+        reference: Optional (m, d) embeddings counted as already selected
+        first: Candidate picked first when there is no reference (default: 0)
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    import numpy as np
+
+    vectors = _normalise(vectors)
+    n = len(vectors)
+    k = min(k, n)
+    if k <= 0:
+        return []
+
+    # Distance from each candidate to its nearest selected point
+    if reference is not None and len(reference):
+        distance = 1.0 - (vectors @ _normalise(reference).T).max(axis=1)
+        selected: List[int] = []
+    else:
+        selected = [first]
+        distance = 1.0 - vectors @ vectors[first]
+        distance[first] = -np.inf
+    while len(selected) < k:
+        pick = int(np.argmax(distance))
+        selected.append(pick)
+        distance = np.minimum(distance, 1.0 - vectors @ vectors[pick])
+        distance[selected] = -np.inf
+    return selected
+
+
+def mmr(vectors, relevance: Sequence[float], k: int, diversity: float = 0.5, reference=None) -> List[int]:
+    """
+    Maximal marginal relevance selection.
+
+    Each step picks the candidate maximising
+    (1 - diversity) * relevance - diversity * (max similarity to anything selected).
+
+    Args:
+        vectors: (n, d) candidate embeddings
+        relevance: Per-candidate relevance, rescaled to [0, 1] internally
+        k: Number of candidates to select
+        diversity: Weight of the redundancy penalty, 0 = pure relevance, 1 = pure diversity (default: 0.5)
+        reference: Optional (m, d) embeddings counted as already selected
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    import numpy as np
+
+    vectors = _normalise(vectors)
+    n = len(vectors)
+    k = min(k, n)
+    relevance = np.asarray(relevance, dtype=np.float32)
+    spread = relevance.max() - relevance.min() if n else 0.0
+    relevance = (relevance - relevance.min()) / spread if spread > 0 else np.zeros(n, dtype=np.float32)
+
+    if reference is not None and len(reference):
+        redundancy = (vectors @ _normalise(reference).T).max(axis=1)
+    else:
+        redundancy = np.zeros(n, dtype=np.float32)
+
+    selected: List[int] = []
+    available = np.ones(n, dtype=bool)
+    while len(selected) < k:
+        score = (1.0 - diversity) * relevance - diversity * redundancy
+        score[~available] = -np.inf
+        pick = int(np.argmax(score))
+        selected.append(pick)
+        available[pick] = False
+        redundancy = np.maximum(redundancy, vectors @ vectors[pick])
+    return selected
+
+
+class DiversitySelector:
+    """
+    Choose a diverse subset of candidate prompts.
+    """
+
+    def __init__(self, method: str = "mmr", oversample: float = 2.0, diversity: float = 0.5,
+                 embed: Optional[Callable[[List[str]], Sequence]] = None, avoid_evaluated: bool = True):
+        """
+        Args:
+            method: 'mmr' or 'k_center' (default: 'mmr')
+            oversample: Candidates generated per population slot (default: 2.0)
+            diversity: MMR weight of the redundancy penalty (default: 0.5)
+            embed: Function mapping texts to vectors (default: hashed character n-grams)
+            avoid_evaluated: Treat the previous round's prompts as already selected (default: True)
+        """
+        if method not in ("mmr", "k_center"):
+            raise ValueError(f"Unknown diversity method '{method}'. Choose 'mmr' or 'k_center'")
+        if oversample < 1:
+            raise ValueError("oversample must be at least 1")
+        self.method = method
+        self.oversample = oversample
+        self._diversity = diversity
+        self._avoid_evaluated = avoid_evaluated
+        self._embeddings = EmbeddingCache(embed or hashed_ngram_embedding)
+        self._stats = {'selections': 0, 'candidates': 0, 'selected': 0, 'duplicates': 0,
+                       'similarity_candidates': 0.0, 'similarity_selected': 0.0}
+
+    def candidate_count(self, breadth: int) -> int:
+        """Return how many candidates to generate for a population of `breadth`."""
+        return max(breadth, int(round(breadth * self.oversample)))
+
+    def select(self, candidates: List[str], k: int, relevance: Optional[Sequence[float]] = None,
+               reference: Optional[List[str]] = None) -> List[str]:
+        """
+        Choose `k` diverse candidates.
+
+        Args:
+            candidates: Candidate prompts (exact duplicates are dropped first)
+            k: Number to keep
+            relevance: Optional per-candidate expected quality, used by MMR (default: equal)
+            reference: Prompts already evaluated, to stay away from
+
+        Returns:
+            The selected prompts, in selection order
+        """
+        import numpy as np
+
+        unique = list(dict.fromkeys(candidates))
+        self._stats['duplicates'] += len(candidates) - len(unique)
+        if relevance is not None:
+            first_relevance = {}
+            for candidate, value in zip(candidates, relevance):
+                first_relevance.setdefault(candidate, value)
+            relevance = [first_relevance[c] for c in unique]
+        if len(unique) <= k:
+            return unique
+
+        vectors = np.asarray(self._embeddings.embed(unique), dtype=np.float32)
+        reference_vectors = None
+        if self._avoid_evaluated and reference:
+            reference_vectors = np.asarray(self._embeddings.embed(list(dict.fromkeys(reference))), dtype=np.float32)
+
+        if self.method == "mmr":
+            chosen = mmr(vectors, relevance if relevance is not None else [0.0] * len(unique), k,
+                         self._diversity, reference_vectors)
+        else:
+            first = int(np.argmax(relevance)) if relevance is not None else 0
+            chosen = k_center_greedy(vectors, k, reference_vectors, first)
+
+        self._stats['selections'] += 1
+        self._stats['candidates'] += len(unique)
+        self._stats['selected'] += len(chosen)
+        self._stats['similarity_candidates'] += _mean_similarity(vectors)
+        self._stats['similarity_selected'] += _mean_similarity(vectors[chosen])
+        return [unique[i] for i in chosen]
+
+    def stats(self) -> Dict:
+        """
+        Return selection counts and redundancy.
+
+        'mean_similarity_candidates' and 'mean_similarity_selected' are the mean
+        pairwise cosine similarity of the generated and the kept prompts,
+        averaged over selections; the gap is the redundancy removed.
+        """
+        stats = {k: v for k, v in self._stats.items() if not k.startswith('similarity')}
+        selections = self._stats['selections']
+        stats['method'] = self.method
+        stats['mean_similarity_candidates'] = self._stats['similarity_candidates'] / selections if selections else None
+        stats['mean_similarity_selected'] = self._stats['similarity_selected'] / selections if selections else None
+        return stats
+
+
+def _mean_similarity(vectors) -> float:
+    """Mean pairwise cosine similarity, excluding self-pairs."""
+    vectors = _normalise(vectors)
+    n = len(vectors)
+    if n < 2:
+        return 0.0
+    total = vectors.sum(axis=0)
+    return float((total @ total - n) / (n * (n - 1)))
@@ -0,0 +1,345 @@
+"""
+EvaluationEngine: Pluggable scoring backends for PromptGenerator
+
+An evaluation engine scores every (prompt, example) pair of a round and returns
+a score matrix. PromptGenerator turns the matrix into per-prompt fitness, logs
+it and hands it to the search strategy, so every engine shares the same loop,
+checkpointing and result tracking.
+
+Available engines:
+- BatchEngine: OpenAI batch API (the default)
+- AsyncEngine: concurrent chat completion calls, for results in minutes rather than hours
+- MockEngine: deterministic offline scores, for dry runs of the whole loop without API calls
+- ScreeningEngine: screens every prompt on a cheap engine, re-scores only the finalists on another
+- LocalEngine (see LocalEvaluator): a small causal LM on the local CPU with dynamic micro-batching
+- QueueEngine (see WorkQueue): distributed workers pulling tasks from a SQLite queue
+
+Typical usage:
+    from PromptGenerator import PromptGenerator
+    from WorkQueue import QueueEngine
+
+    generator = PromptGenerator(
+        base_prompt="You are a helpful assistant.",
+        metric=similarity_metric,
+        engine=QueueEngine("results/queue.sqlite")
+    )
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from typing import Dict, List, Optional
+
+from BatchFiles import RETRYABLE_ERRORS, classify_status
+from RateLimiter import estimate_tokens
+
+_logger = logging.getLogger("prompt_generator")
+
+
+class EvaluationEngine:
+    """
+    Base class for evaluation engines.
+
+    Subclasses implement `score`. Engines may call back into the generator for
+    request bodies (`_evaluation_body`), the metric and usage accounting.
+    """
+
+    name = "base"
+
+    def score(self, generator, prompts: List[str], evaluation_set: List[Dict],
+              round_num: int) -> List[List[Optional[float]]]:
+        """
+        Score every prompt on every example.
+
+        Args:
+            generator: The PromptGenerator running the optimization
+            prompts: Prompts to evaluate
+            evaluation_set: Test cases with 'input' and 'expected' keys
+            round_num: Current round number
+
+        Returns:
+            Score matrix with one row per prompt and one score per example
+            (None where the pair could not be scored)
+        """
+        raise NotImplementedError
+
+
+class BatchEngine(EvaluationEngine):
+    """Score prompts through the OpenAI batch API."""
+
+    name = "batch"
+
+    def score(self, generator, prompts, evaluation_set, round_num):
+        return generator.score_prompts_batch(prompts, evaluation_set, round_num)
+
+
+class AsyncEngine(EvaluationEngine):
+    """
+    Score prompts with concurrent chat completion calls.
+
+    Up to `concurrency` requests are in flight at once, each paced by the
+    generator's rate limiter and answered from its completion cache when
+    possible. Requests that fail with a retryable error (rate limit, timeout,
+    server error) are retried with exponential backoff; the rest score None.
+
+    By default the generator's evaluator client is called from a thread pool,
+    which keeps the shared transport, record/replay and test clients working.
+    An async client (e.g. openai.AsyncOpenAI) can be passed instead and is
+    awaited directly.
+    """
+
+    name = "async"
+
+    def __init__(self, concurrency: int = 16, max_retries: int = 3, backoff: float = 2.0, client=None):
+        """
+        Args:
+            concurrency: Maximum requests in flight (default: 16)
+            max_retries: Retries per request after a retryable error (default: 3)
+            backoff: Base seconds of the exponential backoff between retries (default: 2)
+            client: Optional async OpenAI-compatible client to use instead of the generator's
+        """
+        self._concurrency = concurrency
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._client = client
+
+    def score(self, generator, prompts, evaluation_set, round_num):
+        print(f"\n⚡ Evaluating {len(prompts)} prompts on {len(evaluation_set)} examples "
+              f"with up to {self._concurrency} concurrent requests...")
+        coroutine = self._score(generator, prompts, evaluation_set)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        # Already inside an event loop (e.g. a notebook): run on a separate one
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+
+    async def _score(self, generator, prompts, evaluation_set) -> List[List[Optional[float]]]:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self._concurrency)
+        score_matrix: List[List[Optional[float]]] = [[None] * len(evaluation_set) for _ in prompts]
+        progress = {'done': 0, 'failed': 0}
+        total = len(prompts) * len(evaluation_set)
+        client = self._client
+
+        with ThreadPoolExecutor(max_workers=self._concurrency) as executor:
+            if client is None:
+                sync_client = generator._evaluator_client
+
+            async def create(body):
+                if client is not None:
+                    return await client.chat.completions.create(**body)
+                return await loop.run_in_executor(executor, lambda: sync_client.chat.completions.create(**body))
+
+            async def score_cell(prompt_idx: int, example_idx: int):
+                prompt, example = prompts[prompt_idx], evaluation_set[example_idx]
+                body = generator._evaluation_body(prompt, example)
+                prediction = generator._completion_cache.get(body) if generator._completion_cache else None
+                async with semaphore:
+                    for attempt in range(self._max_retries + 1):
+                        if prediction is not None:
+                            break
+                        try:
+                            await loop.run_in_executor(executor, generator._acquire_budget, estimate_tokens(body))
+                            started = monotonic()
+                            response = await create(body)
+                            usage = getattr(response, 'usage', None)
+                            generator._record_usage(usage)
+                            prediction = response.choices[0].message.content or ''
+                            generator._record_cell_details(
+                                prompt_idx, example_idx, latency_ms=(monotonic() - started) * 1000,
+                                prompt_tokens=getattr(usage, 'prompt_tokens', None),
+                                completion_tokens=getattr(usage, 'completion_tokens', None),
+                                finish_reason=getattr(response.choices[0], 'finish_reason', None))
+                            if generator._completion_cache:
+                                generator._completion_cache.put(body, prediction)
+                        except Exception as e:
+                            error = classify_status(getattr(e, 'status_code', None), getattr(e, 'code', None) or '')
+                            if error not in RETRYABLE_ERRORS or attempt == self._max_retries:
+                                _logger.error(f"Prompt {prompt_idx} example {example_idx} failed ({error}): {e}")
+                                break
+                            await asyncio.sleep(self._backoff * 2 ** attempt)
+                if prediction is None:
+                    progress['failed'] += 1
+                else:
+                    try:
+                        score_matrix[prompt_idx][example_idx] = generator._metric(example['expected'], prediction)
+                        generator._record_cell_details(prompt_idx, example_idx, completion=prediction)
+                    except Exception as e:
+                        _logger.error(f"Metric failed on prompt {prompt_idx} example {example_idx}: {e}")
+                progress['done'] += 1
+                if progress['done'] % max(1, total // 10) == 0 or progress['done'] == total:
+                    generator._report_progress(
+                        f"   Scored {progress['done']}/{total} cells ({progress['failed']} failed)",
+                        phase="scoring", done=f"{progress['done']}/{total}", failed=progress['failed'] or None)
+                    await loop.run_in_executor(executor, generator._check_cancelled)
+
+            tasks = [asyncio.ensure_future(score_cell(p, e))
+                     for p in range(len(prompts)) for e in range(len(evaluation_set))]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                raise
+
+        return score_matrix
+
+
+class ScreeningEngine(EvaluationEngine):
+    """
+    Screen prompts with a cheap engine and score only the finalists with another.
+
+    Every prompt of a round is scored by `screen` (e.g. a LocalEngine); the
+    `finalists` best by mean screening score are then scored by `final` (e.g.
+    the BatchEngine), and only those scores are returned. Screened-out prompts
+    get empty rows, so their fitness is 0 and they are never mixed with scores
+    from the other evaluator.
+    """
+
+    name = "screening"
+
+    def __init__(self, screen: EvaluationEngine, final: EvaluationEngine, finalists: float = 0.25):
+        """
+        Args:
+            screen: Engine scoring every prompt
+            final: Engine scoring the finalists
+            finalists: Number of finalists per round, or a fraction of the round if below 1 (default: 0.25)
+        """
+        if finalists <= 0:
+            raise ValueError("finalists must be positive")
+        self._screen = screen
+        self._final = final
+        self._finalists = finalists
+        self.screening_scores: List[float] = []
+
+    def _finalist_count(self, prompts: int) -> int:
+        if self._finalists < 1:
+            return max(1, round(prompts * self._finalists))
+        return min(prompts, int(self._finalists))
+
+    def score(self, generator, prompts, evaluation_set, round_num):
+        screen_matrix = self._screen.score(generator, prompts, evaluation_set, round_num)
+        self.screening_scores = []
+        for row in screen_matrix:
+            scores = [score for score in row if score is not None]
+            self.screening_scores.append(sum(scores) / len(scores) if scores else 0.0)
+
+        count = self._finalist_count(len(prompts))
+        finalists = sorted(sorted(range(len(prompts)), key=lambda i: -self.screening_scores[i])[:count])
+        print(f"🔎 Screened {len(prompts)} prompts with the {self._screen.name} engine; "
+              f"scoring {len(finalists)} finalists with the {self._final.name} engine")
+
+        # Cell details must describe the returned (final) scores, re-indexed to the full round
+        generator._cell_details = {}
+        final_matrix = self._final.score(generator, [prompts[i] for i in finalists], evaluation_set, round_num)
+        generator._cell_details = {(finalists[p], e): cell for (p, e), cell in generator._cell_details.items()}
+
+        score_matrix: List[List[Optional[float]]] = [[None] * len(evaluation_set) for _ in prompts]
+        for finalist_idx, prompt_idx in enumerate(finalists):
+            score_matrix[prompt_idx] = final_matrix[finalist_idx]
+        return score_matrix
+
+
+def _unit(*parts: str) -> float:
+    """Deterministic pseudo-random number in [0, 1) from strings."""
+    digest = hashlib.sha256("\x00".join(parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+
+class MockEngine(EvaluationEngine):
+    """
+    Score prompts offline with deterministic fake completions.
+
+    Each completion keeps a prompt- and example-dependent share of the expected
+    answer's words, and is scored with the generator's metric. Nothing is sent
+    to an API, so the whole optimization loop (strategies, stopping rules,
+    checkpoints, run store) can be exercised for free. Pair with MockChatClient
+    as the generator client for a fully offline run.
+    """
+
+    name = "mock"
+
+    def __init__(self, seed: str = "mock"):
+        """
+        Args:
+            seed: Changes every fake completion when changed (default: 'mock')
+        """
+        self._seed = seed
+
+    def score(self, generator, prompts, evaluation_set, round_num):
+        print(f"\n🧪 Mock-evaluating {len(prompts)} prompts on {len(evaluation_set)} examples...")
+        score_matrix = []
+        for prompt_idx, prompt in enumerate(prompts):
+            row = []
+            for example_idx, example in enumerate(evaluation_set):
+                # Hash the request body, so anything added to it (e.g. few-shot examples) changes the score
+                body = generator._evaluation_body(prompt, example)
+                system = body['messages'][0]['content']
+                words = str(example['expected']).split()
+                keep = 0.2 + 0.8 * _unit(self._seed, body['model'], system, str(example['input']))
+                prediction = " ".join(words[:round(len(words) * keep)])
+                # Completions are ~4 characters per token and stop at the request's cap
+                finish_reason = 'stop'
+                if len(prediction) // 4 > body.get('max_tokens', len(prediction)):
+                    prediction, finish_reason = prediction[:body['max_tokens'] * 4], 'length'
+                generator._record_usage({'prompt_tokens': (len(prompt) + len(str(example['input']))) // 4,
+                                         'completion_tokens': len(prediction) // 4})
+                generator._record_cell_details(prompt_idx, example_idx, completion=prediction, latency_ms=0.0,
+                                               completion_tokens=len(prediction) // 4, finish_reason=finish_reason)
+                row.append(generator._metric(example['expected'], prediction))
+            score_matrix.append(row)
+        return score_matrix
+
+
+class MockChatClient:
+    """
+    Offline stand-in for the generator client.
+
+    Answers "Generate N ..." requests with N deterministic rewrites of the
+    prompt (in each of `n` choices), so generate_variations and
+    crossover_prompts work without an API.
+    """
+
+    STYLES = [
+        "Be concise.", "Explain your reasoning step by step.", "Use precise technical language.",
+        "Answer in plain language.", "Give a short example where helpful.", "Focus on the key points.",
+        "Be thorough but avoid repetition.", "Structure the answer with clear sections."
+    ]
+
+    def __init__(self):
+        self._calls = 0
+        # Called from the generator's thread pool and async workers; each call needs its own number
+        self._lock = threading.Lock()
+        self.chat = _Namespace(completions=_Namespace(create=self._create))
+
+    def _create(self, messages=(), n: int = 1, **kwargs):
+        from Replay import Record
+
+        with self._lock:
+            self._calls += 1
+            call = self._calls
+        request = messages[-1]['content'] if messages else ""
+        match = re.search(r"Generate (\d+)", request)
+        count = int(match.group(1)) if match else 1
+        prompt = request.split("\n")[1] if "\n" in request else request
+        choices = []
+        for c in range(n or 1):
+            lines = []
+            for i in range(count):
+                style = self.STYLES[int(_unit(prompt, str(call), str(c), str(i)) * len(self.STYLES))]
+                lines.append(f"{prompt} {style}")
+            choices.append({'index': c, 'message': {'content': "\n".join(lines)}, 'finish_reason': 'stop'})
+        completion_tokens = sum(len(choice['message']['content']) for choice in choices) // 4
+        return Record({'choices': choices,
+                       'usage': {'prompt_tokens': len(request) // 4, 'completion_tokens': completion_tokens}})
+
+
+class _Namespace:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
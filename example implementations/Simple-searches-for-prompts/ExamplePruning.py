@@ -0,0 +1,258 @@
+"""
+ExamplePruning: Shrink the evaluation set to the examples that separate prompts
+
+Many examples score almost the same for every prompt, so they cost requests
+without changing the ranking. After the first round(s), ExamplePruner looks at
+the per-(prompt, example) scores of every prompt evaluated so far, estimates
+each example's discriminative power and keeps only the most informative ones
+for later rounds (optionally weighting them by informativeness):
+
+- item_total: correlation of the example's score with the prompt's mean score
+  on the other examples (the classical test theory discrimination index)
+- variance: variance of the example's score across prompts
+- irt: Fisher information under a two-parameter logistic IRT model fitted to
+  the scores, averaged over the prompts' estimated abilities
+
+Fitness on the reduced set is mapped back onto the full-set scale by a linear
+fit over the prompts already evaluated, so it stays comparable with earlier
+rounds, the best prompt so far and the search strategy's state. The report
+gives the rank correlation between full-set and reduced-set fitness, both
+in-sample and split-half (selected on half the prompts, measured on the other).
+
+Typical usage:
+    from ExamplePruning import ExamplePruner
+
+    generator = PromptGenerator(
+        base_prompt="You are a helpful assistant.",
+        metric=similarity_metric,
+        example_pruner=ExamplePruner(method="item_total", keep=0.3, after_rounds=1)
+    )
+"""
+
+import logging
+import random
+from typing import Dict, List, Optional, Sequence
+
+from Rescore import spearman
+
+_logger = logging.getLogger("prompt_generator")
+
+METHODS = ("item_total", "variance", "irt")
+
+
+def _complete_matrix(score_matrix: Sequence[Sequence[Optional[float]]], min_coverage: float = 0.9):
+    """Keep rows with enough scores and fill their gaps with the example's mean."""
+    import numpy as np
+
+    rows = [row for row in score_matrix
+            if row and sum(score is not None for score in row) >= min_coverage * len(row)]
+    matrix = np.array([[np.nan if score is None else score for score in row] for row in rows], dtype=np.float64)
+    if not len(matrix):
+        return matrix
+    gaps = np.isnan(matrix)
+    column_means = np.where(gaps, 0.0, matrix).sum(axis=0) / np.maximum((~gaps).sum(axis=0), 1)
+    matrix[gaps] = column_means[np.nonzero(gaps)[1]]
+    return matrix
+
+
+def item_total_discrimination(matrix):
+    """Correlation of each example's scores with the prompts' mean score on the other examples."""
+    import numpy as np
+
+    n_examples = matrix.shape[1]
+    rest = (matrix.sum(axis=1, keepdims=True) - matrix) / max(1, n_examples - 1)
+    centred = matrix - matrix.mean(axis=0)
+    rest_centred = rest - rest.mean(axis=0)
+    denominator = np.sqrt((centred ** 2).sum(axis=0) * (rest_centred ** 2).sum(axis=0))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = (centred * rest_centred).sum(axis=0) / denominator
+    return np.nan_to_num(correlation)
+
+
+def score_variance(matrix):
+    """Variance of each example's scores across prompts."""
+    return matrix.var(axis=0)
+
+
+def irt_information(matrix, iterations: int = 500, learning_rate: float = 0.5, l2: float = 0.01):
+    """
+    Fit a two-parameter logistic IRT model and return each example's mean Fisher information.
+
+    Scores in [0, 1] are treated as soft correct/incorrect outcomes of
+    P(prompt p succeeds on example e) = sigmoid(a_e * (theta_p - b_e)).
+
+    Args:
+        matrix: (prompts, examples) scores in [0, 1]
+        iterations: Gradient steps (default: 500)
+        learning_rate: Step size (default: 0.5)
+        l2: Penalty keeping parameters finite on near-separable data (default: 0.01)
+
+    Returns:
+        Per-example mean of a_e^2 * P * (1 - P) over the prompts
+    """
+    import numpy as np
+
+    targets = np.clip(matrix, 0.0, 1.0)
+    n_prompts, n_examples = targets.shape
+    theta = np.zeros(n_prompts)
+    a = np.ones(n_examples)
+    b = np.zeros(n_examples)
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-a * (theta[:, None] - b)))
+        residual = targets - p
+        theta += learning_rate * ((residual * a).mean(axis=1) - l2 * theta)
+        a += learning_rate * ((residual * (theta[:, None] - b)).mean(axis=0) - l2 * (a - 1.0))
+        b += learning_rate * ((-residual * a).mean(axis=0) - l2 * b)
+        # Ability is only identified up to location
+        theta -= theta.mean()
+    p = 1.0 / (1.0 + np.exp(-a * (theta[:, None] - b)))
+    return (a ** 2 * p * (1.0 - p)).mean(axis=0)
+
+
+class ExamplePruner:
+    """
+    Choose the most discriminative examples from completed rounds' scores.
+    """
+
+    def __init__(self, method: str = "item_total", keep: float = 0.5, min_examples: int = 5,
+                 min_prompts: int = 8, weighted: bool = False, after_rounds: int = 1, seed: int = 0):
+        """
+        Args:
+            method: 'item_total', 'variance' or 'irt' (default: 'item_total')
+            keep: Examples to keep, as a count or a fraction if below 1 (default: 0.5)
+            min_examples: Never keep fewer examples than this (default: 5)
+            min_prompts: Fully evaluated prompts needed before pruning (default: 8)
+            weighted: Weight kept examples by informativeness instead of equally (default: False)
+            after_rounds: Rounds evaluated on the full set before pruning (default: 1)
+            seed: Seed for the split-half rank correlation (default: 0)
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unknown pruning method '{method}'. Choose from: {', '.join(METHODS)}")
+        if keep <= 0:
+            raise ValueError("keep must be positive")
+        self.method = method
+        self.after_rounds = after_rounds
+        self._keep = keep
+        self._min_examples = min_examples
+        self._min_prompts = min_prompts
+        self._weighted = weighted
+        self._seed = seed
+        self.kept: Optional[List[int]] = None
+        self.weights: Optional[List[float]] = None
+        self._calibration = (0.0, 1.0)
+        self._report: Dict = {}
+
+    @property
+    def active(self) -> bool:
+        """True once a reduced set has been chosen."""
+        return self.kept is not None
+
+    def informativeness(self, matrix):
+        """Per-example discriminative power of a complete (prompts, examples) matrix."""
+        import numpy as np
+
+        if self.method == "variance":
+            values = score_variance(matrix)
+        elif self.method == "irt":
+            values = irt_information(matrix)
+        else:
+            values = item_total_discrimination(matrix)
+        return np.maximum(values, 0.0)
+
+    def _keep_count(self, n_examples: int) -> int:
+        count = round(n_examples * self._keep) if self._keep < 1 else int(self._keep)
+        return min(n_examples, max(self._min_examples, count))
+
+    def _choose(self, matrix):
+        import numpy as np
+
+        informativeness = self.informativeness(matrix)
+        kept = np.sort(np.argsort(-informativeness, kind='stable')[:self._keep_count(matrix.shape[1])])
+        if self._weighted and informativeness[kept].sum() > 0:
+            weights = informativeness[kept] / informativeness[kept].sum()
+        else:
+            weights = np.full(len(kept), 1.0 / len(kept))
+        return kept, weights, informativeness
+
+    def fit(self, score_matrix: Sequence[Sequence[Optional[float]]]) -> Optional[Dict]:
+        """
+        Choose the reduced set from full-set score rows.
+
+        Args:
+            score_matrix: One row of per-example scores (or None) per evaluated prompt
+
+        Returns:
+            The pruning report, or None if there are too few complete rows yet
+        """
+        import numpy as np
+
+        matrix = _complete_matrix(score_matrix)
+        if len(matrix) < self._min_prompts or not matrix.size:
+            _logger.info(f"Example pruning waits for {self._min_prompts} fully evaluated prompts ({len(matrix)} so far)")
+            return None
+
+        kept, weights, informativeness = self._choose(matrix)
+        full = matrix.mean(axis=1)
+        reduced = matrix[:, kept] @ weights
+        # Map reduced-set fitness onto the full-set scale
+        spread = reduced.var()
+        slope = float(((reduced - reduced.mean()) * (full - full.mean())).mean() / spread) if spread > 0 else 1.0
+        self._calibration = (float(full.mean() - slope * reduced.mean()), slope)
+        self.kept = [int(i) for i in kept]
+        self.weights = [float(w) for w in weights]
+
+        self._report = {
+            'method': self.method,
+            'examples': int(matrix.shape[1]),
+            'kept': len(self.kept),
+            'prompts': int(matrix.shape[0]),
+            'request_reduction': 1.0 - len(self.kept) / matrix.shape[1],
+            'spearman_in_sample': spearman(list(full), list(reduced)),
+            'spearman_split_half': self._split_half(matrix),
+            'mean_informativeness_kept': float(informativeness[kept].mean()),
+            'mean_informativeness_dropped': float(np.delete(informativeness, kept).mean())
+            if len(kept) < matrix.shape[1] else None,
+            'calibration': list(self._calibration)
+        }
+        return self._report
+
+    def _split_half(self, matrix, repeats: int = 5) -> Optional[float]:
+        """Mean rank correlation on held-out prompts of a set chosen on the other half."""
+        rng = random.Random(self._seed)
+        prompts = list(range(matrix.shape[0]))
+        correlations = []
+        for _ in range(repeats):
+            rng.shuffle(prompts)
+            half = len(prompts) // 2
+            if half < 2:
+                return None
+            kept, weights, _ = self._choose(matrix[prompts[:half]])
+            held_out = matrix[prompts[half:]]
+            correlation = spearman(list(held_out.mean(axis=1)), list(held_out[:, kept] @ weights))
+            if correlation is not None:
+                correlations.append(correlation)
+        return sum(correlations) / len(correlations) if correlations else None
+
+    def fitness(self, row: Sequence[Optional[float]]) -> float:
+        """Full-set-scale fitness of a full-length score row, from its kept examples."""
+        scored = [(row[i], w) for i, w in zip(self.kept, self.weights) if row[i] is not None]
+        total_weight = sum(w for _, w in scored)
+        if not total_weight:
+            return 0.0
+        reduced = sum(score * w for score, w in scored) / total_weight
+        intercept, slope = self._calibration
+        return intercept + slope * reduced
+
+    def stats(self) -> Dict:
+        """Return the pruning report (empty until the reduced set is chosen)."""
+        return dict(self._report)
+
+    def state_dict(self) -> Dict:
+        return {'kept': self.kept, 'weights': self.weights, 'calibration': list(self._calibration),
+                'report': self._report}
+
+    def load_state_dict(self, state: Dict):
+        self.kept = state.get('kept')
+        self.weights = state.get('weights')
+        self._calibration = tuple(state.get('calibration', (0.0, 1.0)))
+        self._report = state.get('report', {})
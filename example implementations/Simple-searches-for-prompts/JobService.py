@@ -0,0 +1,808 @@
+"""
+JobService: Prompt optimizations as jobs of a long-running local service
+
+A foreground run holds a terminal (and a cold Python process, with its own
+clients, caches and models) for hours while it waits on batches. JobService is
+one long-lived process that runs `optimize` jobs from a persistent SQLite job
+table on a pool of worker threads, sharing everything that is expensive to set
+up between jobs:
+- the Orchestrator's SharedResources (client and connection pool, completion
+  cache, global rate limits, batch coalescer, run store)
+- local evaluator engines, so a local model is loaded once
+- imported metrics, e.g. a sentence embedding model cached by its module
+
+Clients talk to it over a small JSON HTTP API, on a TCP port or a Unix socket:
+
+    POST /jobs                      submit a job (JSON object of 'start' options, see below)
+    GET  /jobs[?status=queued]      list jobs
+    GET  /jobs/ID                   job state, with its run's summary from the run store
+    POST /jobs/ID/cancel            cancel a queued or running job (also DELETE /jobs/ID)
+    GET  /jobs/ID/events[?after=N]  stream progress events as JSON lines until the job ends
+                                    (&follow=0 returns the events so far)
+    GET  /runs/RUN_ID               a run's record and best prompt per round from the run store
+    GET  /stats                     worker, job and shared resource statistics
+
+A job is an object of main.py 'start' options with underscores, e.g.
+{"eval": "eval.csv", "limit": 50, "base_prompt": "...", "engine": "async", "rounds": 5}
+or with the examples inline as "examples": [{"input": ..., "expected": ...}].
+Runs are recorded with those options, so `python main.py resume RUN_ID` also
+works for them. Jobs still running when the service stops are queued again
+at the next start and resume from their run's last checkpoint.
+
+Usage:
+    python JobService.py serve --port 8765 --workers 4 --rpm 3000
+    python JobService.py submit job.json --follow
+    python JobService.py list
+    python JobService.py status JOB_ID
+    python JobService.py events JOB_ID
+    python JobService.py cancel JOB_ID
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import os
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from Datasets import load_examples
+from main import DEFAULT_STORE, RUN_OPTIONS, build_generator, build_parser
+from Orchestrator import SharedResources
+
+_logger = logging.getLogger("prompt_generator")
+
+DEFAULT_JOB_STORE = "results/jobs.sqlite"
+DEFAULT_SERVER = "http://127.0.0.1:8765"
+FINAL_STATES = ("completed", "failed", "cancelled")
+
+# 'start' options describing the evaluation set rather than the run
+DATA_OPTIONS = ["eval", "loader", "limit", "sample", "seed", "input_column", "expected_column", "name"]
+ENGINES = ("batch", "async", "mock", "local")
+
+
+def job_options(spec: Dict) -> Dict:
+    """
+    Complete a job spec with the defaults of main.py 'start' and check it.
+
+    Args:
+        spec: Options with underscores, plus optionally 'examples'
+
+    Returns:
+        The spec with every RUN_OPTIONS and DATA_OPTIONS key filled in
+
+    Raises:
+        ValueError: On unknown options, or a missing base prompt or evaluation set
+    """
+    if not isinstance(spec, dict):
+        raise ValueError("A job must be a JSON object of options")
+    defaults = vars(build_parser().parse_args(["start", "--eval", "", "--base-prompt", ""]))
+    allowed = set(RUN_OPTIONS) | set(DATA_OPTIONS) | {'examples'}
+    unknown = sorted(set(spec) - allowed)
+    if unknown:
+        raise ValueError(f"Unknown job options: {', '.join(unknown)}")
+    options = {key: defaults.get(key) for key in allowed}
+    options.update(spec)
+    if not options['base_prompt']:
+        raise ValueError("A job needs a base_prompt")
+    if not options['eval'] and not options['examples']:
+        raise ValueError("A job needs an 'eval' file or inline 'examples'")
+    if options['engine'] not in ENGINES:
+        raise ValueError(f"Unknown engine '{options['engine']}'. Choose from: {', '.join(ENGINES)}")
+    return options
+
+
+class JobStore:
+    """
+    Persistent job table and per-job event log in a SQLite file.
+
+    Like SQLiteWorkQueue, every method opens its own short-lived connection,
+    so one instance can be used from any thread.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOB_STORE):
+        """
+        Args:
+            path: SQLite file holding the jobs (created if missing, default: results/jobs.sqlite)
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT,
+                    status TEXT DEFAULT 'queued',
+                    spec TEXT,
+                    run_id TEXT,
+                    worker TEXT,
+                    error TEXT,
+                    created REAL,
+                    started REAL,
+                    finished REAL,
+                    updated REAL
+                )""")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    job_id INTEGER,
+                    seq INTEGER,
+                    time REAL,
+                    event TEXT,
+                    PRIMARY KEY (job_id, seq)
+                )""")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _decode(row: sqlite3.Row) -> Dict:
+        job = dict(row)
+        job['spec'] = json.loads(job['spec'])
+        return job
+
+    def submit(self, spec: Dict, name: Optional[str] = None) -> int:
+        """Queue a job and return its id."""
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute("INSERT INTO jobs (name, spec, created, updated) VALUES (?, ?, ?, ?)",
+                                (name, json.dumps(spec), now, now))
+            job_id = cursor.lastrowid
+        self.add_event(job_id, {'type': 'queued'})
+        return job_id
+
+    def claim(self, worker: str) -> Optional[Dict]:
+        """Mark the oldest queued job as running on `worker` and return it, or None if none is queued."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is not None:
+                db.execute("UPDATE jobs SET status = 'running', worker = ?, started = COALESCE(started, ?), "
+                           "updated = ? WHERE id = ?", (worker, now, now, row['id']))
+            db.execute("COMMIT")
+        return self.job(row['id']) if row is not None else None
+
+    def set_run(self, job_id: int, run_id: str):
+        """Record the run a job writes to."""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET run_id = ?, updated = ? WHERE id = ?", (run_id, time.time(), job_id))
+
+    def finish(self, job_id: int, status: str, error: Optional[str] = None):
+        """Move a job to a final state."""
+        now = time.time()
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = ?, error = ?, finished = ?, updated = ? WHERE id = ?",
+                       (status, error, now, now, job_id))
+
+    def request_cancel(self, job_id: int) -> Optional[str]:
+        """
+        Cancel a queued job, or mark a running one 'cancelling' for its worker to stop.
+
+        Returns:
+            The job's new status, or None if the job is unknown
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            status = {'queued': 'cancelled', 'running': 'cancelling'}.get(row['status'], row['status'])
+            db.execute("UPDATE jobs SET status = ?, updated = ?, "
+                       "finished = CASE WHEN ? = 'cancelled' THEN ? ELSE finished END WHERE id = ?",
+                       (status, now, status, now, job_id))
+            db.execute("COMMIT")
+        if row['status'] == 'queued':
+            self.add_event(job_id, {'type': 'cancelled'})
+        return status
+
+    def requeue_interrupted(self) -> int:
+        """
+        Queue again the jobs a stopped service left running; a job being cancelled is cancelled.
+
+        Returns:
+            Number of jobs queued again
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("UPDATE jobs SET status = 'cancelled', finished = ?, updated = ? WHERE status = 'cancelling'",
+                       (now, now))
+            requeued = db.execute("UPDATE jobs SET status = 'queued', worker = NULL, updated = ? "
+                                  "WHERE status = 'running'", (now,)).rowcount
+            db.execute("COMMIT")
+        return requeued
+
+    def job(self, job_id: int) -> Optional[Dict]:
+        """Return one job with its decoded spec, or None if it is unknown."""
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decode(row) if row is not None else None
+
+    def status(self, job_id: int) -> Optional[str]:
+        """Return a job's status, or None if the job is unknown."""
+        with self._connect() as db:
+            row = db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row['status'] if row else None
+
+    def jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Dict]:
+        """List jobs without their specs, newest first, optionally only those in one state."""
+        query = "SELECT id, name, status, run_id, worker, error, created, started, finished FROM jobs"
+        params: List = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        with self._connect() as db:
+            rows = db.execute(query + " ORDER BY id DESC LIMIT ?", params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Count jobs by status."""
+        with self._connect() as db:
+            return dict(db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def add_event(self, job_id: int, event: Dict) -> int:
+        """Append an event to a job's log and return its sequence number."""
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            seq = db.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM events WHERE job_id = ?", (job_id,)).fetchone()[0]
+            db.execute("INSERT INTO events VALUES (?, ?, ?, ?)", (job_id, seq, time.time(), json.dumps(event)))
+            db.execute("COMMIT")
+        return seq
+
+    def events(self, job_id: int, after: int = 0) -> List[Dict]:
+        """Return a job's events after sequence number `after`, each with 'seq' and 'time'."""
+        with self._connect() as db:
+            rows = db.execute("SELECT seq, time, event FROM events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                              (job_id, after)).fetchall()
+        return [dict(json.loads(row['event']), seq=row['seq'], time=row['time']) for row in rows]
+
+
+class _JobProgress:
+    """
+    Status line stand-in that records a job's progress fields as events.
+
+    PromptGenerator calls `update` at every round and batch or scoring poll;
+    this is also where a cancel request for the job reaches its run.
+    """
+
+    def __init__(self, jobs: JobStore, job_id: int, run_store, min_interval: float = 1.0):
+        self._jobs = jobs
+        self._job_id = job_id
+        self._run_store = run_store
+        self._min_interval = min_interval
+        self._fields: Dict = {}
+        self._recorded: Dict = {}
+        self._last = 0.0
+        self.run_id: Optional[str] = None
+
+    def update(self, **fields):
+        for key, value in fields.items():
+            if value is None:
+                self._fields.pop(key, None)
+            else:
+                self._fields[key] = value
+        # Every new round is recorded; polls within a round at most once per interval
+        if self._fields != self._recorded and ('round' in fields or time.time() - self._last >= self._min_interval):
+            self._jobs.add_event(self._job_id, dict(self._fields, type='progress'))
+            self._recorded = dict(self._fields)
+            self._last = time.time()
+        if self.run_id and self._jobs.status(self._job_id) == 'cancelling' \
+                and self._run_store.status(self.run_id) == 'running':
+            self._run_store.set_status(self.run_id, 'cancelling')
+
+
+class JobService:
+    """
+    Run optimization jobs from a JobStore on worker threads with shared, warm resources.
+    """
+
+    def __init__(self, job_store_path: str = DEFAULT_JOB_STORE, workers: int = 2,
+                 resources: Optional[SharedResources] = None, poll_interval: float = 1.0):
+        """
+        Args:
+            job_store_path: SQLite file of the job table (default: results/jobs.sqlite)
+            workers: Jobs run at the same time (default: 2)
+            resources: Clients, caches, budgets and run store shared by every job
+                (default: SharedResources with its defaults)
+            poll_interval: Seconds between checks for queued jobs and new events (default: 1)
+        """
+        self.jobs = JobStore(job_store_path)
+        self.resources = resources or SharedResources()
+        self._workers = workers
+        self._poll_interval = poll_interval
+        self._local_engines: Dict = {}
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._running: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._stats = {'completed': 0, 'failed': 0, 'cancelled': 0}
+
+    @property
+    def run_store(self):
+        return self.resources.run_store
+
+    def start(self):
+        """Queue again jobs left running by a previous service and start the workers."""
+        requeued = self.jobs.requeue_interrupted()
+        if requeued:
+            print(f"🔁 Re-queued {requeued} interrupted jobs; they resume from their last checkpoint")
+        for index in range(self._workers):
+            thread = threading.Thread(target=self._work, args=(f"worker-{index}",), daemon=True,
+                                      name=f"job-worker-{index}")
+            thread.start()
+            self._threads.append(thread)
+        print(f"👷 Started {self._workers} job workers on {self.jobs.path}")
+
+    def stop(self, wait: bool = False):
+        """
+        Stop taking new jobs.
+
+        Args:
+            wait: Block until running jobs finish; otherwise they are queued again at the next start
+        """
+        self._stop.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def submit(self, spec: Dict) -> int:
+        """Check and queue a job, returning its id (raises ValueError for an invalid spec)."""
+        job_options(spec)
+        return self.jobs.submit(spec, name=spec.get('name'))
+
+    def cancel(self, job_id: int) -> Optional[str]:
+        """Cancel a job; a running job stops at its next round or batch poll. Returns the new status."""
+        status = self.jobs.request_cancel(job_id)
+        if status == 'cancelling':
+            run_id = self.jobs.job(job_id)['run_id']
+            if run_id and self.run_store.status(run_id) == 'running':
+                self.run_store.set_status(run_id, 'cancelling')
+        return status
+
+    def job(self, job_id: int) -> Optional[Dict]:
+        """Return a job with its run's status, best fitness and summary from the run store."""
+        job = self.jobs.job(job_id)
+        if job is None:
+            return None
+        job['spec'].pop('examples', None)
+        run = self.run_store.run(job['run_id']) if job['run_id'] else None
+        if run is not None:
+            job['run'] = {key: run[key] for key in ('status', 'best_fitness', 'stopped_reason', 'updated', 'summary')}
+        return job
+
+    def run(self, run_id: str) -> Optional[Dict]:
+        """Return a run's record and its best prompt per round from the run store."""
+        run = self.run_store.run(run_id)
+        if run is not None:
+            run['best_per_round'] = self.run_store.best_per_round(run_id)
+        return run
+
+    def stats(self) -> Dict:
+        """Return worker, job and shared resource statistics."""
+        with self._lock:
+            stats = dict(self._stats, workers=self._workers, running=dict(self._running))
+        stats['jobs'] = self.jobs.counts()
+        stats['resources'] = self.resources.stats()
+        stats['local_engines'] = {name: engine.stats() for name, engine in self._local_engines.items()}
+        return stats
+
+    def _work(self, worker: str):
+        while not self._stop.is_set():
+            job = self.jobs.claim(worker)
+            if job is None:
+                self._stop.wait(self._poll_interval)
+                continue
+            with self._lock:
+                self._running[job['id']] = worker
+            try:
+                status = self._run_job(job)
+            finally:
+                with self._lock:
+                    self._running.pop(job['id'], None)
+            with self._lock:
+                self._stats[status] += 1
+
+    def _evaluation_set(self, job: Dict, options: Dict) -> List[Dict]:
+        if job['run_id']:
+            # A resumed job keeps the examples its run started with
+            return self.run_store.examples(job['run_id'])
+        if options['examples']:
+            return options['examples']
+        return load_examples(options['eval'], loader=options['loader'], limit=options['limit'],
+                             sample=options['sample'], seed=options['seed'], input_column=options['input_column'],
+                             expected_column=options['expected_column'])
+
+    def _run_job(self, job: Dict) -> str:
+        """Run one claimed job to a final state and return that state."""
+        job_id = job['id']
+        run_id = job['run_id']
+        coalescer = None
+        try:
+            options = job_options(job['spec'])
+            evaluation_set = self._evaluation_set(job, options)
+            if not evaluation_set:
+                raise ValueError(f"No examples loaded from {options['eval']}")
+
+            resources = self.resources.generator_kwargs()
+            resources.pop('run_store')
+            progress = _JobProgress(self.jobs, job_id, self.run_store)
+            generator = build_generator({key: options[key] for key in RUN_OPTIONS}, self.run_store,
+                                        run_name=options['name'] or f"job{job_id}", run_id=run_id,
+                                        status_line=progress, local_engines=self._local_engines, **resources)
+            run_id = progress.run_id = generator._run_start
+            self.jobs.set_run(job_id, run_id)
+            self.jobs.add_event(job_id, {'type': 'started', 'run_id': run_id, 'examples': len(evaluation_set),
+                                         'resumed': bool(job['run_id'])})
+            print(f"▶️  Job {job_id} started run {run_id} on {len(evaluation_set)} examples")
+
+            # Only batch jobs submit batches, so only they are waited for by the coalescer
+            if options['engine'] == "batch" and self.resources.batch_coalescer:
+                coalescer = self.resources.batch_coalescer
+                coalescer.register()
+            result = generator.optimize(evaluation_set)
+        except Exception as e:
+            _logger.error(f"Job {job_id} failed: {e}")
+            print(f"❌ Job {job_id} failed: {e}")
+            if run_id:
+                self.run_store.set_status(run_id, 'failed')
+            self.jobs.finish(job_id, 'failed', str(e))
+            self.jobs.add_event(job_id, {'type': 'failed', 'error': str(e)})
+            return 'failed'
+        finally:
+            if coalescer:
+                coalescer.unregister()
+
+        status = 'cancelled' if result['stopped_reason'] == 'cancelled' else 'completed'
+        self.jobs.finish(job_id, status)
+        self.jobs.add_event(job_id, {'type': status, 'run_id': run_id, 'best_fitness': result['best_fitness'],
+                                     'rounds': result['rounds'], 'stopped_reason': result['stopped_reason']})
+        print(f"🏁 Job {job_id} {status}: best fitness {result['best_fitness']:.4f} after {result['rounds']} rounds")
+        return status
+
+    def stream_events(self, job_id: int, after: int = 0) -> Iterator[Dict]:
+        """Yield a job's events after `after` as they are recorded, until the job reaches a final state."""
+        while True:
+            events = self.jobs.events(job_id, after)
+            for event in events:
+                after = event['seq']
+                yield event
+            if not events and self.jobs.status(job_id) in FINAL_STATES + (None,):
+                return
+            if not events:
+                time.sleep(self._poll_interval)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON API over a JobService (set as the server's `service`)."""
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "local"
+
+    def log_message(self, format, *args):
+        _logger.info(f"{self.address_string()} {format % args}")
+
+    @property
+    def service(self) -> JobService:
+        return self.server.service
+
+    def _send(self, payload, status: int = 200):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        job_id = int(parts[1]) if len(parts) > 1 and parts[0] == 'jobs' and parts[1].isdigit() else None
+        return parts, query, job_id
+
+    def do_GET(self):
+        parts, query, job_id = self._route()
+        try:
+            limit = int(query.get('limit', 100))
+            after = int(query.get('after', 0))
+        except ValueError as e:
+            self._send({'error': f"Bad query parameter: {e}"}, 400)
+            return
+        if parts == ['jobs']:
+            self._send(self.service.jobs.jobs(query.get('status'), limit))
+        elif parts == ['stats']:
+            self._send(self.service.stats())
+        elif len(parts) == 2 and parts[0] == 'runs':
+            run = self.service.run(parts[1])
+            self._send(run if run is not None else {'error': f"Unknown run {parts[1]}"}, 200 if run else 404)
+        elif job_id is None or self.service.jobs.status(job_id) is None:
+            self._send({'error': f"Not found: {self.path}"}, 404)
+        elif len(parts) == 2:
+            self._send(self.service.job(job_id))
+        elif parts[2:] == ['events']:
+            self._stream(job_id, after, query.get('follow', '1') != '0')
+        else:
+            self._send({'error': f"Not found: {self.path}"}, 404)
+
+    def do_POST(self):
+        parts, _, job_id = self._route()
+        if parts == ['jobs']:
+            try:
+                spec = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+                self._send({'job_id': self.service.submit(spec)}, 201)
+            except ValueError as e:
+                self._send({'error': str(e)}, 400)
+        elif job_id is not None and parts[2:] == ['cancel']:
+            self._cancel(job_id)
+        else:
+            self._send({'error': f"Not found: {self.path}"}, 404)
+
+    def do_DELETE(self):
+        parts, _, job_id = self._route()
+        if job_id is not None and len(parts) == 2:
+            self._cancel(job_id)
+        else:
+            self._send({'error': f"Not found: {self.path}"}, 404)
+
+    def _cancel(self, job_id: int):
+        status = self.service.cancel(job_id)
+        if status is None:
+            self._send({'error': f"Unknown job {job_id}"}, 404)
+        else:
+            self._send({'job_id': job_id, 'status': status})
+
+    def _stream(self, job_id: int, after: int, follow: bool):
+        if not follow:
+            self._send(self.service.jobs.events(job_id, after))
+            return
+        # HTTP/1.0 response without a length: one JSON event per line until the job ends
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for event in self.service.stream_events(job_id, after):
+                self.wfile.write(json.dumps(event, default=str).encode('utf-8') + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class _UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(service: JobService, host: str = "127.0.0.1", port: int = 8765, socket_path: Optional[str] = None):
+    """
+    Create the HTTP server for a service, on a TCP port or a Unix socket.
+
+    Args:
+        service: Service answering the requests
+        host: Interface to listen on (default: 127.0.0.1)
+        port: TCP port (default: 8765)
+        socket_path: Listen on this Unix socket instead of TCP
+
+    Returns:
+        A server to run with serve_forever()
+    """
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self._socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._socket_path)
+
+
+class JobClient:
+    """
+    Client of a JobService's HTTP API.
+    """
+
+    def __init__(self, server: str = DEFAULT_SERVER, timeout: Optional[float] = 60.0):
+        """
+        Args:
+            server: 'http://HOST:PORT' or 'unix:SOCKET_PATH' (default: http://127.0.0.1:8765)
+            timeout: Socket timeout in seconds; event streams wait without one (default: 60)
+        """
+        self._server = server
+        self._timeout = timeout
+
+    def _connection(self, timeout: Optional[float]) -> http.client.HTTPConnection:
+        if self._server.startswith("unix:"):
+            return _UnixHTTPConnection(self._server[len("unix:"):], timeout)
+        url = urlparse(self._server)
+        return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+
+    def _request(self, method: str, path: str, payload=None):
+        connection = self._connection(self._timeout)
+        try:
+            body = json.dumps(payload).encode('utf-8') if payload is not None else None
+            connection.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            data = json.loads(response.read() or b'null')
+        finally:
+            connection.close()
+        if response.status >= 400:
+            raise RuntimeError(data.get('error') if isinstance(data, dict) else f"HTTP {response.status}")
+        return data
+
+    def submit(self, spec: Dict) -> int:
+        """Queue a job and return its id."""
+        return self._request("POST", "/jobs", spec)['job_id']
+
+    def jobs(self, status: Optional[str] = None) -> List[Dict]:
+        return self._request("GET", f"/jobs?status={status}" if status else "/jobs")
+
+    def job(self, job_id: int) -> Dict:
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def cancel(self, job_id: int) -> str:
+        return self._request("POST", f"/jobs/{job_id}/cancel")['status']
+
+    def run(self, run_id: str) -> Dict:
+        return self._request("GET", f"/runs/{run_id}")
+
+    def stats(self) -> Dict:
+        return self._request("GET", "/stats")
+
+    def events(self, job_id: int, after: int = 0) -> Iterator[Dict]:
+        """Yield a job's progress events as they happen, until the job ends."""
+        connection = self._connection(None)
+        try:
+            connection.request("GET", f"/jobs/{job_id}/events?after={after}")
+            response = connection.getresponse()
+            if response.status >= 400:
+                raise RuntimeError(json.loads(response.read()).get('error'))
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            connection.close()
+
+
+def _print_event(job_id: int, event: Dict):
+    fields = {key: value for key, value in event.items() if key not in ('type', 'seq', 'time')}
+    stamp = time.strftime('%H:%M:%S', time.localtime(event['time']))
+    print(f"[{stamp}] job {job_id} {event['type']}: " + ", ".join(f"{key}={value}" for key, value in fields.items()))
+
+
+def cmd_serve(args) -> int:
+    resources = SharedResources(requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+                                completion_cache_path=args.completion_cache, coalesce_window=args.coalesce_window,
+                                run_store_path=args.store)
+    service = JobService(args.jobs, workers=args.workers, resources=resources)
+    server = make_server(service, args.host, args.port, args.socket)
+    service.start()
+    print(f"🛰️  Job service listening on {'unix:' + args.socket if args.socket else f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping; running jobs resume from their checkpoints at the next start")
+    finally:
+        service.stop()
+        server.server_close()
+    return 0
+
+
+def cmd_submit(args) -> int:
+    with (sys.stdin if args.spec == "-" else open(args.spec)) as handle:
+        spec = json.load(handle)
+    client = JobClient(args.server)
+    job_id = client.submit(spec)
+    print(f"📮 Queued job {job_id}")
+    if args.follow:
+        for event in client.events(job_id):
+            _print_event(job_id, event)
+    return 0
+
+
+def cmd_list(args) -> int:
+    jobs = JobClient(args.server).jobs(args.status)
+    if not jobs:
+        print("No jobs")
+        return 0
+    print(f"{'job':>5}  {'status':<12}{'run id':<45}created")
+    for job in jobs:
+        created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(job['created']))
+        print(f"{job['id']:>5}  {job['status']:<12}{job['run_id'] or '-':<45}{created}")
+    return 0
+
+
+def cmd_status(args) -> int:
+    print(json.dumps(JobClient(args.server).job(args.job_id), indent=2, default=str))
+    return 0
+
+
+def cmd_events(args) -> int:
+    for event in JobClient(args.server).events(args.job_id, args.after):
+        _print_event(args.job_id, event)
+    return 0
+
+
+def cmd_cancel(args) -> int:
+    status = JobClient(args.server).cancel(args.job_id)
+    print(f"⏹️  Job {args.job_id} is {status}")
+    return 0
+
+
+def build_job_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run prompt optimizations as jobs of a local service")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="Run the job service")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1)")
+    serve.add_argument("--port", type=int, default=8765, help="TCP port (default: 8765)")
+    serve.add_argument("--socket", help="Listen on this Unix socket instead of TCP")
+    serve.add_argument("--workers", type=int, default=2, help="Jobs run at the same time (default: 2)")
+    serve.add_argument("--jobs", default=DEFAULT_JOB_STORE, help=f"Job table file (default: {DEFAULT_JOB_STORE})")
+    serve.add_argument("--store", default=DEFAULT_STORE, help=f"Run store file (default: {DEFAULT_STORE})")
+    serve.add_argument("--completion-cache", help="SQLite file for the shared completion cache")
+    serve.add_argument("--coalesce-window", type=float, default=30.0,
+                       help="Seconds a batch waits to be merged with other jobs' batches (default: 30)")
+    serve.add_argument("--rpm", type=float, help="Requests per minute limit shared by all jobs")
+    serve.add_argument("--tpm", type=float, help="Tokens per minute limit shared by all jobs")
+    serve.set_defaults(func=cmd_serve)
+
+    for name, func, help_text in [("submit", cmd_submit, "Queue a job"), ("list", cmd_list, "List jobs"),
+                                  ("status", cmd_status, "Show a job and its run"),
+                                  ("events", cmd_events, "Follow a job's progress events"),
+                                  ("cancel", cmd_cancel, "Cancel a job")]:
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--server", default=DEFAULT_SERVER,
+                             help=f"Service address, http://HOST:PORT or unix:PATH (default: {DEFAULT_SERVER})")
+        if name == "submit":
+            command.add_argument("spec", help="JSON file of 'start' options ('-' for stdin)")
+            command.add_argument("--follow", action="store_true", help="Follow the job's events until it ends")
+        elif name == "list":
+            command.add_argument("--status", help="Only jobs in this state")
+        else:
+            command.add_argument("job_id", type=int)
+        if name == "events":
+            command.add_argument("--after", type=int, default=0, help="Skip events up to this sequence number")
+        command.set_defaults(func=func)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_job_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    try:
+        return args.func(args)
+    except (OSError, RuntimeError) as e:
+        print(f"❌ {e}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""
+Lineage: Parent/child graph of generated prompts
+
+Every prompt produced by `generate_variations` or `crossover_prompts` is
+recorded with the prompt it came from, the round it was generated for and the
+generator call that produced it. Prompts are keyed by the hash of their text,
+so a child that is textually identical to an already evaluated prompt is the
+same node and its per-example scores can be reused instead of paying for a
+second evaluation.
+
+The graph also measures how productive a lineage is: the average fitness gain
+of children over their parents along a prompt's chain of ancestors. The
+'lineage' search strategy uses this to give productive lineages more children.
+
+Typical usage:
+    graph = generator.lineage
+    graph.parent(prompt)              # prompt it was generated from
+    graph.children(prompt)            # prompts generated from it
+    graph.ancestors(prompt)           # chain back to the base prompt
+    graph.productivity(prompt)        # decayed mean fitness gain along the chain
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+from RunStore import text_hash
+
+
+class LineageGraph:
+    """
+    In-memory index of generated prompts, their parents and their evaluations.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._nodes: Dict[str, Dict] = {}
+        self._calls = 0
+        self._reused = 0
+
+    def _node(self, prompt: str) -> Dict:
+        key = text_hash(prompt)
+        if key not in self._nodes:
+            self._nodes[key] = {
+                'prompt': prompt, 'parent': None, 'second_parent': None, 'round': None,
+                'call': None, 'operator': None, 'fitness': None, 'scores': None, 'children': []
+            }
+        return self._nodes[key]
+
+    def record_call(self, parent: str, children: List[str], round_num: int,
+                    operator: str = 'mutation', second_parent: Optional[str] = None) -> int:
+        """
+        Record the children returned by one generator call.
+
+        A child that is already in the graph keeps its first recorded origin.
+
+        Args:
+            parent: Prompt the children were generated from
+            children: Generated prompts
+            round_num: Round the children were generated for
+            operator: 'mutation' or 'crossover' (default: 'mutation')
+            second_parent: Second parent of a crossover
+
+        Returns:
+            The generator call number
+        """
+        with self._lock:
+            self._calls += 1
+            parent_node = self._node(parent)
+            for child in children:
+                node = self._node(child)
+                if node is parent_node or node['call'] is not None:
+                    continue
+                node.update(parent=text_hash(parent), round=round_num, call=self._calls, operator=operator,
+                            second_parent=text_hash(second_parent) if second_parent is not None else None)
+                parent_node['children'].append(text_hash(child))
+            return self._calls
+
+    def record_evaluation(self, prompt: str, fitness: float, scores: List[Optional[float]]):
+        """
+        Store a prompt's fitness and per-example score row.
+
+        A row without a single score (a prompt screened out by a ScreeningEngine,
+        or one whose every request failed) is not an evaluation: nothing is
+        stored, so the prompt is scored again if it is generated again.
+        """
+        if all(score is None for score in scores):
+            return
+        with self._lock:
+            node = self._node(prompt)
+            node['fitness'] = fitness
+            node['scores'] = list(scores)
+
+    def known_scores(self, prompt: str) -> Optional[List[Optional[float]]]:
+        """
+        Return the per-example scores of a prompt evaluated earlier, or None.
+
+        Counts a reuse when scores are found.
+        """
+        with self._lock:
+            node = self._nodes.get(text_hash(prompt))
+            if node is None or node['scores'] is None:
+                return None
+            self._reused += 1
+            return list(node['scores'])
+
+    def score_rows(self) -> List[List[Optional[float]]]:
+        """Return the per-example score row of every evaluated prompt."""
+        with self._lock:
+            return [list(node['scores']) for node in self._nodes.values() if node['scores'] is not None]
+
+    def node(self, prompt: str) -> Optional[Dict]:
+        """Return a copy of a prompt's node (parent, round, call, operator, fitness), or None."""
+        with self._lock:
+            node = self._nodes.get(text_hash(prompt))
+            return {k: v for k, v in node.items() if k != 'scores'} if node else None
+
+    def parent(self, prompt: str) -> Optional[str]:
+        """Return the prompt this one was generated from, or None."""
+        with self._lock:
+            node = self._nodes.get(text_hash(prompt))
+            parent = self._nodes.get(node['parent']) if node and node['parent'] else None
+            return parent['prompt'] if parent else None
+
+    def children(self, prompt: str) -> List[str]:
+        """Return the prompts generated from this one."""
+        with self._lock:
+            node = self._nodes.get(text_hash(prompt))
+            return [self._nodes[key]['prompt'] for key in node['children']] if node else []
+
+    def ancestors(self, prompt: str) -> List[str]:
+        """Return the chain of parents, nearest first."""
+        chain = []
+        with self._lock:
+            node = self._nodes.get(text_hash(prompt))
+            seen = set()
+            while node and node['parent'] and node['parent'] not in seen:
+                seen.add(node['parent'])
+                node = self._nodes.get(node['parent'])
+                if node:
+                    chain.append(node['prompt'])
+        return chain
+
+    def productivity(self, prompt: str, decay: float = 0.5) -> float:
+        """
+        Measure how much a prompt's lineage has improved on its parents.
+
+        For the prompt and each ancestor, the gain is the mean fitness of its
+        evaluated children minus its own fitness. Gains are averaged with weight
+        `decay ** depth`, so recent generations count most.
+
+        Args:
+            prompt: Prompt whose lineage to score
+            decay: Weight multiplier per generation up the chain (default: 0.5)
+
+        Returns:
+            Weighted mean gain, or 0.0 when nothing in the lineage has been measured
+        """
+        total = 0.0
+        weight_sum = 0.0
+        weight = 1.0
+        with self._lock:
+            node = self._nodes.get(text_hash(prompt))
+            seen = set()
+            while node is not None and id(node) not in seen:
+                seen.add(id(node))
+                if node['fitness'] is not None:
+                    gains = [self._nodes[key]['fitness'] - node['fitness'] for key in node['children']
+                             if self._nodes[key]['fitness'] is not None]
+                    if gains:
+                        total += weight * sum(gains) / len(gains)
+                        weight_sum += weight
+                weight *= decay
+                node = self._nodes.get(node['parent']) if node['parent'] else None
+        return total / weight_sum if weight_sum else 0.0
+
+    def stats(self) -> Dict:
+        """Return node, generator call and reused evaluation counts."""
+        with self._lock:
+            return {'prompts': len(self._nodes), 'generator_calls': self._calls, 'reused_evaluations': self._reused}
+
+    def state_dict(self) -> Dict:
+        """
+        Return JSON-serialisable graph state for checkpointing.
+
+        Score rows are left out; the run store holds them (see restore_scores).
+        """
+        with self._lock:
+            nodes = {key: {k: v for k, v in node.items() if k != 'scores'} for key, node in self._nodes.items()}
+            return {'nodes': nodes, 'calls': self._calls, 'reused': self._reused}
+
+    def load_state_dict(self, state: Dict):
+        """Restore graph state from a checkpoint."""
+        with self._lock:
+            self._nodes = {key: dict({'scores': None}, **node) for key, node in state.get('nodes', {}).items()}
+            self._calls = state.get('calls', 0)
+            self._reused = state.get('reused', 0)
+
+    def restore_scores(self, rows: Dict[str, List[Optional[float]]]):
+        """
+        Put back per-example score rows after load_state_dict.
+
+        Args:
+            rows: Mapping of prompt text to its score row (e.g. RunStore.score_rows)
+        """
+        with self._lock:
+            for prompt, scores in rows.items():
+                if any(score is not None for score in scores):
+                    self._node(prompt)['scores'] = list(scores)
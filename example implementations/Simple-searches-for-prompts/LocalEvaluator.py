@@ -0,0 +1,275 @@
+"""
+LocalEvaluator: Score prompts with a small causal LM running on the local CPU
+
+LocalEngine answers evaluation requests with a Hugging Face causal LM instead
+of the remote evaluator, for free early screening and offline testing. Every
+(system prompt, input) request of a round is submitted at once to a
+DynamicBatcher, which groups whatever is queued into padded micro-batches of up
+to `max_batch_size` requests, waiting at most `max_wait_ms` for a batch to fill.
+Runs sharing one engine (e.g. under an Orchestrator) are batched together.
+
+Combine with ScreeningEngine to screen every prompt locally and send only the
+finalists to the paid evaluator:
+
+    from EvaluationEngine import BatchEngine, ScreeningEngine
+    from LocalEvaluator import LocalEngine
+
+    generator = PromptGenerator(
+        base_prompt="You are a helpful assistant.",
+        metric=similarity_metric,
+        engine=ScreeningEngine(LocalEngine("Qwen/Qwen2.5-0.5B-Instruct"), BatchEngine(), finalists=5)
+    )
+
+Needs `transformers` and `torch`, imported when the model is first used.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, as_completed
+from typing import Callable, Dict, List, Optional
+
+from EvaluationEngine import EvaluationEngine
+
+_logger = logging.getLogger("prompt_generator")
+
+
+class DynamicBatcher:
+    """
+    Queue that groups concurrently submitted items into micro-batches.
+
+    A worker thread takes the first waiting item, then keeps collecting until
+    the batch is full or `max_wait_ms` has passed, and processes the batch with
+    one call.
+    """
+
+    def __init__(self, process: Callable[[List], List], max_batch_size: int = 8, max_wait_ms: float = 20.0):
+        """
+        Args:
+            process: Function mapping a list of items to a list of results, in order
+            max_batch_size: Largest batch passed to `process` (default: 8)
+            max_wait_ms: Longest wait for a batch to fill once it has one item (default: 20)
+        """
+        self._process = process
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {'batches': 0, 'items': 0, 'busy_seconds': 0.0}
+
+    def submit(self, item) -> Future:
+        """Queue an item; the returned future resolves to its result."""
+        future: Future = Future()
+        self._queue.put((item, future))
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="dynamic-batcher")
+                self._thread.start()
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, remaining)) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            started = time.monotonic()
+            try:
+                results = self._process([item for item, _ in batch])
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                _logger.error(f"Local batch of {len(batch)} failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+            with self._lock:
+                self._stats['batches'] += 1
+                self._stats['items'] += len(batch)
+                self._stats['busy_seconds'] += time.monotonic() - started
+
+    def stats(self) -> Dict:
+        """Return batch count, item count, mean batch size and time spent processing."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['mean_batch_size'] = stats['items'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+
+class LocalCausalLM:
+    """
+    Greedy chat completion with a Hugging Face causal LM on CPU, one padded batch at a time.
+    """
+
+    def __init__(self, model_name: str = "Qwen/Qwen2.5-0.5B-Instruct", max_new_tokens: int = 256,
+                 max_input_tokens: int = 2048, threads: Optional[int] = None):
+        """
+        Args:
+            model_name: Hugging Face model id or local path (default: Qwen/Qwen2.5-0.5B-Instruct)
+            max_new_tokens: Completion token cap (default: 256)
+            max_input_tokens: Inputs are truncated from the left beyond this (default: 2048)
+            threads: torch CPU threads (default: torch's default)
+        """
+        self.name = model_name
+        self._max_new_tokens = max_new_tokens
+        self._max_input_tokens = max_input_tokens
+        self._threads = threads
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None:
+                import torch
+                from transformers import AutoModelForCausalLM, AutoTokenizer
+
+                if self._threads:
+                    torch.set_num_threads(self._threads)
+                print(f"🖥️  Loading local evaluator model {self.name}...")
+                tokenizer = AutoTokenizer.from_pretrained(self.name)
+                # Left padding keeps every prompt's last token adjacent to its completion
+                tokenizer.padding_side = "left"
+                tokenizer.truncation_side = "left"
+                if tokenizer.pad_token is None:
+                    tokenizer.pad_token = tokenizer.eos_token
+                model = AutoModelForCausalLM.from_pretrained(self.name, torch_dtype=torch.float32)
+                model.eval()
+                self._tokenizer, self._model = tokenizer, model
+
+    def _render(self, messages: List[Dict]) -> str:
+        if getattr(self._tokenizer, 'chat_template', None):
+            return self._tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        return "\n\n".join(message['content'] for message in messages) + "\n\nAnswer:\n"
+
+    def generate(self, batch: List[Dict]) -> List[Dict]:
+        """
+        Complete a batch of chat completion requests.
+
+        The batch is generated up to the largest 'max_tokens' in it; each
+        completion is then cut to its own cap and at its first stop sequence.
+
+        Args:
+            batch: Request bodies with 'messages' and optional 'max_tokens' and 'stop'
+
+        Returns:
+            One dict per request with 'content', 'prompt_tokens', 'completion_tokens' and 'finish_reason'
+        """
+        import torch
+
+        self._load()
+        tokenizer = self._tokenizer
+        caps = [min(self._max_new_tokens, body.get('max_tokens') or self._max_new_tokens) for body in batch]
+        encoded = tokenizer([self._render(body['messages']) for body in batch], return_tensors="pt", padding=True,
+                            truncation=True, max_length=self._max_input_tokens)
+        with torch.inference_mode():
+            output = self._model.generate(**encoded, max_new_tokens=max(caps), do_sample=False,
+                                          pad_token_id=tokenizer.pad_token_id)
+        generated = output[:, encoded['input_ids'].shape[1]:]
+        results = []
+        for body, cap, row, mask in zip(batch, caps, generated, encoded['attention_mask']):
+            tokens = row.tolist()
+            finish_reason = 'stop'
+            if tokenizer.eos_token_id in tokens[:cap]:
+                tokens = tokens[:tokens.index(tokenizer.eos_token_id)]
+            elif len(tokens) >= cap:
+                tokens, finish_reason = tokens[:cap], 'length'
+            content = tokenizer.decode(tokens, skip_special_tokens=True)
+            for stop in body.get('stop') or []:
+                if stop in content:
+                    content, finish_reason = content[:content.index(stop)], 'stop'
+            results.append({
+                'content': content.strip(),
+                'prompt_tokens': int(mask.sum()),
+                'completion_tokens': len(tokens),
+                'finish_reason': finish_reason
+            })
+        return results
+
+
+class LocalEngine(EvaluationEngine):
+    """
+    Score prompts with a local causal LM behind a dynamic batching queue.
+    """
+
+    name = "local"
+
+    def __init__(self, model_name: str = "Qwen/Qwen2.5-0.5B-Instruct", model=None, max_batch_size: int = 8,
+                 max_wait_ms: float = 20.0, max_new_tokens: int = 256):
+        """
+        Args:
+            model_name: Hugging Face model id or local path (default: Qwen/Qwen2.5-0.5B-Instruct)
+            model: Object with `name` and `generate(bodies)` to use instead of loading a LocalCausalLM
+            max_batch_size: Requests per micro-batch (default: 8)
+            max_wait_ms: Longest wait for a micro-batch to fill (default: 20)
+            max_new_tokens: Completion token cap (default: 256)
+        """
+        self._model = model or LocalCausalLM(model_name, max_new_tokens)
+        self._batcher = DynamicBatcher(self._model.generate, max_batch_size, max_wait_ms)
+        self._usage = {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def score(self, generator, prompts, evaluation_set, round_num):
+        print(f"\n🖥️  Evaluating {len(prompts)} prompts on {len(evaluation_set)} examples "
+              f"with local model {self._model.name}...")
+        score_matrix: List[List[Optional[float]]] = [[None] * len(evaluation_set) for _ in prompts]
+        pending = {}
+        cached = 0
+        for prompt_idx, prompt in enumerate(prompts):
+            for example_idx, example in enumerate(evaluation_set):
+                body = dict(generator._evaluation_body(prompt, example), model=self._model.name)
+                content = generator._completion_cache.get(body) if generator._completion_cache else None
+                if content is not None:
+                    cached += 1
+                    self._score_cell(generator, score_matrix, prompt_idx, example_idx, example, content)
+                    continue
+                future = self._batcher.submit(body)
+                pending[future] = (prompt_idx, example_idx, body, time.monotonic())
+        if cached:
+            print(f"♻️  {cached} requests served from completion cache")
+
+        done = 0
+        for future in as_completed(pending):
+            prompt_idx, example_idx, body, submitted = pending[future]
+            done += 1
+            try:
+                result = future.result()
+            except Exception as e:
+                _logger.error(f"Local evaluation of prompt {prompt_idx} example {example_idx} failed: {e}")
+                continue
+            # Local tokens are free, so they are kept out of the generator's (paid) usage and budget
+            usage = {'prompt_tokens': result['prompt_tokens'], 'completion_tokens': result['completion_tokens']}
+            self._usage['requests'] += 1
+            for key, value in usage.items():
+                self._usage[key] += value
+            generator._record_cell_details(prompt_idx, example_idx, latency_ms=(time.monotonic() - submitted) * 1000,
+                                           finish_reason=result.get('finish_reason'), **usage)
+            if generator._completion_cache:
+                generator._completion_cache.put(body, result['content'])
+            self._score_cell(generator, score_matrix, prompt_idx, example_idx, evaluation_set[example_idx],
+                             result['content'])
+            if done % max(1, len(pending) // 10) == 0 or done == len(pending):
+                generator._report_progress(f"   Scored {done}/{len(pending)} cells locally", phase="local scoring",
+                                           done=f"{done}/{len(pending)}")
+
+        stats = self._batcher.stats()
+        print(f"   {stats['batches']} micro-batches so far, mean size {stats['mean_batch_size']:.1f}")
+        return score_matrix
+
+    @staticmethod
+    def _score_cell(generator, score_matrix, prompt_idx: int, example_idx: int, example: Dict, content: str):
+        try:
+            score_matrix[prompt_idx][example_idx] = generator._metric(example['expected'], content)
+            generator._record_cell_details(prompt_idx, example_idx, completion=content)
+        except Exception as e:
+            _logger.error(f"Metric failed on prompt {prompt_idx} example {example_idx}: {e}")
+
+    def stats(self) -> Dict:
+        """Return local usage and the dynamic batcher's statistics."""
+        return dict(self._batcher.stats(), **self._usage)
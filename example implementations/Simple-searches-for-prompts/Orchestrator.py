@@ -0,0 +1,371 @@
+"""
+Orchestrator: Run many prompt optimizations in one process
+
+Each PromptGenerator normally creates its own OpenAI clients and submits its own
+batches, so parallel runs compete for rate limits and repeat work. The
+Orchestrator runs N optimization jobs on a thread pool and gives them shared
+resources:
+- one OpenAI client on one HttpTransport (one connection pool) for both roles
+- one CompletionCache and, optionally, one EmbeddingCache handed to each
+  job's metric_factory
+- one RateLimiter holding the global RPM/TPM budget
+- one BatchCoalescer that merges batch submissions from concurrent jobs
+- one RunStore receiving every job's results
+
+Typical usage:
+    from Orchestrator import Orchestrator, OptimizationJob, SharedResources
+
+    resources = SharedResources(requests_per_minute=3000, tokens_per_minute=250000,
+                                completion_cache_path="results/completions.sqlite")
+    jobs = [
+        OptimizationJob("java_docs", java_set, base_prompt="...", metric=metric, breadth=20),
+        OptimizationJob("qa", qa_set, base_prompt="...", metric=metric, breadth=10),
+    ]
+    results = Orchestrator(jobs, resources).run()
+"""
+
+import json
+import datetime
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from Caches import CompletionCache, EmbeddingCache, request_key
+from RateLimiter import RateLimiter
+from Transport import HttpTransport, get_client
+from RunStore import RunStore
+from BatchFiles import read_batch_requests, write_batch_requests
+from PromptGenerator import PromptGenerator, RunCancelled
+
+_logger = logging.getLogger("prompt_generator")
+
+
+class _Submission:
+    """A batch file waiting to be merged into a shared batch."""
+
+    def __init__(self, job_key: str, batch_file: str, cancelled: Optional[Callable[[], bool]] = None):
+        self.job_key = job_key
+        self.batch_file = batch_file
+        self.cancelled = cancelled or (lambda: False)
+        self.done = threading.Event()
+        self.rows: List[Dict] = []
+        self.error: Optional[Exception] = None
+
+
+class BatchCoalescer:
+    """
+    Merge batch submissions from concurrent jobs into a single batch.
+
+    The first job to submit becomes the leader of a group. It waits until every
+    active job has submitted, or `window_seconds` has passed, then uploads one
+    merged request file, waits for the batch and hands each job back its own
+    rows. Identical request bodies from different jobs are sent once and the
+    result is fanned out to every job that asked for it.
+
+    A cancelled job withdraws only its own submission: the merged batch is
+    cancelled once every job in the group is cancelled, and RunCancelled is
+    raised only in the jobs that asked for it.
+    """
+
+    def __init__(self, window_seconds: float = 30.0, poll_interval: float = 10.0):
+        """
+        Args:
+            window_seconds: Longest time a leader waits for other jobs (default: 30)
+            poll_interval: Seconds between cancellation checks of waiting jobs (default: 10)
+        """
+        self._window = window_seconds
+        self._poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._active = 0
+        self._pending: List[_Submission] = []
+        self._collecting = False
+        self.batches_submitted = 0
+        self.files_merged = 0
+        self.requests_deduplicated = 0
+
+    def register(self):
+        """Mark a job as active, so leaders wait for its submission."""
+        with self._cond:
+            self._active += 1
+
+    def unregister(self):
+        """Mark a job as finished."""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def submit(self, job_key: str, batch_file: str, run_batch: Callable[[str, Callable[[], bool]], List[Dict]],
+               cancelled: Optional[Callable[[], bool]] = None) -> List[Dict]:
+        """
+        Submit a batch file and block until its results are available.
+
+        Args:
+            job_key: Identifier of the submitting job
+            batch_file: Path to the job's JSONL request file
+            run_batch: Function (request file, cancelled) that uploads a request file and
+                returns result rows, cancelling the batch once `cancelled()` is true
+            cancelled: Returns True once the submitting job was cancelled (default: never)
+
+        Returns:
+            Result rows for this job's requests only
+
+        Raises:
+            RunCancelled: If this job was cancelled before its rows arrived
+        """
+        submission = _Submission(job_key, batch_file, cancelled)
+
+        with self._cond:
+            self._pending.append(submission)
+            self._cond.notify_all()
+            leader = not self._collecting
+            if leader:
+                self._collecting = True
+                self._cond.wait_for(lambda: len(self._pending) >= self._active, timeout=self._window)
+                group = self._pending
+                self._pending = []
+                self._collecting = False
+
+        if leader:
+            self._run_group(group, run_batch)
+        else:
+            # The leader keeps the merged batch running for the rest of the group
+            while not submission.done.wait(self._poll_interval):
+                if submission.cancelled():
+                    raise RunCancelled(f"Run {job_key} was cancelled")
+
+        if submission.error:
+            raise submission.error
+        return submission.rows
+
+    def _run_group(self, group: List[_Submission], run_batch: Callable[[str, Callable[[], bool]], List[Dict]]):
+        """Run one merged batch for a group of submissions."""
+        try:
+            if len(group) == 1:
+                rows = run_batch(group[0].batch_file, group[0].cancelled)
+                group[0].rows = rows
+            else:
+                merged_file, fanout = self._merge(group)
+                duplicates = sum(len(targets) - 1 for targets in fanout.values())
+                print(f"🧩 Merged {len(group)} batch files into {merged_file} ({duplicates} duplicate requests dropped)")
+                # Only cancel the merged batch when nobody needs its rows any more
+                for row in run_batch(str(merged_file), lambda: all(member.cancelled() for member in group)):
+                    for index, custom_id in fanout.get(row['custom_id'], []):
+                        group[index].rows.append(dict(row, custom_id=custom_id))
+                with self._cond:
+                    self.requests_deduplicated += duplicates
+            with self._cond:
+                self.batches_submitted += 1
+                self.files_merged += len(group)
+            for submission in group:
+                if submission.cancelled():
+                    submission.rows = []
+                    submission.error = RunCancelled(f"Run {submission.job_key} was cancelled")
+        except Exception as e:
+            for submission in group:
+                submission.error = e
+        finally:
+            for submission in group:
+                submission.done.set()
+
+    @staticmethod
+    def _merge(group: List[_Submission]):
+        """
+        Write a merged request file, sending each distinct request body once.
+
+        Returns:
+            Tuple of (merged file path, mapping of merged custom ID to the
+            (submission index, original custom ID) pairs it answers)
+        """
+        stamp = str(datetime.datetime.now()).replace(':', '-').replace(' ', '_')
+        merged_file = Path(group[0].batch_file).parent / f"batch_requests_merged_{stamp}.compact.jsonl"
+        merged: Dict[str, Dict] = {}
+        merged_ids: Dict[str, str] = {}
+        fanout: Dict[str, List] = {}
+        for index, submission in enumerate(group):
+            for custom_id, body in read_batch_requests(submission.batch_file):
+                key = request_key(body)
+                if key not in merged_ids:
+                    merged_ids[key] = f"{index}|{custom_id}"
+                    fanout[merged_ids[key]] = []
+                    merged[merged_ids[key]] = body
+                fanout[merged_ids[key]].append((index, custom_id))
+        merged_file = write_batch_requests(merged_file, merged, compress=str(group[0].batch_file).endswith('.gz'))
+        return merged_file, fanout
+
+    def stats(self) -> Dict:
+        """Return merge counts."""
+        with self._cond:
+            return {
+                'batches_submitted': self.batches_submitted,
+                'files_merged': self.files_merged,
+                'requests_deduplicated': self.requests_deduplicated
+            }
+
+
+class SharedResources:
+    """
+    Clients, caches and budgets shared by every job in an Orchestrator.
+
+    Attributes:
+        transport (HttpTransport): Connection pool shared by all jobs
+        client (OpenAI): Client used for both generation and evaluation, created on first use
+        completion_cache (CompletionCache): Shared evaluator completion cache
+        embedding_cache (EmbeddingCache): Shared embedding cache for metrics, if an encoder was given
+        rate_limiter (RateLimiter): Global RPM/TPM budget
+        batch_coalescer (BatchCoalescer): Merges concurrent batch submissions, if enabled
+        run_store (RunStore): Store shared by all jobs
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        completion_cache_path: Optional[str] = None,
+        embedding_encoder: Optional[Callable] = None,
+        coalesce_window: Optional[float] = 30.0,
+        transport: Optional[HttpTransport] = None,
+        run_store_path: str = "results/runs.sqlite"
+    ):
+        """
+        Args:
+            api_key: Optional API key (uses env var if None)
+            requests_per_minute: Global request budget (unlimited if None)
+            tokens_per_minute: Global token budget (unlimited if None)
+            completion_cache_path: Optional SQLite file for the completion cache
+            embedding_encoder: Optional encode function to build a shared EmbeddingCache
+            coalesce_window: Seconds to wait when merging batches (None disables merging)
+            transport: HTTP transport for the shared client (default: a new HttpTransport)
+            run_store_path: SQLite file for the shared run store (default: results/runs.sqlite)
+        """
+        self.transport = transport or HttpTransport()
+        # The client is created on first use, so jobs that never call the API
+        # (mock or local engines) need no credentials
+        self._api_key = api_key
+        self.completion_cache = CompletionCache(completion_cache_path)
+        self.embedding_cache = EmbeddingCache(embedding_encoder) if embedding_encoder else None
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.batch_coalescer = BatchCoalescer(coalesce_window) if coalesce_window is not None else None
+        self.run_store = RunStore(run_store_path)
+
+    @property
+    def client(self):
+        return get_client(self._api_key, transport=self.transport)
+
+    def generator_kwargs(self) -> Dict:
+        """Keyword arguments that attach a PromptGenerator to these resources."""
+        # Generators build their clients lazily through get_client, which hands
+        # every one of them this same client for the shared key and transport
+        return {
+            'generator_api_key': self._api_key,
+            'evaluator_api_key': self._api_key,
+            'completion_cache': self.completion_cache,
+            'rate_limiter': self.rate_limiter,
+            'batch_coalescer': self.batch_coalescer,
+            'transport': self.transport,
+            'run_store': self.run_store
+        }
+
+    def stats(self) -> Dict:
+        """Return cache, budget and batching statistics."""
+        stats = {
+            'completion_cache': self.completion_cache.stats(),
+            'rate_limiter': self.rate_limiter.stats(),
+            'transport': self.transport.stats()
+        }
+        if self.embedding_cache:
+            stats['embedding_cache'] = self.embedding_cache.stats()
+        if self.batch_coalescer:
+            stats['batch_coalescer'] = self.batch_coalescer.stats()
+        return stats
+
+
+class OptimizationJob:
+    """
+    One prompt optimization to run under an Orchestrator.
+
+    Attributes:
+        name (str): Job name, also used in result file names
+        evaluation_set (List[Dict]): Test cases with 'input' and 'expected' keys
+        initial_variations (List[str]): Optional starting variations
+        metric_factory (Callable): Optional function building the job's metric
+            from the shared EmbeddingCache (None if no encoder was given)
+        generator_kwargs (Dict): Keyword arguments for PromptGenerator
+    """
+
+    def __init__(self, name: str, evaluation_set: List[Dict],
+                 initial_variations: Optional[List[str]] = None,
+                 metric_factory: Optional[Callable] = None, **generator_kwargs):
+        self.name = name
+        self.evaluation_set = evaluation_set
+        self.initial_variations = initial_variations
+        self.metric_factory = metric_factory
+        self.generator_kwargs = generator_kwargs
+
+
+class Orchestrator:
+    """
+    Run several optimization jobs concurrently with shared resources.
+    """
+
+    def __init__(self, jobs: List[OptimizationJob], resources: Optional[SharedResources] = None,
+                 max_workers: Optional[int] = None):
+        """
+        Args:
+            jobs: Jobs to run
+            resources: Shared clients, caches and budgets (created with defaults if None)
+            max_workers: Maximum concurrent jobs (default: all jobs at once)
+        """
+        names = [job.name for job in jobs]
+        if len(set(names)) != len(names):
+            raise ValueError("Job names must be unique")
+
+        self._jobs = jobs
+        self._resources = resources or SharedResources()
+        self._max_workers = max_workers or max(1, len(jobs))
+
+    def _run_job(self, job: OptimizationJob) -> Dict:
+        coalescer = self._resources.batch_coalescer
+        if coalescer:
+            coalescer.register()
+        try:
+            job_kwargs = dict(job.generator_kwargs)
+            if job.metric_factory:
+                job_kwargs['metric'] = job.metric_factory(self._resources.embedding_cache)
+            generator = PromptGenerator(
+                run_name=job.name,
+                **self._resources.generator_kwargs(),
+                **job_kwargs
+            )
+            return generator.optimize(job.evaluation_set, initial_variations=job.initial_variations)
+        finally:
+            if coalescer:
+                coalescer.unregister()
+
+    def run(self) -> Dict[str, Dict]:
+        """
+        Run all jobs and wait for them to finish.
+
+        Returns:
+            Mapping of job name to its optimize() result, or {'error': message}
+            for jobs that failed
+        """
+        print(f"🚀 Running {len(self._jobs)} optimization jobs with {self._max_workers} workers")
+        results = {}
+
+        with ThreadPoolExecutor(max_workers=self._max_workers) as pool:
+            futures = {pool.submit(self._run_job, job): job.name for job in self._jobs}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    results[name] = future.result()
+                    print(f"✓ Job '{name}' finished: best fitness {results[name]['best_fitness']:.4f}")
+                except Exception as e:
+                    _logger.error(f"Job '{name}' failed: {e}")
+                    print(f"❌ Job '{name}' failed: {e}")
+                    results[name] = {'error': str(e)}
+
+        print(f"📊 Shared resource stats: {json.dumps(self._resources.stats())}")
+        return results
@@ -0,0 +1,152 @@
+"""
+OutputLength: Per-example completion caps and stop sequences for evaluator requests
+
+Every evaluator request used to allow 1000 completion tokens, while the
+expected answers (e.g. one-line Javadoc summaries) need a few dozen; verbose
+prompts then pay for hundreds of wasted tokens per cell and wait for them.
+OutputLengthPolicy caps each example's completion at a multiple of its expected
+answer's length (or one cap from a quantile of the length distribution), adds
+optional stop sequences, and adapts: an example whose completions are cut off
+for many prompts gets a larger cap in later rounds.
+
+PromptGenerator tracks truncation either way (see `truncation_stats`), so the
+effect of the caps on fitness can be checked: truncated cells are counted per
+round and their mean score is compared with that of complete cells.
+
+Typical usage:
+    from OutputLength import OutputLengthPolicy
+
+    generator = PromptGenerator(
+        base_prompt="You are a helpful assistant.",
+        metric=similarity_metric,
+        output_length=OutputLengthPolicy(multiplier=2.0, stop=["\\n\\n"])
+    )
+"""
+
+import logging
+import math
+from typing import Dict, List, Optional, Sequence
+
+from RunStore import text_hash
+
+_logger = logging.getLogger("prompt_generator")
+
+
+def approx_tokens(text: str) -> int:
+    """Roughly count tokens at ~4 characters each, like RateLimiter.estimate_tokens."""
+    return max(1, math.ceil(len(text or '') / 4))
+
+
+def _example_key(example: Dict) -> str:
+    return text_hash(f"{example['input']}\x00{example['expected']}")
+
+
+class OutputLengthPolicy:
+    """
+    Choose max_tokens and stop sequences for each evaluation example.
+    """
+
+    def __init__(self, multiplier: Optional[float] = 2.0, margin: int = 16, min_tokens: int = 16,
+                 max_tokens: int = 1000, quantile: Optional[float] = None, stop: Optional[List[str]] = None, grow: float = 2.0,
+                 grow_above: float = 0.2):
+        """
+        Args:
+            multiplier: Cap as a multiple of the expected answer's tokens; None keeps `max_tokens`
+                for every example, e.g. to only add stop sequences (default: 2.0)
+            margin: Tokens added to every cap (default: 16)
+            min_tokens: Smallest cap (default: 16)
+            max_tokens: Largest cap, also the previous fixed limit (default: 1000)
+            quantile: Use one cap for every example, from this quantile of expected lengths (e.g. 0.95);
+                None caps each example by its own expected length (default: None)
+            stop: Up to 4 stop sequences sent with every request (default: none)
+            grow: Factor applied to an example's cap when it truncates too often (default: 2.0)
+            grow_above: Share of an example's cells in a round that must be truncated to grow its cap
+                (default: 0.2)
+        """
+        if stop and len(stop) > 4:
+            raise ValueError("The API accepts at most 4 stop sequences")
+        if min_tokens > max_tokens:
+            raise ValueError("min_tokens must not exceed max_tokens")
+        self._multiplier = multiplier
+        self._margin = margin
+        self._min_tokens = min_tokens
+        self._max_tokens = max_tokens
+        self._quantile = quantile
+        self._stop = list(stop) if stop else None
+        self._grow = grow
+        self._grow_above = grow_above
+        self._global_cap: Optional[int] = None
+        self._scale: Dict[str, float] = {}
+        self._grown = 0
+
+    def _clamp(self, tokens: float) -> int:
+        return int(min(self._max_tokens, max(self._min_tokens, math.ceil(tokens))))
+
+    def fit(self, evaluation_set: List[Dict]):
+        """Compute the shared cap from the expected-length distribution (quantile mode only)."""
+        if self._quantile is None or self._multiplier is None or not evaluation_set:
+            return
+        lengths = sorted(approx_tokens(str(example['expected'])) for example in evaluation_set)
+        index = min(len(lengths) - 1, int(self._quantile * len(lengths)))
+        self._global_cap = self._clamp(self._multiplier * lengths[index] + self._margin)
+        print(f"📏 Completion cap {self._global_cap} tokens for every example "
+              f"(p{self._quantile * 100:g} expected length {lengths[index]})")
+
+    def max_tokens(self, example: Dict) -> int:
+        """Return the completion cap for an example."""
+        if self._multiplier is None:
+            return self._max_tokens
+        if self._global_cap is not None:
+            base = self._global_cap
+        else:
+            base = self._multiplier * approx_tokens(str(example['expected'])) + self._margin
+        return self._clamp(base * self._scale.get(_example_key(example), 1.0))
+
+    def body_options(self, example: Dict) -> Dict:
+        """Return the request body fields for an example ('max_tokens' and optionally 'stop')."""
+        options: Dict = {'max_tokens': self.max_tokens(example)}
+        if self._stop:
+            options['stop'] = self._stop
+        return options
+
+    def adapt(self, evaluation_set: Sequence[Dict], truncated: Sequence[int], cells: Sequence[int]) -> int:
+        """
+        Grow the caps of examples that were truncated too often in a round.
+
+        Args:
+            evaluation_set: The round's examples
+            truncated: Truncated cells per example
+            cells: Scored cells per example
+
+        Returns:
+            Number of examples whose cap grew
+        """
+        grown = 0
+        for example, cut, total in zip(evaluation_set, truncated, cells):
+            if not total or cut / total <= self._grow_above:
+                continue
+            cap = self.max_tokens(example)
+            if cap >= self._max_tokens:
+                continue
+            key = _example_key(example)
+            self._scale[key] = self._scale.get(key, 1.0) * self._grow
+            grown += 1
+        self._grown += grown
+        return grown
+
+    def stats(self) -> Dict:
+        if self._multiplier is None:
+            mode = 'fixed'
+        else:
+            mode = 'quantile' if self._quantile is not None else 'per_example'
+        return {'mode': mode,
+                'shared_cap': self._global_cap, 'stop': self._stop, 'grown_caps': self._grown,
+                'examples_with_grown_caps': len(self._scale)}
+
+    def state_dict(self) -> Dict:
+        return {'global_cap': self._global_cap, 'scale': dict(self._scale), 'grown': self._grown}
+
+    def load_state_dict(self, state: Dict):
+        self._global_cap = state.get('global_cap')
+        self._scale = dict(state.get('scale', {}))
+        self._grown = state.get('grown', 0)
@@ -8,11 +8,26 @@ Unlike TreeSearch which selects examples from a dataset, PromptGenerator creates
 entirely new prompt variations using an LLM's creative capabilities.
 
 Key Features:
-- LLM-powered prompt variation generation
+- LLM-powered prompt variation generation, as one list, parallel chunks or n sampled choices
+- Pluggable search strategies (beam, tournament, UCB bandit, simulated annealing, lineage-weighted beam)
+- Optional embedding-space diversity selection of over-generated populations (see Diversity)
+- Optional per-input nearest-neighbour few-shot examples (see TreeSearch)
 - Beam search optimization with pruning
+- Convergence-based early termination (patience, confidence overlap, budget caps)
 - Batch API evaluation for cost-effective parallel processing
+- Per-request batch error classification, with only failed requests resubmitted
+- Compact, deduplicated (optionally gzipped) batch request files
+- Prompt lineage tracking, with reuse of results for prompts already evaluated
+- Record/replay of API traffic for offline, deterministic re-runs
+- Raw completions kept in the run store for offline re-scoring (see Rescore)
+- Pluggable evaluation engines, including distributed workers over a work queue
+- Several evaluator models in one pass, with a prompt x model fitness matrix and
+  mean, weighted or worst-case selection
+- Shared clients, completion cache and rate-limit budget across runs (see Orchestrator)
 - Support for multiple LLM providers (OpenAI, etc.)
-- Progress tracking and result logging
+- Shared, tunable HTTP transport with connection reuse metrics
+- Progress tracking and result logging to a compact SQLite run store
+- Resumable, cancellable runs with an optional live status line (see main.py for the CLI)
 
 Typical usage:
     from PromptGenerator import PromptGenerator
@@ -32,21 +47,44 @@ Author: [Add author]
 License: [Add license]
 """
 
+import re
 import random
 import json
-from typing import Dict, List, Optional, Callable
-from time import sleep
+from typing import Dict, List, Optional, Callable, Union, TYPE_CHECKING
+from time import sleep, monotonic
 import datetime
 from pathlib import Path
 import logging
 from statistics import median, mean
 import copy
-import pandas as pd
-from openai import OpenAI
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from SearchStrategy import SearchStrategy, BeamSearchStrategy, get_strategy
+from StoppingRules import StoppingRule
+from Caches import CompletionCache
+from RateLimiter import RateLimiter, estimate_tokens
+from EvaluationEngine import EvaluationEngine, BatchEngine
+from Transport import HttpTransport, get_client, default_transport
+from RunStore import RunStore
+from BatchFiles import write_batch_requests, upload_payload, loads, classify_result, classify_status, RETRYABLE_ERRORS
+from Lineage import LineageGraph
+from Replay import ReplayStore, ReplayClient, replay_scope
+from Router import EvaluatorRouter
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from openai import OpenAI
+    from Diversity import DiversitySelector
+    from ExamplePruning import ExamplePruner
+    from OutputLength import OutputLengthPolicy
 
 _logger = logging.getLogger("prompt_generator")
 
 
+class RunCancelled(Exception):
+    """Raised inside optimize() when the run was cancelled through the run store."""
+
+
 class PromptGenerator:
     """
     LLM-based prompt optimization using beam search.
@@ -59,27 +97,70 @@ class PromptGenerator:
         _generator_client (OpenAI): Client for prompt generation
         _evaluator_client (OpenAI): Client for prompt evaluation
         _generator_model (str): Model name for generation (e.g., "gpt-4")
-        _evaluator_model (str): Model name for evaluation
+        _evaluator_model (str): Model name for evaluation (the first, with several evaluator models)
+        _evaluator_models (List[str]): Every evaluator model each prompt is scored on
         _metric (callable): Function to evaluate prompt quality
         _breadth (int): Number of variations per iteration
         _max_rounds (int): Maximum optimization iterations
         _pruning_threshold (float): Threshold for pruning poor variations
         _temperature (float): Temperature for variation generation
-        _results_file (str): Path to results file
+        _strategy (SearchStrategy): Selection policy for the next population
+        _stopping_rules (List[StoppingRule]): Rules that can end optimization early
+        _usage (Dict): Evaluator requests and tokens spent so far
+        _completion_cache (CompletionCache): Optional cache of evaluator completions
+        _rate_limiter (RateLimiter): Optional shared request/token budget
+        _batch_coalescer (BatchCoalescer): Optional merger of concurrent batch submissions
+        _engine (EvaluationEngine): Engine that scores each round (default: batch API)
+        _transport (HttpTransport): Connection pool shared by the generator and evaluator clients
+        _results_dir (Path): Directory for batch files, checkpoints and final results
+        _store (RunStore): Store receiving parameters, prompts, fitness and per-example scores
     """
     
     def __init__(
         self,
         base_prompt: str,
         generator_model: str = "gpt-4",
-        evaluator_model: str = "gpt-3.5-turbo",
+        evaluator_model: Union[str, List[str]] = "gpt-3.5-turbo",
         metric: Optional[Callable] = None,
         breadth: int = 100,
         max_rounds: int = 5,
         pruning_threshold: float = 0.03,
         temperature: float = 0.7,
         generator_api_key: Optional[str] = None,
-        evaluator_api_key: Optional[str] = None
+        evaluator_api_key: Optional[str] = None,
+        strategy: Optional[Union[str, SearchStrategy]] = None,
+        stopping_rules: Optional[List[StoppingRule]] = None,
+        generator_client: Optional["OpenAI"] = None,
+        evaluator_client: Optional["OpenAI"] = None,
+        completion_cache: Optional[CompletionCache] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        batch_coalescer=None,
+        run_name: Optional[str] = None,
+        engine: Optional[EvaluationEngine] = None,
+        transport: Optional[HttpTransport] = None,
+        generator_base_url: Optional[str] = None,
+        evaluator_base_url: Optional[str] = None,
+        run_store: Optional[RunStore] = None,
+        compress_batch_files: bool = False,
+        reuse_known_results: bool = True,
+        replay_mode: Optional[str] = None,
+        replay_path: Optional[str] = None,
+        max_batch_retries: int = 2,
+        sync_retry_limit: int = 50,
+        run_id: Optional[str] = None,
+        run_metadata: Optional[Dict] = None,
+        status_line=None,
+        generation_mode: str = "list",
+        generation_chunk_size: int = 10,
+        variation_max_tokens: int = 300,
+        generation_attempts: int = 3,
+        generation_workers: int = 8,
+        diversity: Optional["DiversitySelector"] = None,
+        example_selector: Optional[Callable[[str], str]] = None,
+        example_pruner: Optional["ExamplePruner"] = None,
+        output_length: Optional["OutputLengthPolicy"] = None,
+        model_aggregation: str = "mean",
+        model_weights: Optional[Dict[str, float]] = None
     ):
         """
         Initialize the PromptGenerator.
@@ -87,7 +168,8 @@ class PromptGenerator:
         Args:
             base_prompt: Starting prompt to create variations from
             generator_model: LLM model for generating variations (default: "gpt-4")
-            evaluator_model: LLM model for evaluation (default: "gpt-3.5-turbo")
+            evaluator_model: LLM model for evaluation, or a list of models to score every prompt on
+                (default: "gpt-3.5-turbo")
             metric: Function to evaluate prompt quality (expected, predicted) -> float
             breadth: Number of variations to generate per iteration (default: 10)
             max_rounds: Maximum optimization iterations (default: 5)
@@ -95,43 +177,158 @@ class PromptGenerator:
             temperature: Creativity level for generation (default: 0.7)
             generator_api_key: Optional API key for generator (uses env var if None)
             evaluator_api_key: Optional API key for evaluator (uses env var if None)
+            strategy: Search strategy instance or name (default: beam search)
+            stopping_rules: Rules checked after each round to stop early (default: none)
+            generator_client: Existing client to use for generation instead of creating one
+            evaluator_client: Existing client to use for evaluation instead of creating one
+            completion_cache: Cache of evaluator completions, possibly shared between runs
+            rate_limiter: Request/token budget, possibly shared between runs
+            batch_coalescer: BatchCoalescer that merges batches with other runs
+            run_name: Optional name prefixed to the run's result file names
+            engine: Evaluation engine for optimize() rounds (default: BatchEngine)
+            transport: HTTP transport for created clients (default: the process-wide transport)
+            generator_base_url: Optional base URL override for the generator client
+            evaluator_base_url: Optional base URL override for the evaluator client
+            run_store: Store for run results, possibly shared (default: results/runs.sqlite)
+            compress_batch_files: Gzip the compact batch request files kept in results/ (default: False)
+            reuse_known_results: Reuse per-example scores for prompts textually identical to
+                one already evaluated in the run instead of evaluating them again (default: True)
+            replay_mode: 'record' to store every API request and response, 'replay' to answer
+                them from the store without API calls (default: neither)
+            replay_path: Replay store file (default: results/replay.sqlite)
+            max_batch_retries: Times failed batch requests are resubmitted (default: 2)
+            sync_retry_limit: Resubmit this many failed requests or fewer with direct
+                calls instead of a follow-up batch (default: 50)
+            run_id: Existing run to continue from its checkpoint (default: a new run id)
+            run_metadata: Extra JSON-serialisable parameters recorded with the run
+            status_line: StatusLine that shows progress in place of per-poll prints
+            generation_mode: How generate_variations asks for N prompts: 'list' (one completion
+                listing all N, the original behaviour), 'chunked' (parallel completions of
+                `generation_chunk_size` prompts each) or 'choices' (one prompt per sampled
+                choice using the API's n parameter) (default: 'list')
+            generation_chunk_size: Variations per request in 'chunked' and 'choices' modes (default: 10)
+            variation_max_tokens: Completion token cap per variation in 'chunked' and 'choices'
+                modes (default: 300)
+            generation_attempts: Request rounds per call before a shortfall is padded (default: 3)
+            generation_workers: Parallel generator requests per call (default: 8)
+            diversity: Selector that keeps a diverse `breadth` prompts out of an over-generated
+                population each round (default: evaluate every generated prompt)
+            example_selector: Function returning a few-shot block for an evaluation input, appended
+                to the system prompt of every evaluation request (e.g. TreeSearch.NearestNeighbourFewShot)
+            example_pruner: Evaluates later rounds on only the examples that best separate prompts
+                (default: always evaluate the whole set)
+            output_length: Per-example completion caps and stop sequences for evaluator requests
+                (default: 1000 tokens for every request)
+            model_aggregation: With several evaluator models, combine per-model fitness by 'mean'
+                (weighted by model_weights) or 'worst' (the lowest) (default: 'mean')
+            model_weights: Per-model weights for the 'mean' aggregation (default: equal)
         """
         self._base_prompt = base_prompt
         self._generator_model = generator_model
-        self._evaluator_model = evaluator_model
+        self._evaluator_models = [evaluator_model] if isinstance(evaluator_model, str) else list(evaluator_model)
+        if not self._evaluator_models:
+            raise ValueError("At least one evaluator model is required")
+        if model_aggregation not in ("mean", "worst"):
+            raise ValueError(f"Unknown model aggregation '{model_aggregation}'. Choose 'mean' or 'worst'")
+        if len(self._evaluator_models) > 1 and example_pruner is not None:
+            raise ValueError("Example pruning is not supported with several evaluator models")
+        self._evaluator_model = self._evaluator_models[0]
+        self._model_aggregation = model_aggregation
+        self._model_weights = [(model_weights or {}).get(model, 1.0) for model in self._evaluator_models]
+        self._round_model_fitness: List[Dict[str, float]] = []
         self._metric = metric
         self._breadth = breadth
         self._max_rounds = max_rounds
         self._pruning_threshold = pruning_threshold
         self._temperature = temperature
         
-        # Initialize OpenAI clients
-        if generator_api_key:
-            self._generator_client = OpenAI(api_key=generator_api_key)
-        else:
-            self._generator_client = OpenAI()
-            
-        if evaluator_api_key:
-            self._evaluator_client = OpenAI(api_key=evaluator_api_key)
+        # Select search strategy
+        if strategy is None:
+            self._strategy = BeamSearchStrategy()
+        elif isinstance(strategy, str):
+            self._strategy = get_strategy(strategy)
         else:
-            self._evaluator_client = OpenAI()
+            self._strategy = strategy
+        
+        self._stopping_rules = stopping_rules or []
+        self._usage = {'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+        self._round_example_scores: List[List[float]] = []
+        
+        self._completion_cache = completion_cache
+        self._rate_limiter = rate_limiter
+        self._batch_coalescer = batch_coalescer
+        self._engine = engine or BatchEngine()
+        self._compress_batch_files = compress_batch_files
+        self._reuse_known_results = reuse_known_results
+        self._max_batch_retries = max_batch_retries
+        self._sync_retry_limit = sync_retry_limit
+        self._batch_errors: Counter = Counter()
+        self._lineage = LineageGraph()
+        self._lineage_round = 0
+        if generation_mode not in ("list", "chunked", "choices"):
+            raise ValueError(f"Unknown generation mode '{generation_mode}'. Choose 'list', 'chunked' or 'choices'")
+        self._generation_mode = generation_mode
+        self._generation_chunk_size = generation_chunk_size
+        self._variation_max_tokens = variation_max_tokens
+        self._generation_attempts = generation_attempts
+        self._generation_workers = generation_workers
+        self._generation_stats: Counter = Counter()
+        self._diversity = diversity
+        self._example_selector = example_selector
+        self._example_pruner = example_pruner
+        self._output_length = output_length
+        self._truncation: Counter = Counter()
+        
+        # OpenAI clients are created on first use, so constructing a generator
+        # (e.g. to resume or inspect a run) does not load the SDK. Clients with
+        # the same key and endpoint are shared, both between the two roles and
+        # between generators. Replay mode needs no real clients.
+        self._transport = transport
+        self._clients = {'generator': generator_client, 'evaluator': evaluator_client}
+        self._client_args = {
+            'generator': (generator_api_key, generator_base_url),
+            'evaluator': (evaluator_api_key, evaluator_base_url)
+        }
+        
+        self._replay_mode = replay_mode
+        self._replay_store = None
+        if replay_mode:
+            self._replay_store = ReplayStore(replay_path or str(Path.cwd().joinpath("results", "replay.sqlite")))
+            for role, client in self._clients.items():
+                if replay_mode == "replay" or client is not None:
+                    self._clients[role] = ReplayClient(self._replay_store, replay_mode, client)
+            print(f"🎞️  Replay mode '{replay_mode}' using: {self._replay_store.path}")
         
         # Setup results tracking
         self._run_start = str(datetime.datetime.now()).replace(':', '-').replace(' ', '_')
-        self._results_file = Path.cwd().joinpath("results", f"prompt_gen_{self._run_start}.json")
-        self._results_file.parent.mkdir(parents=True, exist_ok=True)
+        if run_name:
+            self._run_start = f"{run_name}_{self._run_start}"
+        if run_id:
+            self._run_start = run_id
+        self._run_metadata = run_metadata or {}
+        self._status_line = status_line
+        self._results_dir = Path.cwd().joinpath("results")
+        self._results_dir.mkdir(parents=True, exist_ok=True)
         
         # Setup checkpoint file
-        self._checkpoint_file = Path.cwd().joinpath("results", f"checkpoint_{self._run_start}.json")
+        self._checkpoint_file = self._results_dir.joinpath(f"checkpoint_{self._run_start}.json")
         
-        # Setup prompt logging
-        self._prompt_log_file = Path.cwd().joinpath("results", f"prompts_{self._run_start}.csv")
-        self._init_prompt_log()
+        # Setup result store
+        self._store = run_store or RunStore(str(self._results_dir.joinpath("runs.sqlite")))
+        self._cell_details: Dict = {}
+        print(f"📝 Recording run {self._run_start} in: {self._store.path}")
         
     def generate_variations(self, prompt: str, num_variations: int) -> List[str]:
         """
         Generate variations of a prompt using the generator LLM.
         
+        Always returns exactly `num_variations` distinct prompts. Truncated
+        output (the completion hit its token cap) and duplicates are dropped,
+        and the missing variations are requested again, up to
+        `generation_attempts` times; any remaining shortfall is padded with
+        marked copies of the prompt. Truncation and shortfall counts are kept
+        in generation_stats().
+        
         Args:
             prompt: The prompt to create variations from
             num_variations: Number of variations to generate
@@ -144,6 +341,64 @@ class PromptGenerator:
             >>> len(variations)
             5
         """
+        stats = Counter(calls=1, requested=num_variations)
+        variations: List[str] = []
+        seen = {prompt}
+        
+        for attempt in range(self._generation_attempts):
+            missing = num_variations - len(variations)
+            if missing <= 0:
+                break
+            if attempt > 0:
+                stats['top_up_requests'] += 1
+            requests = self._variation_requests(prompt, missing)
+            
+            # Independent requests run in parallel, replayed by their position rather than arrival order
+            if len(requests) > 1:
+                with ThreadPoolExecutor(max_workers=min(self._generation_workers, len(requests))) as executor:
+                    responses = list(executor.map(
+                        lambda request, chunk: self._request_variations(*request, chunk=chunk),
+                        requests, range(len(requests))))
+            else:
+                responses = [self._request_variations(*requests[0])]
+            
+            for texts, request_stats in responses:
+                stats.update(request_stats)
+                for text in texts:
+                    if text in seen:
+                        stats['duplicates'] += 1
+                    elif len(variations) < num_variations:
+                        seen.add(text)
+                        variations.append(text)
+            if attempt == 0:
+                stats['first_attempt_shortfall'] = max(0, num_variations - len(variations))
+        
+        if len(variations) < num_variations:
+            _logger.warning(f"Generated only {len(variations)} of {num_variations} requested variations; "
+                            f"padding the rest")
+            # Fallback: slight modifications of the original
+            padded = num_variations - len(variations)
+            variations.extend(f"{prompt} (variation {i+1})" for i in range(len(variations), num_variations))
+            stats['padded'] = padded
+        if stats['truncated']:
+            _logger.warning(f"{stats['truncated']} generator completions hit their token cap; "
+                            f"their unfinished variations were dropped")
+        
+        self._generation_stats.update(stats)
+        self._record_lineage(prompt, variations)
+        return variations
+    
+    def _variation_requests(self, prompt: str, count: int) -> List[tuple]:
+        """
+        Build the generator request bodies asking for `count` variations in the generation mode.
+        
+        Args:
+            prompt: The prompt to create variations from
+            count: Number of variations to ask for
+            
+        Returns:
+            List of (chat completion body, number of variations it should return)
+        """
         system_message = """You are an expert prompt engineer. Your task is to generate creative variations of a given prompt.
 
 Each variation should:
@@ -154,13 +409,185 @@ Each variation should:
 
 Generate EXACTLY the requested number of variations, each on a new line.
 Output ONLY the variations, nothing else."""
-
-        user_message = f"""Original prompt:
+        
+        if self._generation_mode == "list":
+            sizes = [count]
+        else:
+            chunk = max(1, self._generation_chunk_size)
+            sizes = [min(chunk, count - start) for start in range(0, count, chunk)]
+        
+        requests = []
+        for size in sizes:
+            per_request = 1 if self._generation_mode == "choices" else size
+            user_message = f"""Original prompt:
 {prompt}
 
-Generate {num_variations} creative variations of this prompt."""
+Generate {per_request} creative variation{'s' if per_request != 1 else ''} of this prompt."""
+            body = {
+                "model": self._generator_model,
+                "messages": [
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": user_message}
+                ],
+                "temperature": self._temperature,
+                "max_tokens": 2000 if self._generation_mode == "list" else per_request * self._variation_max_tokens
+            }
+            if self._generation_mode == "choices":
+                body["n"] = size
+            requests.append((body, size))
+        return requests
+    
+    def _request_variations(self, body: Dict, expected: int, chunk: Optional[int] = None):
+        """
+        Send one generator request and parse the variations it returned.
+        
+        Args:
+            body: Chat completion body
+            expected: Number of variations requested
+            chunk: Position among parallel requests of the same call, added to its replay key
+            
+        Returns:
+            (variations, stats) where stats counts requests, returned and truncated completions and errors
+        """
+        stats = Counter(requests=1)
+        try:
+            self._acquire_budget(estimate_tokens(body) * body.get("n", 1))
+            with replay_scope(chunk):
+                response = self._generator_client.chat.completions.create(**body)
+        except Exception as e:
+            _logger.error(f"Error generating variations: {e}")
+            stats['errors'] += 1
+            return [], stats
+        
+        variations = []
+        for choice in response.choices:
+            content = choice.message.content or ''
+            truncated = getattr(choice, 'finish_reason', None) == 'length'
+            stats['completions'] += 1
+            stats['truncated'] += truncated
+            if self._generation_mode == "choices":
+                # The whole completion is one variation; a truncated one is unusable
+                if content.strip() and not truncated:
+                    variations.append(content.strip())
+            else:
+                lines = [v.strip() for v in content.split('\n') if v.strip()]
+                # The last line of a truncated list was cut off mid-variation
+                variations.extend(lines[:-1] if truncated else lines)
+        stats['returned'] += min(len(variations), expected)
+        return variations[:expected], stats
+    
+    def generation_stats(self) -> Dict:
+        """
+        Return generator call counts with truncation and shortfall rates.
+        
+        'truncation_rate' is the fraction of generator completions that hit their
+        token cap; 'shortfall_rate' the fraction of requested variations missing
+        after the first request round; 'padding_rate' the fraction that had to
+        be padded after all attempts.
+        """
+        stats = dict(self._generation_stats)
+        requested = stats.get('requested', 0)
+        stats['truncation_rate'] = stats.get('truncated', 0) / stats['completions'] if stats.get('completions') else 0.0
+        stats['shortfall_rate'] = stats.get('first_attempt_shortfall', 0) / requested if requested else 0.0
+        stats['padding_rate'] = stats.get('padded', 0) / requested if requested else 0.0
+        return stats
+
+    def _track_truncation(self, score_matrix: List[List[Optional[float]]], evaluation_set: List[Dict],
+                          adapt: bool = False):
+        """
+        Count evaluator completions of the current cells that hit their token cap.
+        
+        A cell is truncated when its finish reason is 'length', or, for engines that
+        do not report one, when its completion tokens reached the cap. With `adapt`,
+        the output length policy grows the caps of often-truncated examples.
+        """
+        truncated = [0] * len(evaluation_set)
+        cells = [0] * len(evaluation_set)
+        for (p, e), cell in self._cell_details.items():
+            if cell.get('finish_reason') is not None:
+                cut = cell['finish_reason'] == 'length'
+            elif cell.get('completion_tokens') is not None:
+                cap = self._output_length.max_tokens(evaluation_set[e]) if self._output_length else 1000
+                cut = cell['completion_tokens'] >= cap
+            else:
+                continue
+            cells[e] += 1
+            truncated[e] += cut
+            score = score_matrix[p][e] if p < len(score_matrix) else None
+            kind = 'truncated' if cut else 'complete'
+            self._truncation['cells'] += 1
+            self._truncation[kind] += 1
+            if score is not None:
+                self._truncation[f'score_sum_{kind}'] += score
+                self._truncation[f'scored_{kind}'] += 1
+            if cell.get('completion_tokens') is not None:
+                self._truncation['completion_tokens'] += cell['completion_tokens']
+                self._truncation['token_cells'] += 1
+        
+        if sum(truncated):
+            print(f"✂️  {sum(truncated)}/{sum(cells)} evaluator completions hit their token cap")
+        if adapt and self._output_length:
+            grown = self._output_length.adapt(evaluation_set, truncated, cells)
+            if grown:
+                print(f"📏 Raised the completion cap of {grown} often-truncated examples")
+    
+    def truncation_stats(self) -> Dict:
+        """
+        Return evaluator truncation counts and their effect on scores.
+        
+        'truncation_rate' is the fraction of fresh evaluator completions that hit
+        their token cap; 'mean_score_truncated' and 'mean_score_complete' compare
+        the scores of truncated and complete cells; 'mean_completion_tokens' is
+        the average completion length.
+        """
+        counts = self._truncation
+        stats = {
+            'cells': counts['cells'],
+            'truncated': counts['truncated'],
+            'truncation_rate': counts['truncated'] / counts['cells'] if counts['cells'] else 0.0,
+            'mean_score_truncated': counts['score_sum_truncated'] / counts['scored_truncated']
+            if counts['scored_truncated'] else None,
+            'mean_score_complete': counts['score_sum_complete'] / counts['scored_complete']
+            if counts['scored_complete'] else None,
+            'mean_completion_tokens': counts['completion_tokens'] / counts['token_cells']
+            if counts['token_cells'] else None
+        }
+        if self._output_length:
+            stats['policy'] = self._output_length.stats()
+        return stats
+
+    def crossover_prompts(self, parent_a: str, parent_b: str, num_children: int) -> List[str]:
+        """
+        Combine two parent prompts into new prompts using the generator LLM.
+
+        Args:
+            parent_a: First parent prompt
+            parent_b: Second parent prompt
+            num_children: Number of combined prompts to generate
+
+        Returns:
+            List of child prompts
+        """
+        system_message = """You are an expert prompt engineer. Your task is to combine two prompts into new prompts.
+
+Each new prompt should:
+- Keep the strongest instructions and phrasing from both parents
+- Read as a single coherent prompt, not a concatenation
+- Maintain the core intent shared by both parents
+
+Generate EXACTLY the requested number of prompts, each on a new line.
+Output ONLY the prompts, nothing else."""
+
+        user_message = f"""Parent prompt A:
+{parent_a}
+
+Parent prompt B:
+{parent_b}
+
+Generate {num_children} prompts that combine A and B."""
 
         try:
+            self._acquire_budget(len(system_message + user_message) // 4 + 2000)
             response = self._generator_client.chat.completions.create(
                 model=self._generator_model,
                 messages=[
@@ -170,103 +597,262 @@ Generate {num_variations} creative variations of this prompt."""
                 temperature=self._temperature,
                 max_tokens=2000
             )
-            
-            # Parse variations from response
+
             content = response.choices[0].message.content
-            variations = [v.strip() for v in content.split('\n') if v.strip()]
-            
-            # Ensure we have the right number
-            if len(variations) < num_variations:
-                _logger.warning(f"Generated only {len(variations)} of {num_variations} requested variations")
-            
-            return variations[:num_variations]
-            
+            children = [c.strip() for c in content.split('\n') if c.strip()]
+
+            if len(children) < num_children:
+                _logger.warning(f"Crossover produced only {len(children)} of {num_children} requested prompts")
+
+            children = children[:num_children]
+            self._record_lineage(parent_a, children, operator='crossover', second_parent=parent_b)
+            return children
+
         except Exception as e:
-            _logger.error(f"Error generating variations: {e}")
-            # Fallback: return slight modifications of the original
-            return [f"{prompt} (variation {i+1})" for i in range(num_variations)]
+            _logger.error(f"Error in crossover: {e}")
+            # Fallback: mutate the first parent instead
+            return self.generate_variations(parent_a, num_children)
+
+    def _client(self, role: str):
+        """Return the 'generator' or 'evaluator' client, creating it on first use."""
+        if self._clients[role] is None:
+            client = get_client(*self._client_args[role], self._transport)
+            if self._replay_mode == "record":
+                client = ReplayClient(self._replay_store, "record", client)
+            self._clients[role] = client
+        return self._clients[role]
+    
+    @property
+    def _generator_client(self):
+        return self._client('generator')
+    
+    @property
+    def _evaluator_client(self):
+        return self._client('evaluator')
+    
+    @property
+    def lineage(self) -> LineageGraph:
+        """Parent/child graph of the prompts generated in this run."""
+        return self._lineage
+    
+    def _record_lineage(self, parent: str, children: List[str], operator: str = 'mutation',
+                        second_parent: Optional[str] = None):
+        """
+        Record the origin of prompts returned by one generator call.
+        
+        Args:
+            parent: Prompt the children were generated from
+            children: Generated prompts
+            operator: 'mutation' or 'crossover' (default: 'mutation')
+            second_parent: Second parent of a crossover
+        """
+        call = self._lineage.record_call(parent, children, self._lineage_round, operator, second_parent)
+        self._store.record_lineage(self._run_start, children, parent, self._lineage_round, call,
+                                   operator, second_parent)
     
-    def _init_prompt_log(self):
-        """Initialize the prompt log file with headers."""
-        with open(self._prompt_log_file, 'w') as f:
-            f.write("Round,Variation,Fitness,Prompt\n")
-        print(f"📝 Logging prompts to: {self._prompt_log_file}")
+    def _record_usage(self, usage):
+        """
+        Add one evaluator request and its token usage to the running totals.
+        
+        Args:
+            usage: Usage object from the client or 'usage' dict from a batch result
+        """
+        self._usage['requests'] += 1
+        if usage is None:
+            return
+        if isinstance(usage, dict):
+            self._usage['prompt_tokens'] += usage.get('prompt_tokens', 0) or 0
+            self._usage['completion_tokens'] += usage.get('completion_tokens', 0) or 0
+        else:
+            self._usage['prompt_tokens'] += getattr(usage, 'prompt_tokens', 0) or 0
+            self._usage['completion_tokens'] += getattr(usage, 'completion_tokens', 0) or 0
+    
+    def _population_size(self) -> int:
+        """Number of candidates to generate for the next population (over-generated with a diversity selector)."""
+        return self._diversity.candidate_count(self._breadth) if self._diversity else self._breadth
+    
+    def _diversify(self, candidates: List[str], evaluated: List[str]) -> List[str]:
+        """
+        Keep a diverse `breadth` of the candidates when a diversity selector is attached.
+        
+        Each candidate's relevance is its parent's fitness, so MMR prefers
+        children of strong parents among equally novel candidates.
+        
+        Args:
+            candidates: Generated candidate prompts
+            evaluated: Prompts evaluated in the previous round, to stay away from
+            
+        Returns:
+            The prompts to evaluate
+        """
+        if not self._diversity or len(candidates) <= self._breadth:
+            return candidates
+        relevance = []
+        for candidate in candidates:
+            parent = self._lineage.parent(candidate)
+            node = self._lineage.node(parent) if parent is not None else None
+            relevance.append(node['fitness'] if node and node['fitness'] is not None else 0.0)
+        selected = self._diversity.select(candidates, self._breadth, relevance, evaluated)
+        print(f"🧭 Kept {len(selected)} diverse prompts of {len(candidates)} candidates ({self._diversity.method})")
+        return selected
     
-    def _log_prompt(self, round_num: int, variation_num: int, fitness: float, prompt: str):
+    def _report_progress(self, message: Optional[str], **fields):
         """
-        Log a tested prompt in compact CSV format.
+        Show progress on the status line if there is one, otherwise print it.
+        
+        Args:
+            message: Line printed when there is no status line (None to print nothing)
+            **fields: Status line fields to update (e.g. phase, done, total)
+        """
+        if self._status_line is not None:
+            self._status_line.update(**fields)
+        elif message is not None:
+            print(message)
+    
+    def _cancel_requested(self) -> bool:
+        """Return True if the run was marked 'cancelling' in the run store."""
+        return self._store.status(self._run_start) == 'cancelling'
+    
+    def _check_cancelled(self):
+        """
+        Raise RunCancelled if the run was marked 'cancelling' in the run store.
+        
+        Checked between rounds and while waiting on batches and workers.
+        """
+        if self._cancel_requested():
+            raise RunCancelled(f"Run {self._run_start} was cancelled")
+    
+    def _acquire_budget(self, tokens: int):
+        """Wait for the shared rate limiter, if any, to allow one request."""
+        if self._rate_limiter:
+            self._rate_limiter.acquire(requests=1, tokens=tokens)
+    
+    def _evaluation_body(self, prompt: str, example: Dict) -> Dict:
+        """
+        Build the evaluator chat completion body for one prompt-example pair.
+        
+        The same body is used by the batch and sequential paths, and is the key
+        for the completion cache. With an example selector, the few-shot block
+        for the example's input follows the prompt; with an output length
+        policy, max_tokens and stop sequences are set per example. An example
+        carrying a 'model' (see _expand_for_models) is sent to that model.
+        """
+        if self._example_selector is not None:
+            prompt = prompt + self._example_selector(example['input'])
+        return {
+            "model": example.get('model') or self._evaluator_model,
+            "messages": [
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": example['input']}
+            ],
+            "temperature": 0.3,
+            **(self._output_length.body_options(example) if self._output_length else {"max_tokens": 1000})
+        }
+    
+    def _record_cell_details(self, prompt_idx: int, example_idx: int, **details):
+        """
+        Attach token counts and latency to a (prompt, example) cell of the current round.
+        
+        Engines call this while scoring; the details are stored with the round's scores.
+        
+        Args:
+            prompt_idx: Prompt position within the round
+            example_idx: Example position within the evaluation set
+            **details: Any of 'prompt_tokens', 'completion_tokens', 'latency_ms', 'completion', 'finish_reason'
+        """
+        self._cell_details.setdefault((prompt_idx, example_idx), {}).update(details)
+    
+    def _log_prompt(self, round_num: int, variation_num: int, fitness: float, prompt: str,
+                    coverage: Optional[float] = None):
+        """
+        Record a tested prompt in the run store.
         
         Args:
             round_num: Optimization round number
             variation_num: Variation number within round
             fitness: Fitness score achieved
-            prompt: The prompt text (truncated if too long)
+            prompt: The prompt text
+            coverage: Fraction of examples that produced a score
         """
-        # Truncate prompt for readability, keep first 100 chars
-        prompt_preview = prompt.replace('\n', ' ').replace('"', '""')[:100]
-        if len(prompt) > 100:
-            prompt_preview += "..."
-        
-        with open(self._prompt_log_file, 'a') as f:
-            f.write(f"{round_num},{variation_num},{fitness:.4f},\"{prompt_preview}\"\n")
+        self._store.record_candidate(self._run_start, round_num, variation_num, prompt, fitness, coverage,
+                                     parent=self._lineage.parent(prompt))
     
-    def _create_batch_requests(self, prompts: List[str], evaluation_set: List[Dict], round_num: int) -> str:
+    def _create_batch_requests(self, requests: Dict[str, Dict], round_num: int, attempt: int = 0,
+                               model: Optional[str] = None) -> str:
         """
-        Create a JSONL file with batch requests for all prompt-example combinations.
+        Create a compact batch request file.
+        
+        Each distinct prompt and example text is stored once and referenced by
+        the request lines (see BatchFiles); the full JSONL is only rebuilt in
+        memory at upload time.
         
         Args:
-            prompts: List of prompts to evaluate
-            evaluation_set: Test cases to evaluate on
+            requests: Request bodies keyed by custom ID
             round_num: Current round number
+            attempt: Resubmission number, 0 for the round's first batch
+            model: Model of every request in the file, when a round is split by model
             
         Returns:
-            Path to the created JSONL file
+            Path to the created batch file
         """
-        batch_file = self._results_file.parent / f"batch_requests_round_{round_num}_{self._run_start}.jsonl"
-        
-        with open(batch_file, 'w') as f:
-            for prompt_idx, prompt in enumerate(prompts):
-                for example_idx, example in enumerate(evaluation_set):
-                    # Create unique ID for tracking
-                    custom_id = f"r{round_num}_p{prompt_idx}_e{example_idx}"
-                    
-                    request = {
-                        "custom_id": custom_id,
-                        "method": "POST",
-                        "url": "/v1/chat/completions",
-                        "body": {
-                            "model": self._evaluator_model,
-                            "messages": [
-                                {"role": "system", "content": prompt},
-                                {"role": "user", "content": example['input']}
-                            ],
-                            "temperature": 0.3,
-                            "max_tokens": 1000
-                        }
-                    }
-                    f.write(json.dumps(request) + '\n')
+        suffix = f"_retry{attempt}" if attempt else ""
+        if model:
+            suffix += "_" + re.sub(r"[^A-Za-z0-9.-]+", "-", model)
+        batch_file = self._results_dir / f"batch_requests_round_{round_num}_{self._run_start}{suffix}.compact.jsonl"
+        batch_file = write_batch_requests(batch_file, requests, compress=self._compress_batch_files)
         
         print(f"📦 Created batch file: {batch_file}")
-        return str(batch_file)
+        return batch_file
     
-    def _submit_and_wait_batch(self, batch_file: str) -> pd.DataFrame:
+    def _submit_batches(self, requests: Dict[str, Dict], round_num: int, attempt: int) -> "pd.DataFrame":
         """
-        Submit batch file to OpenAI and wait for completion.
+        Submit requests as batches and wait for the results.
+        
+        A batch may only use one model, so with several evaluator models the
+        requests are split into one batch per model, submitted side by side.
+        """
+        import pandas as pd
+        
+        groups: Dict[str, Dict[str, Dict]] = {}
+        for custom_id, body in requests.items():
+            groups.setdefault(body['model'], {})[custom_id] = body
+        if len(groups) == 1:
+            return self._submit_and_wait_batch(self._create_batch_requests(requests, round_num, attempt))
+        
+        batch_files = [self._create_batch_requests(group, round_num, attempt, model=model)
+                       for model, group in groups.items()]
+        if self._batch_coalescer:
+            # The coalescer expects one submission per run at a time
+            frames = [self._submit_and_wait_batch(batch_file) for batch_file in batch_files]
+        else:
+            with ThreadPoolExecutor(max_workers=len(batch_files)) as executor:
+                frames = list(executor.map(self._submit_and_wait_batch, batch_files))
+        return pd.concat(frames, ignore_index=True)
+    
+    def _run_batch_file(self, batch_file: str, cancelled: Optional[Callable[[], bool]] = None) -> List[Dict]:
+        """
+        Upload a batch request file to OpenAI, wait for completion and download the results.
         
         Args:
-            batch_file: Path to JSONL batch request file
+            batch_file: Path to a compact or full JSONL batch request file
+            cancelled: Returns True when the batch should be cancelled (default: this
+                run was cancelled); a merged batch passes a check over every run in it
             
         Returns:
-            DataFrame with results (custom_id, response)
+            Parsed result rows from the batch output and error files. A batch that
+            expired or was cancelled returns the rows it finished.
+            
+        Raises:
+            RunCancelled: If `cancelled()` became true while waiting
         """
+        cancelled = cancelled or self._cancel_requested
         print(f"📤 Uploading batch file...")
         
-        # Upload file
-        with open(batch_file, 'rb') as f:
-            batch_input_file = self._evaluator_client.files.create(
-                file=f,
-                purpose="batch"
-            )
+        # Upload file, expanded to full OpenAI batch JSONL in memory
+        batch_input_file = self._evaluator_client.files.create(
+            file=upload_payload(batch_file),
+            purpose="batch"
+        )
         
         print(f"✓ File uploaded: {batch_input_file.id}")
         
@@ -279,7 +865,7 @@ Generate {num_variations} creative variations of this prompt."""
         )
         
         print(f"🔄 Batch submitted: {batch.id}")
-        print(f"   Status: {batch.status}")
+        self._report_progress(f"   Status: {batch.status}", phase=f"batch {batch.status}")
         
         # Poll for completion
         import time
@@ -287,35 +873,116 @@ Generate {num_variations} creative variations of this prompt."""
         
         while batch.status not in ["completed", "failed", "expired", "cancelled"]:
             time.sleep(poll_interval)
+            if cancelled():
+                cancel = getattr(self._evaluator_client.batches, 'cancel', None)
+                if cancel:
+                    cancel(batch.id)
+                raise RunCancelled(f"Batch {batch.id} was cancelled")
             batch = self._evaluator_client.batches.retrieve(batch.id)
-            print(f"   Status: {batch.status} | Progress: {batch.request_counts.completed}/{batch.request_counts.total}")
+            counts = batch.request_counts
+            self._report_progress(f"   Status: {batch.status} | Progress: {counts.completed}/{counts.total}",
+                                  phase=f"batch {batch.status}", done=f"{counts.completed}/{counts.total}")
         
-        if batch.status != "completed":
+        # A failed batch (e.g. rejected input file) has nothing to salvage
+        file_ids = [file_id for file_id in (batch.output_file_id, getattr(batch, 'error_file_id', None)) if file_id]
+        if not file_ids:
             raise Exception(f"Batch failed with status: {batch.status}")
         
-        print(f"✓ Batch completed!")
+        if batch.status == "completed":
+            print(f"✓ Batch completed!")
+        else:
+            print(f"⚠️  Batch {batch.status}: keeping the finished rows and resubmitting the rest")
+        
+        # Download and parse results, including per-request errors
+        rows = []
+        for file_id in file_ids:
+            content = self._evaluator_client.files.content(file_id)
+            rows.extend(loads(line) for line in content.content.splitlines() if line.strip())
+        return rows
+    
+    def _submit_and_wait_batch(self, batch_file: str) -> "pd.DataFrame":
+        """
+        Submit batch file to OpenAI and wait for completion.
+        
+        When a batch coalescer is attached, the file is merged with concurrent
+        submissions from other runs and only this run's rows are returned.
         
-        # Download results
-        result_file_id = batch.output_file_id
-        result_content = self._evaluator_client.files.content(result_file_id)
+        Args:
+            batch_file: Path to JSONL batch request file
+            
+        Returns:
+            DataFrame with results (custom_id, message, error), where 'error' is
+            None for usable rows and an error class otherwise (see BatchFiles.classify_result)
+        """
+        if self._batch_coalescer:
+            results = self._batch_coalescer.submit(self._run_start, batch_file, self._run_batch_file,
+                                                   cancelled=self._cancel_requested)
+        else:
+            results = self._run_batch_file(batch_file)
         
-        # Parse results
-        results = []
-        for line in result_content.text.strip().split('\n'):
-            results.append(json.loads(line))
+        for result in results:
+            response_body = (result.get('response') or {}).get('body') or {}
+            usage = response_body.get('usage')
+            self._record_usage(usage)
+            if usage:
+                _, prompt_part, example_part = result['custom_id'].split('_')
+                self._record_cell_details(int(prompt_part[1:]), int(example_part[1:]),
+                                          prompt_tokens=usage.get('prompt_tokens'),
+                                          completion_tokens=usage.get('completion_tokens'),
+                                          finish_reason=(response_body.get('choices') or [{}])[0].get('finish_reason'))
         
         # Convert to DataFrame
-        df = pd.DataFrame(results)
-        df['message'] = df['response'].apply(
-            lambda x: x['body']['choices'][0]['message']['content'] if 'body' in x else ''
-        )
+        import pandas as pd
+        
+        errors = [classify_result(result) for result in results]
+        messages = [
+            result['response']['body']['choices'][0]['message']['content'] if error is None else None
+            for result, error in zip(results, errors)
+        ]
+        
+        return pd.DataFrame({'custom_id': [result['custom_id'] for result in results],
+                             'message': messages, 'error': errors},
+                            columns=['custom_id', 'message', 'error'])
+    
+    def _call_requests(self, requests: Dict[str, Dict]) -> "pd.DataFrame":
+        """
+        Send requests directly instead of as a batch, for small resubmissions.
         
-        return df[['custom_id', 'message']]
+        Args:
+            requests: Request bodies keyed by custom ID
+            
+        Returns:
+            DataFrame with results (custom_id, message, error), like _submit_and_wait_batch
+        """
+        import pandas as pd
+        
+        print(f"📨 Sending {len(requests)} requests directly...")
+        rows = []
+        for custom_id, body in requests.items():
+            try:
+                self._acquire_budget(estimate_tokens(body))
+                started = monotonic()
+                response = self._evaluator_client.chat.completions.create(**body)
+                usage = getattr(response, 'usage', None)
+                self._record_usage(usage)
+                _, prompt_part, example_part = custom_id.split('_')
+                self._record_cell_details(int(prompt_part[1:]), int(example_part[1:]),
+                                          latency_ms=(monotonic() - started) * 1000,
+                                          prompt_tokens=getattr(usage, 'prompt_tokens', None),
+                                          completion_tokens=getattr(usage, 'completion_tokens', None),
+                                          finish_reason=response.choices[0].finish_reason)
+                content = response.choices[0].message.content
+                rows.append((custom_id, content, None if content is not None else 'empty'))
+            except Exception as e:
+                _logger.error(f"Error sending request {custom_id}: {e}")
+                rows.append((custom_id, None, classify_status(getattr(e, 'status_code', None),
+                                                              getattr(e, 'code', None) or '')))
+        return pd.DataFrame(rows, columns=['custom_id', 'message', 'error'])
     
-    def _score_batch_results(self, results_df: pd.DataFrame, prompts: List[str], 
-                            evaluation_set: List[Dict], round_num: int) -> List[float]:
+    def _score_batch_results(self, results_df: "pd.DataFrame", prompts: List[str], 
+                            evaluation_set: List[Dict], round_num: int) -> List[List[Optional[float]]]:
         """
-        Score batch results and compute fitness for each prompt.
+        Score batch results for every prompt-example combination.
         
         Args:
             results_df: DataFrame with batch results
@@ -324,38 +991,219 @@ Generate {num_variations} creative variations of this prompt."""
             round_num: Current round number
             
         Returns:
-            List of fitness scores (one per prompt)
+            Score matrix with one row per prompt and one score per example
+            (None where no result came back)
         """
-        fitness_scores = []
+        messages = dict(zip(results_df['custom_id'], results_df['message']))
+        score_matrix = []
         
         for prompt_idx, prompt in enumerate(prompts):
-            total_fitness = 0.0
-            count = 0
-            
+            row = []
             for example_idx, example in enumerate(evaluation_set):
                 custom_id = f"r{round_num}_p{prompt_idx}_e{example_idx}"
                 
-                # Find result for this combination
-                result_row = results_df[results_df['custom_id'] == custom_id]
-                
-                if not result_row.empty:
-                    prediction = result_row.iloc[0]['message']
-                    
-                    # Evaluate using metric
-                    if self._metric:
-                        fitness = self._metric(example['expected'], prediction)
-                        total_fitness += fitness
-                        count += 1
+                # Find result for this combination and evaluate using metric
+                if custom_id in messages and self._metric:
+                    row.append(self._metric(example['expected'], messages[custom_id]))
+                    self._record_cell_details(prompt_idx, example_idx, completion=messages[custom_id])
+                else:
+                    row.append(None)
+            score_matrix.append(row)
+        
+        return score_matrix
+    
+    def _aggregate_fitness(self, score_matrix: List[List[Optional[float]]], prompts: List[str],
+                           round_num: int) -> List[float]:
+        """
+        Average each prompt's per-example scores into a fitness and record the round.
+        
+        With several evaluator models, each model's mean is taken over its own
+        columns and the means are combined by the model aggregation.
+        
+        Args:
+            score_matrix: One row of per-example scores (or None) per prompt
+            prompts: List of prompts that were evaluated
+            round_num: Current round number
+            
+        Returns:
+            List of fitness scores (one per prompt)
+        """
+        fitness_scores = []
+        self._round_example_scores = []
+        self._round_model_fitness = []
+        
+        pruner = self._example_pruner if self._example_pruner and self._example_pruner.active else None
+        
+        for prompt_idx, (prompt, row) in enumerate(zip(prompts, score_matrix)):
+            example_scores = [score for score in row if score is not None]
             
-            # Calculate average fitness for this prompt
-            avg_fitness = total_fitness / count if count > 0 else 0.0
+            # Calculate average fitness for this prompt (on the full-set scale once examples are pruned)
+            if len(self._evaluator_models) > 1:
+                model_fitness = self._model_fitness(row)
+                self._round_model_fitness.append(model_fitness)
+                avg_fitness = self._combine_model_fitness(model_fitness)
+                coverage = len(example_scores) / len(row) if row else 0.0
+            elif pruner:
+                avg_fitness = pruner.fitness(row)
+                coverage = sum(row[i] is not None for i in pruner.kept) / len(pruner.kept)
+            else:
+                avg_fitness = sum(example_scores) / len(example_scores) if example_scores else 0.0
+                coverage = len(example_scores) / len(row) if row else 0.0
             fitness_scores.append(avg_fitness)
+            self._round_example_scores.append(example_scores)
             
             # Log the prompt
-            self._log_prompt(round_num, prompt_idx + 1, avg_fitness, prompt)
+            self._log_prompt(round_num, prompt_idx + 1, avg_fitness, prompt, coverage)
+            self._lineage.record_evaluation(prompt, avg_fitness, row)
+        
+        if self._round_model_fitness:
+            best = max(range(len(fitness_scores)), key=fitness_scores.__getitem__)
+            print(f"   Round best by {self._model_aggregation} over models: " + ", ".join(
+                f"{model} {fitness:.4f}" for model, fitness in self._round_model_fitness[best].items()))
+        
+        # Variations are numbered from 1, so cell prompt indices match candidate indices
+        self._store.record_cells(self._run_start, round_num, score_matrix, self._cell_details, prompt_offset=1)
+        if pruner:
+            # Rescoring aggregates this round's cells the same way
+            self._store.record_pruning(self._run_start, round_num, pruner.state_dict())
         
         return fitness_scores
     
+    def _expand_for_models(self, evaluation_set: List[Dict]) -> List[Dict]:
+        """
+        Repeat the evaluation set once per evaluator model, model by model.
+        
+        Column `m * len(evaluation_set) + e` of a score row is example e on model m,
+        so every engine scores all models in one merged request plan.
+        """
+        if len(self._evaluator_models) == 1:
+            return evaluation_set
+        return [dict(example, model=model) for model in self._evaluator_models for example in evaluation_set]
+    
+    def _model_fitness(self, row: List[Optional[float]]) -> Dict[str, float]:
+        """Split an expanded score row into each evaluator model's mean score."""
+        size = len(row) // len(self._evaluator_models)
+        fitness = {}
+        for m, model in enumerate(self._evaluator_models):
+            scores = [score for score in row[m * size:(m + 1) * size] if score is not None]
+            fitness[model] = sum(scores) / len(scores) if scores else 0.0
+        return fitness
+    
+    def _combine_model_fitness(self, model_fitness: Dict[str, float]) -> float:
+        """Combine per-model fitness into one value: weighted mean or worst case."""
+        values = [model_fitness[model] for model in self._evaluator_models]
+        if self._model_aggregation == "worst":
+            return min(values)
+        return sum(v * w for v, w in zip(values, self._model_weights)) / sum(self._model_weights)
+    
+    def fitness_matrix(self, all_results: List[Dict]) -> Dict:
+        """
+        Return the prompt x evaluator model fitness matrix of a run.
+        
+        Args:
+            all_results: Results from optimize(), carrying 'model_fitness'
+            
+        Returns:
+            Dictionary with 'models', 'aggregation', 'prompts', 'fitness' (one row of
+            per-model fitness per distinct prompt, best aggregate first), 'aggregate'
+            and 'best_per_model'
+        """
+        rows: Dict[str, Dict] = {}
+        for result in all_results:
+            if 'model_fitness' in result:
+                rows[result['prompt']] = result
+        ranked = sorted(rows.values(), key=lambda r: -r['fitness'])
+        best_per_model = {}
+        for model in self._evaluator_models:
+            best = max(ranked, key=lambda r: r['model_fitness'][model], default=None)
+            best_per_model[model] = {'prompt': best['prompt'], 'fitness': best['model_fitness'][model]} if best else None
+        return {
+            'models': list(self._evaluator_models),
+            'aggregation': self._model_aggregation,
+            'prompts': [r['prompt'] for r in ranked],
+            'fitness': [[r['model_fitness'][model] for model in self._evaluator_models] for r in ranked],
+            'aggregate': [r['fitness'] for r in ranked],
+            'best_per_model': best_per_model
+        }
+    
+    def score_prompts_batch(self, prompts: List[str], evaluation_set: List[Dict],
+                            round_num: int) -> List[List[Optional[float]]]:
+        """
+        Score every prompt-example combination using OpenAI's batch API.
+        
+        Args:
+            prompts: List of prompts to evaluate
+            evaluation_set: Test cases to evaluate on
+            round_num: Current round number
+            
+        Returns:
+            Score matrix with one row per prompt and one score (or None) per example
+        """
+        import pandas as pd
+        
+        print(f"\n🔬 Evaluating {len(prompts)} prompts on {len(evaluation_set)} examples using batch API...")
+        
+        requests = {}
+        for prompt_idx, prompt in enumerate(prompts):
+            for example_idx, example in enumerate(evaluation_set):
+                # Create unique ID for tracking
+                requests[f"r{round_num}_p{prompt_idx}_e{example_idx}"] = self._evaluation_body(prompt, example)
+        
+        # Serve repeated requests from the completion cache
+        cached = {}
+        if self._completion_cache:
+            for custom_id, body in requests.items():
+                content = self._completion_cache.get(body)
+                if content is not None:
+                    cached[custom_id] = content
+            if cached:
+                print(f"♻️  {len(cached)}/{len(requests)} requests served from completion cache")
+        pending = {custom_id: body for custom_id, body in requests.items() if custom_id not in cached}
+        
+        results_df = pd.DataFrame({'custom_id': list(cached), 'message': list(cached.values())})
+        
+        # Submit, then resubmit only the requests that failed for retryable reasons
+        attempt = 0
+        while pending:
+            if attempt > 0 and len(pending) <= self._sync_retry_limit:
+                batch_df = self._call_requests(pending)
+            else:
+                batch_df = self._submit_batches(pending, round_num, attempt)
+            
+            succeeded = batch_df[batch_df['error'].isna() & batch_df['custom_id'].isin(list(pending))]
+            if self._completion_cache:
+                for custom_id, message in zip(succeeded['custom_id'], succeeded['message']):
+                    self._completion_cache.put(pending[custom_id], message)
+            results_df = pd.concat([results_df, succeeded[['custom_id', 'message']]], ignore_index=True)
+            
+            errors = dict(zip(batch_df['custom_id'], batch_df['error']))
+            succeeded_ids = set(succeeded['custom_id'])
+            failures = {custom_id: errors.get(custom_id) or 'missing'
+                        for custom_id in pending if custom_id not in succeeded_ids}
+            if failures:
+                counts = Counter(failures.values())
+                self._batch_errors.update(counts)
+                print(f"⚠️  {len(failures)}/{len(pending)} requests failed: {dict(counts)}")
+            
+            retryable = {custom_id: pending[custom_id] for custom_id, error in failures.items()
+                         if error in RETRYABLE_ERRORS}
+            if retryable and attempt < self._max_batch_retries:
+                attempt += 1
+                print(f"🔁 Resubmitting {len(retryable)} failed requests (attempt {attempt}/{self._max_batch_retries})")
+                pending = retryable
+            else:
+                if retryable:
+                    _logger.warning(f"Giving up on {len(retryable)} requests after {attempt} resubmissions")
+                pending = {}
+        
+        scored = len(results_df)
+        total = len(requests)
+        if scored < total:
+            print(f"   Coverage: {scored}/{total} cells ({scored / total:.1%}); fitness uses scored cells only")
+        
+        # Score results
+        return self._score_batch_results(results_df, prompts, evaluation_set, round_num)
+    
     def evaluate_prompts_batch(self, prompts: List[str], evaluation_set: List[Dict], 
                               round_num: int) -> List[float]:
         """
@@ -369,18 +1217,66 @@ Generate {num_variations} creative variations of this prompt."""
         Returns:
             List of fitness scores (one per prompt)
         """
-        print(f"\n🔬 Evaluating {len(prompts)} prompts on {len(evaluation_set)} examples using batch API...")
+        self._cell_details = {}
+        score_matrix = self.score_prompts_batch(prompts, self._expand_for_models(evaluation_set), round_num)
+        return self._aggregate_fitness(score_matrix, prompts, round_num)
+    
+    def evaluate_round(self, prompts: List[str], evaluation_set: List[Dict], round_num: int) -> List[float]:
+        """
+        Evaluate a round of prompts with the configured evaluation engine.
         
-        # Create batch requests
-        batch_file = self._create_batch_requests(prompts, evaluation_set, round_num)
+        Args:
+            prompts: List of prompts to evaluate
+            evaluation_set: Test cases to evaluate on
+            round_num: Current round number
+            
+        Returns:
+            List of fitness scores (one per prompt)
+        """
+        self._cell_details = {}
+        evaluation_set = self._expand_for_models(evaluation_set)
+        
+        # Score each distinct prompt once, skipping prompts already evaluated in this run
+        score_matrix: List[Optional[List[Optional[float]]]] = [None] * len(prompts)
+        positions: Dict[str, List[int]] = {}
+        for prompt_idx, prompt in enumerate(prompts):
+            known = self._lineage.known_scores(prompt) if self._reuse_known_results else None
+            if known is not None and len(known) == len(evaluation_set):
+                score_matrix[prompt_idx] = known
+            else:
+                positions.setdefault(prompt, []).append(prompt_idx)
         
-        # Submit and wait
-        results_df = self._submit_and_wait_batch(batch_file)
+        reused = len(prompts) - len(positions)
+        if reused:
+            print(f"♻️  Reusing per-example results for {reused}/{len(prompts)} prompts already evaluated")
         
-        # Score results
-        fitness_scores = self._score_batch_results(results_df, prompts, evaluation_set, round_num)
+        if positions:
+            pending = list(positions)
+            # With pruned examples only the kept ones are sent; rows are widened back to the full set
+            kept = self._example_pruner.kept if self._example_pruner and self._example_pruner.active else None
+            scored_set = [evaluation_set[i] for i in kept] if kept else evaluation_set
+            pending_matrix = self._engine.score(self, pending, scored_set, round_num)
+            if kept:
+                widened = []
+                for row in pending_matrix:
+                    full_row: List[Optional[float]] = [None] * len(evaluation_set)
+                    for position, score in zip(kept, row):
+                        full_row[position] = score
+                    widened.append(full_row)
+                pending_matrix = widened
+            details = self._cell_details
+            self._cell_details = {}
+            for pending_idx, prompt in enumerate(pending):
+                for prompt_idx in positions[prompt]:
+                    score_matrix[prompt_idx] = pending_matrix[pending_idx]
+                # Tokens and latency were paid once, by the first occurrence
+                first = positions[prompt][0]
+                for (p, e), cell in details.items():
+                    if p == pending_idx:
+                        self._cell_details[(first, kept[e] if kept else e)] = cell
         
-        return fitness_scores
+        self._track_truncation(score_matrix, evaluation_set, adapt=True)
+        return self._aggregate_fitness(score_matrix, prompts, round_num)
     
     def evaluate_prompt(
         self, 
@@ -408,27 +1304,41 @@ Generate {num_variations} creative variations of this prompt."""
         """
         total_fitness = 0.0
         count = 0
+        evaluation_set = self._expand_for_models(evaluation_set)
+        scores: List[Optional[float]] = [None] * len(evaluation_set)
+        self._cell_details = {}
         
         for i, example in enumerate(evaluation_set):
             # Call evaluator model with the prompt
             try:
-                response = self._evaluator_client.chat.completions.create(
-                    model=self._evaluator_model,
-                    messages=[
-                        {"role": "system", "content": prompt},
-                        {"role": "user", "content": example['input']}
-                    ],
-                    temperature=0.3,
-                    max_tokens=1000
-                )
+                body = self._evaluation_body(prompt, example)
+                prediction = self._completion_cache.get(body) if self._completion_cache else None
                 
-                prediction = response.choices[0].message.content
+                if prediction is None:
+                    self._acquire_budget(estimate_tokens(body))
+                    started = monotonic()
+                    response = self._evaluator_client.chat.completions.create(**body)
+                    
+                    prediction = response.choices[0].message.content
+                    usage = getattr(response, 'usage', None)
+                    self._record_usage(usage)
+                    self._record_cell_details(
+                        0, i,
+                        latency_ms=(monotonic() - started) * 1000,
+                        prompt_tokens=getattr(usage, 'prompt_tokens', None),
+                        completion_tokens=getattr(usage, 'completion_tokens', None),
+                        finish_reason=getattr(response.choices[0], 'finish_reason', None)
+                    )
+                    if self._completion_cache:
+                        self._completion_cache.put(body, prediction)
+                self._record_cell_details(0, i, completion=prediction)
                 
                 # Evaluate using metric
                 if self._metric:
                     fitness = self._metric(example['expected'], prediction)
                     total_fitness += fitness
                     count += 1
+                    scores[i] = fitness
                     
                     # Early stopping if performing poorly
                     if count > 5 and (total_fitness / count) < (highest_fitness - self._pruning_threshold):
@@ -440,9 +1350,16 @@ Generate {num_variations} creative variations of this prompt."""
                 continue
         
         final_fitness = total_fitness / count if count > 0 else 0.0
+        if len(self._evaluator_models) > 1:
+            final_fitness = self._combine_model_fitness(self._model_fitness(scores))
         
         # Log this prompt test
-        self._log_prompt(round_num, variation_num, final_fitness, prompt)
+        self._log_prompt(round_num, variation_num, final_fitness, prompt,
+                         count / len(evaluation_set) if evaluation_set else 0.0)
+        self._lineage.record_evaluation(prompt, final_fitness, scores)
+        self._track_truncation([scores], evaluation_set)
+        self._store.record_cells(self._run_start, round_num, [scores], self._cell_details,
+                                 prompt_offset=variation_num)
         
         return final_fitness
     
@@ -465,6 +1382,8 @@ Generate {num_variations} creative variations of this prompt."""
                 - 'best_prompt': The highest-scoring prompt
                 - 'best_fitness': The fitness score
                 - 'all_results': List of all evaluated prompts and scores
+                - 'rounds': Number of rounds actually run
+                - 'stopped_reason': Why optimization ended ('max_rounds' or a stopping rule)
                 
         Example:
             >>> test_cases = [
@@ -477,9 +1396,14 @@ Generate {num_variations} creative variations of this prompt."""
         """
         if not self._metric:
             raise ValueError("Metric function must be provided")
+        if self._output_length:
+            self._output_length.fit(evaluation_set)
         
         # Try to resume from checkpoint
         start_round = 0
+        start_time = monotonic()
+        elapsed_before = 0.0
+        best_scores: List[float] = []
         if resume_from_checkpoint and self._checkpoint_file.exists():
             checkpoint = self._load_checkpoint()
             if checkpoint:
@@ -489,6 +1413,25 @@ Generate {num_variations} creative variations of this prompt."""
                 best_prompt = checkpoint['best_prompt']
                 best_fitness = checkpoint['best_fitness']
                 all_results = checkpoint['all_results']
+                best_scores = checkpoint.get('best_scores', [])
+                elapsed_before = checkpoint.get('elapsed_seconds', 0.0)
+                self._usage.update(checkpoint.get('usage', {}))
+                self._lineage.load_state_dict(checkpoint.get('lineage', {}))
+                # Score rows are not checkpointed; the run store has every recorded cell
+                self._lineage.restore_scores(self._store.score_rows(self._run_start))
+                self._generation_stats.update(checkpoint.get('generation_stats', {}))
+                if self._example_pruner and checkpoint.get('example_pruner'):
+                    self._example_pruner.load_state_dict(checkpoint['example_pruner'])
+                if self._output_length and checkpoint.get('output_length'):
+                    self._output_length.load_state_dict(checkpoint['output_length'])
+                self._truncation.update(checkpoint.get('truncation', {}))
+                self._store.set_status(self._run_start, 'running')
+                strategy_state = checkpoint.get('strategy', {})
+                if strategy_state.get('name') == self._strategy.name:
+                    self._strategy.load_state_dict(strategy_state.get('state', {}))
+                for rule, rule_state in zip(self._stopping_rules, checkpoint.get('stopping_rules', [])):
+                    if rule_state.get('name') == type(rule).__name__:
+                        rule.load_state_dict(rule_state.get('state', {}))
                 print(f"   Best fitness so far: {best_fitness:.4f}")
             else:
                 # Checkpoint corrupted, start fresh
@@ -499,7 +1442,8 @@ Generate {num_variations} creative variations of this prompt."""
             if initial_variations:
                 current_prompts = initial_variations[:self._breadth]
             else:
-                current_prompts = self.generate_variations(self._base_prompt, self._breadth)
+                current_prompts = self._diversify(
+                    self.generate_variations(self._base_prompt, self._population_size()), [self._base_prompt])
             
             best_prompt = self._base_prompt
             best_fitness = 0.0
@@ -507,14 +1451,28 @@ Generate {num_variations} creative variations of this prompt."""
             
             # Write parameters
             self._write_params()
+            # One example row per score column, so each cell's completion keeps its model
+            self._store.record_examples(self._run_start, self._expand_for_models(evaluation_set))
         
         # Optimization loop
+        stopped_reason = 'max_rounds'
+        rounds_run = start_round
         for round_num in range(start_round, self._max_rounds):
             print(f"\n=== Round {round_num + 1}/{self._max_rounds} ===")
+            self._report_progress(None, round=f"{round_num + 1}/{self._max_rounds}",
+                                  phase="evaluating", done=None)
             
             try:
-                # Evaluate all prompts in this round using batch API
-                fitness_scores = self.evaluate_prompts_batch(current_prompts, evaluation_set, round_num)
+                self._check_cancelled()
+                
+                pruner = self._example_pruner
+                if pruner and not pruner.active and round_num >= pruner.after_rounds:
+                    self._prune_examples()
+                
+                # Evaluate all prompts in this round with the evaluation engine
+                fitness_scores = self.evaluate_round(current_prompts, evaluation_set, round_num)
+                rounds_run = round_num + 1
+                previous_best_scores = best_scores
                 
                 # Create results for this round
                 round_results = []
@@ -524,6 +1482,8 @@ Generate {num_variations} creative variations of this prompt."""
                         'prompt': prompt,
                         'fitness': fitness
                     }
+                    if self._round_model_fitness:
+                        result['model_fitness'] = self._round_model_fitness[i]
                     round_results.append(result)
                     all_results.append(result)
                     
@@ -531,32 +1491,32 @@ Generate {num_variations} creative variations of this prompt."""
                     if fitness > best_fitness:
                         best_fitness = fitness
                         best_prompt = prompt
+                        best_scores = self._round_example_scores[i]
                         print(f"✓ New best fitness: {best_fitness:.4f} (variation {i+1})")
-                    
-                    # Save intermediate results
-                    self._save_result(result)
                 
-                # Sort by fitness
-                round_results.sort(key=lambda x: x['fitness'], reverse=True)
-                
-                # Select top performers for next round
-                top_k = max(1, self._breadth // 3)
-                top_prompts = [r['prompt'] for r in round_results[:top_k]]
+                # Check stopping rules before paying for another generation
+                elapsed_seconds = elapsed_before + monotonic() - start_time
+                reason = self._check_stopping_rules(
+                    round_num=round_num,
+                    all_results=all_results,
+                    round_best_index=max(range(len(fitness_scores)), key=fitness_scores.__getitem__),
+                    previous_best_scores=previous_best_scores,
+                    elapsed_seconds=elapsed_seconds,
+                    next_round_requests=self._breadth * self._active_example_count(evaluation_set)
+                )
+                if reason and round_num < self._max_rounds - 1:
+                    stopped_reason = reason
+                    print(f"\n⏹️  Stopping early after round {round_num + 1}: {reason}")
+                    break
                 
-                # Generate new variations from top performers
+                # Let the search strategy choose the next population
                 if round_num < self._max_rounds - 1:
-                    next_prompts = []
-                    variations_per_prompt = self._breadth // len(top_prompts)
-                    
-                    for top_prompt in top_prompts:
-                        variations = self.generate_variations(top_prompt, variations_per_prompt)
-                        next_prompts.extend(variations)
-                    
-                    # Fill remaining slots with variations of best
-                    while len(next_prompts) < self._breadth:
-                        next_prompts.extend(self.generate_variations(best_prompt, 1))
-                    
-                    current_prompts = next_prompts[:self._breadth]
+                    self._report_progress(None, phase="generating", done=None, best=best_fitness)
+                    self._lineage_round = round_num + 1
+                    current_prompts = self._diversify(self._strategy.next_population(
+                        self, round_results, best_prompt, best_fitness, self._breadth,
+                        candidates=self._population_size()
+                    ), current_prompts)
                 
                 # Save checkpoint after successful round
                 self._save_checkpoint(
@@ -564,10 +1524,18 @@ Generate {num_variations} creative variations of this prompt."""
                     current_prompts=current_prompts,
                     best_prompt=best_prompt,
                     best_fitness=best_fitness,
-                    all_results=all_results
+                    all_results=all_results,
+                    best_scores=best_scores,
+                    elapsed_seconds=elapsed_seconds
                 )
                 print(f"💾 Checkpoint saved after round {round_num + 1}")
                 
+            except RunCancelled:
+                # Work from the unfinished round is dropped; the checkpoint of the
+                # last completed round is kept so the run can be resumed
+                stopped_reason = 'cancelled'
+                print(f"\n⏹️  Run cancelled during round {round_num + 1}")
+                break
             except Exception as e:
                 _logger.error(f"Error in round {round_num + 1}: {e}")
                 print(f"\n❌ Error in round {round_num + 1}: {e}")
@@ -580,50 +1548,152 @@ Generate {num_variations} creative variations of this prompt."""
             'best_prompt': best_prompt,
             'best_fitness': best_fitness,
             'all_results': all_results,
-            'rounds': self._max_rounds,
-            'total_evaluations': len(all_results)
+            'rounds': rounds_run,
+            'total_evaluations': len(all_results),
+            'stopped_reason': stopped_reason,
+            'usage': dict(self._usage),
+            'elapsed_seconds': elapsed_before + monotonic() - start_time,
+            'transport': self.transport_stats(),
+            'lineage': self._lineage.stats(),
+            'generation': self.generation_stats(),
+            'diversity': self._diversity.stats() if self._diversity else None,
+            'example_pruning': self._example_pruner.stats() if self._example_pruner else None,
+            'truncation': self.truncation_stats(),
+            'model_fitness': self.fitness_matrix(all_results) if len(self._evaluator_models) > 1 else None,
+            'batch_errors': dict(self._batch_errors)
         }
+        if self._replay_store:
+            final_result['replay'] = self._replay_store.stats()
+        evaluator_client = self._clients['evaluator']
+        if isinstance(evaluator_client, ReplayClient):
+            evaluator_client = evaluator_client.wrapped
+        if isinstance(evaluator_client, EvaluatorRouter):
+            final_result['routing'] = evaluator_client.stats()
         
-        self._save_final_results(final_result)
+        self._save_final_results(final_result, 'cancelled' if stopped_reason == 'cancelled' else 'completed')
         
         return final_result
     
+    def _active_example_count(self, evaluation_set: List[Dict]) -> int:
+        """Number of requests per prompt: examples times evaluator models, fewer once examples are pruned."""
+        if self._example_pruner and self._example_pruner.active:
+            return len(self._example_pruner.kept)
+        return len(evaluation_set) * len(self._evaluator_models)
+    
+    def _prune_examples(self):
+        """
+        Choose the reduced evaluation set from the scores of every prompt evaluated so far.
+        
+        Earlier fitness values stay as they are; reduced-set fitness is calibrated onto their scale.
+        """
+        report = self._example_pruner.fit(self._lineage.score_rows())
+        if report is None:
+            return
+        print(f"\n✂️  Pruned the evaluation set to {report['kept']}/{report['examples']} examples "
+              f"({report['method']}, {report['request_reduction']:.0%} fewer requests per prompt)")
+        in_sample, split_half = report['spearman_in_sample'], report['spearman_split_half']
+        print(f"   Rank correlation with the full set: {in_sample if in_sample is None else round(in_sample, 3)} "
+              f"in-sample, {split_half if split_half is None else round(split_half, 3)} split-half "
+              f"over {report['prompts']} prompts")
+    
+    def transport_stats(self) -> Dict:
+        """
+        Return connection reuse and TLS handshake counts of the HTTP transport.
+        
+        The transport may be shared with other generators, in which case the
+        counts cover all of them.
+        """
+        return (self._transport or default_transport()).stats()
+    
+    def _check_stopping_rules(self, round_num: int, all_results: List[Dict], round_best_index: int,
+                              previous_best_scores: List[float], elapsed_seconds: float,
+                              next_round_requests: int) -> Optional[str]:
+        """
+        Run the configured stopping rules after a round.
+        
+        Returns:
+            The reason from the first rule that fires, or None to continue
+        """
+        if not self._stopping_rules:
+            return None
+        
+        # Best fitness so far after each completed round
+        best_history = []
+        for r in sorted({result['round'] for result in all_results}):
+            round_best = max(result['fitness'] for result in all_results if result['round'] == r)
+            best_history.append(max(round_best, best_history[-1]) if best_history else round_best)
+        
+        state = {
+            'round_num': round_num,
+            'best_history': best_history,
+            'round_best_scores': self._round_example_scores[round_best_index] if self._round_example_scores else [],
+            'previous_best_scores': previous_best_scores,
+            'elapsed_seconds': elapsed_seconds,
+            'usage': dict(self._usage),
+            'next_round_requests': next_round_requests
+        }
+        
+        for rule in self._stopping_rules:
+            reason = rule.check(state)
+            if reason:
+                return reason
+        return None
+    
     def _write_params(self):
-        """Write optimization parameters to results file."""
+        """Record optimization parameters in the run store."""
         params = {
             'base_prompt': self._base_prompt,
             'generator_model': self._generator_model,
-            'evaluator_model': self._evaluator_model,
+            'evaluator_model': self._evaluator_model if len(self._evaluator_models) == 1 else self._evaluator_models,
+            'model_aggregation': self._model_aggregation if len(self._evaluator_models) > 1 else None,
+            'model_weights': (dict(zip(self._evaluator_models, self._model_weights))
+                              if len(self._evaluator_models) > 1 else None),
             'breadth': self._breadth,
             'max_rounds': self._max_rounds,
             'pruning_threshold': self._pruning_threshold,
             'temperature': self._temperature,
-            'run_start': self._run_start
+            'strategy': self._strategy.name,
+            'engine': self._engine.name,
+            'replay_mode': self._replay_mode,
+            'generation_mode': self._generation_mode,
+            'diversity': self._diversity.method if self._diversity else None,
+            'example_selector': type(self._example_selector).__name__ if self._example_selector else None,
+            'example_pruner': self._example_pruner.method if self._example_pruner else None,
+            'output_length': self._output_length.stats()['mode'] if self._output_length else None,
+            'stopping_rules': [type(rule).__name__ for rule in self._stopping_rules],
+            'run_start': self._run_start,
+            **self._run_metadata
         }
         
-        with open(self._results_file, 'w') as f:
-            f.write(json.dumps({'parameters': params}) + '\n')
-    
-    def _save_result(self, result: Dict):
-        """Append a result to the results file."""
-        with open(self._results_file, 'a') as f:
-            f.write(json.dumps(result) + '\n')
+        self._store.start_run(self._run_start, params)
     
-    def _save_final_results(self, final_result: Dict):
-        """Save final optimization results."""
-        final_file = self._results_file.parent / f"final_{self._results_file.name}"
+    def _save_final_results(self, final_result: Dict, status: str = 'completed'):
+        """
+        Save final optimization results.
+        
+        The summary file leaves out 'all_results'; every evaluated prompt is
+        already in the run store. A cancelled run keeps its checkpoint so it
+        can be resumed.
+        """
+        self._store.finish_run(self._run_start, final_result, status)
+        
+        final_file = self._results_dir / f"final_prompt_gen_{self._run_start}.json"
+        summary = {k: v for k, v in final_result.items() if k != 'all_results'}
+        summary['run_id'] = self._run_start
+        summary['run_store'] = self._store.path
         with open(final_file, 'w') as f:
-            json.dump(final_result, f, indent=2)
+            json.dump(summary, f, indent=2)
         
-        print(f"\n✓ Results saved to {final_file}")
+        print(f"\n✓ Results saved to {final_file} and {self._store.path}")
         
         # Clean up checkpoint file on successful completion
-        if self._checkpoint_file.exists():
+        if status == 'completed' and self._checkpoint_file.exists():
             self._checkpoint_file.unlink()
             print(f"✓ Checkpoint file removed (optimization complete)")
     
     def _save_checkpoint(self, round_num: int, current_prompts: List[str], 
-                        best_prompt: str, best_fitness: float, all_results: List[Dict]):
+                        best_prompt: str, best_fitness: float, all_results: List[Dict],
+                        best_scores: Optional[List[float]] = None, elapsed_seconds: float = 0.0):
         """Save checkpoint after each round for recovery."""
         checkpoint = {
             'last_completed_round': round_num,
@@ -631,6 +1701,17 @@ Generate {num_variations} creative variations of this prompt."""
             'best_prompt': best_prompt,
             'best_fitness': best_fitness,
             'all_results': all_results,
+            'strategy': {'name': self._strategy.name, 'state': self._strategy.state_dict()},
+            'stopping_rules': [{'name': type(rule).__name__, 'state': rule.state_dict()}
+                               for rule in self._stopping_rules],
+            'lineage': self._lineage.state_dict(),
+            'best_scores': best_scores or [],
+            'elapsed_seconds': elapsed_seconds,
+            'usage': self._usage,
+            'generation_stats': dict(self._generation_stats),
+            'example_pruner': self._example_pruner.state_dict() if self._example_pruner else None,
+            'output_length': self._output_length.state_dict() if self._output_length else None,
+            'truncation': dict(self._truncation),
             'timestamp': str(datetime.datetime.now())
         }
         
@@ -0,0 +1,109 @@
+"""
+RateLimiter: Process-wide requests-per-minute and tokens-per-minute budget
+
+A single RateLimiter is shared by every PromptGenerator in a process so that
+concurrent runs draw from one budget instead of each hitting the provider's
+limits independently. Both budgets are token buckets that refill continuously.
+
+Typical usage:
+    from RateLimiter import RateLimiter
+
+    limiter = RateLimiter(requests_per_minute=3000, tokens_per_minute=250000)
+    limiter.acquire(tokens=1200)   # blocks until the request fits the budget
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+
+class RateLimiter:
+    """
+    Thread-safe token-bucket limiter for requests and tokens per minute.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        """
+        Args:
+            requests_per_minute: Request budget (unlimited if None)
+            tokens_per_minute: Token budget (unlimited if None)
+        """
+        self._rpm = requests_per_minute
+        self._tpm = tokens_per_minute
+        self._request_allowance = requests_per_minute or 0.0
+        self._token_allowance = tokens_per_minute or 0.0
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited_seconds = 0.0
+        self.requests = 0
+        self.tokens = 0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self._rpm:
+            self._request_allowance = min(self._rpm, self._request_allowance + elapsed * self._rpm / 60.0)
+        if self._tpm:
+            self._token_allowance = min(self._tpm, self._token_allowance + elapsed * self._tpm / 60.0)
+
+    def acquire(self, requests: int = 1, tokens: int = 0):
+        """
+        Block until the budget allows `requests` requests using `tokens` tokens.
+
+        Requests larger than a whole minute of budget are let through once the
+        bucket is full, so oversized calls never deadlock.
+
+        Args:
+            requests: Number of requests about to be made (default: 1)
+            tokens: Estimated prompt plus completion tokens (default: 0)
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                need_requests = min(requests, self._rpm) if self._rpm else 0
+                need_tokens = min(tokens, self._tpm) if self._tpm else 0
+                if self._request_allowance >= need_requests and self._token_allowance >= need_tokens:
+                    if self._rpm:
+                        self._request_allowance -= requests
+                    if self._tpm:
+                        self._token_allowance -= tokens
+                    self.requests += requests
+                    self.tokens += tokens
+                    return
+
+                wait = 0.0
+                if self._rpm and self._request_allowance < need_requests:
+                    wait = max(wait, (need_requests - self._request_allowance) * 60.0 / self._rpm)
+                if self._tpm and self._token_allowance < need_tokens:
+                    wait = max(wait, (need_tokens - self._token_allowance) * 60.0 / self._tpm)
+
+            self.waited_seconds += wait
+            time.sleep(wait)
+
+    def stats(self) -> Dict:
+        """Return totals granted and time spent waiting."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'tokens': self.tokens,
+                'waited_seconds': self.waited_seconds
+            }
+
+
+def estimate_tokens(body: Dict) -> int:
+    """
+    Roughly estimate the tokens a chat completion request will use.
+
+    Uses ~4 characters per prompt token plus the completion cap.
+
+    Args:
+        body: Request body with 'messages' and optional 'max_tokens'
+
+    Returns:
+        Estimated prompt plus completion tokens
+    """
+    characters = sum(len(m.get('content') or '') for m in body.get('messages', []))
+    return characters // 4 + (body.get('max_tokens') or 0)
@@ -0,0 +1,280 @@
+"""
+Replay: Record and replay OpenAI client traffic
+
+Wraps the generator and evaluator clients so an optimize() session can be
+re-run without API calls. In record mode every chat completion, file upload,
+file download and batch is passed through to the real client and its response
+is written to a compact SQLite store (zlib-compressed JSON). In replay mode the
+same calls are answered from the store.
+
+Requests are keyed by a hash of their content plus an occurrence index, so
+repeated identical requests (e.g. generator calls at temperature > 0) replay
+their recorded responses in order. Identical requests sent in parallel are
+told apart with replay_scope, since their arrival order is up to the thread
+scheduler. Batches replay in their final recorded state, so there is no polling.
+
+A replayed session is deterministic as long as it makes the same requests:
+re-scoring with a new metric replays completely, while a change that alters
+generated or evaluated prompts raises ReplayMiss at the first unseen request.
+
+Typical usage:
+    generator = PromptGenerator(base_prompt="...", metric=metric,
+                                replay_mode="record", replay_path="results/replay.sqlite")
+    generator.optimize(test_cases)
+
+    # Later, without network access or an API key
+    generator = PromptGenerator(base_prompt="...", metric=new_metric,
+                                replay_mode="replay", replay_path="results/replay.sqlite")
+    generator.optimize(test_cases)
+"""
+
+import json
+import zlib
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Tuple
+
+from Caches import request_key
+
+TERMINAL_BATCH_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+_scope = threading.local()
+
+
+class ReplayMiss(KeyError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+@contextmanager
+def replay_scope(tag):
+    """
+    Add `tag` to the replay key of chat requests this thread makes inside the block.
+
+    Parallel requests with identical bodies (e.g. the chunks of one generator
+    call) would otherwise take occurrence indices in arrival order; tagging each
+    with its position replays it by position. A tag of None changes nothing.
+    """
+    previous = getattr(_scope, 'tag', None)
+    _scope.tag = tag
+    try:
+        yield
+    finally:
+        _scope.tag = previous
+
+
+class Record:
+    """Attribute-style view of a recorded response, like the SDK's response models."""
+
+    def __init__(self, data: Dict):
+        self._data = data
+
+    def __getattr__(self, name):
+        try:
+            return Record._wrap(self._data[name])
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @staticmethod
+    def _wrap(value):
+        if isinstance(value, dict):
+            return Record(value)
+        if isinstance(value, list):
+            return [Record._wrap(v) for v in value]
+        return value
+
+    def model_dump(self) -> Dict:
+        return self._data
+
+    def __repr__(self):
+        return f"Record({self._data!r})"
+
+
+class ReplayStore:
+    """
+    SQLite store of recorded request/response exchanges.
+    """
+
+    def __init__(self, path: str = "results/replay.sqlite"):
+        """
+        Args:
+            path: SQLite file (created if missing, default: results/replay.sqlite)
+        """
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=60)
+        self._occurrences: Counter = Counter()
+        self._stats = {'recorded': 0, 'replayed': 0, 'misses': 0}
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS exchanges ("
+                "key TEXT, occurrence INTEGER, kind TEXT, response BLOB, "
+                "PRIMARY KEY (key, occurrence))")
+
+    def next_occurrence(self, key: str) -> int:
+        """Return the occurrence index for the next request with this key."""
+        with self._lock:
+            occurrence = self._occurrences[key]
+            self._occurrences[key] += 1
+            return occurrence
+
+    def put(self, key: str, occurrence: int, kind: str, response: Dict):
+        """Store a response."""
+        blob = zlib.compress(json.dumps(response, default=str).encode('utf-8'))
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO exchanges VALUES (?, ?, ?, ?)",
+                             (key, occurrence, kind, blob))
+            self._stats['recorded'] += 1
+
+    def get(self, key: str, occurrence: int, kind: str) -> Dict:
+        """
+        Return a recorded response.
+
+        Requests repeated more often than recorded get the last recorded response.
+
+        Raises:
+            ReplayMiss: If the request was never recorded
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response FROM exchanges WHERE key = ? AND occurrence <= ? "
+                "ORDER BY occurrence DESC LIMIT 1", (key, occurrence)).fetchone()
+            if row is None:
+                self._stats['misses'] += 1
+                raise ReplayMiss(f"No recorded {kind} response for request {key[:12]}")
+            self._stats['replayed'] += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def stats(self) -> Dict:
+        """Return recorded, replayed and missed request counts."""
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+
+def _dump(response):
+    """Convert an SDK response (pydantic model or plain object) to JSON-serialisable data."""
+    if hasattr(response, 'model_dump'):
+        return response.model_dump()
+    if isinstance(response, (list, tuple)):
+        return [_dump(item) for item in response]
+    if isinstance(response, dict):
+        return {key: _dump(value) for key, value in response.items()}
+    if hasattr(response, '__dict__'):
+        return {key: _dump(value) for key, value in vars(response).items() if not key.startswith('_')}
+    return response
+
+
+class ReplayClient:
+    """
+    OpenAI client stand-in that records or replays chat, file and batch calls.
+
+    Attributes:
+        chat, files, batches: Namespaces mirroring the OpenAI client's
+    """
+
+    def __init__(self, store: ReplayStore, mode: str = "replay", client=None):
+        """
+        Args:
+            store: Store to write to or read from
+            mode: 'record' (pass through and store) or 'replay' (answer from the store)
+            client: Real OpenAI client, required in record mode
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown replay mode '{mode}'. Choose 'record' or 'replay'")
+        if mode == "record" and client is None:
+            raise ValueError("Record mode needs a client to pass requests through to")
+        self._store = store
+        self._mode = mode
+        self._client = client
+        self._file_keys: Dict[str, str] = {}
+        self._batch_keys: Dict[str, Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+        self.chat = _Namespace(completions=_Namespace(create=self._chat_create))
+        self.files = _Namespace(create=self._files_create, content=self._files_content)
+        self.batches = _Namespace(create=self._batches_create, retrieve=self._batches_retrieve)
+
+    @property
+    def wrapped(self):
+        """The client requests are passed through to (None in replay mode)."""
+        return self._client
+
+    def _exchange(self, kind: str, key: str, call):
+        """Record `call()`'s response under key, or replay it."""
+        occurrence = self._store.next_occurrence(key)
+        if self._mode == "replay":
+            return self._store.get(key, occurrence, kind)
+        response = call()
+        data = _dump(response) if kind != 'file_content' else {'content': response.content.decode('utf-8')}
+        self._store.put(key, occurrence, kind, data)
+        return response
+
+    def _chat_create(self, **body):
+        tag = getattr(_scope, 'tag', None)
+        key = request_key({'kind': 'chat', **body} if tag is None else {'kind': 'chat', 'scope': tag, **body})
+        response = self._exchange('chat', key, lambda: self._client.chat.completions.create(**body))
+        return Record(response) if isinstance(response, dict) else response
+
+    def _files_create(self, file=None, purpose=None):
+        if isinstance(file, tuple):
+            content = file[1]
+        elif hasattr(file, 'read'):
+            content = file.read()
+            file = (Path(getattr(file, 'name', 'upload.jsonl')).name, content)
+        else:
+            content = file
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        key = 'file:' + hashlib.sha256(content).hexdigest()
+        response = self._exchange('file', key, lambda: self._client.files.create(file=file, purpose=purpose))
+        response = Record(response) if isinstance(response, dict) else response
+        with self._lock:
+            self._file_keys[response.id] = key
+        return response
+
+    def _files_content(self, file_id: str):
+        key = f"content:{file_id}"
+        response = self._exchange('file_content', key, lambda: self._client.files.content(file_id))
+        if isinstance(response, dict):
+            content = response['content'].encode('utf-8')
+            return Record({'content': content, 'text': response['content']})
+        return response
+
+    def _batches_create(self, input_file_id: str = None, **kwargs):
+        key = 'batch:' + self._file_keys.get(input_file_id, input_file_id) + ':' + request_key(kwargs)
+        occurrence = self._store.next_occurrence(key)
+        if self._mode == "replay":
+            batch = Record(self._store.get(key, occurrence, 'batch'))
+        else:
+            batch = self._client.batches.create(input_file_id=input_file_id, **kwargs)
+            if batch.status in TERMINAL_BATCH_STATUSES:
+                self._store.put(key, occurrence, 'batch', _dump(batch))
+        with self._lock:
+            self._batch_keys[batch.id] = (key, occurrence)
+        return batch
+
+    def _batches_retrieve(self, batch_id: str):
+        with self._lock:
+            entry = self._batch_keys.get(batch_id)
+        if self._mode == "replay":
+            if entry is None:
+                raise ReplayMiss(f"Batch {batch_id} was not created in this replay session")
+            return Record(self._store.get(*entry, 'batch'))
+        batch = self._client.batches.retrieve(batch_id)
+        if entry is not None and batch.status in TERMINAL_BATCH_STATUSES:
+            key, occurrence = entry
+            self._store.put(key, occurrence, 'batch', _dump(batch))
+        return batch
+
+
+class _Namespace:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
@@ -0,0 +1,411 @@
+"""
+ReportDecks: One summary slide deck per optimization run, from the VLM-Metrics template
+
+create_ppt_template.py draws every slide shape by shape. Building hundreds of
+run reports that way would redo all of that drawing for every deck. Instead,
+each worker process reads business_presentations/VLM-Metrics_Template.pptx
+once. Every deck then opens that in-memory copy, clones the template's
+prebuilt slides (title, content, two-column) and only replaces their
+placeholder texts with the run's results from the run store:
+
+1. Title: run id, best fitness, status and date
+2. Fitness by round: key numbers and a line chart of round best / best so far
+3. Best prompt
+4. Best prompt per round
+5. Cost: requests, tokens, time and (with prices) an estimated cost
+
+Decks are rendered in parallel worker processes. Each deck's render time is
+reported, along with the total throughput.
+
+Usage:
+    python ReportDecks.py                                  # every run in results/runs.sqlite
+    python ReportDecks.py RUN_ID [RUN_ID ...] --workers 8 --out results/reports
+    python ReportDecks.py --status completed --input-price 0.5 --output-price 1.5
+
+Needs python-pptx.
+"""
+
+import argparse
+import copy
+import io
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.dml.color import RGBColor
+from pptx.enum.chart import XL_CHART_TYPE, XL_LEGEND_POSITION
+from pptx.oxml.ns import qn
+from pptx.util import Pt
+
+from RunStore import RunStore
+
+_logger = logging.getLogger("prompt_generator")
+
+DEFAULT_TEMPLATE = str(Path(__file__).resolve().parents[2].joinpath("business_presentations",
+                                                                    "VLM-Metrics_Template.pptx"))
+DEFAULT_STORE = "results/runs.sqlite"
+
+# Palette of create_ppt_template.py
+DARK_NAVY = RGBColor(25, 42, 86)
+ACCENT_BLUE = RGBColor(41, 128, 185)
+MID_GRAY = RGBColor(149, 165, 166)
+
+# Text that identifies each template slide and its shapes
+TITLE_MARKER = "Presentation Title"
+SUBTITLE_MARKER = "Subtitle or presentation context"
+PRESENTER_MARKER = "Presenter Name | Date"
+SLIDE_TITLE_MARKER = "Slide Title"
+CONTENT_MARKER = "• First key point"
+COLUMN_MARKER = "• Key insight one"
+CHART_MARKER = "[Chart or Image]"
+
+_IGNORED_RELS = ("slideLayout", "notesSlide")
+_R_NAMESPACE = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+# Per worker process: the template file's bytes, read once
+_template_bytes: Optional[bytes] = None
+
+
+def deck_data(store: RunStore, run_id: str) -> Optional[Dict]:
+    """
+    Collect what a run's deck shows from the run store.
+
+    Returns:
+        Dict with run id, status, dates, parameters, best prompt and fitness, per-round
+        best prompts, evaluation count and usage; None if the run is unknown
+    """
+    run = store.run(run_id)
+    if run is None:
+        return None
+    summary = run['summary']
+    return {
+        'run_id': run_id,
+        'status': run['status'],
+        'started': run['started'],
+        'updated': run['updated'],
+        'params': run['params'],
+        'best_fitness': run['best_fitness'],
+        'best_prompt': summary.get('best_prompt') or store.text(run['best_prompt_id']),
+        'stopped_reason': run['stopped_reason'],
+        'rounds': store.best_per_round(run_id),
+        'evaluations': summary.get('total_evaluations', len(store.candidates(run_id))),
+        'usage': summary.get('usage') or {},
+        'elapsed_seconds': summary.get('elapsed_seconds')
+    }
+
+
+def _shape(slide, marker: str):
+    for shape in slide.shapes:
+        if shape.has_text_frame and shape.text_frame.text.startswith(marker):
+            return shape
+    raise ValueError(f"Template slide has no shape starting with '{marker}'")
+
+
+def _set_lines(shape, lines: List[str]):
+    """Replace a shape's text with `lines`, one paragraph each, keeping the first paragraph's formatting."""
+    body = shape.text_frame._txBody
+    paragraphs = body.findall(qn('a:p'))
+    prototype = paragraphs[0]
+    for paragraph in paragraphs:
+        body.remove(paragraph)
+    for line in lines:
+        paragraph = copy.deepcopy(prototype)
+        runs = paragraph.findall(qn('a:r'))
+        for run in runs[1:]:
+            paragraph.remove(run)
+        runs[0].find(qn('a:t')).text = line
+        body.append(paragraph)
+
+
+def _clone_slide(prs, prototype):
+    """Append a copy of a slide of the same presentation, with its shapes, background and relationships."""
+    slide = prs.slides.add_slide(prototype.slide_layout)
+    tree = slide.shapes._spTree
+    for shape in list(slide.shapes):
+        tree.remove(shape._element)
+    for shape in prototype.shapes:
+        tree.append(copy.deepcopy(shape._element))
+    background = prototype._element.cSld.bg
+    if background is not None:
+        slide._element.cSld.insert(0, copy.deepcopy(background))
+
+    # Images, charts and links referenced by the copied shapes get new relationship ids
+    renamed = {}
+    for rId, rel in prototype.part.rels.items():
+        if rel.reltype.rsplit('/', 1)[-1] in _IGNORED_RELS:
+            continue
+        target = rel.target_ref if rel.is_external else rel.target_part
+        renamed[rId] = slide.part.relate_to(target, rel.reltype, rel.is_external)
+    if renamed:
+        for element in slide._element.iter():
+            for attribute, value in element.attrib.items():
+                if attribute.startswith(_R_NAMESPACE) and value in renamed:
+                    element.set(attribute, renamed[value])
+    return slide
+
+
+def _number(slide, number: int, slide_width: int):
+    """Set the slide number (the digits-only text box at the top right), if the slide has one."""
+    for shape in slide.shapes:
+        if shape.has_text_frame and shape.text_frame.text.strip().isdigit() and shape.left > slide_width / 2:
+            _set_lines(shape, [str(number)])
+
+
+def _fitness_chart(slide, placeholder, rounds: List[Dict]):
+    """Replace the chart placeholder with a line chart of round best and best-so-far fitness."""
+    data = CategoryChartData()
+    data.categories = [str(row['round'] + 1) for row in rounds]
+    data.add_series("Round best", [row['fitness'] for row in rounds])
+    data.add_series("Best so far", [row['best_so_far'] for row in rounds])
+    frame = slide.shapes.add_chart(XL_CHART_TYPE.LINE_MARKERS, placeholder.left, placeholder.top,
+                                   placeholder.width, placeholder.height, data)
+    placeholder._element.getparent().remove(placeholder._element)
+
+    chart = frame.chart
+    chart.has_legend = True
+    chart.legend.position = XL_LEGEND_POSITION.BOTTOM
+    chart.legend.include_in_layout = False
+    chart.font.size = Pt(10)
+    chart.font.color.rgb = MID_GRAY
+    for series, color in zip(chart.plots[0].series, (ACCENT_BLUE, DARK_NAVY)):
+        series.format.line.color.rgb = color
+        series.marker.format.fill.solid()
+        series.marker.format.fill.fore_color.rgb = color
+        series.smooth = False
+
+
+def _shorten(text: Optional[str], limit: int) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+def _format_fitness(value: Optional[float]) -> str:
+    return f"{value:.4f}" if value is not None else "-"
+
+
+def render_deck(data: Dict, output_path: str, prices: Optional[Dict[str, float]] = None) -> Dict:
+    """
+    Render one run's deck from the template read by this process.
+
+    Args:
+        data: Run data from deck_data()
+        output_path: .pptx file to write
+        prices: Optional 'input' and 'output' prices per million tokens for the cost slide
+
+    Returns:
+        Dict with 'run_id', 'path', 'slides', 'bytes' and timings 'load_seconds',
+        'fill_seconds', 'save_seconds' and 'seconds'
+    """
+    started = time.perf_counter()
+    prs = Presentation(io.BytesIO(_load_template()))
+    prototypes = list(prs.slides)
+    title_proto = next(slide for slide in prototypes if any(
+        shape.has_text_frame and shape.text_frame.text == TITLE_MARKER for shape in slide.shapes))
+    content_proto = next(slide for slide in prototypes if any(
+        shape.has_text_frame and shape.text_frame.text.startswith(CONTENT_MARKER) for shape in slide.shapes))
+    column_proto = next(slide for slide in prototypes if any(
+        shape.has_text_frame and shape.text_frame.text == CHART_MARKER for shape in slide.shapes))
+    loaded = time.perf_counter()
+
+    params = data['params']
+    evaluator = params.get('evaluator_model')
+    evaluator = ", ".join(evaluator) if isinstance(evaluator, list) else evaluator
+    rounds = data['rounds']
+
+    slide = _clone_slide(prs, title_proto)
+    _set_lines(_shape(slide, TITLE_MARKER), ["Prompt Optimization Report"])
+    _set_lines(_shape(slide, SUBTITLE_MARKER), [
+        f"{data['run_id']} | best fitness {_format_fitness(data['best_fitness'])}"])
+    _set_lines(_shape(slide, PRESENTER_MARKER), [f"{data['status'] or '-'} | {(data['started'] or '')[:10]}"])
+
+    slide = _clone_slide(prs, column_proto)
+    _set_lines(_shape(slide, SLIDE_TITLE_MARKER), ["Fitness by Round"])
+    _set_lines(_shape(slide, COLUMN_MARKER), [
+        f"• Best fitness {_format_fitness(data['best_fitness'])}",
+        f"• {len(rounds)} rounds, {data['evaluations']} evaluations",
+        f"• Stopped: {data['stopped_reason'] or data['status'] or '-'}",
+        f"• {params.get('strategy', '-')} search, breadth {params.get('breadth', '-')}",
+        f"• Evaluator {evaluator or '-'}"
+    ])
+    placeholder = _shape(slide, CHART_MARKER)
+    if rounds:
+        _fitness_chart(slide, placeholder, rounds)
+    else:
+        _set_lines(placeholder, ["No rounds recorded"])
+
+    slide = _clone_slide(prs, content_proto)
+    _set_lines(_shape(slide, SLIDE_TITLE_MARKER), ["Best Prompt"])
+    _set_lines(_shape(slide, CONTENT_MARKER), [_shorten(data['best_prompt'], 700) or "-"])
+
+    slide = _clone_slide(prs, content_proto)
+    _set_lines(_shape(slide, SLIDE_TITLE_MARKER), ["Best Prompt per Round"])
+    # The content box fits about six lines; the latest rounds are the most relevant
+    _set_lines(_shape(slide, CONTENT_MARKER), [
+        f"• Round {row['round'] + 1}: {_format_fitness(row['fitness'])}  {_shorten(row['prompt'], 70)}"
+        for row in rounds[-6:]] or ["• No rounds recorded"])
+
+    usage = data['usage']
+    prompt_tokens = usage.get('prompt_tokens') or 0
+    completion_tokens = usage.get('completion_tokens') or 0
+    cost_lines = [
+        f"• {usage.get('requests') or 0:,} evaluator requests",
+        f"• {prompt_tokens:,} prompt tokens, {completion_tokens:,} completion tokens",
+    ]
+    if data['elapsed_seconds'] is not None:
+        cost_lines.append(f"• {data['elapsed_seconds'] / 60:.1f} minutes of run time")
+    if prices:
+        cost = (prompt_tokens * prices.get('input', 0.0) + completion_tokens * prices.get('output', 0.0)) / 1e6
+        cost_lines.append(f"• Estimated cost ${cost:,.2f}")
+    slide = _clone_slide(prs, content_proto)
+    _set_lines(_shape(slide, SLIDE_TITLE_MARKER), ["Cost"])
+    _set_lines(_shape(slide, CONTENT_MARKER), cost_lines)
+
+    # Drop the template's own slides; their parts are then left out of the saved file
+    slide_ids = prs.slides._sldIdLst
+    for slide_id in list(slide_ids)[:len(prototypes)]:
+        slide_ids.remove(slide_id)
+        prs.part.drop_rel(slide_id.rId)
+    for number, slide in enumerate(prs.slides, start=1):
+        _number(slide, number, prs.slide_width)
+    filled = time.perf_counter()
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    prs.save(output_path)
+    finished = time.perf_counter()
+    return {
+        'run_id': data['run_id'],
+        'path': output_path,
+        'slides': len(prs.slides),
+        'bytes': os.path.getsize(output_path),
+        'load_seconds': loaded - started,
+        'fill_seconds': filled - loaded,
+        'save_seconds': finished - filled,
+        'seconds': finished - started
+    }
+
+
+def _init_worker(template_path: str):
+    """Read the template once per worker process."""
+    global _template_bytes
+    _template_bytes = Path(template_path).read_bytes()
+
+
+def _load_template() -> bytes:
+    if _template_bytes is None:
+        raise RuntimeError("No template loaded; call _init_worker(template_path) first")
+    return _template_bytes
+
+
+def _output_path(out_dir: str, run_id: str) -> str:
+    return str(Path(out_dir).joinpath(f"report_{run_id}.pptx"))
+
+
+def render_decks(datasets: List[Dict], out_dir: str = "results/reports", template_path: str = DEFAULT_TEMPLATE,
+                 workers: Optional[int] = None, prices: Optional[Dict[str, float]] = None) -> List[Dict]:
+    """
+    Render one deck per run, in parallel worker processes.
+
+    Args:
+        datasets: Run data from deck_data(), one per deck
+        out_dir: Directory for the decks, named report_RUN_ID.pptx (default: results/reports)
+        template_path: Template .pptx (default: business_presentations/VLM-Metrics_Template.pptx)
+        workers: Worker processes; 1 renders in this process (default: one per CPU)
+        prices: Optional 'input' and 'output' prices per million tokens
+
+    Returns:
+        render_deck() reports of the decks rendered, in completion order; a deck that
+        failed has 'run_id' and 'error' instead
+
+    Raises:
+        FileNotFoundError: If the template does not exist
+    """
+    # Checked here: a failing pool initializer only surfaces as "process terminated abruptly" for every deck
+    if not Path(template_path).is_file():
+        raise FileNotFoundError(f"Template deck not found: {template_path}")
+    workers = workers or os.cpu_count() or 1
+    reports = []
+
+    def report(result: Dict):
+        reports.append(result)
+        if 'error' in result:
+            print(f"❌ {result['run_id']}: {result['error']}")
+        else:
+            print(f"🖼️  {result['path']}: {result['slides']} slides in {result['seconds'] * 1000:.0f} ms "
+                  f"(load {result['load_seconds'] * 1000:.0f}, fill {result['fill_seconds'] * 1000:.0f}, "
+                  f"save {result['save_seconds'] * 1000:.0f})")
+
+    started = time.perf_counter()
+    if workers == 1:
+        _init_worker(template_path)
+        for data in datasets:
+            try:
+                report(render_deck(data, _output_path(out_dir, data['run_id']), prices))
+            except Exception as e:
+                _logger.error(f"Deck for run {data['run_id']} failed: {e}")
+                report({'run_id': data['run_id'], 'error': str(e)})
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template_path,)) as pool:
+            futures = {pool.submit(render_deck, data, _output_path(out_dir, data['run_id']), prices): data['run_id']
+                       for data in datasets}
+            for future in as_completed(futures):
+                try:
+                    report(future.result())
+                except Exception as e:
+                    _logger.error(f"Deck for run {futures[future]} failed: {e}")
+                    report({'run_id': futures[future], 'error': str(e)})
+
+    elapsed = time.perf_counter() - started
+    times = sorted(result['seconds'] for result in reports if 'error' not in result)
+    if times:
+        print(f"✓ {len(times)} decks in {elapsed:.1f}s with {workers} workers ({len(times) / elapsed:.1f} decks/s); "
+              f"per deck median {times[len(times) // 2] * 1000:.0f} ms, max {times[-1] * 1000:.0f} ms")
+    return reports
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Render a summary slide deck for each optimization run")
+    parser.add_argument("run_ids", nargs="*", help="Runs to report on (default: every run in the store)")
+    parser.add_argument("--store", default=DEFAULT_STORE, help=f"Run store file (default: {DEFAULT_STORE})")
+    parser.add_argument("--status", help="Only runs with this status, e.g. completed")
+    parser.add_argument("--template", default=DEFAULT_TEMPLATE, help="Template deck (default: the VLM-Metrics template)")
+    parser.add_argument("--out", default="results/reports", help="Output directory (default: results/reports)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--input-price", type=float, help="Price per million prompt tokens, for the cost slide")
+    parser.add_argument("--output-price", type=float, help="Price per million completion tokens, for the cost slide")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    store = RunStore(args.store)
+    run_ids = args.run_ids or [run['run_id'] for run in store.runs() if not args.status or run['status'] == args.status]
+    datasets = []
+    for run_id in run_ids:
+        data = deck_data(store, run_id)
+        if data is None:
+            print(f"⚠️  Unknown run {run_id}")
+        else:
+            datasets.append(data)
+    store.close()
+    if not datasets:
+        print("No runs to report on")
+        return 1
+
+    prices = None
+    if args.input_price is not None or args.output_price is not None:
+        prices = {'input': args.input_price or 0.0, 'output': args.output_price or 0.0}
+    print(f"📊 Rendering {len(datasets)} decks from {args.template}")
+    try:
+        reports = render_decks(datasets, args.out, args.template, args.workers, prices)
+    except FileNotFoundError as e:
+        print(f"❌ {e}")
+        return 1
+    return 1 if any('error' in report for report in reports) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
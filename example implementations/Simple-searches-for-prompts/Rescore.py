@@ -0,0 +1,334 @@
+"""
+Rescore: Recompute fitness of recorded runs with a new metric, offline
+
+Every evaluator completion of a run is kept in the run store, so changing the
+metric no longer means paying to regenerate completions. `rescore` scores each
+distinct (prompt, example) completion once with the new metric, in parallel
+chunks, and stores the per-cell scores and per-candidate fitness under a label
+next to the original ranking. It then compares the two rankings. Runs scored on
+several evaluator models are re-aggregated per model and combined with the
+run's own model aggregation and weights; rounds evaluated on a pruned example
+set are aggregated with the pruner's recorded kept examples, weights and
+calibration.
+
+Typical usage:
+    from Rescore import rescore
+
+    summary = rescore(run_id, exact_match, store_path="results/runs.sqlite")
+    print(summary['best_prompt'], summary['rank_correlation'])
+
+    # Metrics that are faster on whole batches (e.g. embedding similarity)
+    rescore(run_id, batch_metric=similarity_batch, batch_size=512)
+
+Command line:
+    python Rescore.py --run RUN_ID --metric my_metrics:exact_match
+"""
+
+import argparse
+import importlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from RunStore import RunStore
+
+_logger = logging.getLogger("prompt_generator")
+
+
+def _score_chunk(chunk: List[Dict], metric: Optional[Callable],
+                 batch_metric: Optional[Callable]) -> List[Optional[float]]:
+    """Score one chunk of completions; a failing cell scores None."""
+    if batch_metric is not None:
+        try:
+            return list(batch_metric([c['expected'] for c in chunk], [c['completion'] for c in chunk]))
+        except Exception as e:
+            _logger.error(f"Batch metric failed on {len(chunk)} cells, scoring them one by one: {e}")
+            if metric is None:
+                return [None] * len(chunk)
+    scores = []
+    for cell in chunk:
+        try:
+            scores.append(metric(cell['expected'], cell['completion']))
+        except Exception as e:
+            _logger.error(f"Metric failed on round {cell['round']} prompt {cell['prompt_idx']} "
+                          f"example {cell['example_idx']}: {e}")
+            scores.append(None)
+    return scores
+
+
+def _model_fitness(cells: List[Dict], scores: Dict, params: Dict) -> Optional[Dict]:
+    """
+    Rebuild the prompt x evaluator model fitness of a multi-model run.
+
+    Each model's fitness is the mean of its scored cells; models are combined
+    like the run combined them: weighted mean or worst case.
+
+    Args:
+        cells: Stored completions, each with its 'model'
+        scores: Re-scored cells keyed by (prompt_id, example_idx)
+        params: The run's recorded parameters
+
+    Returns:
+        Dict with 'models', 'aggregation', 'weights', 'fitness' ({(round, idx): {model: fitness}})
+        and 'candidates' ((round, idx, fitness, coverage) tuples), or None for single-model runs
+    """
+    models = list(dict.fromkeys(cell['model'] for cell in cells if cell['model'] is not None))
+    if len(models) < 2:
+        return None
+    aggregation = params.get('model_aggregation') or 'mean'
+    weights = [(params.get('model_weights') or {}).get(model, 1.0) for model in models]
+
+    per_candidate: Dict = {}
+    for cell in cells:
+        model_scores = per_candidate.setdefault((cell['round'], cell['prompt_idx']), {m: [] for m in models})
+        model_scores[cell['model']].append(scores[(cell['prompt_id'], cell['example_idx'])])
+
+    fitness = {}
+    candidates = []
+    for key, model_scores in per_candidate.items():
+        by_model = {}
+        for model, values in model_scores.items():
+            scored = [v for v in values if v is not None]
+            by_model[model] = sum(scored) / len(scored) if scored else 0.0
+        values = [by_model[model] for model in models]
+        if aggregation == 'worst':
+            combined = min(values)
+        else:
+            combined = sum(v * w for v, w in zip(values, weights)) / sum(weights)
+        all_values = [v for values in model_scores.values() for v in values]
+        fitness[key] = by_model
+        candidates.append((*key, combined, sum(v is not None for v in all_values) / len(all_values)))
+    return {'models': models, 'aggregation': aggregation, 'weights': dict(zip(models, weights)),
+            'fitness': fitness, 'candidates': candidates}
+
+
+def _pruned_fitness(cells: List[Dict], scores: Dict, pruning: Dict[int, Dict],
+                    num_examples: int) -> List[Tuple]:
+    """
+    Rebuild candidate fitness of a run that pruned its evaluation set.
+
+    Rounds with a recorded pruner state are aggregated by that state's
+    ExamplePruner.fitness, like the run aggregated them; earlier rounds take
+    the mean of their scored cells.
+
+    Args:
+        cells: Stored completions
+        scores: Re-scored cells keyed by (prompt_id, example_idx)
+        pruning: Pruner state_dict of each pruned round, by round
+        num_examples: Length of a full score row
+
+    Returns:
+        (round, idx, fitness, coverage) tuples
+    """
+    from ExamplePruning import ExamplePruner
+
+    rows: Dict = {}
+    present: Dict = {}
+    for cell in cells:
+        key = (cell['round'], cell['prompt_idx'])
+        rows.setdefault(key, [None] * num_examples)[cell['example_idx']] = scores[(cell['prompt_id'], cell['example_idx'])]
+        present.setdefault(key, []).append(cell['example_idx'])
+
+    pruners = {}
+    for round_num, state in pruning.items():
+        pruners[round_num] = ExamplePruner()
+        pruners[round_num].load_state_dict(state)
+
+    candidates = []
+    for (round_num, idx), row in rows.items():
+        pruner = pruners.get(round_num)
+        if pruner:
+            fitness = pruner.fitness(row)
+            coverage = sum(row[i] is not None for i in pruner.kept) / len(pruner.kept)
+        else:
+            values = [row[e] for e in present[(round_num, idx)]]
+            scored = [v for v in values if v is not None]
+            fitness = sum(scored) / len(scored) if scored else 0.0
+            coverage = len(scored) / len(values)
+        candidates.append((round_num, idx, fitness, coverage))
+    return candidates
+
+
+def _ranks(values: Sequence[float]) -> List[float]:
+    """Return 1-based ranks, averaging ties."""
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2 + 1
+        i = j + 1
+    return ranks
+
+
+def spearman(a: Sequence[float], b: Sequence[float]) -> Optional[float]:
+    """Spearman rank correlation of two equal-length sequences (None if undefined)."""
+    if len(a) < 2:
+        return None
+    ra, rb = _ranks(a), _ranks(b)
+    mean_a, mean_b = sum(ra) / len(ra), sum(rb) / len(rb)
+    cov = sum((x - mean_a) * (y - mean_b) for x, y in zip(ra, rb))
+    var_a = sum((x - mean_a) ** 2 for x in ra)
+    var_b = sum((y - mean_b) ** 2 for y in rb)
+    return cov / (var_a * var_b) ** 0.5 if var_a and var_b else None
+
+
+def rescore(
+    run_id: str,
+    metric: Optional[Callable] = None,
+    store: Optional[RunStore] = None,
+    store_path: str = "results/runs.sqlite",
+    label: Optional[str] = None,
+    batch_metric: Optional[Callable] = None,
+    batch_size: int = 256,
+    max_workers: Optional[int] = None,
+    top_k: int = 10
+) -> Dict:
+    """
+    Re-score a recorded run with a new metric, without API calls.
+
+    Args:
+        run_id: Run to re-score
+        metric: Function (expected, predicted) -> float
+        store: Run store holding the run (default: opened from `store_path`)
+        store_path: Run store file when `store` is not given (default: results/runs.sqlite)
+        label: Name for this re-scoring (default: the metric's function name)
+        batch_metric: Optional function (expected_list, predicted_list) -> scores,
+            used instead of `metric` on each chunk
+        batch_size: Cells per chunk (default: 256)
+        max_workers: Threads scoring chunks in parallel (default: executor default)
+        top_k: Size of the top-k overlap reported between rankings (default: 10)
+
+    Returns:
+        Dict with 'run_id', 'label', 'cells', 'unique_cells', 'best_prompt', 'best_fitness',
+        'original_best_prompt', 'original_best_fitness', 'rank_correlation', 'top_k_overlap'
+        and 'ranking_file', plus 'model_fitness' ('models', 'aggregation', 'weights' and
+        'best_per_model') for runs scored on several evaluator models and 'pruned_rounds'
+        for runs that pruned their evaluation set
+    """
+    if metric is None and batch_metric is None:
+        raise ValueError("Either metric or batch_metric must be provided")
+    store = store or RunStore(store_path)
+    label = label or getattr(batch_metric or metric, '__name__', 'rescore')
+
+    cells = store.completions(run_id)
+    if not cells:
+        raise ValueError(f"Run {run_id} has no stored completions to re-score")
+
+    # Score each distinct (prompt, example) completion once
+    unique: Dict = {}
+    for cell in cells:
+        unique.setdefault((cell['prompt_id'], cell['example_idx']), cell)
+    pending = list(unique.values())
+    chunks = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    print(f"🔁 Re-scoring {len(pending)} distinct completions ({len(cells)} cells) of run {run_id} "
+          f"with '{label}' in {len(chunks)} chunks...")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        chunk_scores = list(executor.map(lambda chunk: _score_chunk(chunk, metric, batch_metric), chunks))
+    scores = {}
+    for chunk, chunk_result in zip(chunks, chunk_scores):
+        for cell, score in zip(chunk, chunk_result):
+            scores[(cell['prompt_id'], cell['example_idx'])] = score
+
+    run = store.run(run_id)
+    models = _model_fitness(cells, scores, run['params'] if run else {})
+    pruning = store.pruning(run_id)
+    if models:
+        candidates = models['candidates']
+    elif pruning:
+        candidates = _pruned_fitness(cells, scores, pruning, len(store.examples(run_id)))
+    else:
+        candidates = None
+    store.record_rescore(run_id, label, [
+        (cell['round'], cell['prompt_idx'], cell['example_idx'], scores[(cell['prompt_id'], cell['example_idx'])])
+        for cell in cells
+    ], candidates=candidates)
+
+    # Compare the new ranking with the original one
+    ranking = store.rescored_candidates(run_id, label)
+    if models:
+        for candidate in ranking:
+            candidate['model_fitness'] = models['fitness'].get((candidate['round'], candidate['idx']))
+    original = sorted(ranking, key=lambda c: c['fitness'], reverse=True)
+    new_top = {c['prompt'] for c in ranking[:top_k]}
+    original_top = {c['prompt'] for c in original[:top_k]}
+    summary = {
+        'run_id': run_id,
+        'label': label,
+        'cells': len(cells),
+        'unique_cells': len(pending),
+        'best_prompt': ranking[0]['prompt'],
+        'best_fitness': ranking[0]['rescored_fitness'],
+        'original_best_prompt': original[0]['prompt'],
+        'original_best_fitness': original[0]['fitness'],
+        'rank_correlation': spearman([c['fitness'] for c in ranking], [c['rescored_fitness'] for c in ranking]),
+        'top_k_overlap': len(new_top & original_top) / max(1, min(top_k, len(ranking)))
+    }
+    if pruning:
+        summary['pruned_rounds'] = sorted(pruning)
+    if models:
+        summary['model_fitness'] = {
+            'models': models['models'],
+            'aggregation': models['aggregation'],
+            'weights': models['weights'],
+            'best_per_model': {
+                model: max(({'prompt': c['prompt'], 'fitness': c['model_fitness'][model]}
+                            for c in ranking if c['model_fitness']), key=lambda b: b['fitness'], default=None)
+                for model in models['models']
+            }
+        }
+
+    ranking_file = Path(store.path).parent / f"rescore_{run_id}_{label}.json"
+    with open(ranking_file, 'w') as f:
+        json.dump(dict(summary, ranking=ranking), f, indent=2)
+    summary['ranking_file'] = str(ranking_file)
+
+    print(f"✓ Best fitness under '{label}': {summary['best_fitness']:.4f} "
+          f"(original best: {summary['original_best_fitness']:.4f})")
+    if summary['best_prompt'] != summary['original_best_prompt']:
+        print("   The best prompt changed")
+    if summary['rank_correlation'] is not None:
+        print(f"   Rank correlation with original ranking: {summary['rank_correlation']:.3f}")
+    print(f"   Ranking saved to {ranking_file}")
+    return summary
+
+
+def _load_metric(spec: str) -> Callable:
+    """Import a metric given as 'module:function'."""
+    module_name, _, function_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score a recorded PromptGenerator run with a new metric")
+    parser.add_argument("--run", required=True, help="Run id to re-score")
+    parser.add_argument("--metric", required=True, help="Metric as module:function")
+    parser.add_argument("--batch-metric", action="store_true",
+                        help="The metric takes (expected_list, predicted_list) and scores a whole chunk")
+    parser.add_argument("--store", default="results/runs.sqlite", help="Run store file (default: results/runs.sqlite)")
+    parser.add_argument("--label", help="Name of this re-scoring (default: the metric's name)")
+    parser.add_argument("--batch-size", type=int, default=256, help="Cells per chunk (default: 256)")
+    parser.add_argument("--workers", type=int, help="Parallel scoring threads")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    metric = _load_metric(args.metric)
+    rescore(
+        args.run,
+        metric=None if args.batch_metric else metric,
+        batch_metric=metric if args.batch_metric else None,
+        store_path=args.store,
+        label=args.label,
+        batch_size=args.batch_size,
+        max_workers=args.workers
+    )
+
+
+if __name__ == "__main__":
+    main()
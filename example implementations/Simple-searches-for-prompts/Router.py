@@ -0,0 +1,278 @@
+"""
+Router: Weighted, hedged routing of evaluator calls across several endpoints
+
+In the synchronous evaluation path one slow evaluator call holds up a whole
+prompt, so round time is set by tail latency. EvaluatorRouter is a drop-in
+evaluator client that spreads chat completion calls over several
+OpenAI-compatible endpoints (base URLs or deployments) by weight, and hedges:
+when a call has not answered within the current latency percentile (e.g. p95
+of recent calls), the same request is sent to another endpoint and whichever
+answer arrives first is used. A call that fails is retried on another endpoint
+straight away. Hedges are capped at `max_hedge_rate` of requests, so a slow
+period cannot double the load.
+
+File and batch calls (the batch engine) go to the first endpoint.
+
+Typical usage:
+    from Router import Endpoint, EvaluatorRouter
+
+    router = EvaluatorRouter([
+        Endpoint("primary", base_url="https://api.openai.com/v1", weight=3),
+        Endpoint("azure", base_url="https://my-deployment.openai.azure.com/openai/v1", model="gpt-35-turbo")
+    ], hedge_percentile=95)
+    generator = PromptGenerator(base_prompt="...", metric=similarity_metric, evaluator_client=router)
+    print(router.stats())      # hedge rate, hedge win rate, latency histograms per endpoint
+"""
+
+import bisect
+import logging
+import random
+import re
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from time import monotonic
+from typing import Dict, List, Optional
+
+from Transport import HttpTransport, get_client
+
+_logger = logging.getLogger("prompt_generator")
+
+# Upper edges (ms) of the latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+
+
+class Endpoint:
+    """
+    One OpenAI-compatible endpoint the router can send requests to.
+    """
+
+    def __init__(self, name: str, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 weight: float = 1.0, model: Optional[str] = None, client=None,
+                 transport: Optional[HttpTransport] = None):
+        """
+        Args:
+            name: Label used in statistics
+            base_url: API base URL (default: the SDK default)
+            api_key: API key (default: from the environment)
+            weight: Share of primary requests relative to the other endpoints (default: 1.0)
+            model: Model or deployment name replacing the request's model on this endpoint
+            client: Existing client to use instead of building one from base_url and api_key
+            transport: Transport for the built client (default: the process-wide transport)
+        """
+        if weight < 0:
+            raise ValueError("Endpoint weight must not be negative")
+        self.name = name
+        self.weight = weight
+        self.model = model
+        self._client = client
+        self._client_args = (api_key, base_url, transport)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_client(*self._client_args)
+        return self._client
+
+    def create(self, body: Dict):
+        if self.model:
+            body = dict(body, model=self.model)
+        return self.client.chat.completions.create(**body)
+
+
+class EvaluatorRouter:
+    """
+    Evaluator client routing chat completions over weighted endpoints, with hedged requests.
+
+    Attributes:
+        chat, files, batches: Namespaces mirroring the OpenAI client's
+    """
+
+    def __init__(self, endpoints: List[Endpoint], hedge_percentile: Optional[float] = 95.0,
+                 hedge_after: Optional[float] = None, min_samples: int = 20, window: int = 500,
+                 max_hedge_rate: float = 0.1, max_workers: int = 64, seed: Optional[int] = None):
+        """
+        Args:
+            endpoints: Endpoints to route to; the first also serves file and batch calls
+            hedge_percentile: Hedge a call still running after this percentile of recent latencies;
+                None disables hedging (default: 95)
+            hedge_after: Fixed hedge delay in seconds, used until `min_samples` latencies are known
+                (default: None, no hedging until then)
+            min_samples: Latencies needed before the percentile is used (default: 20)
+            window: Number of recent latencies the percentile is taken over (default: 500)
+            max_hedge_rate: Largest fraction of requests that may be hedged (default: 0.1)
+            max_workers: Threads available for in-flight calls (default: 64)
+            seed: Seed for the weighted endpoint choice
+        """
+        if not endpoints:
+            raise ValueError("EvaluatorRouter needs at least one endpoint")
+        if sum(endpoint.weight for endpoint in endpoints) <= 0:
+            raise ValueError("At least one endpoint needs a positive weight")
+        self._endpoints = endpoints
+        self._hedge_percentile = hedge_percentile
+        self._hedge_after = hedge_after
+        self._min_samples = min_samples
+        self._latencies: deque = deque(maxlen=window)
+        self._max_hedge_rate = max_hedge_rate
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="router")
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'failovers': 0, 'failed': 0}
+        self._endpoint_stats = {endpoint.name: {'requests': 0, 'errors': 0, 'wins': 0, 'latencies_ms': [],
+                                                'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+                                for endpoint in endpoints}
+        self.chat = _Namespace(completions=_Namespace(create=self._chat_create))
+
+    def __getattr__(self, name):
+        # files, batches, ...: not routed, served by the first endpoint
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._endpoints[0].client, name)
+
+    @classmethod
+    def from_urls(cls, urls: List[str], api_key: Optional[str] = None,
+                  transport: Optional[HttpTransport] = None, **kwargs) -> "EvaluatorRouter":
+        """
+        Build a router from 'BASE_URL' or 'BASE_URL=WEIGHT' strings.
+
+        Only a trailing '=NUMBER' is read as the weight, so query strings such as
+        '?api-version=2024-02-01' stay part of the URL.
+
+        Args:
+            urls: Endpoint base URLs, optionally with a weight
+            api_key: API key for every endpoint (default: from the environment)
+            transport: Transport shared by the endpoints' clients
+            **kwargs: Passed to EvaluatorRouter
+        """
+        endpoints = []
+        for url in urls:
+            match = re.fullmatch(r'(.*)=([0-9]*\.?[0-9]+)', url)
+            base_url, weight = match.groups() if match else (url, '1')
+            endpoints.append(Endpoint(base_url, base_url=base_url, api_key=api_key, weight=float(weight),
+                                      transport=transport))
+        return cls(endpoints, **kwargs)
+
+    def _pick(self, exclude: Optional[Endpoint] = None) -> Optional[Endpoint]:
+        candidates = [endpoint for endpoint in self._endpoints if endpoint is not exclude and endpoint.weight > 0]
+        if not candidates:
+            # Zero-weight endpoints are standbys: used for hedges and failovers only
+            candidates = [endpoint for endpoint in self._endpoints if endpoint is not exclude]
+            if not candidates:
+                return None
+            return self._random.choice(candidates)
+        return self._random.choices(candidates, weights=[endpoint.weight for endpoint in candidates])[0]
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a call is hedged, or None when hedging is off or not yet calibrated."""
+        if self._hedge_percentile is None:
+            return None
+        with self._lock:
+            if len(self._latencies) < self._min_samples:
+                return self._hedge_after
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * self._hedge_percentile / 100))]
+
+    def _call(self, endpoint: Endpoint, body: Dict):
+        started = monotonic()
+        try:
+            response = endpoint.create(body)
+        except Exception:
+            with self._lock:
+                self._endpoint_stats[endpoint.name]['errors'] += 1
+            raise
+        self._record_latency(endpoint, monotonic() - started)
+        return response
+
+    def _record_latency(self, endpoint: Endpoint, seconds: float):
+        latency_ms = seconds * 1000
+        with self._lock:
+            self._latencies.append(seconds)
+            stats = self._endpoint_stats[endpoint.name]
+            stats['latencies_ms'].append(latency_ms)
+            stats['histogram'][bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+
+    def _submit(self, endpoint: Endpoint, body: Dict):
+        with self._lock:
+            self._endpoint_stats[endpoint.name]['requests'] += 1
+        return self._executor.submit(self._call, endpoint, body)
+
+    def _chat_create(self, **body):
+        with self._lock:
+            self._stats['requests'] += 1
+        primary = self._pick()
+        in_flight = {self._submit(primary, body): primary}
+        backup_sent = hedged = False
+
+        delay = self.hedge_delay()
+        done, _ = wait(in_flight, timeout=delay)
+        while True:
+            for future in done:
+                endpoint = in_flight.pop(future)
+                if future.exception() is None:
+                    with self._lock:
+                        self._endpoint_stats[endpoint.name]['wins'] += 1
+                        if hedged and endpoint is not primary:
+                            self._stats['hedge_wins'] += 1
+                    return future.result()
+                _logger.warning(f"Evaluator endpoint {endpoint.name} failed: {future.exception()}")
+                last_error = future.exception()
+
+            if not backup_sent:
+                backup = self._pick(exclude=primary)
+                # A failure fails over at once; a slow call is hedged while under the hedge budget
+                failover = not in_flight
+                with self._lock:
+                    within_budget = self._stats['hedged'] < self._max_hedge_rate * self._stats['requests']
+                    if backup is not None and (failover or within_budget):
+                        self._stats['failovers' if failover else 'hedged'] += 1
+                    else:
+                        backup = None
+                if backup is not None:
+                    in_flight[self._submit(backup, body)] = backup
+                    hedged = not failover
+                    backup_sent = True
+
+            if not in_flight:
+                with self._lock:
+                    self._stats['failed'] += 1
+                raise last_error
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+    def stats(self) -> Dict:
+        """
+        Return routing statistics.
+
+        'hedge_rate' is the share of requests that were hedged and 'hedge_win_rate'
+        the share of hedges answered first by the backup. Each endpoint reports
+        its requests, errors, wins, p50/p95/p99 latency and a latency histogram
+        over LATENCY_BUCKETS_MS.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            endpoints = {}
+            for name, endpoint_stats in self._endpoint_stats.items():
+                latencies = sorted(endpoint_stats['latencies_ms'])
+                endpoints[name] = {
+                    'requests': endpoint_stats['requests'],
+                    'errors': endpoint_stats['errors'],
+                    'wins': endpoint_stats['wins'],
+                    **{f'p{q}_ms': _percentile(latencies, q) for q in (50, 95, 99)},
+                    'histogram': dict(zip([f"<{edge}ms" for edge in LATENCY_BUCKETS_MS] + [f">={LATENCY_BUCKETS_MS[-1]}ms"],
+                                          endpoint_stats['histogram']))
+                }
+        stats['hedge_rate'] = stats['hedged'] / stats['requests'] if stats['requests'] else 0.0
+        stats['hedge_win_rate'] = stats['hedge_wins'] / stats['hedged'] if stats['hedged'] else 0.0
+        stats['hedge_delay_seconds'] = self.hedge_delay()
+        stats['endpoints'] = endpoints
+        return stats
+
+
+def _percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q / 100))]
+
+
+class _Namespace:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
@@ -0,0 +1,675 @@
+"""
+RunStore: Compact SQLite store for optimization run results
+
+Replaces the per-run prompts_*.csv and prompt_gen_*.json files with one SQLite
+database shared by all runs. Prompt and example strings are interned once in a
+`texts` table and referenced by id everywhere else, so a prompt evaluated in
+several rounds or runs is stored once.
+
+Tables:
+- runs: one row per run with its parameters, status and final summary
+- texts: interned strings (prompts, example inputs and expected outputs)
+- candidates: one row per evaluated prompt per round, with fitness and coverage
+- examples: the evaluation set of each run, by reference
+- cells: per-(prompt, example) score, token counts and latency
+- lineage: parent, round and generator call of every generated prompt
+- completions: raw evaluator output of every (prompt, example) cell, by reference
+- rescored_cells / rescored_candidates: scores and fitness recomputed offline
+  with another metric, one set per label (see Rescore)
+- pruning: the example pruner's kept examples, weights and calibration for
+  every round evaluated on a reduced set (see ExamplePruning)
+
+Typical usage:
+    from RunStore import RunStore
+
+    store = RunStore("results/runs.sqlite")
+    for run in store.runs():
+        print(run['run_id'], run['status'], run['best_fitness'])
+
+    store.best_per_round(run_id)           # best prompt and fitness of every round
+    store.lineage(run_id, prompt)          # chain of ancestors of a prompt
+    store.children(run_id, prompt)         # prompts generated from a prompt
+    store.lineage_stats(run_id)            # which parents produced improving children
+    store.fitness_distribution(run_id)     # histogram and quantiles of fitness
+"""
+
+import json
+import hashlib
+import sqlite3
+import threading
+import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def text_hash(text: str) -> str:
+    """Return the SHA-256 hex digest used to intern a string."""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class RunStore:
+    """
+    Thread-safe SQLite store of optimization runs.
+    """
+
+    def __init__(self, path: str = "results/runs.sqlite"):
+        """
+        Args:
+            path: SQLite file (created if missing, default: results/runs.sqlite)
+        """
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, timeout=60)
+        self._db.row_factory = sqlite3.Row
+        self._text_ids: Dict[str, int] = {}
+
+        with self._lock, self._db:
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS runs (
+                    run_id TEXT PRIMARY KEY,
+                    started TEXT,
+                    updated TEXT,
+                    status TEXT,
+                    params TEXT,
+                    best_fitness REAL,
+                    best_prompt_id INTEGER,
+                    stopped_reason TEXT,
+                    summary TEXT
+                );
+                CREATE TABLE IF NOT EXISTS texts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    hash TEXT UNIQUE,
+                    text TEXT
+                );
+                CREATE TABLE IF NOT EXISTS candidates (
+                    run_id TEXT,
+                    round INTEGER,
+                    idx INTEGER,
+                    prompt_id INTEGER,
+                    parent_id INTEGER,
+                    fitness REAL,
+                    coverage REAL,
+                    PRIMARY KEY (run_id, round, idx)
+                );
+                CREATE INDEX IF NOT EXISTS candidates_prompt ON candidates (prompt_id);
+                CREATE TABLE IF NOT EXISTS examples (
+                    run_id TEXT,
+                    example_idx INTEGER,
+                    input_id INTEGER,
+                    expected_id INTEGER,
+                    model TEXT,
+                    PRIMARY KEY (run_id, example_idx)
+                );
+                CREATE TABLE IF NOT EXISTS cells (
+                    run_id TEXT,
+                    round INTEGER,
+                    prompt_idx INTEGER,
+                    example_idx INTEGER,
+                    score REAL,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    latency_ms REAL,
+                    PRIMARY KEY (run_id, round, prompt_idx, example_idx)
+                );
+                CREATE TABLE IF NOT EXISTS lineage (
+                    run_id TEXT,
+                    prompt_id INTEGER,
+                    parent_id INTEGER,
+                    second_parent_id INTEGER,
+                    round INTEGER,
+                    generator_call INTEGER,
+                    operator TEXT,
+                    PRIMARY KEY (run_id, prompt_id)
+                );
+                CREATE INDEX IF NOT EXISTS lineage_parent ON lineage (run_id, parent_id);
+                CREATE TABLE IF NOT EXISTS completions (
+                    run_id TEXT,
+                    round INTEGER,
+                    prompt_idx INTEGER,
+                    example_idx INTEGER,
+                    completion_id INTEGER,
+                    PRIMARY KEY (run_id, round, prompt_idx, example_idx)
+                );
+                CREATE TABLE IF NOT EXISTS rescored_cells (
+                    run_id TEXT,
+                    label TEXT,
+                    round INTEGER,
+                    prompt_idx INTEGER,
+                    example_idx INTEGER,
+                    score REAL,
+                    PRIMARY KEY (run_id, label, round, prompt_idx, example_idx)
+                );
+                CREATE TABLE IF NOT EXISTS rescored_candidates (
+                    run_id TEXT,
+                    label TEXT,
+                    round INTEGER,
+                    idx INTEGER,
+                    fitness REAL,
+                    coverage REAL,
+                    PRIMARY KEY (run_id, label, round, idx)
+                );
+                CREATE TABLE IF NOT EXISTS pruning (
+                    run_id TEXT,
+                    round INTEGER,
+                    state TEXT,
+                    PRIMARY KEY (run_id, round)
+                );
+            """)
+            # Stores created before multi-model runs were recorded lack the examples' model column
+            if 'model' not in {row['name'] for row in self._db.execute("PRAGMA table_info(examples)")}:
+                self._db.execute("ALTER TABLE examples ADD COLUMN model TEXT")
+
+    @staticmethod
+    def _now() -> str:
+        return str(datetime.datetime.now())
+
+    def intern(self, text: str) -> int:
+        """
+        Return the id of a string, storing it if it is new.
+
+        Args:
+            text: String to intern
+
+        Returns:
+            Row id in the texts table
+        """
+        digest = text_hash(text)
+        with self._lock:
+            text_id = self._text_ids.get(digest)
+            if text_id is None:
+                self._db.execute("INSERT OR IGNORE INTO texts (hash, text) VALUES (?, ?)", (digest, text))
+                text_id = self._db.execute("SELECT id FROM texts WHERE hash = ?", (digest,)).fetchone()[0]
+                self._text_ids[digest] = text_id
+            return text_id
+
+    def find(self, text: str) -> Optional[int]:
+        """Return the id of an already interned string, or None."""
+        digest = text_hash(text)
+        with self._lock:
+            if digest in self._text_ids:
+                return self._text_ids[digest]
+            row = self._db.execute("SELECT id FROM texts WHERE hash = ?", (digest,)).fetchone()
+        return row[0] if row else None
+
+    def text(self, text_id: Optional[int]) -> Optional[str]:
+        """Return the string for an interned id."""
+        if text_id is None:
+            return None
+        with self._lock:
+            row = self._db.execute("SELECT text FROM texts WHERE id = ?", (text_id,)).fetchone()
+        return row[0] if row else None
+
+    def start_run(self, run_id: str, params: Dict):
+        """Create or reset the run row with its parameters."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO runs (run_id, started, updated, status, params) VALUES (?, ?, ?, 'running', ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET updated = excluded.updated, status = 'running', "
+                "params = excluded.params",
+                (run_id, self._now(), self._now(), json.dumps(params)))
+
+    def set_status(self, run_id: str, status: str):
+        """Update a run's status (e.g. 'running', 'completed', 'failed', 'cancelled')."""
+        with self._lock, self._db:
+            self._db.execute("UPDATE runs SET status = ?, updated = ? WHERE run_id = ?",
+                             (status, self._now(), run_id))
+
+    def record_examples(self, run_id: str, evaluation_set: List[Dict]):
+        """
+        Store a run's evaluation set by reference.
+
+        Multi-model runs pass the set expanded per evaluator model (examples
+        carrying a 'model'), so every score column has its example row.
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO examples VALUES (?, ?, ?, ?, ?)",
+                [(run_id, i, self.intern(str(example['input'])), self.intern(str(example['expected'])),
+                  example.get('model')) for i, example in enumerate(evaluation_set)])
+
+    def record_candidate(self, run_id: str, round_num: int, idx: int, prompt: str, fitness: float,
+                         coverage: Optional[float] = None, parent: Optional[str] = None):
+        """
+        Store one evaluated prompt.
+
+        Args:
+            run_id: Run identifier
+            round_num: Round number
+            idx: Position of the prompt within the round
+            prompt: Prompt text
+            fitness: Fitness score
+            coverage: Fraction of examples that produced a score
+            parent: Prompt this one was generated from, if known
+        """
+        parent_id = self.intern(parent) if parent is not None else None
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO candidates VALUES (?, ?, ?, ?, ?, ?, ?)",
+                             (run_id, round_num, idx, self.intern(prompt), parent_id, fitness, coverage))
+
+    def record_lineage(self, run_id: str, children: List[str], parent: str, round_num: int,
+                       generator_call: int, operator: str = 'mutation', second_parent: Optional[str] = None):
+        """
+        Store the origin of prompts returned by one generator call.
+
+        A prompt keeps the first origin recorded for it within a run.
+
+        Args:
+            run_id: Run identifier
+            children: Generated prompts
+            parent: Prompt they were generated from
+            round_num: Round they were generated for
+            generator_call: Generator call number within the run
+            operator: 'mutation' or 'crossover' (default: 'mutation')
+            second_parent: Second parent of a crossover
+        """
+        parent_id = self.intern(parent)
+        second_id = self.intern(second_parent) if second_parent is not None else None
+        rows = [(run_id, self.intern(child), parent_id, second_id, round_num, generator_call, operator)
+                for child in children if child != parent]
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR IGNORE INTO lineage VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def record_cells(self, run_id: str, round_num: int, score_matrix: Sequence[Sequence[Optional[float]]],
+                     details: Optional[Dict] = None, prompt_offset: int = 0):
+        """
+        Store per-(prompt, example) scores of a round.
+
+        Args:
+            run_id: Run identifier
+            round_num: Round number
+            score_matrix: One row of per-example scores (or None) per prompt
+            details: Optional {(row, example_idx): {'prompt_tokens', 'completion_tokens',
+                'latency_ms', 'completion'}} keyed by matrix position, where 'completion'
+                is the raw evaluator output
+            prompt_offset: Added to row positions to get prompt indices (default: 0)
+        """
+        details = details or {}
+        rows = []
+        completions = []
+        for p, row in enumerate(score_matrix):
+            for e, score in enumerate(row):
+                cell = details.get((p, e), {})
+                rows.append((run_id, round_num, p + prompt_offset, e, score, cell.get('prompt_tokens'),
+                             cell.get('completion_tokens'), cell.get('latency_ms')))
+                if cell.get('completion') is not None:
+                    completions.append((run_id, round_num, p + prompt_offset, e, self.intern(cell['completion'])))
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.executemany("INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?)", completions)
+
+    def record_pruning(self, run_id: str, round_num: int, state: Dict):
+        """
+        Store the example pruner state a round's fitness was aggregated with.
+
+        Args:
+            run_id: Run identifier
+            round_num: Round number
+            state: The pruner's state_dict (kept examples, weights and calibration)
+        """
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO pruning VALUES (?, ?, ?)",
+                             (run_id, round_num, json.dumps(state)))
+
+    def record_rescore(self, run_id: str, label: str, cells: Sequence, candidates: Optional[Sequence] = None):
+        """
+        Store offline re-scored cells and aggregate them into per-candidate fitness.
+
+        Args:
+            run_id: Run identifier
+            label: Name of the re-scoring (e.g. the metric name)
+            cells: (round, prompt_idx, example_idx, score) tuples; score may be None
+            candidates: Optional (round, idx, fitness, coverage) tuples to store instead
+                of the mean cell score, e.g. fitness combined over evaluator models
+        """
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM rescored_cells WHERE run_id = ? AND label = ?", (run_id, label))
+            self._db.execute("DELETE FROM rescored_candidates WHERE run_id = ? AND label = ?", (run_id, label))
+            self._db.executemany("INSERT INTO rescored_cells VALUES (?, ?, ?, ?, ?, ?)",
+                                 [(run_id, label, *cell) for cell in cells])
+            if candidates is not None:
+                self._db.executemany("INSERT INTO rescored_candidates VALUES (?, ?, ?, ?, ?, ?)",
+                                     [(run_id, label, *candidate) for candidate in candidates])
+                return
+            self._db.execute(
+                "INSERT INTO rescored_candidates "
+                "SELECT run_id, label, round, prompt_idx, COALESCE(AVG(score), 0.0), "
+                "CAST(COUNT(score) AS REAL) / COUNT(*) FROM rescored_cells "
+                "WHERE run_id = ? AND label = ? GROUP BY round, prompt_idx", (run_id, label))
+
+    def finish_run(self, run_id: str, final_result: Dict, status: str = 'completed'):
+        """Store a run's final summary (without the per-prompt results, which are in candidates)."""
+        summary = {k: v for k, v in final_result.items() if k != 'all_results'}
+        with self._lock, self._db:
+            self._db.execute(
+                "UPDATE runs SET status = ?, updated = ?, best_fitness = ?, best_prompt_id = ?, "
+                "stopped_reason = ?, summary = ? WHERE run_id = ?",
+                (status, self._now(), final_result.get('best_fitness'),
+                 self.intern(final_result['best_prompt']) if final_result.get('best_prompt') else None,
+                 final_result.get('stopped_reason'), json.dumps(summary, default=str), run_id))
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def runs(self) -> List[Dict]:
+        """List all runs, newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT run_id, started, updated, status, best_fitness, stopped_reason, "
+                "(SELECT COUNT(*) FROM candidates c WHERE c.run_id = runs.run_id) AS evaluations, "
+                "(SELECT MAX(round) + 1 FROM candidates c WHERE c.run_id = runs.run_id) AS rounds "
+                "FROM runs ORDER BY started DESC").fetchall()
+        return [dict(row) for row in rows]
+
+    def run(self, run_id: str) -> Optional[Dict]:
+        """Return one run with decoded parameters and summary."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if row is None:
+            return None
+        run = dict(row)
+        run['params'] = json.loads(run['params']) if run['params'] else {}
+        run['summary'] = json.loads(run['summary']) if run['summary'] else {}
+        return run
+
+    def status(self, run_id: str) -> Optional[str]:
+        """Return a run's status, or None if the run is unknown."""
+        with self._lock:
+            row = self._db.execute("SELECT status FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row['status'] if row else None
+
+    def examples(self, run_id: str) -> List[Dict]:
+        """Return a run's evaluation set as dicts with 'input' and 'expected' (once, not per model)."""
+        with self._lock:
+            # Expanded sets are model-major, so the first model's rows are the set itself
+            rows = self._db.execute(
+                "SELECT i.text AS input, x.text AS expected FROM examples e "
+                "JOIN texts i ON i.id = e.input_id JOIN texts x ON x.id = e.expected_id "
+                "WHERE e.run_id = ? AND (e.model IS NULL OR e.model = ("
+                "  SELECT model FROM examples WHERE run_id = e.run_id AND example_idx = 0)) "
+                "ORDER BY e.example_idx", (run_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def candidates(self, run_id: str, round_num: Optional[int] = None) -> List[Dict]:
+        """Return evaluated prompts of a run (optionally one round) with their text."""
+        query = ("SELECT c.round, c.idx, c.fitness, c.coverage, t.text AS prompt, p.text AS parent "
+                 "FROM candidates c JOIN texts t ON t.id = c.prompt_id LEFT JOIN texts p ON p.id = c.parent_id "
+                 "WHERE c.run_id = ?")
+        params: List = [run_id]
+        if round_num is not None:
+            query += " AND c.round = ?"
+            params.append(round_num)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY c.round, c.idx", params).fetchall()
+        return [dict(row) for row in rows]
+
+    def best_per_round(self, run_id: str) -> List[Dict]:
+        """
+        Return the best prompt of every round.
+
+        Returns:
+            Dicts with 'round', 'fitness', 'prompt' and 'best_so_far', by round
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT c.round, c.fitness, t.text AS prompt FROM candidates c "
+                "JOIN texts t ON t.id = c.prompt_id "
+                "WHERE c.run_id = ? AND c.fitness = ("
+                "  SELECT MAX(fitness) FROM candidates WHERE run_id = c.run_id AND round = c.round) "
+                "GROUP BY c.round ORDER BY c.round", (run_id,)).fetchall()
+        best = []
+        best_so_far = float('-inf')
+        for row in rows:
+            best_so_far = max(best_so_far, row['fitness'])
+            best.append(dict(row, best_so_far=best_so_far))
+        return best
+
+    def lineage(self, run_id: str, prompt: str) -> List[Dict]:
+        """
+        Follow a prompt's recorded parents back to the start of the run.
+
+        Args:
+            run_id: Run identifier
+            prompt: Prompt text to start from
+
+        Returns:
+            The prompt and its ancestors, newest first, each with 'round', 'fitness' and 'prompt'
+        """
+        chain = []
+        seen = set()
+        prompt_id = self.find(prompt)
+        with self._lock:
+            while prompt_id is not None and prompt_id not in seen:
+                seen.add(prompt_id)
+                row = self._db.execute(
+                    "SELECT c.round, c.fitness, c.parent_id, t.text AS prompt FROM candidates c "
+                    "JOIN texts t ON t.id = c.prompt_id WHERE c.run_id = ? AND c.prompt_id = ? "
+                    "ORDER BY c.round LIMIT 1", (run_id, prompt_id)).fetchone()
+                if row is None:
+                    break
+                chain.append({'round': row['round'], 'fitness': row['fitness'], 'prompt': row['prompt']})
+                prompt_id = row['parent_id']
+        return chain
+
+    def completions(self, run_id: str) -> List[Dict]:
+        """
+        Return the stored evaluator output of every scored cell of a run.
+
+        Cells of prompts whose results were reused from an earlier round have no
+        completion of their own; they are filled from another cell with the same
+        prompt and example.
+
+        Returns:
+            Dicts with 'round', 'prompt_idx', 'example_idx', 'prompt_id', 'completion', 'expected'
+            and 'model' (the evaluator model of multi-model runs, else None)
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "WITH cell_prompts AS ("
+                "  SELECT c.round, c.prompt_idx, c.example_idx, k.prompt_id FROM cells c "
+                "  JOIN candidates k ON k.run_id = c.run_id AND k.round = c.round AND k.idx = c.prompt_idx "
+                "  WHERE c.run_id = ?), "
+                "known AS ("
+                "  SELECT cp.prompt_id, cp.example_idx, MIN(o.completion_id) AS completion_id "
+                "  FROM cell_prompts cp JOIN completions o ON o.run_id = ? AND o.round = cp.round "
+                "  AND o.prompt_idx = cp.prompt_idx AND o.example_idx = cp.example_idx "
+                "  GROUP BY cp.prompt_id, cp.example_idx) "
+                "SELECT cp.round, cp.prompt_idx, cp.example_idx, cp.prompt_id, t.text AS completion, "
+                "x.text AS expected, e.model FROM cell_prompts cp "
+                "JOIN known k ON k.prompt_id = cp.prompt_id AND k.example_idx = cp.example_idx "
+                "JOIN texts t ON t.id = k.completion_id "
+                "JOIN examples e ON e.run_id = ? AND e.example_idx = cp.example_idx "
+                "JOIN texts x ON x.id = e.expected_id "
+                "ORDER BY cp.round, cp.prompt_idx, cp.example_idx", (run_id, run_id, run_id)).fetchall()
+        return [dict(row) for row in rows]
+
+    def pruning(self, run_id: str) -> Dict[int, Dict]:
+        """Return the example pruner state of every round evaluated on a reduced set, by round."""
+        with self._lock:
+            rows = self._db.execute("SELECT round, state FROM pruning WHERE run_id = ?", (run_id,)).fetchall()
+        return {row['round']: json.loads(row['state']) for row in rows}
+
+    def rescored_candidates(self, run_id: str, label: str) -> List[Dict]:
+        """
+        Return a run's candidates with their original and re-scored fitness.
+
+        Returns:
+            Dicts with 'round', 'idx', 'prompt', 'fitness', 'coverage', 'rescored_fitness'
+            and 'rescored_coverage', best re-scored fitness first
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT c.round, c.idx, t.text AS prompt, c.fitness, c.coverage, "
+                "r.fitness AS rescored_fitness, r.coverage AS rescored_coverage FROM candidates c "
+                "JOIN texts t ON t.id = c.prompt_id JOIN rescored_candidates r ON r.run_id = c.run_id "
+                "AND r.round = c.round AND r.idx = c.idx AND r.label = ? WHERE c.run_id = ? "
+                "ORDER BY r.fitness DESC, c.round, c.idx", (label, run_id)).fetchall()
+        return [dict(row) for row in rows]
+
+    def children(self, run_id: str, prompt: str) -> List[Dict]:
+        """
+        Return the prompts generated from a prompt.
+
+        Returns:
+            Dicts with 'prompt', 'round', 'generator_call', 'operator' and 'fitness'
+            (best fitness over the rounds it was evaluated in, None if never evaluated)
+        """
+        parent_id = self.find(prompt)
+        if parent_id is None:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT t.text AS prompt, l.round, l.generator_call, l.operator, "
+                "(SELECT MAX(fitness) FROM candidates c WHERE c.run_id = l.run_id AND c.prompt_id = l.prompt_id) "
+                "AS fitness FROM lineage l JOIN texts t ON t.id = l.prompt_id "
+                "WHERE l.run_id = ? AND l.parent_id = ? ORDER BY l.generator_call", (run_id, parent_id)).fetchall()
+        return [dict(row) for row in rows]
+
+    def lineage_stats(self, run_id: str) -> List[Dict]:
+        """
+        Summarise how productive each parent prompt was.
+
+        Returns:
+            Dicts with 'prompt', 'fitness', 'children', 'evaluated', 'mean_child_fitness',
+            'mean_gain' and 'improved' (children beating the parent), best mean gain first
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "WITH fit AS (SELECT prompt_id, MAX(fitness) AS fitness FROM candidates "
+                "             WHERE run_id = ? GROUP BY prompt_id) "
+                "SELECT t.text AS prompt, pf.fitness, COUNT(*) AS children, COUNT(cf.fitness) AS evaluated, "
+                "AVG(cf.fitness) AS mean_child_fitness, AVG(cf.fitness - pf.fitness) AS mean_gain, "
+                "SUM(cf.fitness > pf.fitness) AS improved "
+                "FROM lineage l JOIN texts t ON t.id = l.parent_id "
+                "LEFT JOIN fit pf ON pf.prompt_id = l.parent_id LEFT JOIN fit cf ON cf.prompt_id = l.prompt_id "
+                "WHERE l.run_id = ? GROUP BY l.parent_id "
+                "ORDER BY mean_gain IS NULL, mean_gain DESC", (run_id, run_id)).fetchall()
+        return [dict(row) for row in rows]
+
+    def fitness_distribution(self, run_id: str, round_num: Optional[int] = None, bins: int = 10) -> Dict:
+        """
+        Summarise the fitness distribution of a run or one round.
+
+        Args:
+            run_id: Run identifier
+            round_num: Optional round to restrict to
+            bins: Number of equal-width histogram bins (default: 10)
+
+        Returns:
+            Dict with 'count', 'mean', 'min', 'max', 'quantiles' (p10/p25/p50/p75/p90),
+            'bin_edges' and 'histogram'
+        """
+        query = "SELECT fitness FROM candidates WHERE run_id = ?"
+        params: List = [run_id]
+        if round_num is not None:
+            query += " AND round = ?"
+            params.append(round_num)
+        with self._lock:
+            values = sorted(row[0] for row in self._db.execute(query, params).fetchall() if row[0] is not None)
+        if not values:
+            return {'count': 0}
+
+        def quantile(q: float) -> float:
+            position = q * (len(values) - 1)
+            low = int(position)
+            high = min(low + 1, len(values) - 1)
+            return values[low] + (values[high] - values[low]) * (position - low)
+
+        low, high = values[0], values[-1]
+        width = (high - low) / bins or 1.0
+        histogram = [0] * bins
+        for value in values:
+            histogram[min(int((value - low) / width), bins - 1)] += 1
+
+        return {
+            'count': len(values),
+            'mean': sum(values) / len(values),
+            'min': low,
+            'max': high,
+            'quantiles': {f"p{int(q * 100)}": quantile(q) for q in (0.1, 0.25, 0.5, 0.75, 0.9)},
+            'bin_edges': [low + i * width for i in range(bins + 1)],
+            'histogram': histogram
+        }
+
+    def score_rows(self, run_id: str) -> Dict[str, List[Optional[float]]]:
+        """
+        Return the per-example score row of every evaluated prompt of a run.
+
+        A prompt evaluated in several rounds gets its latest row.
+
+        Returns:
+            Mapping of prompt text to its scores by example index (None where a cell was not scored)
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT t.text AS prompt, c.round, c.example_idx, c.score FROM cells c "
+                "JOIN candidates k ON k.run_id = c.run_id AND k.round = c.round AND k.idx = c.prompt_idx "
+                "JOIN texts t ON t.id = k.prompt_id WHERE c.run_id = ? ORDER BY c.round",
+                (run_id,)).fetchall()
+        latest: Dict[str, Tuple[int, Dict[int, Optional[float]]]] = {}
+        for prompt, round_num, example_idx, score in rows:
+            if prompt not in latest or latest[prompt][0] < round_num:
+                latest[prompt] = (round_num, {})
+            latest[prompt][1][example_idx] = score
+        return {prompt: [cells.get(e) for e in range(max(cells) + 1)] for prompt, (_, cells) in latest.items()}
+
+    def cell_matrix(self, run_id: str, round_num: int) -> List[List[Optional[float]]]:
+        """
+        Return a round's per-(prompt, example) score matrix.
+
+        Rows follow the order of the round's prompt indices, so row i belongs to
+        the i-th candidate of the round.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT prompt_idx, example_idx, score FROM cells WHERE run_id = ? AND round = ?",
+                (run_id, round_num)).fetchall()
+        if not rows:
+            return []
+        positions = {idx: i for i, idx in enumerate(sorted({row[0] for row in rows}))}
+        num_examples = max(row[1] for row in rows) + 1
+        matrix: List[List[Optional[float]]] = [[None] * num_examples for _ in positions]
+        for prompt_idx, example_idx, score in rows:
+            matrix[positions[prompt_idx]][example_idx] = score
+        return matrix
+
+    def import_legacy(self, results_file: str) -> str:
+        """
+        Import a legacy prompt_gen_*.json results file into the store.
+
+        Args:
+            results_file: Path to a JSON-lines file written by older versions
+
+        Returns:
+            The imported run id
+        """
+        run_id = None
+        counters: Dict[int, int] = {}
+        with open(results_file, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if 'parameters' in record:
+                    run_id = record['parameters'].get('run_start') or Path(results_file).stem
+                    self.start_run(run_id, record['parameters'])
+                    continue
+                if run_id is None:
+                    run_id = Path(results_file).stem
+                    self.start_run(run_id, {})
+                # Numbered from 1 within a round, like live runs' variations
+                idx = counters.get(record['round'], 0) + 1
+                counters[record['round']] = idx
+                self.record_candidate(run_id, record['round'], idx, record['prompt'], record['fitness'])
+
+        best = max(self.candidates(run_id), key=lambda c: c['fitness'], default=None)
+        if best:
+            self.finish_run(run_id, {'best_prompt': best['prompt'], 'best_fitness': best['fitness'],
+                                     'rounds': len(counters)}, status='imported')
+        return run_id
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,445 @@
+"""
+SearchStrategy: Pluggable selection policies for PromptGenerator
+
+A search strategy decides which prompts are evaluated in the next round, given
+the scored prompts of the current round. The optimization loop, checkpointing
+and evaluation engine all stay in PromptGenerator; a strategy only selects
+parents and asks the generator for new candidates through
+`generate_variations` and `crossover_prompts`.
+
+Available strategies:
+- beam: keep the top third, split variations evenly (the original behaviour)
+- tournament: evolutionary search with tournament selection and LLM crossover
+- ucb: UCB1 bandit that allocates children to the most rewarding parents
+- annealing: simulated annealing chains with a cooling acceptance schedule
+- lineage: beam search that gives more children to parents from productive lineages
+
+Typical usage:
+    from PromptGenerator import PromptGenerator
+    from SearchStrategy import TournamentStrategy
+
+    generator = PromptGenerator(
+        base_prompt="You are a helpful assistant.",
+        metric=similarity_metric,
+        strategy=TournamentStrategy(tournament_size=3, crossover_rate=0.5)
+    )
+
+    # Or select a strategy by name
+    generator = PromptGenerator(base_prompt="...", metric=metric, strategy="ucb")
+"""
+
+import math
+import random
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+_logger = logging.getLogger("prompt_generator")
+
+
+class SearchStrategy:
+    """
+    Base class for next-population selection.
+
+    Subclasses implement `next_population`. Strategies that keep state across
+    rounds must also implement `state_dict` and `load_state_dict` so the state
+    survives a checkpoint/resume cycle.
+    """
+
+    name = "base"
+
+    def next_population(
+        self,
+        generator,
+        round_results: List[Dict],
+        best_prompt: str,
+        best_fitness: float,
+        breadth: int,
+        candidates: Optional[int] = None
+    ) -> List[str]:
+        """
+        Choose the prompts to evaluate in the next round.
+
+        Args:
+            generator: The PromptGenerator running the search
+            round_results: Results of this round, dicts with 'prompt' and 'fitness'
+            best_prompt: Best prompt seen so far in the run
+            best_fitness: Fitness of the best prompt
+            breadth: Number of prompts the next round evaluates; selection (parents,
+                pools, chains) is sized by it
+            candidates: Number of prompts to generate, when a diversity selector will
+                cut them down to `breadth` (default: breadth)
+
+        Returns:
+            List of exactly `candidates` prompts
+        """
+        raise NotImplementedError
+
+    def state_dict(self) -> Dict:
+        """Return JSON-serialisable strategy state for checkpointing."""
+        return {}
+
+    def load_state_dict(self, state: Dict):
+        """Restore strategy state from a checkpoint."""
+        pass
+
+    def _fill(self, generator, prompts: List[str], best_prompt: str, breadth: int) -> List[str]:
+        """Top up a short population with variations of the best prompt."""
+        while len(prompts) < breadth:
+            prompts.extend(generator.generate_variations(best_prompt, breadth - len(prompts)))
+        return prompts[:breadth]
+
+    @staticmethod
+    def _scale(allocation: Counter, total: int) -> Counter:
+        """Scale a per-parent child allocation to `total` children, by largest remainder."""
+        allocated = sum(allocation.values())
+        if allocated == total or not allocated:
+            return allocation
+        exact = {parent: count * total / allocated for parent, count in allocation.items()}
+        scaled = Counter({parent: int(x) for parent, x in exact.items()})
+        by_remainder = sorted(exact, key=lambda p: exact[p] - int(exact[p]), reverse=True)
+        for parent in by_remainder[:total - sum(scaled.values())]:
+            scaled[parent] += 1
+        return +scaled
+
+    @staticmethod
+    def _expand(generator, parent_counts: Counter) -> List[Tuple[str, str]]:
+        """
+        Generate children for each parent with one generator call per parent.
+
+        Returns:
+            List of (child, parent) pairs
+        """
+        children = []
+        for parent, count in parent_counts.items():
+            for child in generator.generate_variations(parent, count):
+                children.append((child, parent))
+        return children
+
+
+class BeamSearchStrategy(SearchStrategy):
+    """
+    Beam search: keep the top `keep_fraction` of the round and split the next
+    population evenly between them.
+    """
+
+    name = "beam"
+
+    def __init__(self, keep_fraction: float = 1 / 3):
+        """
+        Args:
+            keep_fraction: Fraction of the breadth kept as parents (default: 1/3)
+        """
+        self._keep_fraction = keep_fraction
+
+    def next_population(self, generator, round_results, best_prompt, best_fitness, breadth, candidates=None):
+        candidates = candidates or breadth
+        ranked = sorted(round_results, key=lambda x: x['fitness'], reverse=True)
+
+        # Select top performers for next round
+        top_k = max(1, int(breadth * self._keep_fraction))
+        top_prompts = [r['prompt'] for r in ranked[:top_k]]
+
+        # Generate new variations from top performers
+        next_prompts = []
+        variations_per_prompt = candidates // len(top_prompts)
+        if variations_per_prompt > 0:
+            for top_prompt in top_prompts:
+                next_prompts.extend(generator.generate_variations(top_prompt, variations_per_prompt))
+
+        # Fill remaining slots with variations of best
+        return self._fill(generator, next_prompts, best_prompt, candidates)
+
+
+class TournamentStrategy(SearchStrategy):
+    """
+    Evolutionary search with tournament selection and crossover.
+
+    A pool of the best `breadth` evaluated prompts is kept across rounds (elitism
+    without re-evaluation). Each child is produced either by crossing two
+    tournament winners or by mutating a single winner.
+    """
+
+    name = "tournament"
+
+    def __init__(self, tournament_size: int = 3, crossover_rate: float = 0.5,
+                 seed: Optional[int] = None):
+        """
+        Args:
+            tournament_size: Number of pool members competing per selection (default: 3)
+            crossover_rate: Probability a child is produced by crossover (default: 0.5)
+            seed: Optional random seed for reproducible selection
+        """
+        self._tournament_size = tournament_size
+        self._crossover_rate = crossover_rate
+        self._rng = random.Random(seed)
+        self._pool: List[Dict] = []
+
+    def _tournament(self) -> str:
+        """Pick the fittest of `tournament_size` random pool members."""
+        k = min(self._tournament_size, len(self._pool))
+        contenders = self._rng.sample(self._pool, k)
+        return max(contenders, key=lambda x: x['fitness'])['prompt']
+
+    def next_population(self, generator, round_results, best_prompt, best_fitness, breadth, candidates=None):
+        candidates = candidates or breadth
+        # Merge this round into the pool, keeping one entry per prompt
+        merged = {r['prompt']: r['fitness'] for r in self._pool}
+        for r in round_results:
+            merged[r['prompt']] = max(r['fitness'], merged.get(r['prompt'], float('-inf')))
+        self._pool = sorted(
+            ({'prompt': p, 'fitness': f} for p, f in merged.items()),
+            key=lambda x: x['fitness'], reverse=True
+        )[:breadth]
+
+        mutations = Counter()
+        pairs = Counter()
+        for _ in range(candidates):
+            first = self._tournament()
+            if len(self._pool) > 1 and self._rng.random() < self._crossover_rate:
+                second = self._tournament()
+                if second != first:
+                    pairs[(first, second)] += 1
+                    continue
+            mutations[first] += 1
+
+        next_prompts = [child for child, _ in self._expand(generator, mutations)]
+        for (first, second), count in pairs.items():
+            next_prompts.extend(generator.crossover_prompts(first, second, count))
+
+        self._rng.shuffle(next_prompts)
+        return self._fill(generator, next_prompts, best_prompt, candidates)
+
+    def state_dict(self) -> Dict:
+        return {'pool': self._pool}
+
+    def load_state_dict(self, state: Dict):
+        self._pool = state.get('pool', [])
+
+
+class UCBBanditStrategy(SearchStrategy):
+    """
+    UCB1 bandit over parent prompts.
+
+    Every evaluated prompt is an arm. Generating a child from a parent is a pull
+    of that arm, and the child's fitness is the reward. The next population is
+    allocated one child at a time to the arm with the highest upper confidence
+    bound, so productive parents receive more children than the beam's even split.
+    """
+
+    name = "ucb"
+
+    def __init__(self, exploration: float = 0.1, max_arms: int = 50):
+        """
+        Args:
+            exploration: UCB exploration coefficient, in fitness units (default: 0.1)
+            max_arms: Maximum number of arms kept, ranked by mean reward (default: 50)
+        """
+        self._exploration = exploration
+        self._max_arms = max_arms
+        self._arms: Dict[str, Dict] = {}
+        self._pending: Dict[str, str] = {}
+
+    def _ucb(self, arm: Dict, total_pulls: int) -> float:
+        mean = arm['reward'] / arm['pulls']
+        return mean + self._exploration * math.sqrt(2 * math.log(max(total_pulls, 2)) / arm['pulls'])
+
+    def next_population(self, generator, round_results, best_prompt, best_fitness, breadth, candidates=None):
+        candidates = candidates or breadth
+        # Credit children to their parents, then register children as new arms.
+        # An arm starts with its own fitness as a single pseudo-observation.
+        for r in round_results:
+            parent = self._pending.get(r['prompt'])
+            if parent in self._arms:
+                self._arms[parent]['pulls'] += 1
+                self._arms[parent]['reward'] += r['fitness']
+            if r['prompt'] not in self._arms:
+                self._arms[r['prompt']] = {'pulls': 1, 'reward': r['fitness']}
+        self._pending = {}
+
+        if len(self._arms) > self._max_arms:
+            ranked = sorted(self._arms.items(), key=lambda x: x[1]['reward'] / x[1]['pulls'], reverse=True)
+            self._arms = dict(ranked[:self._max_arms])
+
+        # Allocate children with virtual pulls at the arm's current mean
+        virtual = {p: dict(a) for p, a in self._arms.items()}
+        total = sum(a['pulls'] for a in virtual.values())
+        allocation = Counter()
+        for _ in range(breadth):
+            parent = max(virtual, key=lambda p: self._ucb(virtual[p], total))
+            arm = virtual[parent]
+            arm['reward'] += arm['reward'] / arm['pulls']
+            arm['pulls'] += 1
+            total += 1
+            allocation[parent] += 1
+        # Extra candidates for a diversity selector follow the same split
+        allocation = self._scale(allocation, candidates)
+
+        _logger.info(f"UCB allocation: {dict(allocation.most_common(5))}")
+
+        next_prompts = []
+        for child, parent in self._expand(generator, allocation):
+            self._pending[child] = parent
+            next_prompts.append(child)
+        return self._fill(generator, next_prompts, best_prompt, candidates)
+
+    def state_dict(self) -> Dict:
+        return {'arms': self._arms, 'pending': self._pending}
+
+    def load_state_dict(self, state: Dict):
+        self._arms = state.get('arms', {})
+        self._pending = state.get('pending', {})
+
+
+class SimulatedAnnealingStrategy(SearchStrategy):
+    """
+    Simulated annealing over several independent chains.
+
+    Each chain holds a current prompt. The round evaluates neighbours (variations)
+    of every chain's current prompt; a chain moves to its best neighbour if it is
+    better, or with probability exp(delta / T) if it is worse. The temperature
+    decays geometrically every round.
+    """
+
+    name = "annealing"
+
+    def __init__(self, num_chains: int = 4, initial_temperature: float = 0.05,
+                 cooling: float = 0.7, seed: Optional[int] = None):
+        """
+        Args:
+            num_chains: Number of independent annealing chains (default: 4)
+            initial_temperature: Starting temperature, in fitness units (default: 0.05)
+            cooling: Multiplicative temperature decay per round (default: 0.7)
+            seed: Optional random seed for reproducible acceptance decisions
+        """
+        self._num_chains = num_chains
+        self._temperature = initial_temperature
+        self._cooling = cooling
+        self._rng = random.Random(seed)
+        self._chains: List[Dict] = []
+        self._pending: Dict[str, int] = {}
+
+    def next_population(self, generator, round_results, best_prompt, best_fitness, breadth, candidates=None):
+        candidates = candidates or breadth
+        ranked = sorted(round_results, key=lambda x: x['fitness'], reverse=True)
+
+        if not self._chains:
+            # First round: seed chains from the best distinct candidates
+            num_chains = max(1, min(self._num_chains, breadth, len(ranked)))
+            self._chains = [{'prompt': r['prompt'], 'fitness': r['fitness']} for r in ranked[:num_chains]]
+        else:
+            best_neighbour: Dict[int, Dict] = {}
+            for r in ranked:
+                chain_idx = self._pending.get(r['prompt'])
+                if chain_idx is not None and chain_idx not in best_neighbour:
+                    best_neighbour[chain_idx] = r
+
+            for chain_idx, candidate in best_neighbour.items():
+                chain = self._chains[chain_idx]
+                delta = candidate['fitness'] - chain['fitness']
+                if delta >= 0 or self._rng.random() < math.exp(delta / max(self._temperature, 1e-9)):
+                    chain['prompt'] = candidate['prompt']
+                    chain['fitness'] = candidate['fitness']
+
+            self._temperature *= self._cooling
+
+        _logger.info(f"Annealing temperature: {self._temperature:.4f}")
+
+        # Split the candidates across chains, giving the remainder to the first chains
+        self._pending = {}
+        next_prompts = []
+        per_chain, remainder = divmod(candidates, len(self._chains))
+        for chain_idx, chain in enumerate(self._chains):
+            count = per_chain + (1 if chain_idx < remainder else 0)
+            if count == 0:
+                continue
+            for child in generator.generate_variations(chain['prompt'], count):
+                self._pending[child] = chain_idx
+                next_prompts.append(child)
+        return self._fill(generator, next_prompts, best_prompt, candidates)
+
+    def state_dict(self) -> Dict:
+        return {'chains': self._chains, 'pending': self._pending, 'temperature': self._temperature}
+
+    def load_state_dict(self, state: Dict):
+        self._chains = state.get('chains', [])
+        self._pending = state.get('pending', {})
+        self._temperature = state.get('temperature', self._temperature)
+
+
+class LineageStrategy(SearchStrategy):
+    """
+    Beam search weighted by lineage productivity.
+
+    Like beam search, the top `keep_fraction` of the round become parents, but
+    children are split in proportion to a softmax of each parent's lineage
+    productivity (the decayed mean fitness gain of children over parents along
+    its ancestry, see LineageGraph.productivity). A `min_share` of the breadth
+    is always split evenly so new lineages keep being explored.
+    """
+
+    name = "lineage"
+
+    def __init__(self, keep_fraction: float = 1 / 3, temperature: float = 0.02,
+                 min_share: float = 0.3, decay: float = 0.5):
+        """
+        Args:
+            keep_fraction: Fraction of the breadth kept as parents (default: 1/3)
+            temperature: Softmax temperature, in fitness units (default: 0.02)
+            min_share: Fraction of children split evenly across parents (default: 0.3)
+            decay: Weight multiplier per generation when scoring a lineage (default: 0.5)
+        """
+        self._keep_fraction = keep_fraction
+        self._temperature = temperature
+        self._min_share = min_share
+        self._decay = decay
+
+    def next_population(self, generator, round_results, best_prompt, best_fitness, breadth, candidates=None):
+        candidates = candidates or breadth
+        ranked = sorted(round_results, key=lambda x: x['fitness'], reverse=True)
+        top_k = max(1, int(breadth * self._keep_fraction))
+        parents = list(dict.fromkeys(r['prompt'] for r in ranked[:top_k]))
+
+        gains = [generator.lineage.productivity(p, self._decay) for p in parents]
+        top_gain = max(gains)
+        weights = [math.exp((g - top_gain) / max(self._temperature, 1e-9)) for g in gains]
+        total = sum(weights)
+        shares = [self._min_share / len(parents) + (1 - self._min_share) * w / total for w in weights]
+
+        # Largest-remainder rounding of the shares to whole children
+        exact = [share * candidates for share in shares]
+        allocation = Counter({p: int(x) for p, x in zip(parents, exact)})
+        by_remainder = sorted(range(len(parents)), key=lambda i: exact[i] - int(exact[i]), reverse=True)
+        for i in by_remainder[:candidates - sum(allocation.values())]:
+            allocation[parents[i]] += 1
+        allocation = +allocation
+
+        _logger.info(f"Lineage allocation: {[(round(g, 4), allocation[p]) for p, g in zip(parents, gains)][:5]}")
+
+        next_prompts = [child for child, _ in self._expand(generator, allocation)]
+        return self._fill(generator, next_prompts, best_prompt, candidates)
+
+
+STRATEGIES = {
+    BeamSearchStrategy.name: BeamSearchStrategy,
+    TournamentStrategy.name: TournamentStrategy,
+    UCBBanditStrategy.name: UCBBanditStrategy,
+    SimulatedAnnealingStrategy.name: SimulatedAnnealingStrategy,
+    LineageStrategy.name: LineageStrategy,
+}
+
+
+def get_strategy(name: str, **kwargs) -> SearchStrategy:
+    """
+    Build a strategy by name.
+
+    Args:
+        name: One of 'beam', 'tournament', 'ucb', 'annealing', 'lineage'
+        **kwargs: Passed to the strategy constructor
+
+    Returns:
+        A new SearchStrategy instance
+    """
+    if name not in STRATEGIES:
+        raise ValueError(f"Unknown search strategy '{name}'. Choose from: {', '.join(STRATEGIES)}")
+    return STRATEGIES[name](**kwargs)
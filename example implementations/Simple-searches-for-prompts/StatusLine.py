@@ -0,0 +1,150 @@
+"""
+StatusLine: A single live progress line for long-running optimization runs
+
+While active, the status line is redrawn in place (carriage return + clear)
+whenever a field changes, and ordinary print() output is written above it, so
+the log keeps scrolling while the progress line stays at the bottom. When
+stdout is not a terminal (scripts, CI, redirected logs) updates are written as
+plain lines, at most once every `interval` seconds.
+
+Typical usage:
+    status = StatusLine(prefix="run 20250101_120000")
+    with status:
+        status.update(round="1/5", phase="evaluating", done=120, total=400)
+        print("regular log lines still work")
+"""
+
+import sys
+import threading
+import time
+from typing import Optional
+
+_CLEAR = "\r\033[K"
+
+
+class StatusLine:
+    """
+    Progress line that stays at the bottom of the terminal.
+    """
+
+    def __init__(self, prefix: str = "", stream=None, interval: float = 30.0):
+        """
+        Args:
+            prefix: Text shown at the start of the line (e.g. the run id)
+            stream: Output stream (default: sys.stdout when the line is started)
+            interval: Minimum seconds between updates when the stream is not a terminal (default: 30)
+        """
+        self.prefix = prefix
+        self.interval = interval
+        self._stream = stream
+        self._fields = {}
+        self._lock = threading.RLock()
+        self._line = ""
+        self._shown = False
+        self._partial = False
+        self._started = time.time()
+        self._last_plain = 0.0
+        self._saved_stdout = None
+        self._tty = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        """Take over sys.stdout so prints are written above the status line."""
+        with self._lock:
+            if self._saved_stdout is not None:
+                return
+            self._stream = self._stream or sys.stdout
+            self._tty = hasattr(self._stream, 'isatty') and self._stream.isatty()
+            self._saved_stdout = sys.stdout
+            self._started = time.time()
+            sys.stdout = self
+
+    def stop(self):
+        """Finish the status line and restore sys.stdout."""
+        with self._lock:
+            if self._saved_stdout is None:
+                return
+            if self._tty and self._shown:
+                self._stream.write("\n")
+            elif not self._tty and self._fields:
+                self._stream.write(self._render() + "\n")
+            self._stream.flush()
+            sys.stdout = self._saved_stdout
+            self._saved_stdout = None
+            self._line = ""
+            self._shown = False
+
+    def update(self, **fields):
+        """
+        Set status fields and redraw the line.
+
+        A field set to None is removed. Fields are shown in the order they were first set.
+        """
+        with self._lock:
+            for key, value in fields.items():
+                if value is None:
+                    self._fields.pop(key, None)
+                else:
+                    self._fields[key] = value
+            self._draw()
+
+    def _render(self) -> str:
+        elapsed = int(time.time() - self._started)
+        parts = [self.prefix] if self.prefix else []
+        for key, value in self._fields.items():
+            if isinstance(value, float):
+                value = f"{value:.4f}"
+            parts.append(f"{key} {value}")
+        parts.append(f"{elapsed // 3600:d}:{elapsed % 3600 // 60:02d}:{elapsed % 60:02d}")
+        return "⏳ " + " | ".join(parts)
+
+    def _draw(self):
+        stream = self._stream or sys.stdout
+        if self._saved_stdout is None:
+            return
+        if self._tty:
+            self._line = self._render()
+            # Wait for a partly printed log line to be finished
+            if not self._partial:
+                stream.write(_CLEAR + self._line)
+                self._shown = True
+                stream.flush()
+        elif time.time() - self._last_plain >= self.interval:
+            self._last_plain = time.time()
+            stream.write(self._render() + "\n")
+            stream.flush()
+
+    # File-like interface used while the line owns sys.stdout
+
+    def write(self, text: str) -> int:
+        with self._lock:
+            if not self._tty or not self._line:
+                return self._stream.write(text)
+            if self._shown:
+                self._stream.write(_CLEAR)
+                self._shown = False
+            self._stream.write(text)
+            self._partial = bool(text) and not text.endswith("\n")
+            if not self._partial:
+                self._stream.write(self._line)
+                self._shown = True
+            self._stream.flush()
+            return len(text)
+
+    def flush(self):
+        with self._lock:
+            self._stream.flush()
+
+    def isatty(self) -> bool:
+        return self._tty
+
+    @property
+    def encoding(self) -> Optional[str]:
+        return getattr(self._stream, 'encoding', None)
@@ -0,0 +1,186 @@
+"""
+StoppingRules: Convergence-based early termination for PromptGenerator
+
+Each rule inspects the state of the optimization after a round and returns a
+stopping reason, or None to keep going. PromptGenerator checks its rules after
+every round; the first rule that fires ends the run, the final results are
+still written, and the reason is recorded under 'stopped_reason'.
+
+Available rules:
+- PatienceRule: best fitness has not improved by `min_improvement` for `patience` rounds
+- ConfidenceOverlapRule: the round's best prompt is not significantly better than
+  the previous best (per-example confidence intervals overlap)
+- BudgetRule: wall-clock time, evaluator requests or tokens would exceed a cap
+
+Typical usage:
+    from PromptGenerator import PromptGenerator
+    from StoppingRules import PatienceRule, BudgetRule
+
+    generator = PromptGenerator(
+        base_prompt="You are a helpful assistant.",
+        metric=similarity_metric,
+        max_rounds=10,
+        stopping_rules=[
+            PatienceRule(patience=2, min_improvement=0.01),
+            BudgetRule(max_seconds=4 * 3600, max_requests=50000)
+        ]
+    )
+"""
+
+import math
+from statistics import mean, stdev
+from typing import Dict, List, Optional
+
+
+class StoppingRule:
+    """
+    Base class for stopping rules.
+
+    `check` receives a state dictionary built by PromptGenerator after each round:
+        - 'round_num': Index of the round just completed
+        - 'best_history': Best fitness so far after each completed round
+        - 'round_best_scores': Per-example scores of this round's best prompt
+        - 'previous_best_scores': Per-example scores of the best prompt before this round
+        - 'elapsed_seconds': Wall-clock time spent in optimize()
+        - 'usage': Dict with 'requests', 'prompt_tokens' and 'completion_tokens'
+        - 'next_round_requests': Evaluator requests the next round would need
+    """
+
+    def check(self, state: Dict) -> Optional[str]:
+        """
+        Decide whether to stop.
+
+        Args:
+            state: Optimization state after the round
+
+        Returns:
+            A human-readable stopping reason, or None to continue
+        """
+        raise NotImplementedError
+
+    def state_dict(self) -> Dict:
+        """Return JSON-serialisable rule state for checkpointing."""
+        return {}
+
+    def load_state_dict(self, state: Dict):
+        """Restore rule state from a checkpoint."""
+        pass
+
+
+class PatienceRule(StoppingRule):
+    """Stop when best fitness has not improved enough within a patience window."""
+
+    def __init__(self, patience: int = 3, min_improvement: float = 0.0):
+        """
+        Args:
+            patience: Number of rounds to wait for an improvement (default: 3)
+            min_improvement: Smallest gain that counts as an improvement (default: 0.0)
+        """
+        self._patience = patience
+        self._min_improvement = min_improvement
+
+    def check(self, state: Dict) -> Optional[str]:
+        history = state['best_history']
+        if len(history) <= self._patience:
+            return None
+
+        gain = history[-1] - history[-1 - self._patience]
+        if gain <= self._min_improvement:
+            return (f"patience: best fitness improved by {gain:.4f} over the last "
+                    f"{self._patience} rounds (min {self._min_improvement:.4f})")
+        return None
+
+
+class ConfidenceOverlapRule(StoppingRule):
+    """
+    Stop when the round's best prompt is statistically indistinguishable from
+    the previous best.
+
+    A normal-approximation confidence interval is built from the per-example
+    scores of each prompt. If the intervals overlap for `patience` consecutive
+    rounds, further rounds are unlikely to produce a meaningful gain.
+    """
+
+    def __init__(self, z: float = 1.96, patience: int = 1):
+        """
+        Args:
+            z: Critical value for the interval (default: 1.96, i.e. 95%)
+            patience: Consecutive overlapping rounds required to stop (default: 1)
+        """
+        self._z = z
+        self._patience = patience
+        self._overlaps = 0
+
+    def _interval(self, scores: List[float]):
+        centre = mean(scores)
+        if len(scores) < 2:
+            return centre, centre
+        half_width = self._z * stdev(scores) / math.sqrt(len(scores))
+        return centre - half_width, centre + half_width
+
+    def check(self, state: Dict) -> Optional[str]:
+        current = state.get('round_best_scores')
+        previous = state.get('previous_best_scores')
+        if not current or not previous:
+            return None
+
+        current_low, current_high = self._interval(current)
+        previous_low, previous_high = self._interval(previous)
+        if current_low <= previous_high and previous_low <= current_high:
+            self._overlaps += 1
+        else:
+            self._overlaps = 0
+
+        if self._overlaps >= self._patience:
+            return (f"confidence overlap: round best [{current_low:.4f}, {current_high:.4f}] overlaps "
+                    f"previous best [{previous_low:.4f}, {previous_high:.4f}] for {self._overlaps} round(s)")
+        return None
+
+    def state_dict(self) -> Dict:
+        return {'overlaps': self._overlaps}
+
+    def load_state_dict(self, state: Dict):
+        self._overlaps = state.get('overlaps', 0)
+
+
+class BudgetRule(StoppingRule):
+    """
+    Stop before a wall-clock or cost cap is exceeded.
+
+    Request caps are checked against the cost of the next round, so the run
+    stops before starting a round it cannot afford rather than after overshooting.
+    """
+
+    def __init__(self, max_seconds: Optional[float] = None, max_requests: Optional[int] = None,
+                 max_tokens: Optional[int] = None):
+        """
+        Args:
+            max_seconds: Wall-clock cap for optimize() in seconds
+            max_requests: Cap on evaluator requests
+            max_tokens: Cap on prompt plus completion tokens
+        """
+        self._max_seconds = max_seconds
+        self._max_requests = max_requests
+        self._max_tokens = max_tokens
+
+    def check(self, state: Dict) -> Optional[str]:
+        usage = state['usage']
+
+        if self._max_seconds is not None and state['elapsed_seconds'] >= self._max_seconds:
+            return f"budget: wall-clock {state['elapsed_seconds']:.0f}s reached cap of {self._max_seconds:.0f}s"
+
+        if self._max_requests is not None:
+            projected = usage['requests'] + state['next_round_requests']
+            if projected > self._max_requests:
+                return (f"budget: next round would bring requests to {projected} "
+                        f"(cap {self._max_requests})")
+
+        if self._max_tokens is not None:
+            spent = usage['prompt_tokens'] + usage['completion_tokens']
+            # Estimate the next round from the average tokens per request so far
+            per_request = spent / usage['requests'] if usage['requests'] else 0
+            projected = spent + per_request * state['next_round_requests']
+            if projected > self._max_tokens:
+                return f"budget: next round would bring tokens to {projected:.0f} (cap {self._max_tokens})"
+
+        return None
@@ -0,0 +1,187 @@
+"""
+Transport: Shared, tunable HTTP transport for OpenAI clients
+
+By default every OpenAI() client owns a private connection pool, so the
+generator and evaluator of one run, and every run in a process, open and
+TLS-handshake their own connections. This module provides one configurable
+httpx transport and a registry of OpenAI clients built on it: clients are
+shared whenever the API key and base URL match.
+
+The transport traces connection setup through httpcore, so the number of new
+TCP connections, TLS handshakes, reused connections and time spent in
+handshakes are available from `stats()`.
+
+Typical usage:
+    from Transport import HttpTransport, get_client
+
+    transport = HttpTransport(max_keepalive_connections=50, http2=True, timeout=120)
+    client = get_client(transport=transport)          # shared by every caller
+    print(transport.stats())
+"""
+
+import threading
+import time
+import logging
+from typing import Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+
+_logger = logging.getLogger("prompt_generator")
+
+
+class HttpTransport:
+    """
+    Connection pool and HTTP settings shared by OpenAI clients.
+
+    Attributes:
+        client (httpx.Client): The pooled HTTP client passed to OpenAI clients
+        base_url (str): Optional base URL override for clients built on this transport
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 600.0,
+        connect_timeout: float = 10.0,
+        proxy: Optional[str] = None,
+        base_url: Optional[str] = None
+    ):
+        """
+        Args:
+            max_connections: Maximum concurrent connections (default: 100)
+            max_keepalive_connections: Idle connections kept open for reuse (default: 20)
+            keepalive_expiry: Seconds an idle connection is kept (default: 30)
+            http2: Use HTTP/2 if the 'h2' package is installed (default: False)
+            timeout: Read/write/pool timeout in seconds (default: 600)
+            connect_timeout: Connection timeout in seconds (default: 10)
+            proxy: Optional proxy URL
+            base_url: Optional API base URL override (e.g. a gateway or compatible server)
+        """
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        self._stats = {
+            'requests': 0,
+            'new_connections': 0,
+            'tls_handshakes': 0,
+            'connect_seconds': 0.0,
+            'tls_seconds': 0.0
+        }
+        self._started: Dict[str, float] = {}
+
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                _logger.warning("HTTP/2 requested but the 'h2' package is not installed; using HTTP/1.1")
+                http2 = False
+        self.http2 = http2
+
+        import httpx
+
+        self.client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            http2=http2,
+            proxy=proxy,
+            event_hooks={'request': [self._on_request]}
+        )
+
+    def _on_request(self, request: "httpx.Request"):
+        with self._lock:
+            self._stats['requests'] += 1
+        request.extensions['trace'] = self._trace
+
+    def _trace(self, event_name: str, info: Dict):
+        """Count connection setup events reported by httpcore."""
+        key = f"{threading.get_ident()}:{event_name.rsplit('.', 1)[0]}"
+        now = time.perf_counter()
+        if event_name.endswith('.started'):
+            self._started[key] = now
+            return
+
+        started = self._started.pop(key, None)
+        if not event_name.endswith('.complete'):
+            return
+        with self._lock:
+            if event_name == 'connection.connect_tcp.complete':
+                self._stats['new_connections'] += 1
+                if started is not None:
+                    self._stats['connect_seconds'] += now - started
+            elif event_name == 'connection.start_tls.complete':
+                self._stats['tls_handshakes'] += 1
+                if started is not None:
+                    self._stats['tls_seconds'] += now - started
+
+    def stats(self) -> Dict:
+        """
+        Return connection reuse and handshake statistics.
+
+        Returns:
+            Dict with 'requests', 'new_connections', 'reused_connections',
+            'tls_handshakes', 'reuse_rate', 'connect_seconds' and 'tls_seconds'
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        stats['reused_connections'] = max(0, stats['requests'] - stats['new_connections'])
+        stats['reuse_rate'] = stats['reused_connections'] / stats['requests'] if stats['requests'] else 0.0
+        stats['http2'] = self.http2
+        return stats
+
+    def close(self):
+        """Close all pooled connections."""
+        self.client.close()
+
+
+_default_transport: Optional[HttpTransport] = None
+_clients: Dict = {}
+_registry_lock = threading.Lock()
+
+
+def default_transport() -> HttpTransport:
+    """Return the process-wide transport, creating it with default settings."""
+    global _default_transport
+    with _registry_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
+
+
+def get_client(api_key: Optional[str] = None, base_url: Optional[str] = None,
+               transport: Optional[HttpTransport] = None):
+    """
+    Return a shared OpenAI client for an API key, base URL and transport.
+
+    Callers asking for the same (api_key, base_url, transport) get the same
+    client, and therefore the same connection pool.
+
+    Args:
+        api_key: Optional API key (uses env var if None)
+        base_url: Optional base URL (falls back to the transport's, then the SDK default)
+        transport: Transport to build on (default: the process-wide transport)
+
+    Returns:
+        An OpenAI client
+    """
+    from openai import OpenAI
+
+    transport = transport or default_transport()
+    base_url = base_url or transport.base_url
+    key = (api_key, base_url, id(transport))
+
+    with _registry_lock:
+        if key not in _clients:
+            kwargs = {'http_client': transport.client}
+            if api_key:
+                kwargs['api_key'] = api_key
+            if base_url:
+                kwargs['base_url'] = base_url
+            _clients[key] = OpenAI(**kwargs)
+        return _clients[key]
@@ -0,0 +1,508 @@
+"""
+TreeSearch: Few-shot example selection from a dataset, backed by a vector index
+
+Where PromptGenerator rewrites the instructions of a prompt, TreeSearch keeps
+the instructions and searches for the few-shot examples to show with them.
+
+ExampleIndex embeds the inputs of an example pool (e.g. eval.csv's Java
+question/answer pairs) once and keeps them as a normalised NumPy matrix for
+exact cosine search. An optional IVF index (k-means coarse quantizer with
+inverted lists) narrows each query to the `nprobe` nearest lists for large
+pools. Both are persisted to disk (vectors as a memory-mappable .npy file) and
+reused as long as the pool and embedding match.
+
+Two ways to use the index:
+
+- NearestNeighbourFewShot: per-input retrieval. Passed to PromptGenerator as
+  `example_selector`, every evaluation request gets the k pool examples nearest
+  to its own input appended to the system prompt, on any evaluation engine.
+- TreeSearch: beam search over fixed example sets. Each level adds one example
+  to each set in the beam; candidates are the pool examples nearest to the
+  evaluation inputs, leaving out every pool example whose input is in the
+  evaluation set, so no scored set shows the answer to a question it is scored
+  on. Every level is scored as a round with the generator's evaluation engine
+  and recorded in its run store, like an optimize() round.
+
+Typical usage:
+    from Datasets import load_examples
+    from TreeSearch import ExampleIndex, NearestNeighbourFewShot, TreeSearch
+
+    pool = load_examples("eval.csv")
+    index = ExampleIndex.open(pool, "results/example_index", ivf=True)
+
+    # Per-input nearest-neighbour few-shots during prompt optimization
+    generator = PromptGenerator(base_prompt="...", metric=metric,
+                                example_selector=NearestNeighbourFewShot(index, k=3))
+
+    # Search for the best fixed few-shot set
+    result = TreeSearch(generator, index, shots=3).search(evaluation_set)
+
+Command line:
+    python TreeSearch.py build --eval eval.csv --index results/example_index --ivf
+    python TreeSearch.py query --index results/example_index -k 3 "How do I reverse a list in Java?"
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from Caches import EmbeddingCache
+from Diversity import hashed_ngram_embedding
+
+_logger = logging.getLogger("prompt_generator")
+
+
+def format_examples(examples: Sequence[Dict], heading: str = "Examples") -> str:
+    """
+    Format examples as a few-shot block appended to a system prompt.
+
+    Args:
+        examples: Dicts with 'input' and 'expected'
+        heading: Title of the block (default: 'Examples')
+
+    Returns:
+        The block, starting with a blank line (empty string if there are no examples)
+    """
+    if not examples:
+        return ""
+    shots = "\n\n".join(f"Input:\n{example['input']}\nOutput:\n{example['expected']}" for example in examples)
+    return f"\n\n{heading}:\n\n{shots}"
+
+
+class ExampleIndex:
+    """
+    Exact (and optionally IVF) cosine-similarity index over the inputs of an example pool.
+    """
+
+    def __init__(self, examples: List[Dict], vectors, embed: Optional[Callable] = None,
+                 embed_name: str = "hashed-ngram", fingerprint: Optional[str] = None):
+        """
+        Args:
+            examples: Pool of dicts with 'input' and 'expected'
+            vectors: (n, d) normalised embeddings of the inputs
+            embed: Function mapping texts to vectors, used for queries (default: hashed n-grams)
+            embed_name: Name of the embedding, stored to detect stale indexes
+            fingerprint: Hash of the pool and embedding (computed if None)
+        """
+        self.examples = examples
+        self.vectors = vectors
+        self.embed_name = embed_name
+        self.fingerprint = fingerprint or self.compute_fingerprint(examples, embed_name)
+        self._queries = EmbeddingCache(embed or hashed_ngram_embedding, max_entries=10000)
+        self._input_ids: Dict[str, List[int]] = {}
+        for i, example in enumerate(examples):
+            self._input_ids.setdefault(str(example['input']), []).append(i)
+        self._centroids = None
+        self._list_offsets = None
+        self._list_ids = None
+        self.nprobe = 8
+
+    @staticmethod
+    def compute_fingerprint(examples: List[Dict], embed_name: str) -> str:
+        digest = hashlib.sha256(embed_name.encode('utf-8'))
+        for example in examples:
+            digest.update(b"\x00" + str(example['input']).encode('utf-8'))
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, examples: List[Dict], embed: Optional[Callable] = None, embed_name: str = "hashed-ngram",
+              ivf: bool = False, nlist: Optional[int] = None, batch_size: int = 256) -> "ExampleIndex":
+        """
+        Embed a pool and build its index.
+
+        Args:
+            examples: Pool of dicts with 'input' and 'expected'
+            embed: Function mapping texts to vectors (default: hashed n-grams)
+            embed_name: Name of the embedding, stored to detect stale indexes
+            ivf: Also build an IVF index (default: False)
+            nlist: Number of IVF lists (default: sqrt of the pool size)
+            batch_size: Texts embedded per call (default: 256)
+        """
+        import numpy as np
+
+        embed = embed or hashed_ngram_embedding
+        texts = [str(example['input']) for example in examples]
+        chunks = [np.asarray(embed(texts[i:i + batch_size]), dtype=np.float32)
+                  for i in range(0, len(texts), batch_size)]
+        vectors = np.concatenate(chunks) if chunks else np.zeros((0, 1), dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        index = cls(examples, vectors, embed, embed_name)
+        if ivf:
+            index.build_ivf(nlist)
+        return index
+
+    def build_ivf(self, nlist: Optional[int] = None, iterations: int = 10, seed: int = 0):
+        """
+        Cluster the vectors with spherical k-means and build inverted lists.
+
+        Args:
+            nlist: Number of lists (default: sqrt of the pool size)
+            iterations: k-means iterations (default: 10)
+            seed: Random seed for the initial centroids (default: 0)
+        """
+        import numpy as np
+
+        n = len(self.vectors)
+        nlist = max(1, min(n, nlist or int(round(n ** 0.5))))
+        rng = np.random.default_rng(seed)
+        centroids = self.vectors[rng.choice(n, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(self.vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, self.vectors)
+            counts = np.bincount(assignment, minlength=nlist)
+            empty = counts == 0
+            # Re-seed empty lists with random points
+            sums[empty] = self.vectors[rng.choice(n, int(empty.sum()))]
+            centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-12)
+        assignment = np.argmax(self.vectors @ centroids.T, axis=1)
+        order = np.argsort(assignment, kind='stable')
+        self._centroids = centroids.astype(np.float32)
+        self._list_ids = order.astype(np.int64)
+        self._list_offsets = np.concatenate([[0], np.cumsum(np.bincount(assignment, minlength=nlist))]).astype(np.int64)
+
+    @property
+    def has_ivf(self) -> bool:
+        return self._centroids is not None
+
+    def save(self, path: str):
+        """
+        Write the index to a directory (vectors.npy, ivf.npz, examples.json, meta.json).
+        """
+        import numpy as np
+
+        directory = Path(path)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "vectors.npy", np.asarray(self.vectors))
+        if self.has_ivf:
+            np.savez(directory / "ivf.npz", centroids=self._centroids, offsets=self._list_offsets, ids=self._list_ids)
+        elif (directory / "ivf.npz").exists():
+            (directory / "ivf.npz").unlink()
+        with open(directory / "examples.json", 'w') as f:
+            json.dump(self.examples, f)
+        with open(directory / "meta.json", 'w') as f:
+            json.dump({'fingerprint': self.fingerprint, 'embed_name': self.embed_name,
+                       'count': len(self.examples), 'dim': int(self.vectors.shape[1]),
+                       'ivf_lists': int(len(self._centroids)) if self.has_ivf else None}, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, embed: Optional[Callable] = None) -> "ExampleIndex":
+        """
+        Load an index written by save(). The vectors are memory-mapped.
+
+        Args:
+            path: Index directory
+            embed: Query embedding function; must match the one the index was built with
+        """
+        import numpy as np
+
+        directory = Path(path)
+        with open(directory / "meta.json") as f:
+            meta = json.load(f)
+        with open(directory / "examples.json") as f:
+            examples = json.load(f)
+        index = cls(examples, np.load(directory / "vectors.npy", mmap_mode='r'), embed,
+                    meta['embed_name'], meta['fingerprint'])
+        if (directory / "ivf.npz").exists():
+            ivf = np.load(directory / "ivf.npz")
+            index._centroids, index._list_offsets, index._list_ids = ivf['centroids'], ivf['offsets'], ivf['ids']
+        return index
+
+    @classmethod
+    def open(cls, examples: List[Dict], path: str, embed: Optional[Callable] = None,
+             embed_name: str = "hashed-ngram", ivf: bool = False, nlist: Optional[int] = None) -> "ExampleIndex":
+        """
+        Load the index at `path` if it matches the pool and embedding, otherwise build and save it.
+        """
+        meta_file = Path(path) / "meta.json"
+        if meta_file.exists():
+            with open(meta_file) as f:
+                meta = json.load(f)
+            if meta.get('fingerprint') == cls.compute_fingerprint(examples, embed_name) \
+                    and (meta.get('ivf_lists') is not None or not ivf):
+                print(f"📇 Loaded example index from {path} ({meta['count']} examples)")
+                return cls.load(path, embed)
+        started = time.monotonic()
+        index = cls.build(examples, embed, embed_name, ivf, nlist)
+        index.save(path)
+        print(f"📇 Built example index over {len(examples)} examples in {time.monotonic() - started:.1f}s: {path}")
+        return index
+
+    def search(self, queries: List[str], k: int = 3, exclude_same_input: bool = True,
+               use_ivf: Optional[bool] = None, distinct: bool = True) -> List[List[Tuple[int, float]]]:
+        """
+        Find the pool examples whose inputs are nearest to each query.
+
+        Args:
+            queries: Query texts
+            k: Neighbours per query
+            exclude_same_input: Skip pool examples whose input equals the query, so an
+                evaluation example never sees its own answer (default: True)
+            distinct: Return each distinct input once, since repeated pool rows add
+                nothing to a few-shot block (default: True)
+            use_ivf: Search the `nprobe` nearest IVF lists, probing more when they hold fewer
+                than k usable neighbours (default: when an IVF index exists)
+
+        Returns:
+            For each query, (pool index, cosine similarity) pairs, most similar first
+        """
+        import numpy as np
+
+        if not queries:
+            return []
+        query_vectors = np.asarray(self._queries.embed(list(queries)), dtype=np.float32)
+        query_vectors /= np.maximum(np.linalg.norm(query_vectors, axis=1, keepdims=True), 1e-12)
+        use_ivf = self.has_ivf if use_ivf is None else use_ivf and self.has_ivf
+
+        results = []
+        for query, vector in zip(queries, query_vectors):
+            excluded = set(self._input_ids.get(str(query), [])) if exclude_same_input else set()
+            if not use_ivf:
+                results.append(self._nearest(self.vectors @ vector, None, k, excluded, distinct))
+                continue
+            list_order = np.argsort(-(self._centroids @ vector))
+            nprobe = self.nprobe
+            while True:
+                candidates = np.concatenate([self._list_ids[self._list_offsets[l]:self._list_offsets[l + 1]]
+                                             for l in list_order[:nprobe]])
+                neighbours = self._nearest(self.vectors[candidates] @ vector, candidates, k, excluded, distinct)
+                # Excluded and repeated inputs can use up the probed lists; probe more, up to all of them
+                if len(neighbours) == k or nprobe >= len(list_order):
+                    break
+                nprobe *= 2
+            results.append(neighbours)
+        return results
+
+    def _nearest(self, scores, candidates, k: int, excluded: set, distinct: bool) -> List[Tuple[int, float]]:
+        """Pick the k best usable neighbours among scored candidates (pool rows if `candidates` is None)."""
+        import numpy as np
+
+        want = k + len(excluded)
+        while True:
+            # Widen the partial sort until k usable neighbours are found
+            want = min(len(scores), want)
+            top = np.argpartition(-scores, want - 1)[:want] if want < len(scores) else np.arange(len(scores))
+            top = top[np.argsort(-scores[top], kind='stable')]
+            neighbours, seen_inputs = [], set()
+            for position in top:
+                pool_idx = int(candidates[position]) if candidates is not None else int(position)
+                text = str(self.examples[pool_idx]['input'])
+                if pool_idx in excluded or (distinct and text in seen_inputs):
+                    continue
+                seen_inputs.add(text)
+                neighbours.append((pool_idx, float(scores[position])))
+                if len(neighbours) == k:
+                    break
+            if len(neighbours) == k or want == len(scores):
+                return neighbours
+            want *= 4
+
+
+class NearestNeighbourFewShot:
+    """
+    Per-input few-shot block from the k nearest pool examples.
+
+    Pass as PromptGenerator's `example_selector`. Retrievals are cached per
+    input, so each evaluation input is looked up once per run.
+    """
+
+    def __init__(self, index: ExampleIndex, k: int = 3, heading: str = "Examples"):
+        """
+        Args:
+            index: Index over the example pool
+            k: Examples per input (default: 3)
+            heading: Title of the few-shot block (default: 'Examples')
+        """
+        self.index = index
+        self.k = k
+        self._heading = heading
+        self._lock = threading.Lock()
+        self._blocks: Dict[str, str] = {}
+        self._lookups = 0
+        self._lookup_seconds = 0.0
+
+    def __call__(self, text: str) -> str:
+        with self._lock:
+            block = self._blocks.get(text)
+        if block is None:
+            started = time.perf_counter()
+            neighbours = self.index.search([text], self.k)[0]
+            block = format_examples([self.index.examples[i] for i, _ in neighbours], self._heading)
+            with self._lock:
+                self._lookups += 1
+                self._lookup_seconds += time.perf_counter() - started
+                self._blocks[text] = block
+        return block
+
+    def stats(self) -> Dict:
+        """Return retrieval count and mean lookup latency in milliseconds."""
+        with self._lock:
+            return {'lookups': self._lookups,
+                    'mean_lookup_ms': 1000 * self._lookup_seconds / self._lookups if self._lookups else None}
+
+
+class TreeSearch:
+    """
+    Beam search over few-shot example sets, scored with a PromptGenerator's engine.
+    """
+
+    def __init__(self, generator, index: ExampleIndex, shots: int = 3, beam_width: int = 4,
+                 branching: int = 6, neighbours: int = 10):
+        """
+        Args:
+            generator: PromptGenerator whose engine, metric and run store are used
+            index: Index over the example pool
+            shots: Examples per prompt, i.e. tree depth (default: 3)
+            beam_width: Example sets kept per level (default: 4)
+            branching: Children per kept set (default: 6)
+            neighbours: Pool neighbours retrieved per evaluation input to form candidates (default: 10)
+        """
+        self._generator = generator
+        self._index = index
+        self._shots = shots
+        self._beam_width = beam_width
+        self._branching = branching
+        self._neighbours = neighbours
+
+    def _candidates(self, evaluation_set: List[Dict]) -> List[int]:
+        """
+        Rank pool examples by summed similarity to the evaluation inputs.
+
+        Pool examples whose input is any evaluation input are left out: the
+        chosen set is shown with every evaluation request, so such an example
+        would hand its answer to the request it matches.
+        """
+        queries = [str(e['input']) for e in evaluation_set]
+        evaluation_inputs = set(queries)
+        coverage: Dict[int, float] = {}
+        for neighbours in self._index.search(queries, self._neighbours):
+            for pool_idx, similarity in neighbours:
+                if str(self._index.examples[pool_idx]['input']) in evaluation_inputs:
+                    continue
+                coverage[pool_idx] = coverage.get(pool_idx, 0.0) + similarity
+        return sorted(coverage, key=coverage.get, reverse=True)
+
+    def _prompt(self, base_prompt: str, example_ids: Tuple[int, ...]) -> str:
+        return base_prompt + format_examples([self._index.examples[i] for i in example_ids])
+
+    def search(self, evaluation_set: List[Dict], base_prompt: Optional[str] = None) -> Dict:
+        """
+        Find the few-shot example set that scores best on the evaluation set.
+
+        Level 0 evaluates the base prompt alone; level l evaluates sets of l examples.
+
+        Args:
+            evaluation_set: Test cases with 'input' and 'expected' keys
+            base_prompt: Instructions to add examples to (default: the generator's base prompt)
+
+        Returns:
+            Dictionary with 'best_prompt', 'best_fitness', 'best_examples' (pool indices),
+            'all_results', 'rounds' and 'stopped_reason', saved like an optimize() result
+        """
+        generator = self._generator
+        base_prompt = base_prompt or generator._base_prompt
+        run_id = generator._run_start
+        started = time.monotonic()
+        candidates = self._candidates(evaluation_set)
+        print(f"🌳 Tree search over {len(candidates)} candidate examples "
+              f"(depth {self._shots}, beam {self._beam_width}, branching {self._branching})")
+
+        generator._store.start_run(run_id, {'search': 'tree', 'base_prompt': base_prompt, 'shots': self._shots,
+                                            'beam_width': self._beam_width, 'branching': self._branching,
+                                            'engine': generator._engine.name, 'pool_size': len(self._index.examples),
+                                            'index': self._index.embed_name, 'run_start': run_id,
+                                            'evaluator_model': generator._evaluator_models,
+                                            'model_aggregation': generator._model_aggregation,
+                                            'model_weights': dict(zip(generator._evaluator_models,
+                                                                      generator._model_weights))})
+        generator._store.record_examples(run_id, generator._expand_for_models(evaluation_set))
+
+        beam: List[Tuple[Tuple[int, ...], float]] = [((), 0.0)]
+        all_results = []
+        best = ((), float('-inf'))
+        stopped_reason = 'max_depth'
+        for level in range(self._shots + 1):
+            if level == 0:
+                sets = [()]
+            else:
+                sets = []
+                seen = set()
+                for example_ids, _ in beam:
+                    children = 0
+                    for candidate in candidates:
+                        child = tuple(sorted(example_ids + (candidate,)))
+                        if candidate in example_ids or child in seen:
+                            continue
+                        seen.add(child)
+                        sets.append(child)
+                        children += 1
+                        if children == self._branching:
+                            break
+                if not sets:
+                    stopped_reason = 'no_candidates'
+                    break
+
+            print(f"\n=== Level {level}/{self._shots}: {len(sets)} example sets ===")
+            prompts = [self._prompt(base_prompt, example_ids) for example_ids in sets]
+            fitness = generator.evaluate_round(prompts, evaluation_set, level)
+            for example_ids, prompt, score in zip(sets, prompts, fitness):
+                all_results.append({'round': level, 'prompt': prompt, 'fitness': score,
+                                    'examples': list(example_ids)})
+                if score > best[1]:
+                    best = (example_ids, score)
+                    print(f"✓ New best fitness: {score:.4f} with examples {list(example_ids)}")
+            beam = sorted(zip(sets, fitness), key=lambda x: x[1], reverse=True)[:self._beam_width]
+
+        final_result = {
+            'best_prompt': self._prompt(base_prompt, best[0]),
+            'best_fitness': best[1],
+            'best_examples': list(best[0]),
+            'all_results': all_results,
+            'rounds': level + 1,
+            'total_evaluations': len(all_results),
+            'stopped_reason': stopped_reason,
+            'usage': dict(generator._usage),
+            'elapsed_seconds': time.monotonic() - started
+        }
+        generator._save_final_results(final_result)
+        return final_result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query a few-shot example index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Embed an example pool and save its index")
+    build.add_argument("--eval", required=True, help="Example pool (CSV or JSON lines)")
+    build.add_argument("--index", required=True, help="Index directory")
+    build.add_argument("--ivf", action="store_true", help="Also build an IVF index")
+    build.add_argument("--nlist", type=int, help="IVF lists (default: sqrt of the pool size)")
+    query = commands.add_parser("query", help="Retrieve nearest examples for a text")
+    query.add_argument("--index", required=True, help="Index directory")
+    query.add_argument("-k", type=int, default=3, help="Neighbours (default: 3)")
+    query.add_argument("--exact", action="store_true", help="Ignore the IVF index")
+    query.add_argument("text")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        from Datasets import load_examples
+
+        index = ExampleIndex.build(load_examples(args.eval), ivf=args.ivf, nlist=args.nlist)
+        index.save(args.index)
+        print(f"✓ Indexed {len(index.examples)} examples in {args.index}")
+    else:
+        index = ExampleIndex.load(args.index)
+        started = time.perf_counter()
+        neighbours = index.search([args.text], args.k, use_ivf=not args.exact)[0]
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        for pool_idx, similarity in neighbours:
+            print(f"[{pool_idx}] {similarity:.3f}  {index.examples[pool_idx]['input'][:100]!r}")
+        print(f"⏱️  {elapsed_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+"""
+WorkQueue: Distributed evaluation over a SQLite-backed work queue
+
+In coordinator/worker mode, `optimize` pushes one task per (prompt, example)
+pair into a SQLite queue and waits while workers pull tasks, call the evaluator,
+run the metric and write the score back. A round therefore scales horizontally:
+start more workers, on this machine or on any machine that can open the queue
+file (a shared volume with working file locks).
+
+Workers lease tasks for a limited time. A task whose worker crashes is leased
+again once its lease expires; a task whose evaluator call or metric raises is
+retried up to `max_attempts` times before it is marked failed and scored as
+missing. Tasks are keyed by run, round, pair and request hash, so a resumed run
+reuses scores that workers already finished, and a row whose request differs
+from the one the coordinator now asks for is never taken as its score. Workers
+check the completion cache before calling the evaluator and draw calls from the
+rate limiter; local workers use the generator's own cache and limiter.
+
+Typical usage (coordinator):
+    from PromptGenerator import PromptGenerator
+    from WorkQueue import QueueEngine
+
+    generator = PromptGenerator(base_prompt="...", metric=sentence_similarity,
+                                engine=QueueEngine("/shared/queue.sqlite"))
+    generator.optimize(evaluation_set)
+
+Typical usage (each scoring box):
+    python WorkQueue.py --queue /shared/queue.sqlite \\
+        --metric example_prompt_generator:sentence_similarity --threads 8 \\
+        --completion-cache /shared/completions.sqlite --rpm 3000
+"""
+
+import argparse
+import importlib
+import json
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import os
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from Caches import CompletionCache, request_key
+from EvaluationEngine import EvaluationEngine
+from RateLimiter import RateLimiter, estimate_tokens
+
+_logger = logging.getLogger("prompt_generator")
+
+
+def _task_key(run_id: str, round_num: int, prompt_idx: int, example_idx: int, body: Dict) -> str:
+    """Key a task by run, round, (prompt, example) pair and request body hash."""
+    return f"{run_id}:{round_num}:{prompt_idx}:{example_idx}:{request_key(body)[:16]}"
+
+
+class SQLiteWorkQueue:
+    """
+    Lease-based task queue stored in a SQLite file.
+
+    Every method opens its own short-lived connection, so one instance can be
+    used from several threads and several processes can share the file.
+    """
+
+    def __init__(self, path: str, lease_seconds: float = 300.0, max_attempts: int = 3):
+        """
+        Args:
+            path: SQLite file holding the queue (created if missing)
+            lease_seconds: How long a worker owns a task before it can be re-leased (default: 300)
+            max_attempts: Attempts before a task is marked failed (default: 3)
+        """
+        self._path = path
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        with self._connect() as db:
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_key TEXT UNIQUE,
+                    run_id TEXT,
+                    round INTEGER,
+                    prompt_idx INTEGER,
+                    example_idx INTEGER,
+                    payload TEXT,
+                    status TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    lease_until REAL DEFAULT 0,
+                    worker TEXT,
+                    score REAL,
+                    prediction TEXT,
+                    prompt_tokens INTEGER,
+                    completion_tokens INTEGER,
+                    latency_ms REAL,
+                    error TEXT,
+                    seq INTEGER,
+                    updated REAL
+                )""")
+            db.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_until)")
+            db.execute("CREATE INDEX IF NOT EXISTS tasks_round ON tasks (run_id, round, seq)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self._path, timeout=60, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def push(self, run_id: str, round_num: int, tasks: List[Dict]) -> int:
+        """
+        Enqueue tasks for a round, skipping tasks that already exist.
+
+        Tasks that already failed (e.g. before the run was interrupted) are put
+        back in the queue with a fresh set of attempts, so a resumed run gets
+        another chance to score them; finished and in-flight tasks are kept.
+
+        Args:
+            run_id: Identifier of the optimization run
+            round_num: Round number
+            tasks: Dicts with 'prompt_idx', 'example_idx', 'body' and 'expected'
+
+        Returns:
+            Number of tasks inserted or re-queued
+        """
+        rows = []
+        now = time.time()
+        for task in tasks:
+            task_key = _task_key(run_id, round_num, task['prompt_idx'], task['example_idx'], task['body'])
+            payload = json.dumps({'body': task['body'], 'expected': task['expected']})
+            rows.append((task_key, run_id, round_num, task['prompt_idx'], task['example_idx'], payload, now))
+
+        with self._connect() as db:
+            before = db.total_changes
+            db.execute("BEGIN IMMEDIATE")
+            db.executemany(
+                "INSERT OR IGNORE INTO tasks (task_key, run_id, round, prompt_idx, example_idx, payload, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            db.executemany(
+                "UPDATE tasks SET status = 'pending', attempts = 0, lease_until = 0, seq = NULL, error = NULL, "
+                "updated = ? WHERE task_key = ? AND status = 'failed'", [(now, row[0]) for row in rows])
+            db.execute("COMMIT")
+            return db.total_changes - before
+
+    def lease(self, worker: str, limit: int = 1) -> List[Dict]:
+        """
+        Lease up to `limit` pending or expired tasks.
+
+        Args:
+            worker: Worker identifier recorded on the task
+            limit: Maximum number of tasks to lease (default: 1)
+
+        Returns:
+            Leased tasks as dicts with 'id', 'attempts', 'body' and 'expected'
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            rows = db.execute(
+                "SELECT id, attempts, payload FROM tasks "
+                "WHERE status = 'pending' OR (status = 'leased' AND lease_until < ?) "
+                "ORDER BY id LIMIT ?", (now, limit)).fetchall()
+            db.executemany(
+                "UPDATE tasks SET status = 'leased', lease_until = ?, worker = ?, attempts = attempts + 1, "
+                "updated = ? WHERE id = ?",
+                [(now + self._lease_seconds, worker, now, row['id']) for row in rows])
+            db.execute("COMMIT")
+
+        leased = []
+        for row in rows:
+            payload = json.loads(row['payload'])
+            leased.append({'id': row['id'], 'attempts': row['attempts'] + 1,
+                           'body': payload['body'], 'expected': payload['expected']})
+        return leased
+
+    def complete(self, task_id: int, score: float, prediction: str, usage: Optional[Dict] = None):
+        """
+        Record a task's score and prediction.
+
+        Tasks reach a final state at most once: a late result from a worker
+        whose lease already expired is ignored if another worker finished first.
+        Each final state gets the next completion sequence number, which is what
+        `results` streams by.
+        """
+        usage = usage or {}
+        with self._connect() as db:
+            db.execute("UPDATE tasks SET status = 'done', score = ?, prediction = ?, prompt_tokens = ?, "
+                       "completion_tokens = ?, latency_ms = ?, error = NULL, updated = ?, "
+                       "seq = (SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks) "
+                       "WHERE id = ? AND status NOT IN ('done', 'failed')",
+                       (score, prediction, usage.get('prompt_tokens'), usage.get('completion_tokens'),
+                        usage.get('latency_ms'), time.time(), task_id))
+
+    def fail(self, task_id: int, error: str):
+        """Return a task to the queue, or mark it failed once attempts are exhausted."""
+        with self._connect() as db:
+            db.execute("UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                       "seq = CASE WHEN attempts >= ? THEN (SELECT COALESCE(MAX(seq), 0) + 1 FROM tasks) END, "
+                       "lease_until = 0, error = ?, updated = ? WHERE id = ? AND status = 'leased'",
+                       (self._max_attempts, self._max_attempts, error, time.time(), task_id))
+
+    def results(self, run_id: str, round_num: int, after_seq: int = 0) -> List[Dict]:
+        """
+        Fetch tasks of a round that reached a final state (done or failed).
+
+        Args:
+            run_id: Identifier of the optimization run
+            round_num: Round number
+            after_seq: Only return tasks finished after this completion sequence number
+
+        Returns:
+            Dicts with 'seq', 'task_key', 'prompt_idx', 'example_idx', 'status', 'score', 'prediction',
+            'prompt_tokens', 'completion_tokens', 'latency_ms' and 'error', in completion order
+        """
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT seq, task_key, prompt_idx, example_idx, status, score, prediction, prompt_tokens, "
+                "completion_tokens, latency_ms, error FROM tasks "
+                "WHERE run_id = ? AND round = ? AND seq > ? ORDER BY seq",
+                (run_id, round_num, after_seq)).fetchall()
+        return [dict(row) for row in rows]
+
+    def counts(self, run_id: Optional[str] = None, round_num: Optional[int] = None) -> Dict[str, int]:
+        """Count tasks by status, optionally for one run and round."""
+        query = "SELECT status, COUNT(*) FROM tasks"
+        params = []
+        if run_id is not None:
+            query += " WHERE run_id = ?"
+            params.append(run_id)
+            if round_num is not None:
+                query += " AND round = ?"
+                params.append(round_num)
+        with self._connect() as db:
+            return dict(db.execute(query + " GROUP BY status", params).fetchall())
+
+
+class EvaluationWorker:
+    """
+    Pull evaluation tasks from the queue, call the evaluator and score the result.
+    """
+
+    def __init__(self, queue: SQLiteWorkQueue, metric: Callable, evaluator_client=None,
+                 worker_id: Optional[str] = None, batch_size: int = 4, idle_sleep: float = 2.0,
+                 completion_cache: Optional[CompletionCache] = None, rate_limiter: Optional[RateLimiter] = None):
+        """
+        Args:
+            queue: Work queue to pull from
+            metric: Function (expected, predicted) -> float
+            evaluator_client: OpenAI-compatible client (created from env vars if None)
+            worker_id: Identifier recorded on leased tasks (default: host:pid:thread)
+            batch_size: Tasks leased per queue round-trip (default: 4)
+            idle_sleep: Seconds to wait when the queue is empty (default: 2)
+            completion_cache: Optional cache consulted before, and filled after, each evaluator call
+            rate_limiter: Optional request/token budget every evaluator call draws from
+        """
+        if evaluator_client is None:
+            from openai import OpenAI
+            evaluator_client = OpenAI()
+
+        self._queue = queue
+        self._metric = metric
+        self._client = evaluator_client
+        self._completion_cache = completion_cache
+        self._rate_limiter = rate_limiter
+        self._worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self._batch_size = batch_size
+        self._idle_sleep = idle_sleep
+        self.completed = 0
+        self.failed = 0
+
+    def run_once(self) -> int:
+        """
+        Lease and process one group of tasks.
+
+        Returns:
+            Number of tasks processed
+        """
+        tasks = self._queue.lease(self._worker_id, self._batch_size)
+        for task in tasks:
+            try:
+                body = task['body']
+                prediction = self._completion_cache.get(body) if self._completion_cache else None
+                details = {}
+                if prediction is None:
+                    if self._rate_limiter:
+                        self._rate_limiter.acquire(requests=1, tokens=estimate_tokens(body))
+                    started = time.monotonic()
+                    response = self._client.chat.completions.create(**body)
+                    usage = getattr(response, 'usage', None)
+                    details = {
+                        'prompt_tokens': getattr(usage, 'prompt_tokens', None),
+                        'completion_tokens': getattr(usage, 'completion_tokens', None),
+                        'latency_ms': (time.monotonic() - started) * 1000
+                    }
+                    prediction = response.choices[0].message.content or ''
+                    if self._completion_cache:
+                        self._completion_cache.put(body, prediction)
+                score = self._metric(task['expected'], prediction)
+                self._queue.complete(task['id'], score, prediction, details)
+                self.completed += 1
+            except Exception as e:
+                _logger.error(f"Task {task['id']} attempt {task['attempts']} failed: {e}")
+                self._queue.fail(task['id'], str(e))
+                self.failed += 1
+        return len(tasks)
+
+    def run(self, stop_event: Optional[threading.Event] = None, exit_when_idle: bool = False):
+        """
+        Process tasks until stopped.
+
+        Args:
+            stop_event: Event that ends the loop when set
+            exit_when_idle: Return as soon as the queue has no leasable task
+        """
+        while not (stop_event and stop_event.is_set()):
+            if self.run_once() == 0:
+                if exit_when_idle:
+                    return
+                if stop_event:
+                    stop_event.wait(self._idle_sleep)
+                else:
+                    time.sleep(self._idle_sleep)
+
+
+class QueueEngine(EvaluationEngine):
+    """
+    Coordinator side of distributed evaluation.
+
+    Pushes a round's (prompt, example) tasks to the queue, then streams scores
+    back as workers finish them. With `local_workers` > 0, worker threads are
+    also started in this process, which is enough to use the engine on a single
+    machine.
+    """
+
+    name = "queue"
+
+    def __init__(self, queue_path: str, lease_seconds: float = 300.0, max_attempts: int = 3,
+                 poll_interval: float = 2.0, timeout: Optional[float] = None, local_workers: int = 0):
+        """
+        Args:
+            queue_path: SQLite file shared with the workers
+            lease_seconds: Task lease length before a silent worker's task is retried (default: 300)
+            max_attempts: Attempts per task before it is scored as missing (default: 3)
+            poll_interval: Seconds between result polls (default: 2)
+            timeout: Optional cap in seconds on waiting for one round
+            local_workers: Worker threads to run inside the coordinator (default: 0)
+        """
+        self._queue = SQLiteWorkQueue(queue_path, lease_seconds, max_attempts)
+        self._poll_interval = poll_interval
+        self._timeout = timeout
+        self._local_workers = local_workers
+
+    def score(self, generator, prompts, evaluation_set, round_num):
+        run_id = generator._run_start
+        tasks = [
+            {'prompt_idx': p, 'example_idx': e, 'body': generator._evaluation_body(prompt, example),
+             'expected': example['expected']}
+            for p, prompt in enumerate(prompts)
+            for e, example in enumerate(evaluation_set)
+        ]
+        # A resumed round can hold rows for other prompts at the same indices;
+        # only a row for this exact request scores a cell
+        task_keys = {(task['prompt_idx'], task['example_idx']):
+                     _task_key(run_id, round_num, task['prompt_idx'], task['example_idx'], task['body'])
+                     for task in tasks}
+        inserted = self._queue.push(run_id, round_num, tasks)
+        print(f"\n📮 Queued {inserted} new tasks ({len(tasks)} total) for round {round_num + 1}")
+
+        stop_event = threading.Event()
+        threads = []
+        for i in range(self._local_workers):
+            worker = EvaluationWorker(self._queue, generator._metric, generator._evaluator_client,
+                                      worker_id=f"local-{run_id}-{i}", idle_sleep=self._poll_interval,
+                                      completion_cache=generator._completion_cache,
+                                      rate_limiter=generator._rate_limiter)
+            thread = threading.Thread(target=worker.run, args=(stop_event,), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+        score_matrix: List[List[Optional[float]]] = [[None] * len(evaluation_set) for _ in prompts]
+        finished = set()
+        failed = 0
+        last_seq = 0
+        started = time.monotonic()
+        try:
+            while len(finished) < len(tasks):
+                rows = self._queue.results(run_id, round_num, last_seq)
+                for row in rows:
+                    last_seq = row['seq']
+                    cell = (row['prompt_idx'], row['example_idx'])
+                    if cell in finished or task_keys.get(cell) != row['task_key']:
+                        continue
+                    finished.add(cell)
+                    if row['status'] == 'done':
+                        score_matrix[cell[0]][cell[1]] = row['score']
+                        # Rows served from a worker's completion cache carry no latency or usage
+                        if row['latency_ms'] is not None:
+                            generator._record_usage({'prompt_tokens': row['prompt_tokens'],
+                                                     'completion_tokens': row['completion_tokens']})
+                        generator._record_cell_details(*cell, prompt_tokens=row['prompt_tokens'],
+                                                       completion_tokens=row['completion_tokens'],
+                                                       latency_ms=row['latency_ms'],
+                                                       completion=row['prediction'])
+                    else:
+                        failed += 1
+                if rows:
+                    generator._report_progress(f"   Scored {len(finished)}/{len(tasks)} tasks ({failed} failed)",
+                                               phase="scoring", done=f"{len(finished)}/{len(tasks)}",
+                                               failed=failed or None)
+                if len(finished) >= len(tasks):
+                    break
+                generator._check_cancelled()
+                if self._timeout is not None and time.monotonic() - started > self._timeout:
+                    _logger.warning(f"Round {round_num + 1} timed out with {len(tasks) - len(finished)} tasks unscored")
+                    break
+                time.sleep(self._poll_interval)
+        finally:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        return score_matrix
+
+
+def _load_metric(spec: str) -> Callable:
+    """Import a metric given as 'module:function'."""
+    module_name, _, function_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run evaluation workers for a PromptGenerator work queue")
+    parser.add_argument("--queue", required=True, help="SQLite queue file shared with the coordinator")
+    parser.add_argument("--metric", required=True, help="Metric as module:function, e.g. example_prompt_generator:sentence_similarity")
+    parser.add_argument("--threads", type=int, default=4, help="Worker threads in this process (default: 4)")
+    parser.add_argument("--lease-seconds", type=float, default=300.0, help="Task lease length (default: 300)")
+    parser.add_argument("--max-attempts", type=int, default=3, help="Attempts per task (default: 3)")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Stop once the queue is empty")
+    parser.add_argument("--completion-cache", help="SQLite file for the completion cache shared with other runs")
+    parser.add_argument("--rpm", type=float, help="Requests per minute limit shared by this process's workers")
+    parser.add_argument("--tpm", type=float, help="Tokens per minute limit shared by this process's workers")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    queue = SQLiteWorkQueue(args.queue, args.lease_seconds, args.max_attempts)
+    metric = _load_metric(args.metric)
+    completion_cache = CompletionCache(args.completion_cache) if args.completion_cache else None
+    rate_limiter = RateLimiter(args.rpm, args.tpm) if args.rpm or args.tpm else None
+
+    workers = [EvaluationWorker(queue, metric, completion_cache=completion_cache, rate_limiter=rate_limiter)
+               for _ in range(args.threads)]
+    threads = [threading.Thread(target=w.run, kwargs={'exit_when_idle': args.exit_when_idle}) for w in workers]
+    print(f"👷 Started {len(threads)} workers on {args.queue}")
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        print("Stopping workers...")
+    print(f"✓ Completed {sum(w.completed for w in workers)} tasks, {sum(w.failed for w in workers)} failures")
+
+
+if __name__ == "__main__":
+    main()
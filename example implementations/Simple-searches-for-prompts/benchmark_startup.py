@@ -0,0 +1,137 @@
+"""
+Startup benchmark: cold import time and baseline memory of the project modules
+
+Each target is imported in a fresh interpreter several times. The benchmark
+reports the median import time, the peak RSS after the import compared with an
+empty interpreter, and which heavy dependencies (pandas, openai, httpx, torch,
+sentence_transformers) the import pulled in. Those should stay unloaded until
+scoring starts.
+
+Results are appended to results/startup_benchmark.jsonl so cold-start latency
+can be tracked over time.
+
+Usage:
+    python benchmark_startup.py
+    python benchmark_startup.py --repeat 10 --modules PromptGenerator Orchestrator
+    python benchmark_startup.py --max-seconds 0.5     # exit 1 if any import is slower
+"""
+
+import argparse
+import datetime
+import json
+import subprocess
+import sys
+from pathlib import Path
+from statistics import median
+from typing import Dict, List
+
+DEFAULT_MODULES = [
+    "PromptGenerator",
+    "Orchestrator",
+    "WorkQueue",
+    "RunStore",
+    "Rescore",
+    "example_prompt_generator",
+]
+
+HEAVY_MODULES = ["pandas", "numpy", "openai", "httpx", "torch", "sentence_transformers"]
+
+_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(json.dumps({{
+    'seconds': elapsed,
+    'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy': [name for name in {heavy!r} if name in sys.modules]
+}}))
+"""
+
+
+def measure(statement: str, repeat: int) -> Dict:
+    """
+    Run a statement in `repeat` fresh interpreters.
+
+    Args:
+        statement: Python statement to time, e.g. 'import PromptGenerator'
+        repeat: Number of fresh interpreters
+
+    Returns:
+        Dict with 'seconds' (median), 'min_seconds', 'max_rss_mb' (median) and
+        'heavy' (heavy modules loaded), or 'error'
+    """
+    here = Path(__file__).resolve().parent
+    runs = []
+    for _ in range(repeat):
+        probe = _PROBE.format(statement=statement, heavy=HEAVY_MODULES)
+        completed = subprocess.run([sys.executable, "-c", probe], cwd=here, capture_output=True, text=True)
+        if completed.returncode != 0:
+            return {'error': completed.stderr.strip().splitlines()[-1]}
+        runs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {
+        'seconds': median(run['seconds'] for run in runs),
+        'min_seconds': min(run['seconds'] for run in runs),
+        'max_rss_mb': median(run['max_rss_mb'] for run in runs),
+        'heavy': runs[-1]['heavy']
+    }
+
+
+def run_benchmark(modules: List[str], repeat: int = 5) -> Dict:
+    """
+    Measure the empty interpreter and every module.
+
+    Returns:
+        Dict with 'timestamp', 'python', 'baseline' and per-module 'results'
+    """
+    baseline = measure("pass", repeat)
+    results = {}
+    for module in modules:
+        result = measure(f"import {module}", repeat)
+        if 'error' not in result:
+            result['rss_delta_mb'] = result['max_rss_mb'] - baseline['max_rss_mb']
+        results[module] = result
+    return {
+        'timestamp': str(datetime.datetime.now()),
+        'python': sys.version.split()[0],
+        'baseline': baseline,
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold import time and memory of the project modules")
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES, help="Modules to import")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per module (default: 5)")
+    parser.add_argument("--output", default="results/startup_benchmark.jsonl",
+                        help="File the results are appended to (default: results/startup_benchmark.jsonl)")
+    parser.add_argument("--max-seconds", type=float, help="Exit with status 1 if any import is slower")
+    args = parser.parse_args()
+
+    report = run_benchmark(args.modules, args.repeat)
+
+    baseline = report['baseline']
+    print(f"⏱️  Empty interpreter: {baseline['seconds'] * 1000:.0f} ms, {baseline['max_rss_mb']:.0f} MB\n")
+    print(f"{'module':<28}{'import ms':>10}{'RSS MB':>9}{'+MB':>7}  heavy modules loaded")
+    for module, result in report['results'].items():
+        if 'error' in result:
+            print(f"{module:<28}  ⚠️  {result['error']}")
+            continue
+        print(f"{module:<28}{result['seconds'] * 1000:>10.0f}{result['max_rss_mb']:>9.0f}"
+              f"{result['rss_delta_mb']:>7.0f}  {', '.join(result['heavy']) or '-'}")
+
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'a') as f:
+        f.write(json.dumps(report) + '\n')
+    print(f"\n✓ Results appended to {output}")
+
+    if args.max_seconds is not None:
+        slow = [m for m, r in report['results'].items() if r.get('seconds', 0) > args.max_seconds]
+        if slow:
+            print(f"❌ Slower than {args.max_seconds}s: {', '.join(slow)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
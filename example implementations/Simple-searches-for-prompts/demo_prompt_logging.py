@@ -1,7 +1,8 @@
 """
 Quick example demonstrating the prompt logging feature.
 
-Run this to see how prompts are logged to a CSV file.
+Run this to see how tested prompts are recorded in the run store
+(results/runs.sqlite) and queried afterwards.
 """
 
 from PromptGenerator import PromptGenerator
@@ -43,10 +44,17 @@ print("RESULTS")
 print("=" * 60)
 print(f"Best Prompt: {result['best_prompt']}")
 print(f"Best Fitness: {result['best_fitness']:.4f}")
-print(f"\nPrompt log saved to: results/prompts_*.csv")
-print("\nView the CSV file to see all tested prompts!")
-print("\nCSV Format:")
-print("  Round | Variation | Fitness | Prompt (first 100 chars)")
-print("  ------|-----------|---------|-------------------------")
-print("  0     | 1         | 0.5000  | You are a helpful and friendly assistant...")
-print("  0     | 2         | 0.7500  | You are an expert assistant that provides...")
+# Every tested prompt is recorded in the run store
+from RunStore import RunStore
+
+store = RunStore("results/runs.sqlite")
+run_id = store.runs()[0]['run_id']
+
+print(f"\nRun {run_id} saved to: {store.path}")
+print("\nBest prompt per round:")
+print("  Round | Fitness | Prompt (first 60 chars)")
+print("  ------|---------|------------------------")
+for row in store.best_per_round(run_id):
+    print(f"  {row['round']:<5} | {row['fitness']:.4f}  | {row['prompt'][:60]}")
+
+print(f"\nFitness distribution: {store.fitness_distribution(run_id)['quantiles']}")
@@ -5,11 +5,70 @@ This script demonstrates how to use the PromptGenerator class to optimize
 prompts using an LLM to generate variations.
 """
 
+import threading
+from typing import Callable, Optional
+
 from PromptGenerator import PromptGenerator
-from sentence_transformers import SentenceTransformer, util
+from Caches import EmbeddingCache
+
+# The similarity model is loaded when scoring starts, not at import, so
+# importing this module or resuming a run stays fast
+_model_lock = threading.Lock()
+_model = None
+_embedding_cache = None
+
+
+def sentence_encoder(texts):
+    """
+    Encode texts with the sentence embedding model, loading it on first use.
+    
+    Args:
+        texts: Texts to encode
+        
+    Returns:
+        One embedding tensor per text
+    """
+    global _model
+    with _model_lock:
+        if _model is None:
+            from sentence_transformers import SentenceTransformer
+            
+            _model = SentenceTransformer("multi-qa-mpnet-base-dot-v1")
+    return _model.encode(texts, convert_to_tensor=True)
 
-# Setup similarity metric
-model = SentenceTransformer("multi-qa-mpnet-base-dot-v1")
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Return this module's embedding cache, for runs that do not share one.
+    
+    Returns:
+        Embedding cache around the model; expected answers repeat for every
+        prompt, so their embeddings are computed once
+    """
+    global _embedding_cache
+    with _model_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(sentence_encoder)
+    return _embedding_cache
+
+def sentence_similarity_metric(embedding_cache: Optional[EmbeddingCache] = None) -> Callable[[str, str], float]:
+    """
+    Build a sentence similarity metric on an embedding cache.
+    
+    Args:
+        embedding_cache: Cache to embed with, e.g. an Orchestrator's shared
+            cache (default: this module's cache)
+        
+    Returns:
+        Metric taking (expected, predicted) and returning a score between 0 and 1
+    """
+    def metric(expected: str, predicted: str) -> float:
+        from sentence_transformers import util
+        
+        cache = embedding_cache or get_embedding_cache()
+        exp_emb, pred_emb = cache.embed([expected, predicted])
+        return util.pytorch_cos_sim(exp_emb, pred_emb).item()
+    
+    return metric
 
 def sentence_similarity(expected: str, predicted: str) -> float:
     """
@@ -22,9 +81,7 @@ def sentence_similarity(expected: str, predicted: str) -> float:
     Returns:
         Similarity score between 0 and 1
     """
-    exp_emb = model.encode([expected], convert_to_tensor=True)
-    pred_emb = model.encode([predicted], convert_to_tensor=True)
-    return util.pytorch_cos_sim(exp_emb, pred_emb).item()
+    return sentence_similarity_metric()(expected, predicted)
 
 
 # Example 1: Code Documentation Task
@@ -156,6 +213,48 @@ def example_custom_variations():
     return result
 
 
+# Example 4: Several Tasks Sharing One Budget
+def example_orchestrated_runs(num_examples=10):
+    """
+    Optimize prompts for two tasks at once with shared caches and rate limits.
+    
+    Args:
+        num_examples: Number of eval.csv examples for the documentation task (default: 10)
+    """
+    import pandas as pd
+    from Orchestrator import Orchestrator, OptimizationJob, SharedResources
+    
+    df = pd.read_csv("eval.csv", index_col=0)
+    java_set = [{'input': row['question'], 'expected': row['answer']}
+                for _, row in df.head(num_examples).iterrows()]
+    qa_set = [
+        {'input': 'What is the capital of France?', 'expected': 'Paris'},
+        {'input': 'What is the boiling point of water at sea level?', 'expected': '100 degrees Celsius'}
+    ]
+    
+    resources = SharedResources(
+        requests_per_minute=3000,
+        tokens_per_minute=250000,
+        completion_cache_path="results/completions.sqlite",
+        embedding_encoder=sentence_encoder
+    )
+    # Both jobs embed through the resources' cache, so one job's expected
+    # answers and predictions are never encoded again for the other
+    jobs = [
+        OptimizationJob("java_docs", java_set, metric_factory=sentence_similarity_metric, breadth=10, max_rounds=3,
+                        base_prompt="You are a helpful assistant that writes clear and concise code documentation."),
+        OptimizationJob("qa", qa_set, metric_factory=sentence_similarity_metric, breadth=8, max_rounds=3,
+                        base_prompt="You are a knowledgeable assistant that provides accurate answers.")
+    ]
+    
+    results = Orchestrator(jobs, resources).run()
+    for name, result in results.items():
+        print(f"{name}: {result.get('best_fitness', result.get('error'))}")
+    print(f"Embedding cache: {resources.stats()['embedding_cache']}")
+    
+    return results
+
+
 if __name__ == "__main__":
     print("PromptGenerator Examples\n")
     
@@ -171,3 +270,4 @@ if __name__ == "__main__":
     # Uncomment to run other examples:
     # example_question_answering()
     # example_custom_variations()
+    # example_orchestrated_runs()
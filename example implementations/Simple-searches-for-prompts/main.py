@@ -1,6 +1,333 @@
-def main():
-    print("Hello from simple-searches-for-prompts!")
+"""
+Command line interface for starting, resuming, listing and cancelling optimization runs
+
+Runs are recorded in the run store (results/runs.sqlite by default), together
+with the CLI options and the evaluation set, so a run can be resumed from its
+last checkpoint by id alone. Progress is shown on a single live status line.
+To run many optimizations in one long-lived process, submit them as jobs to
+JobService.py instead.
+
+Usage:
+    python main.py start --eval eval.csv --limit 50 --base-prompt "You are a helpful assistant." \\
+        --engine async --concurrency 32 --rounds 5 --breadth 20 --max-requests 20000
+    python main.py start --eval eval.csv --loader mmap --sample 200 --engine mock --metric my_metrics:f1
+    python main.py start --eval eval.csv --base-prompt "You are a helpful assistant." --finalists 5
+    python main.py start --eval eval.csv --base-prompt "..." --engine async \
+        --evaluator-endpoint https://api.openai.com/v1=3 --evaluator-endpoint http://localhost:8000/v1
+    python main.py start --eval eval.csv --base-prompt "..." --evaluator-model gpt-4o-mini gpt-3.5-turbo \
+        --model-aggregation worst
+    python main.py list
+    python main.py resume RUN_ID
+    python main.py cancel RUN_ID
+"""
+
+import argparse
+import importlib
+import logging
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from Datasets import load_examples
+from Diversity import DiversitySelector
+from ExamplePruning import METHODS as PRUNING_METHODS, ExamplePruner
+from EvaluationEngine import AsyncEngine, BatchEngine, EvaluationEngine, MockChatClient, MockEngine, ScreeningEngine
+from LocalEvaluator import LocalEngine
+from OutputLength import OutputLengthPolicy
+from RateLimiter import RateLimiter
+from Router import EvaluatorRouter
+from RunStore import RunStore
+from SearchStrategy import STRATEGIES
+from StatusLine import StatusLine
+from StoppingRules import BudgetRule, PatienceRule, StoppingRule
+
+DEFAULT_STORE = "results/runs.sqlite"
+DEFAULT_METRIC = "example_prompt_generator:sentence_similarity"
+DEFAULT_LOCAL_MODEL = "Qwen/Qwen2.5-0.5B-Instruct"
+
+# Options recorded with a run and reused by 'resume'
+RUN_OPTIONS = [
+    "base_prompt", "generator_model", "evaluator_model", "breadth", "rounds", "strategy", "engine",
+    "concurrency", "metric", "rpm", "tpm", "max_requests", "max_tokens", "max_seconds", "patience",
+    "generation_mode", "generation_chunk_size", "diversity", "oversample", "local_model", "finalists",
+    "evaluator_endpoint", "hedge_percentile", "prune_examples", "prune_keep",
+    "output_cap", "stop", "model_aggregation", "model_weight"
+]
+
+
+def _load_metric(spec: str) -> Callable:
+    """Import a metric given as 'module:function'."""
+    module_name, _, function_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _make_engine(options: Dict, local_engines: Optional[Dict[str, LocalEngine]] = None) -> EvaluationEngine:
+    local_model = options.get('local_model') or DEFAULT_LOCAL_MODEL
+    # Local engines passed in are shared, so their models stay loaded between runs
+    local_engines = {} if local_engines is None else local_engines
+    if (options['engine'] == "local" or options.get('finalists')) and local_model not in local_engines:
+        local_engines[local_model] = LocalEngine(local_model)
+    if options['engine'] == "local":
+        return local_engines[local_model]
+    if options['engine'] == "async":
+        engine: EvaluationEngine = AsyncEngine(concurrency=options['concurrency'])
+    elif options['engine'] == "mock":
+        engine = MockEngine()
+    else:
+        engine = BatchEngine()
+    if options.get('finalists'):
+        return ScreeningEngine(local_engines[local_model], engine, finalists=options['finalists'])
+    return engine
+
+
+def _stopping_rules(options: Dict) -> List[StoppingRule]:
+    rules: List[StoppingRule] = []
+    if options.get('patience'):
+        rules.append(PatienceRule(patience=options['patience']))
+    if any(options.get(key) for key in ('max_requests', 'max_tokens', 'max_seconds')):
+        rules.append(BudgetRule(max_seconds=options.get('max_seconds'),
+                                max_requests=options.get('max_requests'),
+                                max_tokens=options.get('max_tokens')))
+    return rules
+
+
+def build_generator(options: Dict, store: RunStore, run_name: Optional[str] = None, run_id: Optional[str] = None,
+                    status_line=None, local_engines: Optional[Dict[str, LocalEngine]] = None, **resources):
+    """
+    Build a PromptGenerator from run options (the RUN_OPTIONS of 'start').
+
+    Args:
+        options: Run options, recorded with the run for 'resume'
+        store: Run store receiving the run
+        run_name: Optional name prefixed to the run id
+        run_id: Existing run to continue from its checkpoint
+        status_line: Progress sink with an update(**fields) method
+        local_engines: Local engines by model name, shared between runs
+        **resources: Shared clients, caches and budgets (see SharedResources.generator_kwargs);
+            a run's own mock client, evaluator endpoints and rate limits take precedence
+    """
+    from PromptGenerator import PromptGenerator
+
+    if options['engine'] == "mock":
+        resources['generator_client'] = MockChatClient()
+    if options.get('evaluator_endpoint'):
+        resources['evaluator_client'] = EvaluatorRouter.from_urls(options['evaluator_endpoint'],
+                                                                  hedge_percentile=options.get('hedge_percentile'))
+    if options.get('rpm') or options.get('tpm'):
+        resources['rate_limiter'] = RateLimiter(options.get('rpm'), options.get('tpm'))
+
+    return PromptGenerator(
+        base_prompt=options['base_prompt'],
+        generator_model=options['generator_model'],
+        evaluator_model=options['evaluator_model'],
+        metric=_load_metric(options['metric']),
+        breadth=options['breadth'],
+        max_rounds=options['rounds'],
+        strategy=options['strategy'],
+        stopping_rules=_stopping_rules(options),
+        run_name=run_name,
+        run_id=run_id,
+        engine=_make_engine(options, local_engines),
+        run_store=store,
+        run_metadata={'cli': options},
+        status_line=status_line,
+        generation_mode=options.get('generation_mode', "list"),
+        generation_chunk_size=options.get('generation_chunk_size', 10),
+        diversity=DiversitySelector(options['diversity'], options.get('oversample', 2.0))
+        if options.get('diversity') else None,
+        example_pruner=ExamplePruner(options['prune_examples'], keep=options.get('prune_keep', 0.5))
+        if options.get('prune_examples') else None,
+        output_length=OutputLengthPolicy(multiplier=options.get('output_cap'), stop=options.get('stop'))
+        if options.get('output_cap') or options.get('stop') else None,
+        model_aggregation=options.get('model_aggregation') or "mean",
+        model_weights={model: float(weight) for model, _, weight in
+                       (spec.rpartition('=') for spec in options.get('model_weight') or [])},
+        **resources
+    )
+
+
+def _run(options: Dict, evaluation_set: List[Dict], store: RunStore, run_name: Optional[str] = None,
+         run_id: Optional[str] = None) -> int:
+    """Build a PromptGenerator from CLI options and run (or resume) it."""
+    status = StatusLine()
+    generator = build_generator(options, store, run_name=run_name, run_id=run_id, status_line=status)
+    status.prefix = generator._run_start
+
+    try:
+        with status:
+            result = generator.optimize(evaluation_set)
+    except KeyboardInterrupt:
+        store.set_status(generator._run_start, 'interrupted')
+        print(f"\n⏸️  Interrupted. Resume with: python main.py resume {generator._run_start}")
+        return 130
+    except Exception as e:
+        store.set_status(generator._run_start, 'failed')
+        print(f"❌ Run {generator._run_start} failed: {e}")
+        print(f"   Resume from the last checkpoint with: python main.py resume {generator._run_start}")
+        return 1
+
+    print(f"\n🏁 Run {generator._run_start}: best fitness {result['best_fitness']:.4f} "
+          f"after {result['rounds']} rounds ({result['stopped_reason']})")
+    print(f"   Best prompt: {result['best_prompt']}")
+    return 0
+
+
+def cmd_start(args) -> int:
+    evaluation_set = load_examples(args.eval, loader=args.loader, limit=args.limit, sample=args.sample,
+                                   seed=args.seed, input_column=args.input_column,
+                                   expected_column=args.expected_column)
+    if not evaluation_set:
+        print(f"❌ No examples loaded from {args.eval}")
+        return 1
+    print(f"📚 Loaded {len(evaluation_set)} examples from {args.eval} ({args.loader} loader)")
+
+    base_prompt = Path(args.base_prompt_file).read_text() if args.base_prompt_file else args.base_prompt
+    options = {key: getattr(args, key) for key in RUN_OPTIONS}
+    options['base_prompt'] = base_prompt
+    return _run(options, evaluation_set, RunStore(args.store), run_name=args.name)
+
+
+def cmd_resume(args) -> int:
+    store = RunStore(args.store)
+    run = store.run(args.run_id)
+    if run is None:
+        print(f"❌ Unknown run {args.run_id}")
+        return 1
+    if run['status'] == 'completed':
+        print(f"✓ Run {args.run_id} already completed (best fitness {run['best_fitness']:.4f})")
+        return 0
+    options = run['params'].get('cli')
+    if options is None:
+        print(f"❌ Run {args.run_id} was not started from the command line; resume it with optimize()")
+        return 1
+    if not Path("results", f"checkpoint_{args.run_id}.json").exists():
+        print(f"⚠️  No checkpoint for run {args.run_id}; it will restart from round 1")
+    evaluation_set = store.examples(args.run_id)
+    print(f"📚 Reusing the run's {len(evaluation_set)} recorded examples")
+    return _run(options, evaluation_set, store, run_id=args.run_id)
+
+
+def cmd_list(args) -> int:
+    runs = RunStore(args.store).runs()
+    if not runs:
+        print("No runs recorded")
+        return 0
+    print(f"{'run id':<40}{'status':<13}{'rounds':>7}{'evals':>7}{'best':>9}  updated")
+    for run in runs[:args.limit]:
+        best = f"{run['best_fitness']:.4f}" if run['best_fitness'] is not None else "-"
+        print(f"{run['run_id']:<40}{run['status'] or '-':<13}{run['rounds'] or 0:>7}{run['evaluations']:>7}"
+              f"{best:>9}  {run['updated']}")
+    return 0
+
+
+def cmd_cancel(args) -> int:
+    store = RunStore(args.store)
+    status = store.status(args.run_id)
+    if status is None:
+        print(f"❌ Unknown run {args.run_id}")
+        return 1
+    if status in ('completed', 'cancelled'):
+        print(f"Run {args.run_id} is already {status}")
+        return 0
+    if status == 'running' and not args.force:
+        # The running process sees this at its next batch poll or round and stops
+        store.set_status(args.run_id, 'cancelling')
+        print(f"⏹️  Cancellation requested for run {args.run_id}")
+    else:
+        store.set_status(args.run_id, 'cancelled')
+        print(f"⏹️  Run {args.run_id} marked as cancelled")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Start, resume, list and cancel prompt optimization runs")
+    parser.add_argument("--store", default=DEFAULT_STORE, help=f"Run store file (default: {DEFAULT_STORE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    start = commands.add_parser("start", help="Start a new optimization run")
+    start.add_argument("--eval", required=True, help="Evaluation set (CSV or JSON lines)")
+    start.add_argument("--loader", choices=["stream", "mmap"], default="stream",
+                       help="Streaming or memory-mapped eval set loader (default: stream)")
+    start.add_argument("--limit", type=int, help="Use only the first N examples")
+    start.add_argument("--sample", type=int, help="Use N random examples")
+    start.add_argument("--seed", type=int, default=0, help="Seed for --sample (default: 0)")
+    start.add_argument("--input-column", default="question", help="Input column (default: question)")
+    start.add_argument("--expected-column", default="answer", help="Expected output column (default: answer)")
+    prompt = start.add_mutually_exclusive_group(required=True)
+    prompt.add_argument("--base-prompt", help="Prompt to start from")
+    prompt.add_argument("--base-prompt-file", help="File containing the prompt to start from")
+    start.add_argument("--name", help="Name prefixed to the run id")
+    start.add_argument("--generator-model", default="gpt-4", help="Model generating variations (default: gpt-4)")
+    start.add_argument("--evaluator-model", nargs="+", default=["gpt-3.5-turbo"],
+                       help="Model(s) answering the eval set; several give a prompt x model fitness matrix "
+                            "(default: gpt-3.5-turbo)")
+    start.add_argument("--model-aggregation", choices=["mean", "worst"], default="mean",
+                       help="Combine fitness over several evaluator models by weighted mean or worst case "
+                            "(default: mean)")
+    start.add_argument("--model-weight", action="append", metavar="MODEL=WEIGHT",
+                       help="Weight of an evaluator model in the mean (repeatable, default: 1)")
+    start.add_argument("--breadth", type=int, default=10, help="Prompts per round (default: 10)")
+    start.add_argument("--rounds", type=int, default=5, help="Maximum rounds (default: 5)")
+    start.add_argument("--strategy", choices=sorted(STRATEGIES), default="beam", help="Search strategy (default: beam)")
+    start.add_argument("--generation-mode", choices=["list", "chunked", "choices"], default="list",
+                       help="Ask for variations as one list, parallel chunks or n sampled choices (default: list)")
+    start.add_argument("--generation-chunk-size", type=int, default=10,
+                       help="Variations per generator request in chunked/choices mode (default: 10)")
+    start.add_argument("--diversity", choices=["mmr", "k_center"],
+                       help="Over-generate each population and keep a diverse subset")
+    start.add_argument("--oversample", type=float, default=2.0,
+                       help="Candidates generated per population slot with --diversity (default: 2.0)")
+    start.add_argument("--prune-examples", choices=PRUNING_METHODS,
+                       help="After round 1, evaluate only the examples that best separate prompts")
+    start.add_argument("--prune-keep", type=float, default=0.5,
+                       help="Examples kept by --prune-examples, as a count or a fraction if below 1 (default: 0.5)")
+    start.add_argument("--output-cap", type=float,
+                       help="Cap each evaluator completion at this multiple of the expected answer's length")
+    start.add_argument("--stop", action="append", help="Stop sequence for evaluator completions (repeatable, up to 4)")
+    start.add_argument("--metric", default=DEFAULT_METRIC, help=f"Metric as module:function (default: {DEFAULT_METRIC})")
+    start.add_argument("--engine", choices=["batch", "async", "mock", "local"], default="batch",
+                       help="Evaluation engine: batch API, concurrent calls, offline mock or local CPU model "
+                            "(default: batch)")
+    start.add_argument("--local-model", default=DEFAULT_LOCAL_MODEL,
+                       help=f"Causal LM for --engine local and --finalists (default: {DEFAULT_LOCAL_MODEL})")
+    start.add_argument("--finalists", type=float,
+                       help="Screen each round with the local model and score only this many finalists "
+                            "(or this fraction if below 1) with --engine")
+    start.add_argument("--concurrency", type=int, default=16, help="Requests in flight for --engine async (default: 16)")
+    start.add_argument("--evaluator-endpoint", action="append", metavar="BASE_URL[=WEIGHT]",
+                       help="OpenAI-compatible evaluator endpoint; repeat to load-balance and hedge across several")
+    start.add_argument("--hedge-percentile", type=float, default=95.0,
+                       help="Hedge evaluator calls slower than this latency percentile to another endpoint "
+                            "(default: 95)")
+    start.add_argument("--rpm", type=float, help="Requests per minute limit")
+    start.add_argument("--tpm", type=float, help="Tokens per minute limit")
+    start.add_argument("--max-requests", type=int, help="Stop before exceeding this many evaluator requests")
+    start.add_argument("--max-tokens", type=int, help="Stop before exceeding this many tokens")
+    start.add_argument("--max-seconds", type=float, help="Stop after this many seconds")
+    start.add_argument("--patience", type=int, help="Stop after N rounds without improvement")
+    start.set_defaults(func=cmd_start)
+
+    resume = commands.add_parser("resume", help="Resume a run from its last checkpoint")
+    resume.add_argument("run_id")
+    resume.set_defaults(func=cmd_resume)
+
+    listing = commands.add_parser("list", help="List recorded runs")
+    listing.add_argument("--limit", type=int, default=20, help="Runs to show (default: 20)")
+    listing.set_defaults(func=cmd_list)
+
+    cancel = commands.add_parser("cancel", help="Cancel a run")
+    cancel.add_argument("run_id")
+    cancel.add_argument("--force", action="store_true",
+                        help="Mark the run cancelled immediately (e.g. its process is gone)")
+    cancel.set_defaults(func=cmd_cancel)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    return args.func(args)
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from BatchFiles import classify_result, classify_status, read_batch_requests, upload_payload, write_batch_requests
+
+SYSTEM = "You are a careful assistant."
+REQUESTS = {
+    f"r0_p0_e{i}": {'model': 'm', 'messages': [{'role': 'system', 'content': SYSTEM},
+                                               {'role': 'user', 'content': f"question {i}"}]}
+    for i in range(3)
+}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_compact_file_round_trips(tmp_path, compress):
+    path = write_batch_requests(str(tmp_path / "batch.compact.jsonl"), REQUESTS, compress=compress)
+    assert path.endswith('.gz') == compress
+    assert dict(read_batch_requests(path)) == REQUESTS
+
+
+def test_compact_file_stores_each_string_once(tmp_path):
+    path = write_batch_requests(str(tmp_path / "batch.compact.jsonl"), REQUESTS)
+    with open(path) as f:
+        header = json.loads(f.readline())
+    assert header['strings'].count(SYSTEM) == 1
+
+
+def test_reads_legacy_full_files(tmp_path):
+    path = tmp_path / "batch.jsonl"
+    path.write_text("\n".join(json.dumps({'custom_id': k, 'method': 'POST', 'url': '/v1/chat/completions',
+                                          'body': v}) for k, v in REQUESTS.items()))
+    assert dict(read_batch_requests(str(path))) == REQUESTS
+
+
+def test_upload_payload_is_full_batch_jsonl(tmp_path):
+    path = write_batch_requests(str(tmp_path / "batch.compact.jsonl"), REQUESTS, compress=True)
+    filename, content = upload_payload(path)
+    assert filename == "batch.jsonl"
+    lines = [json.loads(line) for line in content.decode().splitlines()]
+    assert {line['custom_id']: line['body'] for line in lines} == REQUESTS
+    assert all(line['url'] == '/v1/chat/completions' for line in lines)
+
+
+@pytest.mark.parametrize("status_code, code, expected", [
+    (429, '', 'rate_limit'),
+    (None, 'rate_limit_exceeded', 'rate_limit'),
+    (None, 'batch_expired', 'expired'),
+    (None, 'batch_cancelled', 'cancelled'),
+    (408, '', 'timeout'),
+    (503, '', 'server_error'),
+    (401, '', 'auth'),
+    (400, '', 'invalid_request'),
+    (None, 'invalid_prompt', 'invalid_request'),
+    (None, None, 'unknown'),
+])
+def test_classify_status(status_code, code, expected):
+    assert classify_status(status_code, code) == expected
+
+
+def _row(status_code=200, content="ok", error=None, body_error=None):
+    body = {'choices': [{'message': {'content': content}}]} if status_code == 200 else {'error': body_error}
+    return {'custom_id': 'r0_p0_e0', 'response': {'status_code': status_code, 'body': body}, 'error': error}
+
+
+def test_classify_result():
+    assert classify_result(_row()) is None
+    assert classify_result(_row(content=None)) == 'empty'
+    assert classify_result(_row(500, body_error={'code': 'server_error'})) == 'server_error'
+    assert classify_result(_row(400, body_error={'code': 'context_length_exceeded'})) == 'invalid_request'
+    assert classify_result({'custom_id': 'x', 'response': None,
+                            'error': {'code': 'batch_expired', 'message': 'expired'}}) == 'expired'
@@ -0,0 +1,51 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from Diversity import DiversitySelector, hashed_ngram_embedding, k_center_greedy, mmr  # noqa: E402
+
+PARAPHRASES = ["You are a helpful assistant.", "You are a helpful assistant!", "you are a  helpful assistant."]
+DISTINCT = ["Answer in one word.", "Explain step by step, citing sources."]
+
+
+def test_embedding_is_normalised_and_lexical():
+    vectors = hashed_ngram_embedding(PARAPHRASES + DISTINCT)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+    assert vectors[0] @ vectors[2] == pytest.approx(1.0)
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[3]
+
+
+def test_k_center_spreads_out():
+    vectors = np.array([[1.0, 0.0], [0.99, 0.1], [0.0, 1.0], [0.7, 0.7]])
+    assert k_center_greedy(vectors, 2) == [0, 2]
+    # A reference point near candidate 0 pushes the first pick away from it
+    assert k_center_greedy(vectors, 1, reference=np.array([[1.0, 0.0]])) == [2]
+
+
+def test_mmr_trades_relevance_for_diversity():
+    vectors = np.array([[1.0, 0.0], [1.0, 0.01], [0.0, 1.0]])
+    relevance = [1.0, 0.9, 0.0]
+    assert mmr(vectors, relevance, 2, diversity=0.0) == [0, 1]
+    assert mmr(vectors, relevance, 2, diversity=0.7) == [0, 2]
+
+
+@pytest.mark.parametrize("method", ["mmr", "k_center"])
+def test_selector_drops_paraphrases(method):
+    selector = DiversitySelector(method=method, oversample=2.0)
+    assert selector.candidate_count(3) == 6
+    selected = selector.select(PARAPHRASES + DISTINCT + [PARAPHRASES[0]], 3)
+    assert len(selected) == 3 and set(DISTINCT) <= set(selected)
+    stats = selector.stats()
+    assert stats['duplicates'] == 1 and stats['mean_similarity_selected'] < stats['mean_similarity_candidates']
+
+
+def test_selector_avoids_evaluated_prompts():
+    selector = DiversitySelector(method="k_center")
+    assert PARAPHRASES[1] not in selector.select(PARAPHRASES[1:] + DISTINCT, 2, reference=[PARAPHRASES[0]])
+
+
+def test_selector_validates_arguments():
+    with pytest.raises(ValueError):
+        DiversitySelector(method="random")
+    with pytest.raises(ValueError):
+        DiversitySelector(oversample=0.5)
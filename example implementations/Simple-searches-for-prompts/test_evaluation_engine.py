@@ -0,0 +1,52 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+
+from EvaluationEngine import MockChatClient, MockEngine
+from PromptGenerator import PromptGenerator
+
+REQUEST = [{'role': 'user', 'content': "Generate 3 variations of:\nYou are helpful."}]
+
+
+def metric(expected: str, predicted: str) -> float:
+    return SequenceMatcher(None, expected, predicted).ratio()
+
+
+def _contents(response):
+    return response.choices[0].message.content
+
+
+def test_mock_client_numbers_concurrent_calls_uniquely():
+    calls = 400
+    sequential = MockChatClient()
+    expected = sorted(_contents(sequential.chat.completions.create(messages=REQUEST)) for _ in range(calls))
+
+    # Switch threads often, so an unguarded counter would hand out repeated numbers
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        concurrent = MockChatClient()
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            responses = list(pool.map(lambda _: concurrent.chat.completions.create(messages=REQUEST), range(calls)))
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert concurrent._calls == calls
+    assert sorted(_contents(r) for r in responses) == expected
+
+
+def test_mock_client_answers_requested_count_per_choice():
+    response = MockChatClient().chat.completions.create(messages=REQUEST, n=2)
+    assert len(response.choices) == 2
+    assert all(len(choice.message.content.split("\n")) == 3 for choice in response.choices)
+
+
+def test_mock_engine_is_deterministic(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    examples = [{'input': f'q{i}', 'expected': f'the answer is {i}'} for i in range(4)]
+    matrices = []
+    for _ in range(2):
+        generator = PromptGenerator("Base.", metric=metric, generator_client=MockChatClient(), engine=MockEngine())
+        matrices.append(generator._engine.score(generator, ["Base.", "Other."], examples, 0))
+    assert matrices[0] == matrices[1]
+    assert len(matrices[0]) == 2 and all(len(row) == 4 for row in matrices[0])
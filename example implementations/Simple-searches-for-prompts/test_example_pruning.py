@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ExamplePruning import ExamplePruner, item_total_discrimination, irt_information, score_variance  # noqa: E402
+
+
+def _score_matrix(prompts=12, informative=4, flat=6, seed=0):
+    """Rows whose first `informative` examples track prompt quality and whose rest are flat."""
+    rng = random.Random(seed)
+    rows = []
+    for p in range(prompts):
+        quality = p / (prompts - 1)
+        rows.append([min(1.0, max(0.0, quality + rng.uniform(-0.05, 0.05))) for _ in range(informative)]
+                    + [0.5 + rng.uniform(-0.01, 0.01) for _ in range(flat)])
+    return rows
+
+
+@pytest.mark.parametrize("measure", [item_total_discrimination, score_variance, irt_information])
+def test_informative_examples_score_higher(measure):
+    values = measure(np.array(_score_matrix()))
+    assert values[:4].min() > values[4:].max()
+
+
+@pytest.mark.parametrize("method", ["item_total", "variance", "irt"])
+def test_pruner_keeps_informative_examples(method):
+    pruner = ExamplePruner(method=method, keep=4, min_examples=2, min_prompts=8)
+    report = pruner.fit(_score_matrix())
+    assert pruner.active and pruner.kept == [0, 1, 2, 3]
+    assert report['request_reduction'] == pytest.approx(0.6)
+    assert report['spearman_in_sample'] > 0.9
+
+
+def test_pruner_waits_for_enough_complete_rows():
+    pruner = ExamplePruner(min_prompts=8)
+    rows = _score_matrix(prompts=10)
+    for row in rows[:4]:
+        row[0] = row[1] = None
+    assert pruner.fit(rows[:9]) is None and not pruner.active
+
+
+def test_calibrated_fitness_is_on_the_full_scale():
+    rows = _score_matrix()
+    pruner = ExamplePruner(keep=4, min_examples=2, min_prompts=8)
+    pruner.fit(rows)
+    full = [sum(row) / len(row) for row in rows]
+    calibrated = [pruner.fitness(row) for row in rows]
+    assert np.mean(calibrated) == pytest.approx(np.mean(full))
+    # Unscored kept examples are skipped; a row with none scores zero
+    assert pruner.fitness([None] * len(rows[0])) == 0.0
+
+
+def test_state_round_trip():
+    rows = _score_matrix()
+    pruner = ExamplePruner(keep=4, min_examples=2, min_prompts=8, weighted=True)
+    pruner.fit(rows)
+    restored = ExamplePruner()
+    restored.load_state_dict(pruner.state_dict())
+    assert restored.kept == pruner.kept and restored.stats() == pruner.stats()
+    assert all(restored.fitness(row) == pruner.fitness(row) for row in rows)
+
+
+def test_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        ExamplePruner(method="random")
+    with pytest.raises(ValueError):
+        ExamplePruner(keep=0)
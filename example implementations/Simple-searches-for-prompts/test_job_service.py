@@ -0,0 +1,76 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from difflib import SequenceMatcher
+
+import pytest
+
+from JobService import JobClient, JobService, JobStore, make_server
+from Orchestrator import SharedResources
+
+
+def similarity(expected: str, predicted: str) -> float:
+    return SequenceMatcher(None, expected, predicted).ratio()
+
+
+EXAMPLES = [{'input': f'q{i}', 'expected': f'answer number {i}'} for i in range(4)]
+SPEC = {'base_prompt': 'Base.', 'examples': EXAMPLES, 'engine': 'mock', 'rounds': 2, 'breadth': 3,
+        'metric': 'test_job_service:similarity'}
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    resources = SharedResources(run_store_path=str(tmp_path / "runs.sqlite"))
+    service = JobService(str(tmp_path / "jobs.sqlite"), workers=2, resources=resources, poll_interval=0.05)
+    server = make_server(service, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield service, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_mock_jobs_run_without_api_key(service):
+    svc, url = service
+    client = JobClient(url)
+    job_id = client.submit(SPEC)
+    svc.start()
+    events = list(client.events(job_id))
+    assert events[-1]['type'] == 'completed'
+    assert client.job(job_id)['run']['status'] == 'completed'
+
+
+def test_rejects_bad_spec(service):
+    _, url = service
+    client = JobClient(url)
+    with pytest.raises(RuntimeError):
+        client.submit({'base_prompt': 'x'})
+    with pytest.raises(RuntimeError):
+        client.submit(dict(SPEC, bogus=1))
+
+
+@pytest.mark.parametrize("path", ["/jobs?limit=x", "/jobs/1/events?after=y&follow=0"])
+def test_bad_query_integer_is_400(service, path):
+    svc, url = service
+    svc.jobs.submit(SPEC)
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(url + path)
+    assert error.value.code == 400
+    assert 'error' in json.loads(error.value.read())
+
+
+def test_cancel_queued_job(service):
+    _, url = service
+    client = JobClient(url)
+    job_id = client.submit(SPEC)
+    client.cancel(job_id)
+    assert client.job(job_id)['status'] == 'cancelled'
+
+
+def test_interrupted_job_is_requeued(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.sqlite"))
+    job_id = store.submit(SPEC)
+    store.claim("dead-worker")
+    assert store.requeue_interrupted() == 1
+    assert store.job(job_id)['status'] == 'queued'
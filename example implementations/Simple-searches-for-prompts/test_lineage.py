@@ -0,0 +1,124 @@
+import json
+from difflib import SequenceMatcher
+
+from EvaluationEngine import MockChatClient, MockEngine, ScreeningEngine
+from Lineage import LineageGraph
+from PromptGenerator import PromptGenerator
+
+EXAMPLES = [{'input': f'q{i}', 'expected': f'the answer to question {i}'} for i in range(4)]
+
+
+def metric(expected: str, predicted: str) -> float:
+    return SequenceMatcher(None, expected, predicted).ratio()
+
+
+class CountingEngine(MockEngine):
+    """MockEngine that remembers which prompts it was asked to score."""
+
+    def __init__(self):
+        super().__init__()
+        self.scored = []
+
+    def score(self, generator, prompts, evaluation_set, round_num):
+        self.scored.extend(prompts)
+        return super().score(generator, prompts, evaluation_set, round_num)
+
+
+def test_graph_records_origin_and_scores():
+    graph = LineageGraph()
+    graph.record_call("base", ["a", "b"], 0)
+    graph.record_call("a", ["c"], 1)
+    graph.record_evaluation("base", 0.5, [0.5, 0.5])
+    graph.record_evaluation("a", 0.7, [0.7, None])
+    graph.record_evaluation("c", 0.9, [0.9, 0.9])
+
+    assert graph.parent("c") == "a"
+    assert graph.ancestors("c") == ["a", "base"]
+    assert graph.children("base") == ["a", "b"]
+    assert graph.known_scores("a") == [0.7, None]
+    assert graph.known_scores("b") is None
+    # 'a' gained 0.2 over base; 'c' gained 0.2 over 'a'
+    assert abs(graph.productivity("a") - 0.2) < 1e-9
+
+
+def test_child_keeps_first_origin():
+    graph = LineageGraph()
+    graph.record_call("base", ["a"], 0)
+    graph.record_call("other", ["a"], 1)
+    assert graph.parent("a") == "base"
+
+
+def test_unscored_row_is_not_recorded():
+    graph = LineageGraph()
+    graph.record_evaluation("screened", 0.0, [None, None])
+    assert graph.known_scores("screened") is None
+    assert graph.score_rows() == []
+
+
+def test_state_round_trips_through_json():
+    graph = LineageGraph()
+    graph.record_call("base", ["a"], 0)
+    graph.record_evaluation("a", 0.4, [0.4])
+    restored = LineageGraph()
+    restored.load_state_dict(json.loads(json.dumps(graph.state_dict())))
+    assert restored.parent("a") == "base" and restored.node("a")['fitness'] == 0.4
+    # Score rows come back from the run store, not the checkpoint
+    assert restored.known_scores("a") is None
+    restored.restore_scores({"a": [0.4], "screened": [None]})
+    assert restored.known_scores("a") == [0.4] and restored.known_scores("screened") is None
+
+
+def test_screened_out_prompts_are_scored_again(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    final = CountingEngine()
+    generator = PromptGenerator("Base.", metric=metric, generator_client=MockChatClient(),
+                                engine=ScreeningEngine(MockEngine(), final, finalists=1))
+    prompts = ["Prompt one.", "Prompt two.", "Prompt three."]
+    generator.evaluate_round(prompts, EXAMPLES, 0)
+    assert len(final.scored) == 1
+    winner = final.scored[0]
+
+    final.scored = []
+    generator.evaluate_round(prompts, EXAMPLES, 1)
+    # The finalist's scores are reused; the screened-out prompts are screened again
+    assert winner not in final.scored and len(final.scored) == 1
+
+
+def _interrupted_run(max_rounds: int = 4, interrupt_after: int = 2):
+    """Run a mock optimization until its generator is called `interrupt_after` + 1 times."""
+    generator = PromptGenerator("Base.", metric=metric, generator_client=MockChatClient(), engine=MockEngine(),
+                                breadth=3, max_rounds=max_rounds)
+    generate = generator.generate_variations
+    calls = []
+
+    def interrupting(*args, **kwargs):
+        calls.append(1)
+        if len(calls) > interrupt_after:
+            raise KeyboardInterrupt
+        return generate(*args, **kwargs)
+
+    generator.generate_variations = interrupting
+    try:
+        generator.optimize(EXAMPLES)
+    except KeyboardInterrupt:
+        pass
+    return generator
+
+
+def test_checkpoint_keeps_score_rows_in_run_store_only(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generator = _interrupted_run()
+    with open(generator._checkpoint_file) as f:
+        checkpoint = json.load(f)
+    nodes = checkpoint['lineage']['nodes']
+    assert nodes and not any('scores' in node for node in nodes.values())
+
+    resumed = PromptGenerator("Base.", metric=metric, generator_client=MockChatClient(), engine=MockEngine(),
+                              breadth=3, max_rounds=4, run_id=generator._run_start)
+    resumed.optimize(EXAMPLES)
+    # Every prompt scored before the interruption gets the same row back
+    stored = resumed._store.score_rows(generator._run_start)
+    for key, node in generator.lineage._nodes.items():
+        if node['scores'] is not None:
+            assert stored[node['prompt']] == node['scores']
+            assert resumed.lineage.known_scores(node['prompt']) == node['scores']
@@ -0,0 +1,102 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from BatchFiles import read_batch_requests, write_batch_requests
+from Orchestrator import BatchCoalescer
+from PromptGenerator import RunCancelled
+
+
+def _body(content):
+    return {'model': 'm', 'messages': [{'role': 'user', 'content': content}]}
+
+
+class FakeBatch:
+    """run_batch stand-in that answers every request and can wait to be cancelled."""
+
+    def __init__(self, duration=0.0):
+        self.duration = duration
+        self.files = []
+        self.cancelled_batch = False
+
+    def __call__(self, batch_file, cancelled):
+        self.files.append(batch_file)
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline:
+            if cancelled():
+                self.cancelled_batch = True
+                raise RunCancelled("batch cancelled")
+            time.sleep(0.01)
+        return [{'custom_id': custom_id, 'response': {'body': body}}
+                for custom_id, body in read_batch_requests(batch_file)]
+
+
+def _submit_all(coalescer, tmp_path, run_batch, requests, cancelled=None):
+    """Submit one batch file per job concurrently; return each job's rows or exception."""
+    cancelled = cancelled or {}
+    for _ in requests:
+        coalescer.register()
+
+    def submit(job):
+        path = write_batch_requests(str(tmp_path / f"{job}.jsonl"), requests[job])
+        try:
+            return coalescer.submit(job, path, run_batch, cancelled=cancelled.get(job))
+        except RunCancelled as e:
+            return e
+        finally:
+            coalescer.unregister()
+
+    with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+        return dict(zip(requests, pool.map(submit, requests)))
+
+
+def test_merges_and_fans_out_duplicates(tmp_path):
+    coalescer = BatchCoalescer(window_seconds=5, poll_interval=0.01)
+    run_batch = FakeBatch()
+    results = _submit_all(coalescer, tmp_path, run_batch, {
+        'a': {'r0_p0_e0': _body("shared"), 'r0_p0_e1': _body("only a")},
+        'b': {'r0_p0_e0': _body("shared")},
+    })
+    assert len(run_batch.files) == 1
+    assert sorted(row['custom_id'] for row in results['a']) == ['r0_p0_e0', 'r0_p0_e1']
+    assert [row['response']['body'] for row in results['b']] == [_body("shared")]
+    assert coalescer.stats() == {'batches_submitted': 1, 'files_merged': 2, 'requests_deduplicated': 1}
+
+
+def test_cancelled_job_withdraws_only_its_own_rows(tmp_path):
+    coalescer = BatchCoalescer(window_seconds=5, poll_interval=0.01)
+    run_batch = FakeBatch(duration=0.3)
+    cancel_a = threading.Event()
+    threading.Timer(0.1, cancel_a.set).start()
+    results = _submit_all(coalescer, tmp_path, run_batch, {
+        'a': {'r0_p0_e0': _body("from a")},
+        'b': {'r0_p0_e0': _body("from b")},
+    }, cancelled={'a': cancel_a.is_set})
+    assert isinstance(results['a'], RunCancelled)
+    assert [row['response']['body'] for row in results['b']] == [_body("from b")]
+    assert not run_batch.cancelled_batch
+
+
+def test_merged_batch_is_cancelled_when_every_job_is(tmp_path):
+    coalescer = BatchCoalescer(window_seconds=5, poll_interval=0.01)
+    run_batch = FakeBatch(duration=5)
+    cancel = threading.Event()
+    threading.Timer(0.1, cancel.set).start()
+    results = _submit_all(coalescer, tmp_path, run_batch, {
+        'a': {'r0_p0_e0': _body("from a")},
+        'b': {'r0_p0_e0': _body("from b")},
+    }, cancelled={'a': cancel.is_set, 'b': cancel.is_set})
+    assert run_batch.cancelled_batch
+    assert all(isinstance(result, RunCancelled) for result in results.values())
+
+
+@pytest.mark.parametrize("leader_cancelled", [True, False])
+def test_single_job_batch_follows_its_own_cancellation(tmp_path, leader_cancelled):
+    coalescer = BatchCoalescer(window_seconds=0, poll_interval=0.01)
+    run_batch = FakeBatch(duration=0.2)
+    results = _submit_all(coalescer, tmp_path, run_batch, {'a': {'r0_p0_e0': _body("x")}},
+                          cancelled={'a': lambda: leader_cancelled})
+    assert run_batch.cancelled_batch == leader_cancelled
+    assert isinstance(results['a'], RunCancelled) == leader_cancelled
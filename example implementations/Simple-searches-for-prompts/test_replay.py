@@ -0,0 +1,70 @@
+import random
+import time
+
+import pytest
+
+from EvaluationEngine import MockChatClient
+from PromptGenerator import PromptGenerator
+from Replay import ReplayClient, ReplayMiss, ReplayStore, replay_scope
+
+BODY = {'model': 'm', 'messages': [{'role': 'user', 'content': "Generate 2 variations of:\nBase."}]}
+
+
+def _content(response):
+    return response.choices[0].message.content
+
+
+def test_identical_requests_replay_in_order(tmp_path):
+    store = ReplayStore(str(tmp_path / "replay.sqlite"))
+    recorder = ReplayClient(store, "record", MockChatClient())
+    recorded = [_content(recorder.chat.completions.create(**BODY)) for _ in range(3)]
+    assert len(set(recorded)) == 3
+
+    replayer = ReplayClient(ReplayStore(store.path), "replay")
+    assert [_content(replayer.chat.completions.create(**BODY)) for _ in range(3)] == recorded
+
+
+def test_unrecorded_request_misses(tmp_path):
+    replayer = ReplayClient(ReplayStore(str(tmp_path / "replay.sqlite")), "replay")
+    with pytest.raises(ReplayMiss):
+        replayer.chat.completions.create(**BODY)
+
+
+def test_scope_keys_requests_apart(tmp_path):
+    store = ReplayStore(str(tmp_path / "replay.sqlite"))
+    recorder = ReplayClient(store, "record", MockChatClient())
+    with replay_scope(1):
+        scoped = _content(recorder.chat.completions.create(**BODY))
+    plain = _content(recorder.chat.completions.create(**BODY))
+
+    replayer = ReplayClient(ReplayStore(store.path), "replay")
+    assert _content(replayer.chat.completions.create(**BODY)) == plain
+    with replay_scope(1):
+        assert _content(replayer.chat.completions.create(**BODY)) == scoped
+    with replay_scope(2), pytest.raises(ReplayMiss):
+        replayer.chat.completions.create(**BODY)
+
+
+def _generate(path, replay_mode, generation_mode, client=None, seed=0):
+    generator = PromptGenerator("Base.", metric=lambda e, p: 0.0, generator_client=client,
+                                replay_mode=replay_mode, replay_path=path, generation_mode=generation_mode,
+                                generation_chunk_size=2, generation_workers=4)
+    rng = random.Random(seed)
+    acquire = generator._acquire_budget
+
+    # Let the chunks reach the client in a scrambled order
+    def jittered(tokens):
+        time.sleep(rng.random() * 0.02)
+        acquire(tokens)
+
+    generator._acquire_budget = jittered
+    return [generator.generate_variations(prompt, 8) for prompt in ("Base.", "Other.", "Base.")]
+
+
+@pytest.mark.parametrize("mode", ["chunked", "choices"])
+def test_parallel_chunks_replay_by_position(tmp_path, monkeypatch, mode):
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "replay.sqlite")
+    recorded = _generate(path, "record", mode, MockChatClient())
+    for seed in range(1, 4):
+        assert _generate(path, "replay", mode, seed=seed) == recorded
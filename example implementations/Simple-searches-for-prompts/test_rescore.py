@@ -0,0 +1,69 @@
+from difflib import SequenceMatcher
+
+import pytest
+
+from EvaluationEngine import MockChatClient, MockEngine
+from ExamplePruning import ExamplePruner
+from PromptGenerator import PromptGenerator
+from Rescore import rescore, spearman
+
+EXAMPLES = [{'input': f'question {i}', 'expected': ' '.join(f'word{j}' for j in range(i % 5 + 3))}
+            for i in range(10)]
+
+
+def similarity(expected: str, predicted: str) -> float:
+    return SequenceMatcher(None, expected, predicted).ratio()
+
+
+def word_count(expected: str, predicted: str) -> float:
+    return len(predicted.split()) / max(1, len(expected.split()))
+
+
+def _run(tmp_path, monkeypatch, **kwargs):
+    monkeypatch.chdir(tmp_path)
+    generator = PromptGenerator("Base.", metric=similarity, generator_client=MockChatClient(), engine=MockEngine(),
+                                breadth=4, max_rounds=3, **kwargs)
+    generator.optimize(EXAMPLES)
+    return generator
+
+
+def _recorded_and_rescored(generator, metric):
+    summary = rescore(generator._run_start, metric, store=generator._store, label='again')
+    ranking = generator._store.rescored_candidates(generator._run_start, 'again')
+    return summary, ranking
+
+
+def test_identical_metric_reproduces_fitness(tmp_path, monkeypatch):
+    generator = _run(tmp_path, monkeypatch)
+    summary, ranking = _recorded_and_rescored(generator, similarity)
+    assert ranking and all(c['rescored_fitness'] == c['fitness'] for c in ranking)
+    assert summary['best_fitness'] == summary['original_best_fitness']
+    assert 'pruned_rounds' not in summary
+
+
+def test_identical_metric_reproduces_pruned_fitness(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    pruner = ExamplePruner(keep=0.4, min_examples=2, min_prompts=3, weighted=True, after_rounds=1)
+    generator = _run(tmp_path, monkeypatch, example_pruner=pruner)
+    assert pruner.active
+    pruned = generator._store.pruning(generator._run_start)
+    assert sorted(pruned) == [1, 2] and pruned[1]['kept'] == pruner.kept
+
+    summary, ranking = _recorded_and_rescored(generator, similarity)
+    assert ranking and all(c['rescored_fitness'] == c['fitness'] for c in ranking)
+    assert all(c['rescored_coverage'] == c['coverage'] for c in ranking)
+    assert summary['pruned_rounds'] == [1, 2]
+
+
+def test_batch_metric_writes_ranking_file(tmp_path, monkeypatch):
+    generator = _run(tmp_path, monkeypatch)
+    summary = rescore(generator._run_start, batch_metric=lambda e, p: [word_count(x, y) for x, y in zip(e, p)],
+                      store=generator._store, label='words')
+    assert summary['label'] == 'words' and summary['unique_cells'] <= summary['cells']
+    assert (tmp_path / "results" / f"rescore_{generator._run_start}_words.json").exists()
+
+
+def test_spearman():
+    assert spearman([1, 2, 3], [10, 20, 30]) == 1.0
+    assert spearman([1, 2, 3], [3, 2, 1]) == -1.0
+    assert spearman([1, 1], [1, 2]) is None
@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+from Router import Endpoint, EvaluatorRouter
+
+BODY = {'model': 'gpt', 'messages': [{'role': 'user', 'content': 'hi'}]}
+
+
+class _Namespace:
+    def __init__(self, **attributes):
+        self.__dict__.update(attributes)
+
+
+class FakeClient:
+    """Chat client that answers with its name after a delay, or fails."""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.bodies = []
+        self.chat = _Namespace(completions=_Namespace(create=self._create))
+
+    def _create(self, **body):
+        self.bodies.append(body)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return self.name
+
+
+def test_slow_call_is_hedged_to_standby():
+    slow, standby = FakeClient("slow", delay=0.5), FakeClient("standby")
+    router = EvaluatorRouter([Endpoint("slow", client=slow), Endpoint("standby", client=standby, weight=0)],
+                             hedge_after=0.05, max_hedge_rate=1.0)
+    assert router.chat.completions.create(**BODY) == "standby"
+    stats = router.stats()
+    assert stats['hedged'] == 1 and stats['hedge_wins'] == 1 and stats['hedge_rate'] == 1.0
+
+
+def test_hedges_stay_within_budget():
+    slow, standby = FakeClient("slow", delay=0.1), FakeClient("standby")
+    router = EvaluatorRouter([Endpoint("slow", client=slow), Endpoint("standby", client=standby, weight=0)],
+                             hedge_after=0.01, max_hedge_rate=0.0)
+    assert router.chat.completions.create(**BODY) == "slow"
+    assert router.stats()['hedged'] == 0 and not standby.bodies
+
+
+def test_failure_fails_over_at_once():
+    router = EvaluatorRouter([Endpoint("down", client=FakeClient("down", fail=True)),
+                              Endpoint("up", client=FakeClient("up"), weight=0)], hedge_percentile=None)
+    assert router.chat.completions.create(**BODY) == "up"
+    stats = router.stats()
+    assert stats['failovers'] == 1 and stats['endpoints']['down']['errors'] == 1
+
+
+def test_all_endpoints_failing_raises():
+    router = EvaluatorRouter([Endpoint("a", client=FakeClient("a", fail=True)),
+                              Endpoint("b", client=FakeClient("b", fail=True))], seed=0)
+    with pytest.raises(RuntimeError):
+        router.chat.completions.create(**BODY)
+    assert router.stats()['failed'] == 1
+
+
+def test_endpoint_model_replaces_request_model():
+    client = FakeClient("azure")
+    router = EvaluatorRouter([Endpoint("azure", client=client, model="deployment")])
+    router.chat.completions.create(**BODY)
+    assert client.bodies[0]['model'] == "deployment" and BODY['model'] == "gpt"
+
+
+def test_hedge_delay_switches_to_percentile():
+    router = EvaluatorRouter([Endpoint("a", client=FakeClient("a"))], hedge_after=2.0, min_samples=10,
+                             hedge_percentile=90)
+    assert router.hedge_delay() == 2.0
+    for i in range(10):
+        router._record_latency(router._endpoints[0], i / 10)
+    assert router.hedge_delay() == 0.9
+
+
+def test_from_urls_reads_only_trailing_weights():
+    router = EvaluatorRouter.from_urls([
+        "https://a.example/v1=3",
+        "https://b.example/openai/v1?api-version=2024-02-01",
+        "https://c.example/v1?api-version=2024-02-01=0.5",
+    ])
+    assert [(e.name, e.weight) for e in router._endpoints] == [
+        ("https://a.example/v1", 3.0),
+        ("https://b.example/openai/v1?api-version=2024-02-01", 1.0),
+        ("https://c.example/v1?api-version=2024-02-01", 0.5),
+    ]
+
+
+def test_rejects_bad_weights():
+    with pytest.raises(ValueError):
+        Endpoint("a", weight=-1)
+    with pytest.raises(ValueError):
+        EvaluatorRouter([Endpoint("a", client=FakeClient("a"), weight=0)])
@@ -0,0 +1,79 @@
+import json
+import sqlite3
+
+from RunStore import RunStore
+
+
+def test_old_store_is_migrated(tmp_path):
+    path = str(tmp_path / "runs.sqlite")
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE examples (run_id TEXT, example_idx INTEGER, input_id INTEGER, expected_id INTEGER, "
+               "PRIMARY KEY (run_id, example_idx))")
+    db.commit()
+    db.close()
+
+    store = RunStore(path)
+    store.record_examples("run", [{'input': 'q', 'expected': 'a', 'model': 'm1'},
+                                  {'input': 'q', 'expected': 'a', 'model': 'm2'}])
+    # Expanded multi-model sets come back once
+    assert store.examples("run") == [{'input': 'q', 'expected': 'a'}]
+    store.record_pruning("run", 1, {'kept': [0], 'weights': [1.0], 'calibration': [0.0, 1.0]})
+    assert store.pruning("run") == {1: {'kept': [0], 'weights': [1.0], 'calibration': [0.0, 1.0]}}
+
+
+def test_texts_are_interned_once(tmp_path):
+    store = RunStore(str(tmp_path / "runs.sqlite"))
+    assert store.intern("prompt") == store.intern("prompt") == store.find("prompt")
+    assert store.find("unseen") is None
+    assert store.text(store.intern("prompt")) == "prompt"
+
+
+def test_import_legacy(tmp_path):
+    legacy = tmp_path / "prompt_gen_old.json"
+    lines = [{'parameters': {'run_start': 'old-run', 'breadth': 2}},
+             {'round': 0, 'prompt': 'A', 'fitness': 0.2},
+             {'round': 0, 'prompt': 'B', 'fitness': 0.4},
+             {'round': 1, 'prompt': 'C', 'fitness': 0.3}]
+    legacy.write_text("\n".join(json.dumps(line) for line in lines) + "\n")
+
+    store = RunStore(str(tmp_path / "runs.sqlite"))
+    assert store.import_legacy(str(legacy)) == 'old-run'
+    run = store.run('old-run')
+    assert run['status'] == 'imported' and run['best_fitness'] == 0.4 and run['params']['breadth'] == 2
+    assert [(c['round'], c['idx'], c['prompt']) for c in store.candidates('old-run')] == \
+        [(0, 1, 'A'), (0, 2, 'B'), (1, 1, 'C')]
+    assert [b['best_so_far'] for b in store.best_per_round('old-run')] == [0.4, 0.4]
+
+
+def test_lineage_queries(tmp_path):
+    store = RunStore(str(tmp_path / "runs.sqlite"))
+    store.start_run("run", {})
+    store.record_candidate("run", 0, 1, "base", 0.3)
+    store.record_lineage("run", ["child", "other"], "base", 1, 1)
+    store.record_candidate("run", 1, 1, "child", 0.5, parent="base")
+    store.record_candidate("run", 1, 2, "other", 0.1, parent="base")
+    assert [link['prompt'] for link in store.lineage("run", "child")] == ["child", "base"]
+    assert [c['prompt'] for c in store.children("run", "base")] == ["child", "other"]
+    stats = store.lineage_stats("run")[0]
+    assert stats['prompt'] == "base" and stats['children'] == 2 and stats['improved'] == 1
+
+
+def test_score_rows_keep_latest_round(tmp_path):
+    store = RunStore(str(tmp_path / "runs.sqlite"))
+    store.record_candidate("run", 0, 1, "A", 0.5)
+    store.record_candidate("run", 1, 1, "A", 0.7)
+    store.record_candidate("run", 1, 2, "B", 0.0)
+    store.record_cells("run", 0, [[0.5, 0.5]], prompt_offset=1)
+    store.record_cells("run", 1, [[0.7, None], [None, None]], prompt_offset=1)
+    assert store.score_rows("run") == {"A": [0.7, None], "B": [None, None]}
+    assert store.cell_matrix("run", 1) == [[0.7, None], [None, None]]
+
+
+def test_fitness_distribution(tmp_path):
+    store = RunStore(str(tmp_path / "runs.sqlite"))
+    for idx in range(5):
+        store.record_candidate("run", 0, idx, f"p{idx}", idx / 4)
+    distribution = store.fitness_distribution("run", bins=4)
+    assert distribution['count'] == 5 and distribution['quantiles']['p50'] == 0.5
+    assert sum(distribution['histogram']) == 5
+    assert store.fitness_distribution("missing") == {'count': 0}
@@ -0,0 +1,92 @@
+from collections import Counter
+
+import pytest
+
+from Diversity import DiversitySelector
+from EvaluationEngine import MockChatClient, MockEngine
+from Lineage import LineageGraph
+from PromptGenerator import PromptGenerator
+from SearchStrategy import STRATEGIES, BeamSearchStrategy, SearchStrategy, TournamentStrategy, UCBBanditStrategy
+
+
+class FakeGenerator:
+    """Generator stand-in that records which parents it was asked to vary."""
+
+    def __init__(self):
+        self.lineage = LineageGraph()
+        self.parents = Counter()
+        self._made = 0
+
+    def generate_variations(self, prompt, n):
+        self.parents[prompt] += n
+        children = [f"{prompt}/{self._made + i}" for i in range(n)]
+        self._made += n
+        self.lineage.record_call(prompt, children, 0)
+        return children
+
+    def crossover_prompts(self, first, second, n):
+        return self.generate_variations(f"{first}x{second}", n)
+
+
+def _results(count=9):
+    return [{'prompt': f"p{i}", 'fitness': i / count} for i in range(count)]
+
+
+@pytest.mark.parametrize("name", sorted(STRATEGIES))
+def test_strategies_return_requested_counts(name):
+    results = _results()
+    best = results[-1]
+    strategy = STRATEGIES[name]()
+    generator = FakeGenerator()
+    assert len(strategy.next_population(generator, results, best['prompt'], best['fitness'], 6)) == 6
+    # A diversity selector asks for more candidates than the round evaluates
+    assert len(strategy.next_population(generator, results, best['prompt'], best['fitness'], 6, candidates=18)) == 18
+
+
+def test_beam_selects_parents_by_breadth_not_candidates():
+    results = _results()
+    generator = FakeGenerator()
+    BeamSearchStrategy().next_population(generator, results, "p8", 8 / 9, 3, candidates=9)
+    # One third of the breadth survives, and it gets all the candidates
+    assert generator.parents == Counter({"p8": 9})
+
+
+def test_tournament_pool_is_sized_by_breadth():
+    strategy = TournamentStrategy(seed=0)
+    strategy.next_population(FakeGenerator(), _results(), "p8", 8 / 9, 3, candidates=9)
+    assert [entry['prompt'] for entry in strategy.state_dict()['pool']] == ["p8", "p7", "p6"]
+
+
+def test_ucb_scales_breadth_allocation_to_candidates():
+    results = _results(4)
+    plain, oversampled = FakeGenerator(), FakeGenerator()
+    UCBBanditStrategy().next_population(plain, results, "p3", 0.75, 4)
+    UCBBanditStrategy().next_population(oversampled, results, "p3", 0.75, 4, candidates=12)
+    assert oversampled.parents == Counter({p: 3 * n for p, n in plain.parents.items()})
+
+
+def test_scale_keeps_total():
+    scaled = SearchStrategy._scale(Counter({'a': 2, 'b': 1}), 7)
+    assert sum(scaled.values()) == 7 and scaled['a'] > scaled['b']
+
+
+class RecordingBeam(BeamSearchStrategy):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def next_population(self, generator, round_results, best_prompt, best_fitness, breadth, candidates=None):
+        self.calls.append((breadth, candidates))
+        return super().next_population(generator, round_results, best_prompt, best_fitness, breadth, candidates)
+
+
+def test_generator_passes_true_breadth_with_diversity(tmp_path, monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.chdir(tmp_path)
+    strategy = RecordingBeam()
+    examples = [{'input': f'q{i}', 'expected': f'answer {i}'} for i in range(3)]
+    generator = PromptGenerator("Base.", metric=lambda e, p: len(p) % 5 / 5, generator_client=MockChatClient(),
+                                engine=MockEngine(), breadth=3, max_rounds=2, strategy=strategy,
+                                diversity=DiversitySelector(oversample=3))
+    generator.optimize(examples)
+    assert strategy.calls == [(3, 9)]
@@ -0,0 +1,59 @@
+from difflib import SequenceMatcher
+
+from EvaluationEngine import MockChatClient, MockEngine
+from PromptGenerator import PromptGenerator
+from StoppingRules import BudgetRule, ConfidenceOverlapRule, PatienceRule
+
+USAGE = {'requests': 90, 'prompt_tokens': 9000, 'completion_tokens': 900}
+
+
+def _state(**overrides):
+    state = {'round_num': 0, 'best_history': [], 'round_best_scores': None, 'previous_best_scores': None,
+             'elapsed_seconds': 0.0, 'usage': dict(USAGE), 'next_round_requests': 10}
+    state.update(overrides)
+    return state
+
+
+def test_patience_waits_for_the_window():
+    rule = PatienceRule(patience=2, min_improvement=0.01)
+    assert rule.check(_state(best_history=[0.5, 0.5])) is None
+    assert rule.check(_state(best_history=[0.5, 0.505, 0.509])) is not None
+    assert rule.check(_state(best_history=[0.5, 0.5, 0.52])) is None
+
+
+def test_confidence_overlap_counts_consecutive_rounds():
+    rule = ConfidenceOverlapRule(patience=2)
+    close = _state(round_best_scores=[0.5, 0.6, 0.55], previous_best_scores=[0.5, 0.58, 0.54])
+    apart = _state(round_best_scores=[0.9, 0.91, 0.9], previous_best_scores=[0.1, 0.11, 0.1])
+    assert rule.check(close) is None
+    assert rule.check(apart) is None
+    assert rule.check(close) is None
+    assert rule.check(close) is not None
+
+    restored = ConfidenceOverlapRule(patience=2)
+    restored.load_state_dict(rule.state_dict())
+    assert restored.check(close) is not None
+
+
+def test_confidence_overlap_needs_both_rows():
+    assert ConfidenceOverlapRule().check(_state(round_best_scores=[0.5, 0.6])) is None
+
+
+def test_budget_checks_the_next_round():
+    assert BudgetRule(max_requests=100).check(_state()) is None
+    assert BudgetRule(max_requests=99).check(_state()) is not None
+    # 110 tokens per request so far, so the next 10 requests bring 9900 + 1100
+    assert BudgetRule(max_tokens=11000).check(_state()) is None
+    assert BudgetRule(max_tokens=10999).check(_state()) is not None
+    assert BudgetRule(max_seconds=60).check(_state(elapsed_seconds=61)) is not None
+
+
+def test_generator_stops_on_first_rule(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    examples = [{'input': f'q{i}', 'expected': f'the answer to question {i}'} for i in range(3)]
+    generator = PromptGenerator("Base.", metric=lambda e, p: SequenceMatcher(None, e, p).ratio(),
+                                generator_client=MockChatClient(), engine=MockEngine(), breadth=3, max_rounds=6,
+                                stopping_rules=[PatienceRule(patience=1, min_improvement=1.0)])
+    result = generator.optimize(examples)
+    assert result['stopped_reason'].startswith("patience")
+    assert generator._store.run(generator._run_start)['stopped_reason'] == result['stopped_reason']
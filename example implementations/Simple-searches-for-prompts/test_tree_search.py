@@ -0,0 +1,66 @@
+import random
+
+import pytest
+
+from EvaluationEngine import MockChatClient, MockEngine
+from PromptGenerator import PromptGenerator
+from TreeSearch import ExampleIndex, TreeSearch
+
+pytest.importorskip("numpy")
+
+TOPICS = [[f"w{t}_{j}" for j in range(30)] for t in range(12)]
+
+
+def _pool(distinct: int = 60, copies: int = 5):
+    rng = random.Random(0)
+    inputs = [" ".join(rng.choice(TOPICS[i % len(TOPICS)]) for _ in range(20)) + f" id{i}" for i in range(distinct)]
+    return [{'input': text, 'expected': f"answer {i}"} for i, text in enumerate(inputs) for _ in range(copies)]
+
+
+def metric(expected: str, predicted: str) -> float:
+    return len(set(expected.split()) & set(predicted.split())) / max(1, len(expected.split()))
+
+
+def test_exact_search_skips_own_input_and_repeats():
+    pool = _pool()
+    index = ExampleIndex.build(pool)
+    query = pool[0]['input']
+    neighbours = index.search([query], k=5, use_ivf=False)[0]
+    inputs = [pool[i]['input'] for i, _ in neighbours]
+    assert len(inputs) == 5 and len(set(inputs)) == 5 and query not in inputs
+
+
+def test_ivf_probes_more_lists_when_probed_ones_run_out():
+    pool = _pool()
+    index = ExampleIndex.build(pool, ivf=True, nlist=30)
+    index.nprobe = 1
+    queries = [pool[i]['input'] for i in range(0, len(pool), 25)]
+    exact = index.search(queries, k=9, use_ivf=False)
+    ivf = index.search(queries, k=9)
+    assert all(len(neighbours) == 9 for neighbours in exact)
+    assert [len(neighbours) for neighbours in ivf] == [len(neighbours) for neighbours in exact]
+
+
+def test_index_round_trips_through_disk(tmp_path):
+    pool = _pool(20, 2)
+    built = ExampleIndex.open(pool, str(tmp_path / "index"), ivf=True)
+    loaded = ExampleIndex.open(pool, str(tmp_path / "index"), ivf=True)
+    assert loaded.has_ivf and loaded.fingerprint == built.fingerprint
+    query = pool[3]['input']
+    assert loaded.search([query], k=3, use_ivf=False) == built.search([query], k=3, use_ivf=False)
+
+
+def test_tree_search_candidates_exclude_evaluation_inputs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pool = _pool(30, 2)
+    index = ExampleIndex.build(pool)
+    evaluation_set = pool[:10]
+    generator = PromptGenerator("Answer.", metric=metric, generator_client=MockChatClient(), engine=MockEngine())
+    search = TreeSearch(generator, index, shots=2, beam_width=2, branching=3)
+    evaluation_inputs = {example['input'] for example in evaluation_set}
+    candidates = search._candidates(evaluation_set)
+    assert candidates and not any(pool[i]['input'] in evaluation_inputs for i in candidates)
+
+    result = search.search(evaluation_set)
+    assert result['rounds'] == 3
+    assert not any(pool[i]['input'] in evaluation_inputs for i in result['best_examples'])
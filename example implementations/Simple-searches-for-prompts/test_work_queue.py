@@ -0,0 +1,95 @@
+import time
+
+from Caches import CompletionCache
+from EvaluationEngine import MockChatClient
+from PromptGenerator import PromptGenerator
+from RateLimiter import RateLimiter
+from WorkQueue import EvaluationWorker, QueueEngine, SQLiteWorkQueue
+
+EXAMPLES = [{'input': 'a', 'expected': 'b'}, {'input': 'c', 'expected': 'd'}]
+
+
+def metric(expected: str, predicted: str) -> float:
+    return len(predicted) % 7 / 7
+
+
+def _task(prompt_idx=0, example_idx=0, content="x"):
+    return {'prompt_idx': prompt_idx, 'example_idx': example_idx,
+            'body': {'model': 'm', 'messages': [{'role': 'user', 'content': content}]}, 'expected': 'b'}
+
+
+def test_push_skips_existing_tasks(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "q.sqlite"))
+    assert queue.push("run", 0, [_task(0), _task(1)]) == 2
+    assert queue.push("run", 0, [_task(0), _task(1)]) == 0
+
+
+def test_expired_lease_is_leased_again(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "q.sqlite"), lease_seconds=0.01)
+    queue.push("run", 0, [_task()])
+    first = queue.lease("w1")
+    time.sleep(0.05)
+    second = queue.lease("w2")
+    assert second and second[0]['id'] == first[0]['id'] and second[0]['attempts'] == 2
+
+
+def test_task_finishes_once(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "q.sqlite"))
+    queue.push("run", 0, [_task()])
+    task = queue.lease("w")[0]
+    queue.complete(task['id'], 0.5, "first")
+    queue.complete(task['id'], 0.9, "late")
+    rows = queue.results("run", 0)
+    assert [(row['score'], row['prediction']) for row in rows] == [(0.5, "first")]
+
+
+def test_failed_task_is_requeued_on_push(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "q.sqlite"), max_attempts=1)
+    queue.push("run", 0, [_task()])
+    task = queue.lease("w")[0]
+    queue.fail(task['id'], "boom")
+    assert queue.counts("run", 0) == {'failed': 1}
+
+    # A resumed run pushes the round again and gets fresh attempts
+    assert queue.push("run", 0, [_task()]) == 1
+    assert queue.counts("run", 0) == {'pending': 1}
+    assert queue.results("run", 0) == []
+    task = queue.lease("w")[0]
+    assert task['attempts'] == 1
+    queue.complete(task['id'], 1.0, "ok")
+    assert [row['status'] for row in queue.results("run", 0)] == ['done']
+
+
+def test_done_task_is_not_requeued(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "q.sqlite"))
+    queue.push("run", 0, [_task()])
+    queue.complete(queue.lease("w")[0]['id'], 1.0, "ok")
+    assert queue.push("run", 0, [_task()]) == 0
+    assert queue.counts("run", 0) == {'done': 1}
+
+
+def test_worker_uses_cache_and_limiter(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / "q.sqlite"))
+    cache = CompletionCache()
+    limiter = RateLimiter(100000, None)
+    queue.push("run", 0, [_task(0), _task(1)])
+    worker = EvaluationWorker(queue, metric, MockChatClient(), completion_cache=cache, rate_limiter=limiter)
+    worker.run(exit_when_idle=True)
+    assert limiter.stats()['requests'] == 1
+    assert cache.stats()['hits'] == 1
+    rows = queue.results("run", 0)
+    assert [row['latency_ms'] is None for row in rows] == [False, True]
+
+
+def test_coordinator_ignores_rows_for_other_requests(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = QueueEngine(str(tmp_path / "q.sqlite"), poll_interval=0.01, local_workers=2)
+    generator = PromptGenerator("Base.", metric=metric, generator_client=MockChatClient(),
+                                evaluator_client=MockChatClient(), engine=engine)
+    # A stale result for cell (0, 0) of round 0, from a request the coordinator no longer sends
+    queue = SQLiteWorkQueue(str(tmp_path / "q.sqlite"))
+    queue.push(generator._run_start, 0, [_task(0, 0, "stale")])
+    queue.complete(queue.lease("old")[0]['id'], 99.0, "stale")
+
+    matrix = engine.score(generator, ["P one", "P two"], EXAMPLES, 0)
+    assert all(score is not None and score != 99.0 for row in matrix for score in row)